@@ -0,0 +1,208 @@
+# accounts/actor.py
+# -*- coding: utf-8 -*-
+"""
+تشخیص یکجای «کاربر فعلی کیست» (پروفایل/باشگاه/هیئت/گروه‌ها):
+  - یک کوئری (select_related روی reverse one-to-one + Exists برای گروه‌ها)
+  - memo روی خود request
+  - کش کوتاه‌مدت بر اساس user_id (ACTOR_CACHE_TTL) که با سیگنال‌ها باطل می‌شود
+"""
+from __future__ import annotations
+
+from dataclasses import asdict, dataclass, field
+from typing import Optional
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db.models import Exists, OuterRef
+
+CACHE_PREFIX = "actor:v1:"
+HEYAT_GROUPS = ("heyat", "board")
+
+
+def _ttl() -> int:
+    return int(getattr(settings, "ACTOR_CACHE_TTL", 60) or 0)
+
+
+def cache_key(user_id) -> str:
+    return f"{CACHE_PREFIX}{user_id}"
+
+
+@dataclass
+class Actor:
+    user_id: Optional[int] = None
+    role: str = ""                       # player/coach/referee/both/club/heyat/board یا ""
+    profile_role: str = ""               # نقش خامِ پروفایل (نرمال‌شده)، بدون fallback
+    profile_id: Optional[int] = None
+    is_coach: bool = False
+    is_referee: bool = False
+    coach_id: Optional[int] = None       # مربیِ بازیکن
+    member_club_id: Optional[int] = None  # باشگاهِ عضویت پروفایل
+    member_board_id: Optional[int] = None
+    club_id: Optional[int] = None        # باشگاهی که کاربر مالک آن است (TkdClub.user)
+    board_id: Optional[int] = None       # هیئتی که کاربر مالک آن است (TkdBoard.user)
+    groups: tuple = ()
+    _profile: object = field(default=None, repr=False, compare=False)
+
+    # ---------- نقش‌ها ----------
+    @property
+    def is_authenticated(self) -> bool:
+        return self.user_id is not None
+
+    @property
+    def is_player(self) -> bool:
+        return self.profile_id is not None and self.role in ("player", "both")
+
+    @property
+    def is_coach_role(self) -> bool:
+        return self.profile_id is not None and self.role in ("coach", "both")
+
+    @property
+    def is_club(self) -> bool:
+        return self.club_id is not None
+
+    @property
+    def is_board(self) -> bool:
+        return self.board_id is not None
+
+    # ---------- اشیاء (lazy) ----------
+    @property
+    def profile(self):
+        if self.profile_id is None:
+            return None
+        if self._profile is None:
+            from accounts.models import UserProfile
+            self._profile = (
+                UserProfile.objects.select_related("club", "tkd_board", "coach")
+                .filter(pk=self.profile_id).first()
+            )
+        return self._profile
+
+    @property
+    def player_profile(self):
+        return self.profile if self.is_player else None
+
+    @property
+    def coach_profile(self):
+        return self.profile if self.is_coach_role else None
+
+    @property
+    def referee_profile(self):
+        return self.profile if self.role == "referee" else None
+
+    @property
+    def club(self):
+        if self.club_id is None:
+            return None
+        from accounts.models import TkdClub
+        return TkdClub.objects.filter(pk=self.club_id).first()
+
+    @property
+    def board(self):
+        if self.board_id is None:
+            return None
+        from accounts.models import TkdBoard
+        return TkdBoard.objects.filter(pk=self.board_id).first()
+
+    def to_cache(self) -> dict:
+        data = asdict(self)
+        data.pop("_profile", None)
+        return data
+
+
+ANONYMOUS = Actor()
+
+
+def _profile_role(prof) -> str:
+    role = (getattr(prof, "role", "") or "").strip().lower() if prof else ""
+    return "heyat" if role in {"board", "hey'at"} else role
+
+
+def _role_of(prof, club_id, board_id, groups) -> str:
+    role = _profile_role(prof)
+    if role:
+        return role
+    if club_id:
+        return "club"
+    if board_id:
+        return "heyat"
+    for g in HEYAT_GROUPS:
+        if g in groups:
+            return g
+    return ""
+
+
+def load_actor(user) -> Actor:
+    """یک کوئری: User + profile(+club/board/coach) + باشگاه/هیئتِ مالک + عضویت گروه‌های هیئت."""
+    User = get_user_model()
+    group_through = User.groups.through
+    qs = (
+        User.objects.filter(pk=user.pk)
+        .select_related("profile", "profile__club", "profile__tkd_board", "profile__coach", "tkdclub", "tkdboard")
+        .annotate(**{
+            f"_in_{g}": Exists(group_through.objects.filter(user_id=OuterRef("pk"), group__name__iexact=g))
+            for g in HEYAT_GROUPS
+        })
+    )
+    u = qs.first()
+    if u is None:
+        return ANONYMOUS
+
+    def _rel(name):
+        try:
+            return getattr(u, name)
+        except Exception:
+            return None
+
+    prof = _rel("profile")
+    club = _rel("tkdclub")
+    board = _rel("tkdboard")
+    groups = tuple(g for g in HEYAT_GROUPS if getattr(u, f"_in_{g}", False))
+    club_id = getattr(club, "id", None)
+    board_id = getattr(board, "id", None)
+
+    return Actor(
+        user_id=u.pk,
+        role=_role_of(prof, club_id, board_id, groups),
+        profile_role=_profile_role(prof),
+        profile_id=getattr(prof, "id", None),
+        is_coach=bool(getattr(prof, "is_coach", False)),
+        is_referee=bool(getattr(prof, "is_referee", False)),
+        coach_id=getattr(prof, "coach_id", None),
+        member_club_id=getattr(prof, "club_id", None),
+        member_board_id=getattr(prof, "tkd_board_id", None),
+        club_id=club_id,
+        board_id=board_id,
+        groups=groups,
+        _profile=prof,
+    )
+
+
+def actor_for_user(user, use_cache: bool = True) -> Actor:
+    if user is None or not getattr(user, "is_authenticated", False):
+        return ANONYMOUS
+    ttl = _ttl() if use_cache else 0
+    if ttl:
+        data = cache.get(cache_key(user.pk))
+        if data:
+            return Actor(**data)
+    actor = load_actor(user)
+    if ttl:
+        cache.set(cache_key(user.pk), actor.to_cache(), ttl)
+    return actor
+
+
+def get_actor(request) -> Actor:
+    """Actor کاربر فعلی؛ در طول یک request فقط یک بار محاسبه می‌شود."""
+    raw = getattr(request, "_request", request)  # DRF Request ← HttpRequest
+    actor = getattr(raw, "_tkd_actor", None)
+    if actor is None or actor.user_id != getattr(request.user, "pk", None):
+        # ClaimsJWTAuthentication: نقش از خود توکن، بدون کوئری
+        actor = getattr(request.user, "actor", None) or actor_for_user(getattr(request, "user", None))
+        raw._tkd_actor = actor
+    return actor
+
+
+def invalidate_actor(user_id) -> None:
+    if user_id:
+        cache.delete(cache_key(user_id))
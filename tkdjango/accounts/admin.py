@@ -6,27 +6,23 @@ from django.shortcuts import get_object_or_404, redirect
 from django.urls import path, reverse
 from django.contrib.auth import get_user_model
 
+from .approvals import approve_clubs, approve_edits, approve_users
 from .models import (
     PendingCoach, PendingReferee, PendingPlayer,
     ApprovedCoach, ApprovedReferee, ApprovedPlayer,
-    UserProfile, PendingClub, TkdClub, TkdBoard, PendingEditProfile
+    UserProfile, PendingClub, TkdClub, TkdBoard, PendingEditProfile, SMSOutbox
 )
 
 UserModel = get_user_model()
 
 
-# -------------------------------
-# Helper: ایجاد/بازیابی User با یوزرنیم = شماره موبایل
-# -------------------------------
-def get_or_create_auth_user_by_phone(phone: str):
-    user, _ = UserModel.objects.get_or_create(
-        username=phone,
-        defaults={'is_active': True}
-    )
-    if not user.has_usable_password():
-        user.set_unusable_password()
-        user.save()
-    return user
+def report_skipped(model_admin, request, result, limit=10):
+    """ردیف‌هایی که تأیید گروهی رد کرد (accounts.approvals) با علت."""
+    skipped = result.get("skipped") or []
+    for pk, reason in skipped[:limit]:
+        model_admin.message_user(request, f"#{pk}: {reason}", level=messages.WARNING)
+    if len(skipped) > limit:
+        model_admin.message_user(request, f"و {len(skipped) - limit} مورد دیگر رد شد.", level=messages.WARNING)
 
 
 # -------------------------------
@@ -73,52 +69,9 @@ class PendingCoachAdmin(PendingSingleApproveMixin, admin.ModelAdmin):
         return qs.filter(role__in=['coach', 'both'])
 
     def approve(self, request, queryset):
-        count = 0
-        for pending in queryset:
-            user_obj = get_or_create_auth_user_by_phone(pending.phone)
-
-            profile = UserProfile.objects.create(
-                first_name=pending.first_name,
-                last_name=pending.last_name,
-                father_name=pending.father_name,
-                national_code=pending.national_code,
-                birth_date=pending.birth_date,
-                phone=pending.phone,
-                gender=pending.gender,
-                role=pending.role,
-                province=pending.province,
-                county=pending.county,
-                city=pending.city,
-                tkd_board=pending.tkd_board,
-                tkd_board_name=pending.tkd_board.name if pending.tkd_board else '',
-                address=pending.address,
-                profile_image=pending.profile_image,
-                belt_grade=pending.belt_grade,
-                belt_certificate_number=pending.belt_certificate_number,
-                belt_certificate_date=pending.belt_certificate_date,
-                is_coach=True,
-                is_referee=pending.role in ['referee', 'both'],
-                coach_level=pending.coach_level,
-                coach_level_International=pending.coach_level_International,
-                kyorogi=pending.kyorogi,
-                kyorogi_level=pending.kyorogi_level,
-                kyorogi_level_International=pending.kyorogi_level_International,
-                poomseh=pending.poomseh,
-                poomseh_level=pending.poomseh_level,
-                poomseh_level_International=pending.poomseh_level_International,
-                hanmadang=pending.hanmadang,
-                hanmadang_level=pending.hanmadang_level,
-                hanmadang_level_International=pending.hanmadang_level_International,
-                confirm_info=pending.confirm_info,
-                club_names=pending.club_names,
-                coach_name=pending.coach_name,
-                club=pending.club,
-                user=user_obj,
-            )
-            profile.coaching_clubs.set(pending.coaching_clubs.all())
-            pending.delete()
-            count += 1
-        self.message_user(request, f"{count} مربی با موفقیت تأیید شدند.")
+        result = approve_users(queryset)
+        self.message_user(request, f"{result['approved']} مربی با موفقیت تأیید شدند.")
+        report_skipped(self, request, result)
     approve.short_description = "تأیید و انتقال به کاربران اصلی"
 
 
@@ -135,52 +88,9 @@ class PendingRefereeAdmin(PendingSingleApproveMixin, admin.ModelAdmin):
         return qs.filter(role__in=['referee', 'both'])
 
     def approve(self, request, queryset):
-        count = 0
-        for pending in queryset:
-            user_obj = get_or_create_auth_user_by_phone(pending.phone)
-
-            profile = UserProfile.objects.create(
-                first_name=pending.first_name,
-                last_name=pending.last_name,
-                father_name=pending.father_name,
-                national_code=pending.national_code,
-                birth_date=pending.birth_date,
-                phone=pending.phone,
-                gender=pending.gender,
-                role=pending.role,
-                province=pending.province,
-                county=pending.county,
-                city=pending.city,
-                tkd_board=pending.tkd_board,
-                tkd_board_name=pending.tkd_board.name if pending.tkd_board else '',
-                address=pending.address,
-                profile_image=pending.profile_image,
-                belt_grade=pending.belt_grade,
-                belt_certificate_number=pending.belt_certificate_number,
-                belt_certificate_date=pending.belt_certificate_date,
-                is_coach=pending.role in ['coach', 'both'],
-                is_referee=True,
-                coach_level=pending.coach_level,
-                coach_level_International=pending.coach_level_International,
-                kyorogi=pending.kyorogi,
-                kyorogi_level=pending.kyorogi_level,
-                kyorogi_level_International=pending.kyorogi_level_International,
-                poomseh=pending.poomseh,
-                poomseh_level=pending.poomseh_level,
-                poomseh_level_International=pending.poomseh_level_International,
-                hanmadang=pending.hanmadang,
-                hanmadang_level=pending.hanmadang_level,
-                hanmadang_level_International=pending.hanmadang_level_International,
-                confirm_info=pending.confirm_info,
-                club_names=pending.club_names,
-                coach_name=pending.coach_name,
-                club=pending.club,
-                user=user_obj,
-            )
-            profile.coaching_clubs.set(pending.coaching_clubs.all())
-            pending.delete()
-            count += 1
-        self.message_user(request, f"{count} داور با موفقیت تأیید شدند.")
+        result = approve_users(queryset)
+        self.message_user(request, f"{result['approved']} داور با موفقیت تأیید شدند.")
+        report_skipped(self, request, result)
     approve.short_description = "تأیید و انتقال به کاربران اصلی"
 
 
@@ -197,41 +107,9 @@ class PendingPlayerAdmin(PendingSingleApproveMixin, admin.ModelAdmin):
         return qs.filter(role='player')
 
     def approve(self, request, queryset):
-        count = 0
-        for pending in queryset:
-            user_obj = get_or_create_auth_user_by_phone(pending.phone)
-
-            profile = UserProfile.objects.create(
-                first_name=pending.first_name,
-                last_name=pending.last_name,
-                father_name=pending.father_name,
-                national_code=pending.national_code,
-                birth_date=pending.birth_date,
-                phone=pending.phone,
-                gender=pending.gender,
-                role=pending.role,
-                province=pending.province,
-                county=pending.county,
-                city=pending.city,
-                tkd_board=pending.tkd_board,
-                tkd_board_name=pending.tkd_board.name if pending.tkd_board else '',
-                address=pending.address,
-                profile_image=pending.profile_image,
-                belt_grade=pending.belt_grade,
-                belt_certificate_number=pending.belt_certificate_number,
-                belt_certificate_date=pending.belt_certificate_date,
-                is_coach=False,
-                is_referee=False,
-                confirm_info=pending.confirm_info,
-                club_names=pending.club_names,
-                coach_name=pending.coach_name,
-                club=pending.club,
-                user=user_obj,
-            )
-            profile.coaching_clubs.set(pending.coaching_clubs.all())
-            pending.delete()
-            count += 1
-        self.message_user(request, f"{count} بازیکن با موفقیت تأیید شدند.")
+        result = approve_users(queryset)
+        self.message_user(request, f"{result['approved']} بازیکن با موفقیت تأیید شدند.")
+        report_skipped(self, request, result)
     approve.short_description = "تأیید و انتقال به کاربران اصلی"
 
 
@@ -283,32 +161,9 @@ class PendingClubAdmin(admin.ModelAdmin):
     change_form_template = "admin/accounts/pendinguserprofile/approve_pending_club.html"
 
     def approve(self, request, queryset):
-        count = 0
-        for pending in queryset:
-            user_obj = get_or_create_auth_user_by_phone(pending.founder_phone)
-
-            TkdClub.objects.create(
-                club_name=pending.club_name,
-                founder_name=pending.founder_name,
-                founder_national_code=pending.founder_national_code,
-                founder_phone=pending.founder_phone,
-                club_type=pending.club_type,
-                activity_description=pending.activity_description,
-                province=pending.province,
-                county=pending.county,
-                city=pending.city,
-                tkd_board=pending.tkd_board,
-                phone=pending.phone,
-                address=pending.address,
-                license_number=pending.license_number,
-                federation_id=pending.federation_id,
-                license_image=pending.license_image,
-                confirm_info=pending.confirm_info,
-                user=user_obj,  # برای لاگین باشگاه
-            )
-            pending.delete()
-            count += 1
-        self.message_user(request, f"{count} باشگاه با موفقیت تأیید شد.")
+        result = approve_clubs(queryset)
+        self.message_user(request, f"{result['approved']} باشگاه با موفقیت تأیید شد.")
+        report_skipped(self, request, result)
     approve.short_description = "تأیید و انتقال به لیست باشگاه‌ها"
 
 
@@ -324,36 +179,9 @@ class PendingEditsAdmin(admin.ModelAdmin):
         return super().get_queryset(request).filter(original_user__isnull=False)
 
     def approve(self, request, queryset):
-        count = 0
-        for pending in queryset:
-            user = pending.original_user
-            if not user:
-                continue
-
-            # بروزرسانی فیلدها
-            for field in [
-                'first_name', 'last_name', 'birth_date', 'belt_grade', 'belt_certificate_number',
-                'belt_certificate_date', 'address', 'coach', 'coach_name', 'club', 'club_names',
-                'tkd_board', 'tkd_board_name', 'coach_level', 'coach_level_International',
-                'kyorogi', 'kyorogi_level', 'kyorogi_level_International',
-                'poomseh', 'poomseh_level', 'poomseh_level_International',
-                'hanmadang', 'hanmadang_level', 'hanmadang_level_International',
-                'is_coach', 'is_referee',
-            ]:
-                setattr(user, field, getattr(pending, field))
-
-            if pending.coaching_clubs.exists():
-                user.coaching_clubs.set(pending.coaching_clubs.all())
-
-            # تصویر جدید
-            if pending.profile_image:
-                user.profile_image = pending.profile_image
-
-            user.save()
-            pending.delete()
-            count += 1
-
-        self.message_user(request, f"{count} ویرایش تأیید شد.")
+        result = approve_edits(queryset)
+        self.message_user(request, f"{result['approved']} ویرایش تأیید شد.")
+        report_skipped(self, request, result)
     approve.short_description = "تأیید و اعمال ویرایش"
 
 
@@ -401,6 +229,19 @@ class TkdBoardAdmin(admin.ModelAdmin):
     search_fields = ['name', 'province', 'city']
 
 
+@admin.register(SMSOutbox)
+class SMSOutboxAdmin(admin.ModelAdmin):
+    list_display = ['phone', 'kind', 'status', 'attempts', 'provider', 'created_at', 'sent_at']
+    list_filter = ['status', 'kind', 'provider']
+    search_fields = ['phone', 'provider_ref']
+    # params (کد تأیید) عمداً نمایش داده نمی‌شود
+    fields = ['phone', 'kind', 'status', 'attempts', 'next_attempt_at', 'provider', 'provider_ref',
+              'last_error', 'created_at', 'expires_at', 'sent_at']
+    readonly_fields = fields
+
+    def has_add_permission(self, request): return False
+
+
 # -------------------------------
 # Register
 # -------------------------------
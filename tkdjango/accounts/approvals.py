@@ -0,0 +1,305 @@
+# accounts/approvals.py
+# -*- coding: utf-8 -*-
+"""
+تأیید گروهی ثبت‌نام‌ها (PendingUserProfile / PendingClub) و ویرایش‌ها (PendingEditProfile):
+  - کل دسته در یک تراکنش؛ User و UserProfile/TkdClub با bulk_create و ویرایش‌ها با bulk_update
+  - هش رمزها (= کد ملی) در یک ThreadPool ساخته می‌شود (pbkdf2 در hashlib قفل GIL را آزاد می‌کند)
+  - عکس pending_photos/ روی دیسک به player_photos/ منتقل (rename) می‌شود، نه کپی؛ اگر تراکنش شکست بخورد برمی‌گردد
+  - ردیف‌های ویرایش‌شده post_save را دستی می‌فرستند تا کش Actor/توکن‌ها/کارت‌ها مثل save() باطل شوند
+خروجی هر تابع: {"approved": تعداد، "skipped": [(pk، علت)]}
+"""
+import logging
+import os
+import posixpath
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import router, transaction
+from django.db.models.signals import post_save
+
+from main import normalize
+from main.caching import invalidate as invalidate_cache
+from main.images import delete_variants
+
+from .actor import invalidate_actor
+from .models import PendingClub, PendingEditProfile, PendingUserProfile, TkdClub, UserProfile
+from .signals import CLAIM_FIELDS
+from .tokens import revoke_tokens
+
+logger = logging.getLogger(__name__)
+User = get_user_model()
+
+# همان فیلدهای approve_edited_profile
+EDIT_FIELDS = (
+    'first_name', 'last_name', 'father_name', 'birth_date', 'gender',
+    'address', 'province', 'county', 'city',
+    'belt_grade', 'belt_certificate_number', 'belt_certificate_date',
+    'coach_level', 'coach_level_International',
+    'kyorogi', 'kyorogi_level', 'kyorogi_level_International',
+    'poomseh', 'poomseh_level', 'poomseh_level_International',
+    'hanmadang', 'hanmadang_level', 'hanmadang_level_International',
+    'is_coach', 'is_referee', 'tkd_board_name', 'club_names', 'confirm_info', 'role',
+)
+
+# فیلدهای مشترک PendingUserProfile → UserProfile
+PROFILE_FIELDS = (
+    'first_name', 'last_name', 'father_name', 'national_code', 'birth_date', 'phone',
+    'gender', 'role', 'province', 'county', 'city', 'tkd_board_id', 'address',
+    'belt_grade', 'belt_certificate_number', 'belt_certificate_date',
+    'coach_level', 'coach_level_International',
+    'kyorogi', 'kyorogi_level', 'kyorogi_level_International',
+    'poomseh', 'poomseh_level', 'poomseh_level_International',
+    'hanmadang', 'hanmadang_level', 'hanmadang_level_International',
+    'confirm_info', 'club_names', 'coach_name', 'club_id', 'coach_id',
+)
+
+CLUB_FIELDS = (
+    'club_name', 'founder_name', 'founder_national_code', 'founder_phone', 'club_type',
+    'activity_description', 'province', 'county', 'city', 'tkd_board_id', 'phone', 'address',
+    'license_number', 'federation_id', 'confirm_info',
+)
+
+
+def approval_settings() -> dict:
+    cfg = dict(getattr(settings, "APPROVALS", {}) or {})
+    cfg.setdefault("HASH_WORKERS", min(8, os.cpu_count() or 1))
+    cfg.setdefault("BATCH_SIZE", 500)
+    return cfg
+
+
+def hash_passwords(raws):
+    """رمزهای خام → هش (None/خالی → رمز غیرقابل‌استفاده)، به همان ترتیب."""
+    unique = {r for r in raws if r}
+    workers = max(1, int(approval_settings()["HASH_WORKERS"]))
+    if workers > 1 and len(unique) > 1:
+        with ThreadPoolExecutor(max_workers=min(workers, len(unique))) as pool:
+            hashed = dict(zip(unique, pool.map(make_password, unique)))
+    else:
+        hashed = {r: make_password(r) for r in unique}
+    unusable = make_password(None)
+    return [hashed[r] if r else unusable for r in raws]
+
+
+def _national_code_password(code):
+    code = normalize.digits((code or "").strip())
+    return code if code.isdigit() else None
+
+
+class FileMover:
+    """جابه‌جایی فایل‌ها روی FileSystemStorage با امکان برگشت؛ storage غیرمحلی همان نام را نگه می‌دارد."""
+
+    def __init__(self, field):
+        self.storage = field.storage
+        self.folder = field.upload_to if isinstance(field.upload_to, str) else ""
+        self.done = []
+
+    def move(self, name):
+        if not name or not self.folder or name.startswith(self.folder):
+            return name
+        try:
+            src = self.storage.path(name)
+        except NotImplementedError:
+            return name
+        if not os.path.exists(src):
+            return name
+        new_name = self.storage.get_available_name(posixpath.join(self.folder, posixpath.basename(name)))
+        dst = self.storage.path(new_name)
+        os.makedirs(os.path.dirname(dst), exist_ok=True)
+        os.replace(src, dst)
+        self.done.append((dst, src))
+        # نسخه‌های کوچک (main.images) مسیر قبلی را دارند؛ در صورت نیاز از مسیر جدید دوباره ساخته می‌شوند
+        delete_variants(self.storage, name)
+        return new_name
+
+    def undo(self):
+        for dst, src in reversed(self.done):
+            try:
+                os.replace(dst, src)
+            except OSError as e:
+                logger.warning("could not move %s back to %s: %s", dst, src, e)
+        self.done = []
+
+
+def _set_m2m(field, rows):
+    """rows: [(pk مبدأ، [pk مقصدها])] → ردیف‌های جدول واسط با یک delete و یک bulk_create."""
+    through = field.remote_field.through
+    src, dst = f"{field.m2m_field_name()}_id", f"{field.m2m_reverse_field_name()}_id"
+    through.objects.filter(**{f"{src}__in": [pk for pk, _t in rows]}).delete()
+    through.objects.bulk_create(
+        [through(**{src: pk, dst: t}) for pk, targets in rows for t in targets],
+        batch_size=approval_settings()["BATCH_SIZE"], ignore_conflicts=True,
+    )
+
+
+def _users_for(usernames, passwords):
+    """User موجود (رمز جدید) یا جدید با username = موبایل → {username: id}"""
+    batch = approval_settings()["BATCH_SIZE"]
+    existing = {u.username: u for u in User.objects.filter(username__in=usernames)}
+    new = []
+    for username, pw in zip(usernames, passwords):
+        u = existing.get(username)
+        if u is not None:
+            u.password = pw
+        else:
+            new.append(User(username=username, password=pw))
+    User.objects.bulk_create(new, batch_size=batch)
+    if existing:
+        User.objects.bulk_update(list(existing.values()), ["password"], batch_size=batch)
+        for u in existing.values():
+            transaction.on_commit(lambda uid=u.pk: (invalidate_actor(uid), revoke_tokens(uid)))
+    return dict(User.objects.filter(username__in=usernames).values_list("username", "id"))
+
+
+def approve_users(queryset) -> dict:
+    """PendingUserProfile (یا proxy های آن) → UserProfile + User؛ رمز = کد ملی."""
+    pendings = list(queryset.prefetch_related("coaching_clubs").select_related("tkd_board"))
+    codes = [p.national_code for p in pendings]
+    phones = [(p.phone or "").strip() for p in pendings]
+    taken_codes = set(UserProfile.objects.filter(national_code__in=codes).values_list("national_code", flat=True))
+    taken_phones = set(UserProfile.objects.filter(phone__in=phones).values_list("phone", flat=True))
+    linked = set(UserProfile.objects.filter(user__username__in=phones).values_list("user__username", flat=True))
+
+    ok, skipped = [], []
+    for p, phone in zip(pendings, phones):
+        if p.national_code in taken_codes:
+            skipped.append((p.pk, "این کاربر قبلاً تأیید شده است."))
+        elif phone in taken_phones or phone in linked:
+            skipped.append((p.pk, "این شماره قبلاً برای کاربر دیگری ثبت شده است."))
+        else:
+            ok.append((p, phone))
+    if not ok:
+        return {"approved": 0, "skipped": skipped}
+
+    passwords = hash_passwords([_national_code_password(p.national_code) for p, _ph in ok])
+    image = FileMover(UserProfile._meta.get_field("profile_image"))
+    try:
+        with transaction.atomic():
+            user_ids = _users_for([ph for _p, ph in ok], passwords)
+            profiles = []
+            for p, phone in ok:
+                data = {f: getattr(p, f) for f in PROFILE_FIELDS}
+                data["phone"] = phone
+                data["tkd_board_name"] = p.tkd_board.name if p.tkd_board else ''
+                data["is_coach"] = p.role in ('coach', 'both')
+                data["is_referee"] = p.role in ('referee', 'both')
+                data["profile_image"] = image.move(p.profile_image.name)
+                profiles.append(UserProfile(user_id=user_ids[phone], **data))
+                profiles[-1].fill_search_text()
+            UserProfile.objects.bulk_create(profiles, batch_size=approval_settings()["BATCH_SIZE"])
+
+            pk_by_code = dict(UserProfile.objects.filter(national_code__in=[p.national_code for p, _ph in ok])
+                              .values_list("national_code", "id"))
+            clubs = [(pk_by_code[p.national_code], [c.pk for c in p.coaching_clubs.all()]) for p, _ph in ok]
+            clubs = [row for row in clubs if row[1]]
+            if clubs:
+                _set_m2m(UserProfile._meta.get_field("coaching_clubs"), clubs)
+
+            PendingUserProfile.objects.filter(pk__in=[p.pk for p, _ph in ok]).delete()
+            transaction.on_commit(lambda: invalidate_cache("form_data"))
+    except Exception:
+        image.undo()
+        raise
+    return {"approved": len(ok), "skipped": skipped}
+
+
+def approve_clubs(queryset) -> dict:
+    """PendingClub → TkdClub + User (username = موبایل موسس، رمز = کد ملی موسس)."""
+    pendings = list(queryset.select_related("tkd_board"))
+    licenses = set(TkdClub.objects.filter(license_number__in=[p.license_number for p in pendings])
+                   .values_list("license_number", flat=True))
+    names = set(TkdClub.objects.filter(club_name__in=[p.club_name for p in pendings])
+                .values_list("club_name", flat=True))
+    phones = [(p.founder_phone or "").strip() for p in pendings]
+    linked = set(TkdClub.objects.filter(user__username__in=phones).values_list("user__username", flat=True))
+
+    ok, skipped = [], []
+    for p, phone in zip(pendings, phones):
+        if (p.license_number and p.license_number in licenses) or p.club_name in names:
+            skipped.append((p.pk, "این باشگاه قبلاً ثبت و تایید شده است."))
+        elif phone in linked:
+            skipped.append((p.pk, "این شماره به باشگاه دیگری متصل است."))
+        else:
+            licenses.add(p.license_number)
+            linked.add(phone)
+            ok.append((p, phone))
+    if not ok:
+        return {"approved": 0, "skipped": skipped}
+
+    passwords = hash_passwords([_national_code_password(p.founder_national_code) for p, _ph in ok])
+    image = FileMover(TkdClub._meta.get_field("license_image"))
+    try:
+        with transaction.atomic():
+            user_ids = _users_for([ph for _p, ph in ok], passwords)
+            clubs = []
+            for p, phone in ok:
+                data = {f: getattr(p, f) for f in CLUB_FIELDS}
+                data["founder_phone"] = phone
+                data["license_image"] = image.move(p.license_image.name)
+                clubs.append(TkdClub(user_id=user_ids[phone], **data))
+                clubs[-1].fill_search_text()
+            TkdClub.objects.bulk_create(clubs, batch_size=approval_settings()["BATCH_SIZE"])
+            PendingClub.objects.filter(pk__in=[p.pk for p, _ph in ok]).delete()
+            transaction.on_commit(lambda: invalidate_cache("form_data"))
+    except Exception:
+        image.undo()
+        raise
+    return {"approved": len(ok), "skipped": skipped}
+
+
+def approve_edits(queryset) -> dict:
+    """PendingEditProfile → اعمال روی original_user با یک bulk_update."""
+    pendings = list(queryset.select_related("original_user").prefetch_related("coaching_clubs"))
+    ok, skipped = [], []
+    for p in pendings:
+        if p.original_user_id is None:
+            skipped.append((p.pk, "پروفایل اصلی یافت نشد."))
+        else:
+            ok.append(p)
+    if not ok:
+        return {"approved": 0, "skipped": skipped}
+
+    claim_fields = CLAIM_FIELDS[UserProfile]
+    image = FileMover(UserProfile._meta.get_field("profile_image"))
+    fields = {*EDIT_FIELDS, "search_text"}
+    profiles = []
+    try:
+        with transaction.atomic():
+            for p in ok:
+                prof = p.original_user
+                prof._claims_before = tuple(getattr(prof, f) for f in claim_fields)
+                for f in EDIT_FIELDS:
+                    setattr(prof, f, getattr(p, f))
+                if p.tkd_board_id:
+                    prof.tkd_board_id = p.tkd_board_id
+                    fields.add("tkd_board")
+                if p.coach_id:
+                    prof.coach_id, prof.coach_name = p.coach_id, p.coach_name
+                    fields.update(("coach", "coach_name"))
+                if p.club_id:
+                    prof.club_id = p.club_id
+                    fields.add("club")
+                if p.profile_image:
+                    prof.profile_image = image.move(p.profile_image.name)
+                    fields.add("profile_image")
+                prof.fill_search_text()
+                profiles.append(prof)
+            UserProfile.objects.bulk_update(profiles, sorted(fields), batch_size=approval_settings()["BATCH_SIZE"])
+
+            clubs = [(p.original_user_id, [c.pk for c in p.coaching_clubs.all()]) for p in ok]
+            clubs = [row for row in clubs if row[1]]
+            if clubs:
+                _set_m2m(UserProfile._meta.get_field("coaching_clubs"), clubs)
+
+            PendingEditProfile.objects.filter(pk__in=[p.pk for p in ok]).delete()
+
+            # گیرنده‌های post_save (Actor/توکن، کش کارت‌ها و form_data) همان رفتار save() را داشته باشند
+            using = router.db_for_write(UserProfile)
+            for prof in profiles:
+                post_save.send(sender=UserProfile, instance=prof, created=False,
+                               update_fields=None, raw=False, using=using)
+    except Exception:
+        image.undo()
+        raise
+    return {"approved": len(ok), "skipped": skipped}
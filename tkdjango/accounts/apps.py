@@ -4,3 +4,14 @@ from django.apps import AppConfig
 class AccountsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'accounts'
+
+    def ready(self):
+        import accounts.signals  # noqa
+        from django.db.models.signals import post_migrate
+        post_migrate.connect(_ensure_search_indexes, sender=self)
+
+
+def _ensure_search_indexes(sender, using="default", **kwargs):
+    # جدول FTS5/ایندکس trigram جستجو (accounts.search) بعد از هر migrate بررسی و در صورت نیاز ساخته شود
+    from accounts.search import ensure_indexes
+    ensure_indexes(using=using)
@@ -0,0 +1,45 @@
+# accounts/authentication.py
+# -*- coding: utf-8 -*-
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+
+from .tokens import VERSION_CLAIM, actor_from_claims, current_version
+
+
+def _check_version(validated_token):
+    user_id = validated_token.get(api_settings.USER_ID_CLAIM)
+    if int(validated_token.get(VERSION_CLAIM, 0) or 0) != current_version(user_id):
+        raise AuthenticationFailed(_("توکن باطل شده است؛ دوباره وارد شوید."), code="token_revoked")
+
+
+class VersionedJWTAuthentication(JWTAuthentication):
+    """همان JWTAuthentication به‌علاوهٔ بررسی نسخهٔ توکن (ابطال)."""
+
+    def get_user(self, validated_token):
+        _check_version(validated_token)
+        return super().get_user(validated_token)
+
+
+class ClaimsUser(TokenUser):
+    """کاربر بدون کوئری که از claimهای توکن ساخته می‌شود؛ فقط برای endpointهای خواندنی."""
+
+    @property
+    def actor(self):
+        return actor_from_claims(self.token)
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    """
+    به claimهای نقش داخل توکن اعتماد می‌کند و جدول کاربران را نمی‌خواند.
+    request.user مدل واقعی نیست؛ در ORM به جای آن از request.user.id استفاده شود.
+    توکن‌های قدیمی (بدون claim نقش) به مسیر عادی برمی‌گردند.
+    """
+
+    def get_user(self, validated_token):
+        _check_version(validated_token)
+        if "role" not in validated_token:
+            return super().get_user(validated_token)
+        return ClaimsUser(validated_token)
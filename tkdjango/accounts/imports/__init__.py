@@ -0,0 +1,55 @@
+# accounts/imports/__init__.py
+import os
+import secrets
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+from .importers import ClubImporter, ImportReport, PlayerImporter
+from .readers import ImportFileError
+
+IMPORTERS = {
+    "players": PlayerImporter,
+    "clubs": ClubImporter,
+}
+
+
+def import_settings() -> dict:
+    cfg = dict(getattr(settings, "IMPORTS", {}) or {})
+    cfg.setdefault("CHUNK_SIZE", 1000)
+    # گزارش خطا شامل کد ملی/موبایل است → پوشهٔ خصوصی بیرون از MEDIA_ROOT
+    cfg.setdefault("REPORT_DIR", os.path.join(settings.BASE_DIR, "private", "imports"))
+    cfg.setdefault("STRICT_NATIONAL_CODE", False)       # بررسی رقم کنترل کد ملی
+    return cfg
+
+
+def run_import(path, kind="players", board=None, dry_run=False, sheet=None, chunk_size=None,
+               strict_national_code=None) -> ImportReport:
+    cfg = import_settings()
+    cls = IMPORTERS.get(kind)
+    if cls is None:
+        raise ImportFileError(f"نوع ورود نامعتبر است: {kind}")
+    if strict_national_code is None:
+        strict_national_code = cfg["STRICT_NATIONAL_CODE"]
+    importer = cls(board=board, dry_run=dry_run, strict_national_code=strict_national_code)
+    return importer.run(path, sheet=sheet, chunk_size=chunk_size or cfg["CHUNK_SIZE"])
+
+
+def save_error_report(report: ImportReport, name: str) -> str:
+    """
+    گزارش خطا را در REPORT_DIR (خارج از MEDIA_ROOT، بدون آدرس عمومی) ذخیره می‌کند و مسیر کامل فایل را برمی‌گرداند.
+    یک توکن تصادفی به نام فایل اضافه می‌شود تا قابل حدس نباشد.
+    """
+    from django.core.files.base import ContentFile
+    from django.core.files.storage import FileSystemStorage
+
+    directory = os.path.abspath(import_settings()["REPORT_DIR"])
+    media_root = os.path.abspath(settings.MEDIA_ROOT)
+    if os.path.commonpath([directory, media_root]) == media_root:
+        raise ImproperlyConfigured("IMPORTS['REPORT_DIR'] نباید داخل MEDIA_ROOT باشد.")
+
+    base, ext = os.path.splitext(name)
+    storage = FileSystemStorage(location=directory, file_permissions_mode=0o600,
+                                directory_permissions_mode=0o700)
+    saved = storage.save(f"{base}-{secrets.token_urlsafe(16)}{ext}", ContentFile(report.error_csv()))
+    return storage.path(saved)
@@ -0,0 +1,439 @@
+# accounts/imports/importers.py
+# -*- coding: utf-8 -*-
+"""
+ورود گروهی بازیکنان/مربیان (UserProfile) و باشگاه‌ها (TkdClub) از CSV/XLSX:
+  - فایل به‌صورت جریانی و در chunk خوانده می‌شود؛ هر chunk در یک تراکنش با bulk_create ذخیره می‌شود
+  - ارقام/تاریخ‌ها با main.normalize یکدست می‌شوند (تاریخ‌های یک chunk دسته‌ای)
+  - یکتایی کد ملی/موبایل/نام باشگاه با مجموعه‌های درحافظه (یک بار از DB + سطرهای قبلی همین فایل) چک می‌شود
+  - User هر سطر: username = موبایل، بدون رمز قابل‌استفاده؛ کاربر با «فراموشی رمز» (OTP) فعال می‌شود و رمز = کد ملی
+سطرهای نامعتبر ذخیره نمی‌شوند و در ImportReport (قابل خروجی CSV) با شمارهٔ سطر و علت می‌آیند.
+"""
+import re
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+
+from accounts.models import PendingClub, PendingUserProfile, TkdBoard, TkdClub, UserProfile
+from main import jalali, normalize
+
+from .readers import ImportFileError, chunked, open_rows, write_csv
+
+User = get_user_model()
+
+_SPACES_RE = re.compile(r"\s+")
+_PERSIAN = {ord("ي"): "ی", ord("ى"): "ی", ord("ك"): "ک"}
+# متن ذخیره‌شونده: نیم‌فاصله حفظ می‌شود
+_TEXT = {**normalize.CLEAN, **_PERSIAN, 0x200C: "\u200c"}
+# کلید مقایسه: نیم‌فاصله و _ → فاصله
+_KEY = {**normalize.CLEAN, **_PERSIAN, 0x200C: " ", ord("ۀ"): "ه", ord("_"): " "}
+
+
+def norm_key(s) -> str:
+    """برای مقایسهٔ سرستون/نام: ی/ک عربی، نیم‌فاصله، فاصله‌های تکراری و حروف بزرگ یکدست می‌شوند."""
+    return _SPACES_RE.sub(" ", str(s).translate(_KEY)).strip().lower()
+
+
+def national_code_ok(code: str) -> bool:
+    """الگوریتم رقم کنترل کد ملی."""
+    if len(code) != 10 or not code.isdigit() or len(set(code)) == 1:
+        return False
+    s = sum(int(code[i]) * (10 - i) for i in range(9)) % 11
+    check = int(code[9])
+    return check == s if s < 2 else check == 11 - s
+
+
+def clean_national_code(v) -> str:
+    t = normalize.clean(v).strip().replace("-", "").replace(" ", "")
+    if t.isdigit() and 8 <= len(t) < 10:   # صفرهای ابتدایی که اکسل حذف کرده
+        t = t.zfill(10)
+    return t
+
+
+def clean_phone(v) -> str:
+    t = re.sub(r"[\s\-()]", "", normalize.clean(v))
+    if t.startswith("+98"):
+        t = "0" + t[3:]
+    elif t.startswith("0098"):
+        t = "0" + t[4:]
+    elif t.startswith("98") and len(t) == 12:
+        t = "0" + t[2:]
+    elif t.startswith("9") and len(t) == 10:  # صفر اول که اکسل حذف کرده
+        t = "0" + t
+    return t
+
+
+def phone_ok(phone: str) -> bool:
+    return phone.isdigit() and phone.startswith("09") and len(phone) == 11
+
+
+class ImportReport:
+    def __init__(self, kind: str, dry_run: bool = False):
+        self.kind = kind
+        self.dry_run = dry_run
+        self.rows = 0
+        self.created = 0
+        self.headers = []
+        self.errors = []   # (شمارهٔ سطر، ستون، پیام، مقادیر خام)
+
+    def add_error(self, row: int, field: str, message: str, values=()):
+        self.errors.append((row, field, message, values))
+
+    @property
+    def failed_rows(self) -> int:
+        return len({e[0] for e in self.errors})
+
+    def as_dict(self) -> dict:
+        return {
+            "kind": self.kind, "dry_run": self.dry_run, "rows": self.rows,
+            "created": self.created, "failed": self.failed_rows,
+        }
+
+    def error_csv(self) -> bytes:
+        head = ["سطر", "ستون", "خطا", *self.headers]
+        return write_csv([head, *([r, f, m, *v] for r, f, m, v in self.errors)])
+
+
+class BaseImporter:
+    kind = ""
+    model = None
+    # فیلد → نام‌های قابل قبول سرستون (فارسی/انگلیسی)
+    COLUMNS = {}
+    REQUIRED = ()
+
+    def __init__(self, board=None, dry_run=False, strict_national_code=False):
+        self.default_board = board
+        self.dry_run = dry_run
+        self.strict_national_code = strict_national_code
+        self._lengths = {
+            f.name: f.max_length for f in self.model._meta.get_fields()
+            if getattr(f, "max_length", None) and not f.is_relation
+        }
+
+    # ---------- سرستون‌ها ----------
+    def map_headers(self, headers):
+        aliases = {}
+        for field, names in self.COLUMNS.items():
+            for name in (field, *names):
+                aliases[norm_key(name)] = field
+        columns = {}
+        for i, h in enumerate(headers):
+            field = aliases.get(norm_key(h))
+            if field and field not in columns:
+                columns[field] = i
+        missing = [f for f in self.REQUIRED if f not in columns]
+        if missing:
+            names = "، ".join(self.COLUMNS[f][0] if self.COLUMNS[f] else f for f in missing)
+            raise ImportFileError(f"ستون‌های الزامی در فایل نیست: {names}")
+        return columns
+
+    # ---------- داده‌های موجود ----------
+    def load_existing(self):
+        self.usernames = set(User.objects.values_list("username", flat=True))
+        self.boards = {}
+        for b in TkdBoard.objects.only("id", "name"):
+            self.boards[norm_key(b.name)] = b
+            self.boards[str(b.pk)] = b
+
+    def board_for(self, raw):
+        if raw:
+            return self.boards.get(norm_key(raw)) or self.boards.get(normalize.digits(raw))
+        return self.default_board
+
+    # ---------- اجرا ----------
+    def run(self, path, sheet=None, chunk_size=1000) -> ImportReport:
+        report = ImportReport(self.kind, self.dry_run)
+        headers, rows = open_rows(path, sheet)
+        report.headers = headers
+        self.columns = self.map_headers(headers)
+        self.load_existing()
+
+        for chunk in chunked(rows, max(1, int(chunk_size))):
+            report.rows += len(chunk)
+            raws = [(n, values, self._raw(values)) for n, values in chunk]
+            records = self.prepare(raws, report)
+            if records and not self.dry_run:
+                with transaction.atomic():
+                    self.save(records)
+            report.created += len(records)
+
+        if report.created and not self.dry_run:
+            from main.caching import invalidate
+            invalidate("form_data")   # bulk_create سیگنال post_save نمی‌فرستد
+        return report
+
+    def _raw(self, values):
+        return {f: (values[i] if i < len(values) else "") for f, i in self.columns.items()}
+
+    def text(self, raw, field) -> str:
+        v = raw.get(field, "")
+        return _SPACES_RE.sub(" ", v.translate(_TEXT)).strip() if isinstance(v, str) else str(v)
+
+    def check_lengths(self, data, errs):
+        for field, value in data.items():
+            limit = self._lengths.get(field)
+            if limit and isinstance(value, str) and len(value) > limit:
+                errs.append((field, f"حداکثر {limit} نویسه مجاز است."))
+
+    def check_national_code(self, raw, field, errs, taken=None):
+        code = clean_national_code(raw.get(field, ""))
+        if not (code.isdigit() and len(code) == 10):
+            errs.append((field, "کد ملی باید ۱۰ رقمی باشد."))
+        elif self.strict_national_code and not national_code_ok(code):
+            errs.append((field, "کد ملی نامعتبر است."))
+        elif taken is not None and code in taken:
+            errs.append((field, "این کد ملی قبلاً ثبت شده است."))
+        return code
+
+    def check_phone(self, raw, field, errs, taken=()):
+        phone = clean_phone(raw.get(field, ""))
+        if not phone_ok(phone):
+            errs.append((field, "شماره موبایل معتبر نیست."))
+        elif phone in taken or phone in self.usernames:
+            errs.append((field, "این شماره قبلاً ثبت شده است."))
+        return phone
+
+    def create_users(self, phones):
+        """User های بدون رمز قابل‌استفاده (بدون هش؛ یک مقدار '!...' برای کل chunk) → {موبایل: id}"""
+        unusable = make_password(None)
+        User.objects.bulk_create([User(username=p, password=unusable) for p in phones], batch_size=500)
+        return dict(User.objects.filter(username__in=phones).values_list("username", "id"))
+
+    def prepare(self, raws, report):
+        raise NotImplementedError
+
+    def save(self, records):
+        raise NotImplementedError
+
+
+class PlayerImporter(BaseImporter):
+    kind = "players"
+    model = UserProfile
+    COLUMNS = {
+        "first_name": ("نام",),
+        "last_name": ("نام خانوادگی", "فامیلی"),
+        "father_name": ("نام پدر",),
+        "national_code": ("کد ملی", "کدملی", "national id"),
+        "birth_date": ("تاریخ تولد", "birthdate"),
+        "phone": ("موبایل", "شماره موبایل", "تلفن همراه", "mobile"),
+        "gender": ("جنسیت", "جنس", "sex"),
+        "belt_grade": ("کمربند", "درجه کمربند", "belt"),
+        "belt_certificate_number": ("شماره حکم کمربند", "شماره حکم"),
+        "belt_certificate_date": ("تاریخ حکم کمربند", "تاریخ حکم"),
+        "role": ("نقش",),
+        "province": ("استان",),
+        "county": ("شهرستان",),
+        "city": ("شهر",),
+        "address": ("آدرس", "نشانی"),
+        "board": ("هیئت", "tkd_board"),
+        "club": ("باشگاه", "نام باشگاه", "club_name"),
+        "coach_national_code": ("کد ملی مربی",),
+    }
+    REQUIRED = ("first_name", "last_name", "national_code", "birth_date", "phone", "gender", "belt_grade")
+
+    GENDERS = {
+        "male": "male", "m": "male", "مرد": "male", "آقا": "male", "پسر": "male", "مذکر": "male",
+        "female": "female", "f": "female", "زن": "female", "خانم": "female", "دختر": "female", "مونث": "female",
+    }
+    ROLES = {
+        "": "player", "player": "player", "بازیکن": "player", "ورزشکار": "player",
+        "coach": "coach", "مربی": "coach", "referee": "referee", "داور": "referee",
+        "both": "both", "مربی و داور": "both",
+    }
+    BELTS = {norm_key(b): b for b, _ in UserProfile.BELT_CHOICES}
+    BELTS.update({norm_key(f"دان {i}"): f"مشکی دان {i}" for i in range(1, 11)})
+
+    def load_existing(self):
+        super().load_existing()
+        self.national_codes = set(UserProfile.objects.values_list("national_code", flat=True))
+        self.national_codes.update(PendingUserProfile.objects.values_list("national_code", flat=True))
+        self.phones = set(UserProfile.objects.values_list("phone", flat=True))
+        self.phones.update(PendingUserProfile.objects.values_list("phone", flat=True))
+        self.clubs = {norm_key(n): (pk, n) for pk, n in TkdClub.objects.values_list("id", "club_name")}
+        self.coaches = {
+            nc: (pk, f"{fn} {ln}".strip())
+            for pk, nc, fn, ln in UserProfile.objects.filter(is_coach=True)
+            .values_list("id", "national_code", "first_name", "last_name")
+        }
+
+    def prepare(self, raws, report):
+        births = normalize.parse_dates([raw.get("birth_date") for _n, _v, raw in raws])
+        records = []
+        for (n, values, raw), birth in zip(raws, births):
+            errs = []
+            data = {f: self.text(raw, f) for f in (
+                "first_name", "last_name", "father_name", "province", "county", "city",
+                "address", "belt_certificate_number",
+            )}
+            for f in ("first_name", "last_name"):
+                if not data[f]:
+                    errs.append((f, "الزامی است."))
+
+            data["national_code"] = self.check_national_code(raw, "national_code", errs, self.national_codes)
+            data["phone"] = self.check_phone(raw, "phone", errs, self.phones)
+
+            if birth is None:
+                errs.append(("birth_date", "تاریخ تولد نامعتبر است."))
+            else:
+                data["birth_date"] = jalali.format_date(birth)
+
+            cert = raw.get("belt_certificate_date")
+            if cert:
+                d = normalize.parse_date(cert)
+                if d is None:
+                    errs.append(("belt_certificate_date", "تاریخ حکم نامعتبر است."))
+                data["belt_certificate_date"] = jalali.format_date(d) if d else ""
+
+            data["gender"] = self.GENDERS.get(norm_key(raw.get("gender", "")))
+            if not data["gender"]:
+                errs.append(("gender", "جنسیت نامعتبر است."))
+            data["belt_grade"] = self.BELTS.get(norm_key(raw.get("belt_grade", "")))
+            if not data["belt_grade"]:
+                errs.append(("belt_grade", "کمربند نامعتبر است."))
+            data["role"] = self.ROLES.get(norm_key(raw.get("role", "")))
+            if not data["role"]:
+                errs.append(("role", "نقش نامعتبر است."))
+            data["is_coach"] = data["role"] in ("coach", "both")
+            data["is_referee"] = data["role"] in ("referee", "both")
+
+            board = self.board_for(self.text(raw, "board"))
+            if raw.get("board") and board is None:
+                errs.append(("board", "هیئت پیدا نشد."))
+            data["tkd_board_id"] = board.pk if board else None
+            data["tkd_board_name"] = board.name if board else ""
+
+            club_name = self.text(raw, "club")
+            data["club_id"], data["club_names"] = None, []
+            if club_name:
+                club = self.clubs.get(norm_key(club_name))
+                if club is None:
+                    errs.append(("club", "باشگاه پیدا نشد."))
+                else:
+                    data["club_id"], data["club_names"] = club[0], [club[1]]
+
+            coach_nc = clean_national_code(raw.get("coach_national_code", ""))
+            data["coach_id"], data["coach_name"] = None, ""
+            if coach_nc:
+                coach = self.coaches.get(coach_nc)
+                if coach is None:
+                    errs.append(("coach_national_code", "مربی با این کد ملی پیدا نشد."))
+                else:
+                    data["coach_id"], data["coach_name"] = coach
+
+            self.check_lengths(data, errs)
+            if errs:
+                for field, msg in errs:
+                    report.add_error(n, field, msg, values)
+                continue
+
+            self.national_codes.add(data["national_code"])
+            self.phones.add(data["phone"])
+            self.usernames.add(data["phone"])
+            if data["is_coach"]:
+                # مربی همین فایل برای سطرهای بعدی قابل ارجاع است؛ id بعد از ذخیره پر می‌شود
+                self.coaches[data["national_code"]] = (None, f"{data['first_name']} {data['last_name']}")
+            records.append((data, coach_nc if data["coach_id"] is None else ""))
+        return records
+
+    def save(self, records):
+        users = self.create_users([r["phone"] for r, _c in records])
+        objs = [UserProfile(user_id=users[r["phone"]], **r) for r, _c in records]
+        for o in objs:
+            o.fill_search_text()      # bulk_create از save() رد می‌شود
+        UserProfile.objects.bulk_create(objs, batch_size=500)
+
+        coach_codes = [r["national_code"] for r, _c in records if r["is_coach"]]
+        if coach_codes:
+            for pk, nc, fn, ln in UserProfile.objects.filter(national_code__in=coach_codes).values_list(
+                    "id", "national_code", "first_name", "last_name"):
+                self.coaches[nc] = (pk, f"{fn} {ln}".strip())
+
+        # ارجاع به مربی‌ای که در همین chunk ساخته شد
+        pending = [(o, c) for o, (_r, c) in zip(objs, records) if c]
+        if pending:
+            ids = dict(UserProfile.objects.filter(national_code__in=[o.national_code for o, _c in pending])
+                       .values_list("national_code", "id"))
+            for o, c in pending:
+                o.pk, o.coach_id = ids[o.national_code], self.coaches[c][0]
+            UserProfile.objects.bulk_update([o for o, _c in pending], ["coach"], batch_size=500)
+
+
+class ClubImporter(BaseImporter):
+    kind = "clubs"
+    model = TkdClub
+    COLUMNS = {
+        "club_name": ("نام باشگاه", "باشگاه"),
+        "founder_name": ("نام موسس", "موسس"),
+        "founder_national_code": ("کد ملی موسس",),
+        "founder_phone": ("موبایل موسس", "شماره موبایل موسس"),
+        "club_type": ("نوع باشگاه", "نوع"),
+        "license_number": ("شماره مجوز", "شماره پروانه"),
+        "federation_id": ("شناسه فدراسیون", "کد فدراسیون"),
+        "phone": ("تلفن", "تلفن باشگاه"),
+        "province": ("استان",),
+        "county": ("شهرستان",),
+        "city": ("شهر",),
+        "address": ("آدرس", "نشانی"),
+        "activity_description": ("توضیحات", "توضیحات فعالیت"),
+        "board": ("هیئت", "tkd_board"),
+    }
+    REQUIRED = ("club_name", "founder_name", "founder_national_code", "founder_phone")
+
+    CLUB_TYPES = {"": "other", "private": "private", "خصوصی": "private",
+                  "governmental": "governmental", "دولتی": "governmental", "other": "other", "سایر": "other"}
+
+    def load_existing(self):
+        super().load_existing()
+        self.club_names = {norm_key(n) for n in TkdClub.objects.values_list("club_name", flat=True)}
+        self.club_names.update(norm_key(n) for n in PendingClub.objects.values_list("club_name", flat=True))
+        self.licenses = set(TkdClub.objects.exclude(license_number="").values_list("license_number", flat=True))
+
+    def prepare(self, raws, report):
+        records = []
+        for n, values, raw in raws:
+            errs = []
+            data = {f: self.text(raw, f) for f in (
+                "club_name", "founder_name", "province", "county", "city", "address",
+                "license_number", "federation_id", "activity_description",
+            )}
+            data["license_number"] = normalize.digits(data["license_number"])
+            data["phone"] = normalize.digits(self.text(raw, "phone")).replace(" ", "").replace("-", "")
+            for f in ("club_name", "founder_name"):
+                if not data[f]:
+                    errs.append((f, "الزامی است."))
+            if data["club_name"] and norm_key(data["club_name"]) in self.club_names:
+                errs.append(("club_name", "باشگاهی با این نام وجود دارد."))
+            if data["license_number"] and data["license_number"] in self.licenses:
+                errs.append(("license_number", "این شماره مجوز قبلاً ثبت شده است."))
+
+            data["founder_national_code"] = self.check_national_code(raw, "founder_national_code", errs)
+            data["founder_phone"] = self.check_phone(raw, "founder_phone", errs)
+
+            data["club_type"] = self.CLUB_TYPES.get(norm_key(raw.get("club_type", "")))
+            if not data["club_type"]:
+                errs.append(("club_type", "نوع باشگاه نامعتبر است."))
+
+            board = self.board_for(self.text(raw, "board"))
+            if raw.get("board") and board is None:
+                errs.append(("board", "هیئت پیدا نشد."))
+            data["tkd_board_id"] = board.pk if board else None
+
+            self.check_lengths(data, errs)
+            if errs:
+                for field, msg in errs:
+                    report.add_error(n, field, msg, values)
+                continue
+
+            self.club_names.add(norm_key(data["club_name"]))
+            if data["license_number"]:
+                self.licenses.add(data["license_number"])
+            self.usernames.add(data["founder_phone"])
+            records.append(data)
+        return records
+
+    def save(self, records):
+        users = self.create_users([r["founder_phone"] for r in records])
+        clubs = [TkdClub(user_id=users[r["founder_phone"]], **r) for r in records]
+        for c in clubs:
+            c.fill_search_text()
+        TkdClub.objects.bulk_create(clubs, batch_size=500)
@@ -0,0 +1,96 @@
+# accounts/imports/readers.py
+import csv
+import io
+import os
+from datetime import date, datetime
+from itertools import islice
+
+try:
+    import openpyxl
+except ImportError:  # فقط برای xlsx لازم است
+    openpyxl = None
+
+
+class ImportFileError(Exception):
+    pass
+
+
+def cell(v):
+    """مقدار خام سلول → رشته (تاریخ‌های اکسل دست‌نخورده می‌مانند تا parse_date خودش تبدیل کند)."""
+    if v is None:
+        return ""
+    if isinstance(v, (datetime, date)):
+        return v
+    if isinstance(v, float) and v.is_integer():
+        return str(int(v))  # کد ملی/موبایل که اکسل عدد ذخیره کرده
+    return str(v).strip()
+
+
+def _csv_rows(path):
+    with open(path, "r", encoding="utf-8-sig", newline="") as f:
+        sample = f.read(8192)
+        f.seek(0)
+        try:
+            dialect = csv.Sniffer().sniff(sample, delimiters=",;\t")
+        except csv.Error:
+            dialect = csv.excel
+        for row in csv.reader(f, dialect):
+            yield row
+
+
+def _xlsx_rows(path, sheet=None):
+    if openpyxl is None:
+        raise ImportFileError("برای خواندن xlsx بستهٔ openpyxl را نصب کنید (یا فایل را CSV ذخیره کنید).")
+    wb = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    try:
+        ws = wb[sheet] if sheet else wb.worksheets[0]
+        for row in ws.iter_rows(values_only=True):
+            yield row
+    finally:
+        wb.close()
+
+
+def open_rows(path, sheet=None):
+    """
+    (headers, rows): rows یک iterator تنبل از (شمارهٔ سطر در فایل، tuple مقادیر) است؛
+    فایل هیچ‌وقت کامل در حافظه خوانده نمی‌شود. سطرهای کاملاً خالی رد می‌شوند.
+    """
+    if not os.path.exists(path):
+        raise ImportFileError(f"فایل پیدا نشد: {path}")
+    ext = os.path.splitext(path)[1].lower()
+    if ext in (".xlsx", ".xlsm"):
+        it = _xlsx_rows(path, sheet)
+    elif ext in (".csv", ".txt", ".tsv"):
+        it = _csv_rows(path)
+    else:
+        raise ImportFileError("فقط فایل‌های CSV و XLSX پشتیبانی می‌شوند.")
+
+    headers = next(it, None)
+    if not headers:
+        raise ImportFileError("فایل خالی است.")
+    headers = [h if isinstance(h, str) else "" for h in map(cell, headers)]
+
+    def rows():
+        for n, row in enumerate(it, start=2):
+            values = tuple(cell(v) for v in row)
+            if any(v != "" for v in values):
+                yield n, values
+    return headers, rows()
+
+
+def chunked(iterable, size):
+    it = iter(iterable)
+    while True:
+        chunk = list(islice(it, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def write_csv(rows) -> bytes:
+    """گزارش خطا با BOM تا اکسل فارسی را درست باز کند."""
+    buf = io.StringIO()
+    w = csv.writer(buf)
+    for r in rows:
+        w.writerow(r)
+    return buf.getvalue().encode("utf-8-sig")
@@ -0,0 +1,225 @@
+# accounts/listings.py
+# -*- coding: utf-8 -*-
+"""
+فهرست مربیان و داوران هیئت (HeyatCoachesAPIView / HeyatRefereesAPIView):
+  - فقط ستون‌های لازم با values()؛ باشگاه‌های مربیگری هر صفحه با یک کوئری روی جدول واسط
+  - فیلتر باشگاه با زیرکوئری روی جدول واسط (بدون join تکراری و distinct)
+  - صفحه‌بندی keyset روی id (cursor = id آخرین ردیف)
+  - خروجی CSV جریانی: ردیف‌ها chunk به chunk از دیتابیس خوانده و نوشته می‌شوند
+"""
+from __future__ import annotations
+
+import base64
+import csv
+from collections import defaultdict
+from typing import Iterable, Iterator, List, Optional
+
+from django.db.models import Q
+
+from .models import UserProfile
+from .search import filter_queryset as search_filter
+
+MAX_LIMIT = 200
+EXPORT_CHUNK = 2000
+
+FIELD_MAP = {"کیوروگی": "kyorogi", "پومسه": "poomseh", "هانمادانگ": "hanmadang"}
+ALL = "همه"
+
+BASE_FIELDS = ("id", "first_name", "last_name", "national_code", "birth_date", "belt_grade")
+COACH_FIELDS = BASE_FIELDS + ("coach_level", "coach_level_International")
+REFEREE_FIELDS = BASE_FIELDS + tuple(
+    f"{k}{suffix}" for k in FIELD_MAP.values() for suffix in ("", "_level", "_level_International")
+)
+
+
+class ListingError(ValueError):
+    pass
+
+
+def encode_cursor(pk: int) -> str:
+    return base64.urlsafe_b64encode(str(int(pk)).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> int:
+    try:
+        return int(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode())
+    except Exception:
+        raise ListingError("cursor نامعتبر است.")
+
+
+def _chosen(params, key):
+    v = params.get(key)
+    return v if v and v != ALL else None
+
+
+def _common(qs, params):
+    club = _chosen(params, "club")
+    if club:
+        through = UserProfile.coaching_clubs.through
+        qs = qs.filter(id__in=through.objects.filter(tkdclub__club_name=club).values("userprofile_id"))
+    belt = _chosen(params, "belt")
+    if belt:
+        qs = qs.filter(belt_grade=belt)
+    if params.get("birth_from"):
+        qs = qs.filter(birth_date__gte=params["birth_from"])
+    if params.get("birth_to"):
+        qs = qs.filter(birth_date__lte=params["birth_to"])
+    if params.get("search"):
+        qs = search_filter(qs, params["search"])
+    return qs
+
+
+def coaches(board, params):
+    qs = _common(UserProfile.objects.filter(tkd_board=board, is_coach=True), params)
+    national_level = _chosen(params, "national_level")
+    if national_level:
+        qs = qs.filter(coach_level=national_level)
+    international_level = _chosen(params, "international_level")
+    if international_level:
+        qs = qs.filter(coach_level_International=international_level)
+    return qs
+
+
+def referees(board, params):
+    qs = _common(UserProfile.objects.filter(tkd_board=board, is_referee=True), params)
+    field_key = FIELD_MAP.get(_chosen(params, "referee_field"))
+    if field_key:
+        qs = qs.filter(**{field_key: True})
+    national_level = _chosen(params, "national_level")
+    if national_level:
+        qs = qs.filter(Q(kyorogi_level=national_level) | Q(poomseh_level=national_level)
+                       | Q(hanmadang_level=national_level))
+    international_level = _chosen(params, "international_level")
+    if international_level:
+        qs = qs.filter(Q(kyorogi_level_International=international_level)
+                       | Q(poomseh_level_International=international_level)
+                       | Q(hanmadang_level_International=international_level))
+    return qs
+
+
+def clubs_for(ids: Iterable[int]) -> dict:
+    """{profile id: [نام باشگاه‌های مربیگری]} با یک کوئری (به ازای هر EXPORT_CHUNK شناسه) روی جدول واسط."""
+    through = UserProfile.coaching_clubs.through
+    ids, out = list(ids), defaultdict(list)
+    for i in range(0, len(ids), EXPORT_CHUNK):      # حد پارامترهای IN در SQLite
+        rows = (through.objects.filter(userprofile_id__in=ids[i:i + EXPORT_CHUNK])
+                .order_by("id").values_list("userprofile_id", "tkdclub__club_name"))
+        for pk, name in rows:
+            out[pk].append(name)
+    return out
+
+
+def coach_row(r: dict, clubs: List[str]) -> dict:
+    return {
+        "full_name": f"{r['first_name']} {r['last_name']}",
+        "national_code": r["national_code"],
+        "birth_date": r["birth_date"],
+        "belt_grade": r["belt_grade"],
+        "national_certificate_date": r["coach_level"] or "—",
+        "international_certificate_date": r["coach_level_International"] or "درجه بین‌الملل ندارد",
+        "clubs": clubs,
+    }
+
+
+def referee_row(r: dict, clubs: List[str]) -> dict:
+    return {
+        "full_name": f"{r['first_name']} {r['last_name']}",
+        "national_code": r["national_code"],
+        "birth_date": r["birth_date"],
+        "belt_grade": r["belt_grade"],
+        "clubs": clubs,
+        "referee_fields": {
+            label: {
+                "active": r[key],
+                "national": r[f"{key}_level"] or "درجه ملی ندارد",
+                "international": r[f"{key}_level_International"] or "درجه بین‌الملل ندارد",
+            }
+            for label, key in FIELD_MAP.items()
+        },
+    }
+
+
+KINDS = {
+    "coaches": (coaches, COACH_FIELDS, coach_row),
+    "referees": (referees, REFEREE_FIELDS, referee_row),
+}
+
+
+def _rows(values: List[dict], build) -> List[dict]:
+    clubs = clubs_for(r["id"] for r in values)
+    return [build(r, clubs.get(r["id"], [])) for r in values]
+
+
+def listing(kind: str, board, params, cursor: Optional[str] = None, limit: Optional[int] = None):
+    """
+    بدون limit/cursor: کل فهرست (قالب قبلی API، یک لیست)؛
+    با limit/cursor: {"results": [...], "next": cursor صفحهٔ بعد یا None}
+    """
+    build_qs, fields, build = KINDS[kind]
+    qs = build_qs(board, params).order_by("id")
+    if limit is None and not cursor:
+        return _rows(list(qs.values(*fields)), build)
+
+    limit = max(1, min(int(limit or 50), MAX_LIMIT))
+    if cursor:
+        qs = qs.filter(id__gt=decode_cursor(cursor))
+    values = list(qs.values(*fields)[: limit + 1])
+    has_more = len(values) > limit
+    values = values[:limit]
+    return {
+        "results": _rows(values, build),
+        "next": encode_cursor(values[-1]["id"]) if has_more and values else None,
+    }
+
+
+# ---------- خروجی CSV ----------
+
+COACH_HEADER = ["نام و نام خانوادگی", "کد ملی", "تاریخ تولد", "کمربند", "درجه ملی", "درجه بین‌الملل", "باشگاه‌ها"]
+REFEREE_HEADER = ["نام و نام خانوادگی", "کد ملی", "تاریخ تولد", "کمربند", "باشگاه‌ها"] + [
+    f"{label} ({part})" for label in FIELD_MAP for part in ("ملی", "بین‌الملل")
+]
+
+
+def _coach_csv(r: dict, clubs: List[str]) -> list:
+    row = coach_row(r, clubs)
+    return [row["full_name"], row["national_code"], row["birth_date"], row["belt_grade"],
+            row["national_certificate_date"], row["international_certificate_date"], "، ".join(clubs)]
+
+
+def _referee_csv(r: dict, clubs: List[str]) -> list:
+    out = [f"{r['first_name']} {r['last_name']}", r["national_code"], r["birth_date"], r["belt_grade"],
+           "، ".join(clubs)]
+    for key in FIELD_MAP.values():
+        active = r[key]
+        out += [(r[f"{key}_level"] or "") if active else "", (r[f"{key}_level_International"] or "") if active else ""]
+    return out
+
+
+EXPORTS = {
+    "coaches": (COACH_HEADER, _coach_csv),
+    "referees": (REFEREE_HEADER, _referee_csv),
+}
+
+
+class _Echo:
+    def write(self, value):
+        return value
+
+
+def export_rows(kind: str, board, params) -> Iterator[str]:
+    """ردیف‌های CSV (با BOM در ابتدا) به‌صورت generator برای StreamingHttpResponse."""
+    build_qs, fields, _build = KINDS[kind]
+    header, to_csv = EXPORTS[kind]
+    writer = csv.writer(_Echo())
+    qs = build_qs(board, params).order_by("id")
+
+    yield "\ufeff" + writer.writerow(header)
+    last = 0
+    while True:
+        values = list(qs.filter(id__gt=last).values(*fields)[:EXPORT_CHUNK])
+        if not values:
+            return
+        last = values[-1]["id"]
+        clubs = clubs_for(r["id"] for r in values)
+        for r in values:
+            yield writer.writerow(to_csv(r, clubs.get(r["id"], [])))
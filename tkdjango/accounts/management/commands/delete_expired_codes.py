@@ -1,15 +1,14 @@
 from django.core.management.base import BaseCommand
-from django.utils import timezone
-from datetime import timedelta
-from accounts.models import SMSVerification
+
+from accounts.otp import get_store
+
 
 class Command(BaseCommand):
-    help = "حذف کدهای تایید منقضی‌شده از دیتابیس"
+    help = "حذف کدهای تایید منقضی‌شده (store تنظیم‌شده در settings.OTP)"
 
-    def handle(self, *args, **kwargs):
-        expire_time = timezone.now() - timedelta(minutes=3)
-        expired = SMSVerification.objects.filter(created_at__lt=expire_time)
-        count = expired.count()
-        expired.delete()
+    def add_arguments(self, parser):
+        parser.add_argument("--store", default=None, help="db یا cache (پیش‌فرض: settings.OTP['STORE'])")
 
+    def handle(self, *args, **opts):
+        count = get_store(opts.get("store")).sweep()
         self.stdout.write(self.style.SUCCESS(f"{count} کد منقضی حذف شد."))
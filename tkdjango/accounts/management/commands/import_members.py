@@ -0,0 +1,58 @@
+# accounts/management/commands/import_members.py
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from accounts.imports import IMPORTERS, ImportFileError, run_import, save_error_report
+from accounts.models import TkdBoard
+
+
+class Command(BaseCommand):
+    help = (
+        "ورود گروهی بازیکنان/مربیان یا باشگاه‌ها از CSV/XLSX (جریانی، chunk به chunk با bulk_create). "
+        "سطرهای نامعتبر ذخیره نمی‌شوند و در گزارش خطای CSV (پوشهٔ خصوصی IMPORTS['REPORT_DIR']) می‌آیند. "
+        "کاربران واردشده با «فراموشی رمز» فعال می‌شوند (رمز = کد ملی)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="مسیر فایل csv یا xlsx")
+        parser.add_argument("--kind", choices=sorted(IMPORTERS), default="players")
+        parser.add_argument("--board", default=None, help="شناسه یا نام هیئت پیش‌فرض برای سطرهای بدون ستون هیئت")
+        parser.add_argument("--sheet", default=None, help="نام شیت (xlsx)؛ پیش‌فرض شیت اول")
+        parser.add_argument("--chunk", type=int, default=None, help="تعداد سطر در هر تراکنش")
+        parser.add_argument("--strict-national-code", action="store_true", default=None,
+                            help="بررسی رقم کنترل کد ملی")
+        parser.add_argument("--dry-run", action="store_true", help="فقط اعتبارسنجی، بدون ذخیره")
+
+    def handle(self, *args, **opts):
+        board = None
+        if opts["board"]:
+            q = opts["board"]
+            board = (TkdBoard.objects.filter(pk=int(q)).first() if q.isdigit()
+                     else TkdBoard.objects.filter(name=q).first())
+            if board is None:
+                raise CommandError(f"هیئت پیدا نشد: {q}")
+
+        t0 = time.perf_counter()
+        try:
+            report = run_import(
+                opts["path"], kind=opts["kind"], board=board, dry_run=opts["dry_run"],
+                sheet=opts["sheet"], chunk_size=opts["chunk"],
+                strict_national_code=opts["strict_national_code"],
+            )
+        except ImportFileError as e:
+            raise CommandError(str(e))
+        elapsed = time.perf_counter() - t0
+
+        s = report.as_dict()
+        label = "بررسی شد" if report.dry_run else "ذخیره شد"
+        self.stdout.write(self.style.SUCCESS(
+            f"{s['rows']} سطر در {elapsed:.1f}s ({s['rows'] / max(elapsed, 1e-6):.0f} سطر/ثانیه): "
+            f"{s['created']} {label}، {s['failed']} سطر خطا"
+        ))
+        if report.errors:
+            base = os.path.splitext(os.path.basename(opts["path"]))[0]
+            path = save_error_report(report, f"{base}-errors-{timezone.now():%Y%m%d-%H%M%S}.csv")
+            self.stdout.write(self.style.WARNING(f"گزارش خطا: {path}"))
@@ -0,0 +1,25 @@
+# accounts/management/commands/rebuild_search_index.py
+import time
+
+from django.core.management.base import BaseCommand
+
+from accounts.search import MODELS, backfill, ensure_indexes
+
+
+class Command(BaseCommand):
+    help = (
+        "ستون search_text پروفایل‌ها و باشگاه‌ها را دوباره می‌سازد (بعد از تغییر قواعد یکدست‌سازی یا ویرایش مستقیم دیتابیس) "
+        "و جدول FTS5 / ایندکس pg_trgm را بازسازی می‌کند."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--database", default="default")
+        parser.add_argument("--batch", type=int, default=2000)
+
+    def handle(self, *args, **opts):
+        t0 = time.perf_counter()
+        for model in MODELS:
+            changed = backfill(model, using=opts["database"], batch_size=opts["batch"])
+            self.stdout.write(f"{model.__name__}: {changed} ردیف به‌روز شد")
+        ensure_indexes(using=opts["database"], rebuild=True)
+        self.stdout.write(self.style.SUCCESS(f"ایندکس جستجو در {time.perf_counter() - t0:.1f}s بازسازی شد."))
@@ -0,0 +1,43 @@
+# accounts/management/commands/send_sms_outbox.py
+import time
+
+from django.core.management.base import BaseCommand
+
+from accounts.sms import get_provider, sms_settings
+from accounts.sms.outbox import process_batch, purge_done, requeue_stuck
+
+
+PURGE_EVERY_SECONDS = 3600
+
+
+class Command(BaseCommand):
+    help = "ارسال پیامک‌های صف (SMSOutbox) با provider ماندگار، همراه با تلاش مجدد و backoff"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--loop", action="store_true", help="به‌صورت worker دائمی اجرا شود")
+        parser.add_argument("--sleep", type=float, default=1.0, help="مکث بین دورها وقتی صف خالی است (ثانیه)")
+        parser.add_argument("--limit", type=int, default=None, help="حداکثر پیام در هر دسته")
+        parser.add_argument("--provider", default=None, help="نام provider (پیش‌فرض از settings.SMS)")
+
+    def handle(self, *args, **opts):
+        provider = get_provider(opts["provider"])
+        limit = opts["limit"] or sms_settings()["BATCH_SIZE"]
+        self.stdout.write(f"SMS worker using provider '{provider.name}', batch={limit}")
+
+        last_purge = 0.0
+        while True:
+            if time.monotonic() - last_purge > PURGE_EVERY_SECONDS:
+                purged = purge_done()
+                last_purge = time.monotonic()
+                if purged:
+                    self.stdout.write(f"purged={purged}")
+            requeue_stuck()
+            stats = process_batch(limit=limit, provider=provider)
+            if any(stats.values()):
+                self.stdout.write(self.style.SUCCESS(
+                    f"sent={stats['sent']} retry={stats['retry']} failed={stats['failed']} expired={stats['expired']}"
+                ))
+            if not opts["loop"]:
+                break
+            if stats["sent"] + stats["retry"] + stats["failed"] + stats["expired"] < limit:
+                time.sleep(opts["sleep"])
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.1 on 2026-10-19 13:58
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0025_tkdboard_ranking_total'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='tkdboard',
+            index=models.Index(fields=['-ranking_total', 'id'], name='board_rank_total_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tkdclub',
+            index=models.Index(fields=['-ranking_total', 'id'], name='club_rank_total_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tkdclub',
+            index=models.Index(fields=['tkd_board', '-ranking_total', 'id'], name='club_board_rank_total_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='userprofile',
+            index=models.Index(fields=['-ranking_competition', 'id'], name='profile_rank_comp_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='userprofile',
+            index=models.Index(fields=['tkd_board', '-ranking_competition', 'id'], name='profile_board_rank_comp_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='userprofile',
+            index=models.Index(fields=['-ranking_total', 'id'], name='profile_rank_total_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='userprofile',
+            index=models.Index(fields=['tkd_board', '-ranking_total', 'id'], name='profile_board_rank_total_idx'),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.1 on 2026-10-19 14:02
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0026_ranking_leaderboard_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SMSOutbox',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('phone', models.CharField(max_length=11)),
+                ('kind', models.CharField(choices=[('otp', 'کد تأیید')], default='otp', max_length=16)),
+                ('params', models.JSONField(blank=True, default=list)),
+                ('status', models.CharField(choices=[('pending', 'در صف'), ('sending', 'در حال ارسال'), ('sent', 'ارسال\u200cشده'), ('failed', 'ناموفق')], default='pending', max_length=10)),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('next_attempt_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('provider', models.CharField(blank=True, default='', max_length=32)),
+                ('provider_ref', models.CharField(blank=True, default='', max_length=64)),
+                ('last_error', models.TextField(blank=True, default='')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('sent_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'پیامک در صف',
+                'verbose_name_plural': 'صف پیامک\u200cها',
+                'indexes': [models.Index(fields=['status', 'next_attempt_at'], name='accounts_sm_status_9e6dd8_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.1 on 2026-10-19 14:06
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0027_smsoutbox'),
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TokenVersion',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='token_version', serialize=False, to=settings.AUTH_USER_MODEL, verbose_name='کاربر')),
+                ('version', models.PositiveIntegerField(default=0, verbose_name='نسخهٔ توکن')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='آخرین ابطال')),
+            ],
+            options={
+                'verbose_name': 'نسخهٔ توکن کاربر',
+                'verbose_name_plural': 'نسخه\u200cهای توکن کاربران',
+            },
+        ),
+    ]
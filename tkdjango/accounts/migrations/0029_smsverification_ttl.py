@@ -0,0 +1,26 @@
+# Generated by Django 5.2.1 on 2026-10-19 14:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0028_token_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='smsverification',
+            name='attempts',
+            field=models.PositiveSmallIntegerField(default=0, verbose_name='تلاش ناموفق'),
+        ),
+        migrations.AddIndex(
+            model_name='smsverification',
+            index=models.Index(fields=['phone', 'created_at'], name='smsver_phone_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='smsverification',
+            index=models.Index(fields=['created_at'], name='smsver_created_idx'),
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 5.2.1 on 2026-10-19 16:40
+
+from django.db import migrations, models
+
+from main.normalize import search_text
+
+SEARCH_FIELDS = {
+    "userprofile": ("first_name", "last_name", "national_code"),
+    "tkdclub": ("club_name", "founder_name", "founder_phone"),
+}
+
+
+def fill_search_text(apps, schema_editor):
+    using = schema_editor.connection.alias
+    for name, fields in SEARCH_FIELDS.items():
+        model = apps.get_model("accounts", name)
+        objs = list(model.objects.using(using).only("pk", *fields))
+        for o in objs:
+            o.search_text = search_text(*(getattr(o, f) for f in fields))
+        model.objects.using(using).bulk_update(objs, ["search_text"], batch_size=1000)
+
+
+def drop_search_indexes(apps, schema_editor):
+    # trigger های FTS5 به search_text ارجاع دارند و باید پیش از حذف ستون برداشته شوند
+    from accounts.search import drop_indexes
+    drop_indexes(using=schema_editor.connection.alias)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0029_smsverification_ttl'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tkdclub',
+            name='search_text',
+            field=models.CharField(blank=True, default='', editable=False, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='userprofile',
+            name='search_text',
+            field=models.CharField(blank=True, default='', editable=False, max_length=255),
+        ),
+        # جدول FTS5 / ایندکس pg_trgm در post_migrate (accounts.search.ensure_indexes) ساخته می‌شود
+        migrations.RunPython(fill_search_text, drop_search_indexes),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.1 on 2026-10-19 14:57
+
+from django.db import migrations, models
+from django.db.models import Max
+
+
+def drop_duplicate_codes(apps, schema_editor):
+    # فقط آخرین کد هر شماره می‌ماند تا قید یکتایی ساخته شود
+    SMSVerification = apps.get_model("accounts", "SMSVerification")
+    db = SMSVerification.objects.using(schema_editor.connection.alias)
+    keep = db.values("phone").annotate(last=Max("id")).values_list("last", flat=True)
+    db.exclude(id__in=list(keep)).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0030_search_text'),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_duplicate_codes, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='smsverification',
+            constraint=models.UniqueConstraint(fields=('phone',), name='smsver_phone_uniq'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.1 on 2026-10-19 15:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0031_smsverification_phone_unique'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='smsoutbox',
+            name='expires_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='smsoutbox',
+            name='status',
+            field=models.CharField(choices=[('pending', 'در صف'), ('sending', 'در حال ارسال'), ('sent', 'ارسال\u200cشده'), ('failed', 'ناموفق'), ('expired', 'منقضی (ارسال نشد)')], default='pending', max_length=10),
+        ),
+    ]
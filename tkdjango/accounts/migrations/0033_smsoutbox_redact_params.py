@@ -0,0 +1,19 @@
+from django.db import migrations
+
+
+def redact_done(apps, schema_editor):
+    # کد تأیید ردیف‌های پایان‌یافته دیگر لازم نیست
+    SMSOutbox = apps.get_model("accounts", "SMSOutbox")
+    (SMSOutbox.objects.using(schema_editor.connection.alias)
+     .filter(status__in=("sent", "expired", "failed")).update(params=[]))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0032_smsoutbox_expires_at'),
+    ]
+
+    operations = [
+        migrations.RunPython(redact_done, migrations.RunPython.noop),
+    ]
@@ -3,6 +3,8 @@ from django.utils import timezone
 from django.conf import settings
 from django.contrib.auth import get_user_model
 
+from main.normalize import search_text as _search_text
+
 User = get_user_model()
 
 # -----------------------------
@@ -20,6 +22,10 @@ class TkdBoard(models.Model):
     class Meta:
         verbose_name = "هیئت"
         verbose_name_plural = "\u200b\u200c\u200c\u200cهیئت‌ها"  # بعد از باشگاه‌ها
+        indexes = [
+            # جدول رده‌بندی (keyset: -ranking_total, id)
+            models.Index(fields=["-ranking_total", "id"], name="board_rank_total_idx"),
+        ]
 
 
 # -----------------------------
@@ -65,12 +71,31 @@ class TkdClub(models.Model):
 
     created_at = models.DateTimeField(auto_now_add=True)
     user = models.OneToOneField(User, on_delete=models.CASCADE, null=True, blank=True)
+    search_text = models.CharField(max_length=255, blank=True, default="", editable=False)
     def __str__(self):
         return self.club_name
 
+    # ستون جستجوی یکدست‌شده (accounts.search): با save() و در مسیرهای bulk با fill_search_text پر می‌شود
+    SEARCH_FIELDS = ("club_name", "founder_name", "founder_phone")
+
+    def fill_search_text(self):
+        self.search_text = _search_text(*(getattr(self, f) for f in self.SEARCH_FIELDS))
+        return self.search_text
+
+    def save(self, *args, **kwargs):
+        self.fill_search_text()
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and set(update_fields) & set(self.SEARCH_FIELDS):
+            kwargs["update_fields"] = {*update_fields, "search_text"}
+        return super().save(*args, **kwargs)
+
     class Meta:
         verbose_name = "باشگاه"
         verbose_name_plural = "\u200b\u200b\u200cباشگاه‌ها"
+        indexes = [
+            models.Index(fields=["-ranking_total", "id"], name="club_rank_total_idx"),
+            models.Index(fields=["tkd_board", "-ranking_total", "id"], name="club_board_rank_total_idx"),
+        ]
 
 
 # models.py
@@ -192,13 +217,34 @@ class UserProfile(models.Model):
 
     confirm_info = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
+    search_text = models.CharField(max_length=255, blank=True, default="", editable=False)
 
     def __str__(self):
         return f"{self.first_name} {self.last_name} - {self.phone}"
 
+    # ستون جستجوی یکدست‌شده (accounts.search): با save() و در مسیرهای bulk با fill_search_text پر می‌شود
+    SEARCH_FIELDS = ("first_name", "last_name", "national_code")
+
+    def fill_search_text(self):
+        self.search_text = _search_text(*(getattr(self, f) for f in self.SEARCH_FIELDS))
+        return self.search_text
+
+    def save(self, *args, **kwargs):
+        self.fill_search_text()
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and set(update_fields) & set(self.SEARCH_FIELDS):
+            kwargs["update_fields"] = {*update_fields, "search_text"}
+        return super().save(*args, **kwargs)
+
     class Meta:
         verbose_name = "کاربر"
         verbose_name_plural = " کاربران"
+        indexes = [
+            models.Index(fields=["-ranking_competition", "id"], name="profile_rank_comp_idx"),
+            models.Index(fields=["tkd_board", "-ranking_competition", "id"], name="profile_board_rank_comp_idx"),
+            models.Index(fields=["-ranking_total", "id"], name="profile_rank_total_idx"),
+            models.Index(fields=["tkd_board", "-ranking_total", "id"], name="profile_board_rank_total_idx"),
+        ]
 # -----------------------------
 # ۴. مدل ثبت‌نام در انتظار تایید
 # -----------------------------
@@ -427,12 +473,85 @@ class PendingReferee(PendingUserProfile):
 class SMSVerification(models.Model):
     phone = models.CharField(max_length=11)
     code = models.CharField(max_length=4)
+    attempts = models.PositiveSmallIntegerField("تلاش ناموفق", default=0)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["phone", "created_at"], name="smsver_phone_created_idx"),
+            models.Index(fields=["created_at"], name="smsver_created_idx"),
+        ]
+        constraints = [
+            # هر شماره حداکثر یک کد فعال (accounts.otp.db: درج هم‌زمان دوم IntegrityError می‌گیرد)
+            models.UniqueConstraint(fields=["phone"], name="smsver_phone_uniq"),
+        ]
+
     def is_expired(self):
         return (timezone.now() - self.created_at).seconds > 300  # 5 دقیقه
 
 
+class TokenVersion(models.Model):
+    """
+    نسخهٔ توکن‌های هر کاربر؛ با افزایش آن همهٔ access/refresh های قبلی (claim «ver») باطل می‌شوند.
+    """
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True,
+                                related_name="token_version", verbose_name="کاربر")
+    version = models.PositiveIntegerField("نسخهٔ توکن", default=0)
+    updated_at = models.DateTimeField("آخرین ابطال", auto_now=True)
+
+    class Meta:
+        verbose_name = "نسخهٔ توکن کاربر"
+        verbose_name_plural = "نسخه‌های توکن کاربران"
+
+    def __str__(self):
+        return f"{self.user_id} v{self.version}"
+
+
+class SMSOutbox(models.Model):
+    """
+    صف پیامک‌ها: درخواست‌ها فقط ردیف اضافه می‌کنند و ارسال واقعی
+    با دستور send_sms_outbox (یا در حالت eager همان لحظه) انجام می‌شود.
+    """
+    KIND_OTP = "otp"
+    KIND_CHOICES = [(KIND_OTP, "کد تأیید")]
+
+    STATUS_PENDING = "pending"
+    STATUS_SENDING = "sending"
+    STATUS_SENT = "sent"
+    STATUS_FAILED = "failed"
+    STATUS_EXPIRED = "expired"
+    STATUS_CHOICES = [
+        (STATUS_PENDING, "در صف"),
+        (STATUS_SENDING, "در حال ارسال"),
+        (STATUS_SENT, "ارسال‌شده"),
+        (STATUS_FAILED, "ناموفق"),
+        (STATUS_EXPIRED, "منقضی (ارسال نشد)"),
+    ]
+
+    phone = models.CharField(max_length=11)
+    kind = models.CharField(max_length=16, choices=KIND_CHOICES, default=KIND_OTP)
+    params = models.JSONField(default=list, blank=True)  # جایگزین‌های قالب (مثلاً [code])
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    provider = models.CharField(max_length=32, blank=True, default="")
+    provider_ref = models.CharField(max_length=64, blank=True, default="")
+    last_error = models.TextField(blank=True, default="")
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(null=True, blank=True)  # کد تأیید بعد از این زمان دیگر ارسال نمی‌شود
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = "پیامک در صف"
+        verbose_name_plural = "صف پیامک‌ها"
+        indexes = [
+            models.Index(fields=["status", "next_attempt_at"]),
+        ]
+
+    def __str__(self):
+        return f"{self.phone} [{self.kind}] {self.status}"
+
+
 
 class CoachClubRequest(models.Model):
     STATUS_CHOICES = [
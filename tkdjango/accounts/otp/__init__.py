@@ -0,0 +1,167 @@
+# accounts/otp/__init__.py
+# -*- coding: utf-8 -*-
+"""
+کد تأیید پیامکی (ثبت‌نام / فراموشی رمز):
+  - store قابل تعویض: db (SMSVerification) یا cache (انقضای خود کش)
+  - سقف ارسال برای هر شماره و هر IP، و سقف کد اشتباه برای هر IP (شمارنده‌های پنجره‌ای در کش)
+  - IP = REMOTE_ADDR؛ X-Forwarded-For فقط وقتی خوانده می‌شود که REMOTE_ADDR در OTP["TRUSTED_PROXIES"] باشد
+"""
+import ipaddress
+import random
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.cache import caches
+
+from .base import EXPIRED, INVALID, OK, OtpStoreBase
+from .cache import CacheOtpStore
+from .db import DbOtpStore
+
+STORES = {
+    "db": DbOtpStore,
+    "cache": CacheOtpStore,
+}
+
+_instances = {}
+
+
+class OtpThrottled(Exception):
+    def __init__(self, message, retry_after=0):
+        super().__init__(message)
+        self.message = message
+        self.retry_after = int(retry_after or 0)
+
+
+def otp_settings() -> dict:
+    cfg = dict(getattr(settings, "OTP", {}) or {})
+    cfg.setdefault("STORE", "db")
+    cfg.setdefault("CACHE_ALIAS", "default")
+    cfg.setdefault("TTL_SECONDS", 180)
+    cfg.setdefault("COOLDOWN_SECONDS", 180)
+    cfg.setdefault("MAX_VERIFY_ATTEMPTS", 3)
+    cfg.setdefault("WINDOW_SECONDS", 3600)
+    cfg.setdefault("MAX_SENDS_PER_PHONE", 5)
+    cfg.setdefault("MAX_SENDS_PER_IP", 20)
+    cfg.setdefault("MAX_FAILS_PER_IP", 15)
+    cfg.setdefault("TRUSTED_PROXIES", [])   # IP یا CIDR پراکسی‌های معکوس خودمان (مثلاً nginx)
+    return cfg
+
+
+def get_store(name=None) -> OtpStoreBase:
+    cfg = otp_settings()
+    name = name or cfg["STORE"]
+    if name not in _instances:
+        _instances[name] = STORES.get(name, DbOtpStore)(cfg)
+    return _instances[name]
+
+
+def reset_stores():
+    _instances.clear()
+
+
+@lru_cache(maxsize=8)
+def _proxy_networks(proxies: tuple):
+    return tuple(ipaddress.ip_network(p.strip(), strict=False) for p in proxies if p and p.strip())
+
+
+def _trusted(ip: str, networks) -> bool:
+    try:
+        addr = ipaddress.ip_address(ip)
+    except ValueError:
+        return False
+    return any(addr in net for net in networks)
+
+
+def client_ip(request) -> str:
+    """
+    REMOTE_ADDR؛ فقط اگر اتصال از یک پراکسی مورد اعتماد آمده باشد X-Forwarded-For از راست پیمایش می‌شود
+    و اولین hop غیرقابل‌اعتماد برگردانده می‌شود (مقدارهای سمت چپ را خود کلاینت می‌تواند جعل کند).
+    """
+    remote = (request.META.get("REMOTE_ADDR") or "").strip()
+    networks = _proxy_networks(tuple(otp_settings()["TRUSTED_PROXIES"] or ()))
+    if not networks or not _trusted(remote, networks):
+        return remote
+    hops = [h.strip() for h in (request.META.get("HTTP_X_FORWARDED_FOR") or "").split(",") if h.strip()]
+    for hop in reversed(hops):
+        if not _trusted(hop, networks):
+            return hop
+    return hops[0] if hops else remote
+
+
+# ---------- شمارنده‌های پنجره‌ای ----------
+def _counter(kind, ident):
+    cfg = otp_settings()
+    return caches[cfg["CACHE_ALIAS"]], f"otp:v1:lim:{kind}:{ident}", int(cfg["WINDOW_SECONDS"])
+
+
+def _hits(kind, ident) -> int:
+    if not ident:
+        return 0
+    c, key, _ = _counter(kind, ident)
+    return int(c.get(key) or 0)
+
+
+def _hit(kind, ident) -> int:
+    if not ident:
+        return 0
+    c, key, window = _counter(kind, ident)
+    if c.add(key, 1, window):
+        return 1
+    try:
+        return c.incr(key)
+    except ValueError:  # بین add و incr منقضی شد
+        c.add(key, 1, window)
+        return 1
+
+
+def _unhit(kind, ident):
+    if not ident:
+        return
+    c, key, _ = _counter(kind, ident)
+    try:
+        c.decr(key)
+    except ValueError:
+        pass
+
+
+def _check(kind, ident, limit, message):
+    if limit and _hits(kind, ident) >= int(limit):
+        raise OtpThrottled(message, otp_settings()["WINDOW_SECONDS"])
+
+
+# ---------- API ----------
+def send_code(phone: str, ip: str = "") -> str:
+    """
+    کد می‌سازد، ذخیره و در صف پیامک می‌گذارد. در صورت محدودیت OtpThrottled.
+    """
+    from accounts.utils import send_verification_code
+
+    cfg = otp_settings()
+    _check("send_ip", ip, cfg["MAX_SENDS_PER_IP"], "تعداد درخواست کد از این دستگاه زیاد است. بعداً تلاش کنید.")
+    _check("send_phone", phone, cfg["MAX_SENDS_PER_PHONE"], "تعداد درخواست کد برای این شماره زیاد است. بعداً تلاش کنید.")
+
+    code = str(random.SystemRandom().randint(1000, 9999))
+    remaining = get_store().issue(phone, code)
+    if remaining > 0:
+        raise OtpThrottled("کد قبلی هنوز معتبر است.", remaining)
+
+    _hit("send_ip", ip)
+    _hit("send_phone", phone)
+    send_verification_code(phone, code)
+    return code
+
+
+def check_code(phone: str, code: str, ip: str = "") -> str:
+    """
+    OK / INVALID / EXPIRED؛ IP با کد اشتباه زیاد OtpThrottled می‌گیرد.
+    هر تلاش پیش از مقایسه با حاصل incr شمرده می‌شود (تلاش‌های موازی یک IP هم از سقف رد نمی‌شوند)
+    و تلاش موفق از شمارنده کم می‌شود.
+    """
+    limit = int(otp_settings()["MAX_FAILS_PER_IP"] or 0)
+    if limit and _hit("fail_ip", ip) > limit:
+        raise OtpThrottled("تعداد تلاش ناموفق زیاد است. بعداً تلاش کنید.", otp_settings()["WINDOW_SECONDS"])
+    result = get_store().verify(phone, code)
+    if result != INVALID and limit:
+        _unhit("fail_ip", ip)
+    return result
+
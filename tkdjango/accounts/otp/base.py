@@ -0,0 +1,36 @@
+# accounts/otp/base.py
+# -*- coding: utf-8 -*-
+import hmac
+
+OK = "ok"
+INVALID = "invalid"
+EXPIRED = "expired"
+
+
+class OtpStoreBase:
+    """
+    محل نگهداری کد یک‌بارمصرف هر شماره (در هر لحظه فقط یک کد فعال).
+    ttl: اعتبار کد (ثانیه)، cooldown: فاصلهٔ مجاز بین دو ارسال، max_attempts: تعداد ورود اشتباه قبل از ابطال
+    """
+    name = "base"
+
+    def __init__(self, cfg: dict):
+        self.ttl = int(cfg.get("TTL_SECONDS", 180))
+        self.cooldown = int(cfg.get("COOLDOWN_SECONDS", 180))
+        self.max_attempts = max(1, int(cfg.get("MAX_VERIFY_ATTEMPTS", 3)))
+
+    def issue(self, phone: str, code: str) -> int:
+        """کد را ذخیره می‌کند و 0 برمی‌گرداند؛ اگر کد قبلی هنوز در cooldown است، ثانیه‌های باقی‌مانده."""
+        raise NotImplementedError
+
+    def verify(self, phone: str, code: str) -> str:
+        """OK / INVALID / EXPIRED؛ کد درست یا منقضی مصرف (حذف) می‌شود."""
+        raise NotImplementedError
+
+    def sweep(self) -> int:
+        """حذف کدهای منقضی؛ تعداد حذف‌شده."""
+        return 0
+
+    @staticmethod
+    def same(a, b) -> bool:
+        return hmac.compare_digest(str(a or ""), str(b or ""))
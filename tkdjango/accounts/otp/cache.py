@@ -0,0 +1,59 @@
+# accounts/otp/cache.py
+# -*- coding: utf-8 -*-
+import time
+
+from django.core.cache import caches
+
+from .base import EXPIRED, INVALID, OK, OtpStoreBase
+
+
+class CacheOtpStore(OtpStoreBase):
+    """
+    کد با انقضای خود کش نگه داشته می‌شود (چیزی برای sweep نمی‌ماند)؛ شمارندهٔ اشتباه با incr اتمیک.
+    برای چند پروسه باید کش مشترک (Redis/Memcached) تنظیم شده باشد.
+    """
+    name = "cache"
+
+    def __init__(self, cfg):
+        super().__init__(cfg)
+        self.cache = caches[cfg.get("CACHE_ALIAS", "default")]
+        self.prefix = cfg.get("KEY_PREFIX", "otp:v1:")
+
+    def _keys(self, phone):
+        return f"{self.prefix}code:{phone}", f"{self.prefix}att:{phone}"
+
+    def issue(self, phone, code):
+        k_code, k_att = self._keys(phone)
+        now = time.time()
+        keep = max(self.ttl, self.cooldown)
+        # add اتمیک است: دو درخواست هم‌زمان فقط یکی کد می‌سازد
+        if not self.cache.add(k_code, {"code": code, "ts": now}, keep):
+            cur = self.cache.get(k_code) or {}
+            remaining = self.cooldown - int(now - float(cur.get("ts", now)))
+            if remaining > 0:
+                return remaining
+            self.cache.set(k_code, {"code": code, "ts": now}, keep)
+        self.cache.set(k_att, 0, keep)
+        return 0
+
+    def verify(self, phone, code):
+        k_code, k_att = self._keys(phone)
+        cur = self.cache.get(k_code)
+        if not cur:
+            return INVALID
+        # شمارش قبل از مقایسه: حاصل incr برای هر درخواست یکتاست، پس موازی‌ها هم از سقف رد نمی‌شوند
+        try:
+            n = self.cache.incr(k_att)
+        except ValueError:
+            n = 1 if self.cache.add(k_att, 1, max(self.ttl, self.cooldown)) else self.cache.incr(k_att)
+        if n > self.max_attempts:
+            self.cache.delete_many([k_code, k_att])
+            return INVALID
+        if not self.same(cur.get("code"), code):
+            if n >= self.max_attempts:
+                self.cache.delete_many([k_code, k_att])
+            return INVALID
+        self.cache.delete_many([k_code, k_att])
+        if time.time() - float(cur.get("ts", 0)) > self.ttl:
+            return EXPIRED
+        return OK
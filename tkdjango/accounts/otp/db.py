@@ -0,0 +1,69 @@
+# accounts/otp/db.py
+# -*- coding: utf-8 -*-
+from datetime import timedelta
+
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from accounts.models import SMSVerification
+
+from .base import EXPIRED, INVALID, OK, OtpStoreBase
+
+
+class DbOtpStore(OtpStoreBase):
+    """SMSVerification؛ هر شماره حداکثر یک ردیف، ردیف‌های کهنه با sweep حذف می‌شوند."""
+    name = "db"
+
+    def _latest(self, phone):
+        return SMSVerification.objects.filter(phone=phone).order_by("-created_at").first()
+
+    @transaction.atomic
+    def issue(self, phone, code):
+        """
+        phone یکتاست: ردیف موجود قفل و با شرط created_at قبلی جایگزین می‌شود (compare-and-swap)،
+        و درج هم‌زمان دوم به IntegrityError می‌خورد؛ در هر دو حالت فقط یک درخواست کد می‌فرستد.
+        """
+        now = timezone.now()
+        last = SMSVerification.objects.select_for_update().filter(phone=phone).first()
+        if last is not None:
+            remaining = self.cooldown - int((now - last.created_at).total_seconds())
+            if remaining > 0:
+                return remaining
+            swapped = SMSVerification.objects.filter(pk=last.pk, created_at=last.created_at).update(
+                code=code, attempts=0, created_at=now,
+            )
+            return 0 if swapped else self.cooldown
+        try:
+            with transaction.atomic():
+                SMSVerification.objects.create(phone=phone, code=code)
+        except IntegrityError:
+            return self.cooldown
+        return 0
+
+    def verify(self, phone, code):
+        """
+        قبل از مقایسه یک تلاش با UPDATE شرطی رزرو می‌شود (attempts < سقف)؛ درخواست‌های موازی
+        نمی‌توانند با خواندن مقدار کهنهٔ attempts از سقف رد شوند.
+        """
+        rec = self._latest(phone)
+        if rec is None:
+            return INVALID
+        reserved = SMSVerification.objects.filter(pk=rec.pk, attempts__lt=self.max_attempts).update(
+            attempts=F("attempts") + 1,
+        )
+        if not reserved:
+            SMSVerification.objects.filter(pk=rec.pk).delete()
+            return INVALID
+        if not self.same(rec.code, code):
+            SMSVerification.objects.filter(pk=rec.pk, attempts__gte=self.max_attempts).delete()
+            return INVALID
+        SMSVerification.objects.filter(pk=rec.pk).delete()
+        if rec.created_at < timezone.now() - timedelta(seconds=self.ttl):
+            return EXPIRED
+        return OK
+
+    def sweep(self):
+        cutoff = timezone.now() - timedelta(seconds=max(self.ttl, self.cooldown))
+        deleted, _ = SMSVerification.objects.filter(created_at__lt=cutoff).delete()
+        return deleted
@@ -0,0 +1,167 @@
+# accounts/search.py
+# -*- coding: utf-8 -*-
+"""
+جستجوی فارسی روی پروفایل‌ها و باشگاه‌ها بر اساس ستون یکدست‌شدهٔ search_text (main.normalize.search_text):
+  - هر توکن عبارت باید پیشوند یکی از کلمه‌های رکورد باشد («علی کری» → «علیرضا کریمی»)
+  - SQLite: جدول FTS5 (external content) که با trigger روی جدول اصلی همگام می‌ماند
+  - PostgreSQL: ایندکس GIN با pg_trgm روی search_text (برای LIKE)
+  - سایر پایگاه‌ها یا نبود FTS5: همان شرط با LIKE (بدون ایندکس)
+رتبه: ۰ = کلمهٔ کامل (مثلاً کد ملی دقیق)، ۱ = ابتدای نام، ۲ = سایر تطابق‌ها
+ensure_indexes بعد از هر migrate (post_migrate) اجرا می‌شود، چون بازسازی جدول در SQLite trigger ها را حذف می‌کند.
+"""
+import logging
+
+from django.conf import settings
+from django.db import OperationalError, ProgrammingError, connections, transaction
+from django.db.models import Case, IntegerField, Q, Value, When
+from django.db.models.expressions import RawSQL
+
+from main.normalize import search_terms
+
+from .models import TkdClub, UserProfile
+
+logger = logging.getLogger(__name__)
+
+MODELS = (UserProfile, TkdClub)
+
+_ready = {}   # (alias, نام پایگاه, جدول) → FTS5 آماده است؟
+
+
+def search_settings() -> dict:
+    cfg = dict(getattr(settings, "SEARCH", {}) or {})
+    cfg.setdefault("MIN_LENGTH", 2)     # حداقل طول عبارت در API جستجو
+    cfg.setdefault("LIMIT", 20)
+    cfg.setdefault("MAX_LIMIT", 100)
+    return cfg
+
+
+def fts_table(model) -> str:
+    return f"{model._meta.db_table}_fts"
+
+
+def _fts_sql(model):
+    table, fts = model._meta.db_table, fts_table(model)
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5("
+        f"search_text, content='{table}', content_rowid='id', "
+        f"tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table} BEGIN "
+        f"INSERT INTO {fts}(rowid, search_text) VALUES (new.id, new.search_text); END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, search_text) VALUES ('delete', old.id, old.search_text); END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF search_text ON {table} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, search_text) VALUES ('delete', old.id, old.search_text); "
+        f"INSERT INTO {fts}(rowid, search_text) VALUES (new.id, new.search_text); END",
+    ]
+
+
+def _sqlite_objects(cursor, fts):
+    names = [fts, f"{fts}_ai", f"{fts}_ad", f"{fts}_au"]
+    cursor.execute("SELECT name FROM sqlite_master WHERE name IN (%s, %s, %s, %s)", names)
+    return {r[0] for r in cursor.fetchall()}
+
+
+def ensure_indexes(using="default", rebuild=False):
+    """جدول FTS5 و trigger ها (SQLite) یا ایندکس pg_trgm (PostgreSQL) را می‌سازد؛ idempotent است."""
+    conn = connections[using]
+    for model in MODELS:
+        table, fts = model._meta.db_table, fts_table(model)
+        if table not in conn.introspection.table_names():
+            continue
+        with conn.cursor() as cursor:
+            columns = {c.name for c in conn.introspection.get_table_description(cursor, table)}
+        if "search_text" not in columns:      # migrate به قبل از 0030
+            continue
+        try:
+            with transaction.atomic(using=using), conn.cursor() as cursor:
+                if conn.vendor == "sqlite":
+                    existing = _sqlite_objects(cursor, fts)
+                    for sql in _fts_sql(model):
+                        cursor.execute(sql)
+                    # جدول تازه یا trigger گم‌شده → محتوای FTS از جدول اصلی بازسازی شود
+                    if rebuild or len(existing) < 4:
+                        cursor.execute(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+                elif conn.vendor == "postgresql":
+                    cursor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+                    cursor.execute(
+                        f"CREATE INDEX IF NOT EXISTS {table}_search_trgm "
+                        f"ON {table} USING gin (search_text gin_trgm_ops)"
+                    )
+        except (OperationalError, ProgrammingError) as e:
+            # SQLite بدون FTS5 یا کاربر PostgreSQL بدون مجوز ساخت extension → جستجو با LIKE
+            logger.warning("search index for %s not created: %s", table, e)
+        _ready.pop((conn.alias, conn.settings_dict.get("NAME"), fts), None)
+
+
+def drop_indexes(using="default"):
+    conn = connections[using]
+    with conn.cursor() as cursor:
+        for model in MODELS:
+            table, fts = model._meta.db_table, fts_table(model)
+            if conn.vendor == "sqlite":
+                for suffix in ("_ai", "_ad", "_au"):
+                    cursor.execute(f"DROP TRIGGER IF EXISTS {fts}{suffix}")
+                cursor.execute(f"DROP TABLE IF EXISTS {fts}")
+            elif conn.vendor == "postgresql":
+                cursor.execute(f"DROP INDEX IF EXISTS {table}_search_trgm")
+            _ready.pop((conn.alias, conn.settings_dict.get("NAME"), fts), None)
+
+
+def backfill(model, using="default", batch_size=2000):
+    """search_text ردیف‌های موجود را (مثلاً بعد از تغییر قواعد یکدست‌سازی) دوباره می‌سازد."""
+    qs = model._default_manager.using(using).only("pk", "search_text", *model.SEARCH_FIELDS).order_by("pk")
+    changed, last = 0, 0
+    while True:
+        batch = list(qs.filter(pk__gt=last)[:batch_size])
+        if not batch:
+            return changed
+        last = batch[-1].pk
+        dirty = [o for o in batch if o.search_text != model.fill_search_text(o)]
+        if dirty:
+            model._default_manager.using(using).bulk_update(dirty, ["search_text"])
+            changed += len(dirty)
+
+
+def _use_fts(model, conn) -> bool:
+    if conn.vendor != "sqlite":
+        return False
+    key = (conn.alias, conn.settings_dict.get("NAME"), fts_table(model))
+    if key not in _ready:
+        with conn.cursor() as cursor:
+            _ready[key] = len(_sqlite_objects(cursor, fts_table(model))) >= 4
+    return _ready[key]
+
+
+def filter_queryset(qs, query):
+    """qs را به رکوردهایی که همهٔ توکن‌های query را (به‌صورت پیشوند کلمه) دارند محدود می‌کند."""
+    terms = search_terms(query)
+    if not terms:
+        return qs
+    model = qs.model._meta.concrete_model
+    conn = connections[qs.db]
+    if _use_fts(model, conn):
+        fts = fts_table(model)
+        match = " ".join(f'"{t}"*' for t in terms)
+        return qs.filter(pk__in=RawSQL(f"SELECT rowid FROM {fts} WHERE {fts} MATCH %s", [match]))
+    for t in terms:
+        qs = qs.filter(Q(search_text__startswith=t) | Q(search_text__contains=f" {t}"))
+    return qs
+
+
+def rank(qs, query):
+    """annotate(search_rank) و مرتب‌سازی بر اساس آن (کمتر = مرتبط‌تر)؛ عبارت بدون توکن → همه رتبهٔ ۲."""
+    phrase = " ".join(search_terms(query))
+    if not phrase:
+        return qs.annotate(search_rank=Value(2, output_field=IntegerField())).order_by("search_text", "pk")
+    exact = (Q(search_text=phrase) | Q(search_text__startswith=f"{phrase} ")
+             | Q(search_text__endswith=f" {phrase}") | Q(search_text__contains=f" {phrase} "))
+    return qs.annotate(search_rank=Case(
+        When(exact, then=Value(0)),
+        When(search_text__startswith=phrase, then=Value(1)),
+        default=Value(2),
+        output_field=IntegerField(),
+    )).order_by("search_rank", "search_text", "pk")
+
+
+def search(qs, query, limit=None):
+    return rank(filter_queryset(qs, query), query)[:limit or search_settings()["LIMIT"]]
@@ -1,6 +1,8 @@
 from rest_framework import serializers
 from .models import PendingCoach, PendingUserProfile, TkdBoard, TkdClub, UserProfile,PendingClub,PendingEditProfile,CoachClubRequest
 from competitions.models import KyorugiCompetition, CoachApproval
+from main import jalali
+from main.images import variant_url
 from django.contrib.auth import get_user_model
 from datetime import datetime
 import re
@@ -242,7 +244,7 @@ class PlayerDashboardSerializer(serializers.ModelSerializer):
 
     def get_profile_image_url(self, obj):
         if obj.profile_image:
-            return self.context['request'].build_absolute_uri(obj.profile_image.url)
+            return variant_url(obj.profile_image, "card", self.context.get('request'))
         return ""
 
 
@@ -320,7 +322,7 @@ class UserProfileSerializer(serializers.ModelSerializer):
     club = serializers.SerializerMethodField()
     class Meta:
         model = UserProfile
-        fields = "__all__"  # یا لیست دقیق فیلدهایی که لازم داری
+        exclude = ("search_text",)  # ستون داخلی جستجو (accounts.search)
 
     def get_profile_image_url(self, obj):
         request = self.context.get('request')
@@ -469,11 +471,7 @@ class DashboardKyorugiCompetitionSerializer(serializers.ModelSerializer):
             return d[:10].replace('-', '/')
         if hasattr(d, 'year') and d.year < 1700:
             return f"{d.year:04d}/{d.month:02d}/{d.day:02d}"
-        try:
-            import jdatetime
-            return jdatetime.date.fromgregorian(date=d).strftime('%Y/%m/%d')
-        except Exception:
-            return str(d)[:10].replace('-', '/')
+        return jalali.format_date(d) or str(d)[:10].replace('-', '/')
 
     # ---------- computed ----------
     def get_status(self, obj):
@@ -0,0 +1,84 @@
+# accounts/signals.py
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from main.caching import invalidate as invalidate_cache
+
+from .actor import invalidate_actor
+from .models import TkdBoard, TkdClub, UserProfile
+from .tokens import revoke_tokens
+
+# فیلدهایی که در claimهای توکن آمده‌اند؛ تغییرشان یعنی توکن‌های قبلی باید باطل شوند
+CLAIM_FIELDS = {
+    UserProfile: ("user_id", "role", "coach_id", "is_coach"),
+    TkdClub: ("user_id",),
+    TkdBoard: ("user_id",),
+}
+
+
+def _claim_values(instance):
+    return tuple(getattr(instance, f, None) for f in CLAIM_FIELDS[type(instance)])
+
+
+@receiver(pre_save, sender=UserProfile)
+@receiver(pre_save, sender=TkdClub)
+@receiver(pre_save, sender=TkdBoard)
+def remember_claim_fields(sender, instance, **kwargs):
+    old = None
+    if instance.pk:
+        old = sender.objects.filter(pk=instance.pk).values_list(*CLAIM_FIELDS[sender]).first()
+    instance._claims_before = old
+
+
+@receiver(post_save, sender=UserProfile)
+@receiver(post_delete, sender=UserProfile)
+@receiver(post_save, sender=TkdClub)
+@receiver(post_delete, sender=TkdClub)
+@receiver(post_save, sender=TkdBoard)
+@receiver(post_delete, sender=TkdBoard)
+def drop_actor_on_change(sender, instance, **kwargs):
+    # نقش/باشگاه/هیئت کاربر عوض شد → کش Actor باطل شود
+    invalidate_actor(getattr(instance, "user_id", None))
+
+    before = getattr(instance, "_claims_before", None)
+    if kwargs.get("signal") is post_delete:
+        changed = [before or _claim_values(instance)]
+    elif before is None:
+        changed = [_claim_values(instance)] if kwargs.get("created") else []
+    elif tuple(before) != _claim_values(instance):
+        changed = [tuple(before), _claim_values(instance)]
+    else:
+        changed = []
+    # user_id همیشه اولین فیلد است؛ کاربر قبلی و جدید هر دو باید دوباره وارد شوند
+    for user_id in {vals[0] for vals in changed if vals and vals[0]}:
+        invalidate_actor(user_id)
+        transaction.on_commit(lambda uid=user_id: (invalidate_actor(uid), revoke_tokens(uid)))
+
+
+@receiver(post_save, sender=UserProfile)
+@receiver(post_delete, sender=UserProfile)
+def drop_form_data_on_coach_change(sender, instance, **kwargs):
+    # لیست مربی‌ها در فرم‌های ثبت‌نام (کش form_data): فقط مربی فعلی یا کسی که تازه از مربی‌گری خارج شد
+    before = getattr(instance, "_claims_before", None)
+    was_coach = bool(before and before[CLAIM_FIELDS[UserProfile].index("is_coach")])
+    if instance.is_coach or was_coach:
+        transaction.on_commit(lambda: invalidate_cache("form_data"))
+
+
+@receiver(m2m_changed, sender=UserProfile.coaching_clubs.through)
+def drop_form_data_on_coaching_clubs(sender, action, **kwargs):
+    if action.startswith("post_"):
+        transaction.on_commit(lambda: invalidate_cache("form_data"))
+
+
+@receiver(m2m_changed, sender=get_user_model().groups.through)
+def drop_actor_on_groups(sender, instance, action, reverse, pk_set, **kwargs):
+    if not action.startswith("post_"):
+        return
+    if not reverse:
+        invalidate_actor(instance.pk)
+    else:
+        for uid in pk_set or ():
+            invalidate_actor(uid)
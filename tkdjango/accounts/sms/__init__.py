@@ -0,0 +1,40 @@
+# accounts/sms/__init__.py
+from django.conf import settings
+
+from .base import SmsProviderBase, SmsProviderError
+from .fake import FakeSmsProvider
+from .payamak import PayamakProvider
+
+PROVIDERS = {
+    "fake": FakeSmsProvider,
+    "payamak": PayamakProvider,
+}
+
+_instances = {}
+
+
+def sms_settings() -> dict:
+    cfg = dict(getattr(settings, "SMS", {}) or {})
+    dry = getattr(settings, "SMS_DRY_RUN", False) or getattr(settings, "DEBUG", False)
+    cfg.setdefault("DEFAULT_PROVIDER", "fake" if dry else "payamak")
+    cfg.setdefault("EAGER", dry)
+    cfg.setdefault("MAX_ATTEMPTS", 5)
+    cfg.setdefault("BACKOFF_SECONDS", 15)
+    cfg.setdefault("BACKOFF_MAX_SECONDS", 600)
+    cfg.setdefault("BATCH_SIZE", 50)
+    cfg.setdefault("RETENTION_DAYS", 30)   # نگهداری ردیف‌های پایان‌یافتهٔ صف (بدون params)
+    return cfg
+
+
+def get_provider(name=None) -> SmsProviderBase:
+    """یک نمونهٔ ماندگار برای هر provider در هر پروسه (کلاینت/WSDL دوباره ساخته نمی‌شود)."""
+    cfg = sms_settings()
+    name = name or cfg["DEFAULT_PROVIDER"]
+    if name not in _instances:
+        cls = PROVIDERS.get(name, FakeSmsProvider)
+        _instances[name] = cls(cfg.get("PROVIDERS", {}).get(name, {}))
+    return _instances[name]
+
+
+def reset_providers():
+    _instances.clear()
@@ -0,0 +1,19 @@
+# accounts/sms/base.py
+from abc import ABC, abstractmethod
+
+
+class SmsProviderError(Exception):
+    """خطای موقت ارسال؛ پیام دوباره تلاش می‌شود."""
+
+
+class SmsProviderBase(ABC):
+    name: str = "base"
+
+    def __init__(self, config=None):
+        self.config = config or {}
+
+    @abstractmethod
+    def send_template(self, phone: str, params: list) -> str:
+        """ارسال پیامک قالب‌دار.
+        Return: شناسه/نتیجهٔ سامانه؛ در خطا SmsProviderError"""
+        raise NotImplementedError
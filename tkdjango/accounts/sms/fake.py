@@ -0,0 +1,21 @@
+# accounts/sms/fake.py
+import logging
+
+from .base import SmsProviderBase
+
+logger = logging.getLogger(__name__)
+
+
+class FakeSmsProvider(SmsProviderBase):
+    """برای لوکال/تست: پیامک را فقط لاگ می‌کند و در sent نگه می‌دارد."""
+    name = "fake"
+
+    def __init__(self, config=None):
+        super().__init__(config)
+        self.sent = []
+
+    def send_template(self, phone, params):
+        self.sent.append((phone, list(params)))
+        msg = f"[DEV SMS] to {phone}: {' '.join(str(p) for p in params)}"
+        logger.warning(msg)
+        return f"FAKE-{len(self.sent)}"
@@ -0,0 +1,123 @@
+# accounts/sms/outbox.py
+import logging
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from accounts.models import SMSOutbox
+from . import get_provider, sms_settings
+
+logger = logging.getLogger(__name__)
+
+
+def enqueue(phone: str, params, kind: str = SMSOutbox.KIND_OTP, expires_at=None) -> SMSOutbox:
+    """فقط یک INSERT؛ ارسال با worker. در حالت EAGER (لوکال/تست) همان لحظه فرستاده می‌شود."""
+    msg = SMSOutbox.objects.create(phone=phone, kind=kind, params=list(params), expires_at=expires_at)
+    if sms_settings()["EAGER"]:
+        transaction.on_commit(lambda: process_batch(ids=[msg.pk]))
+    return msg
+
+
+def enqueue_otp(phone: str, code: str) -> SMSOutbox:
+    """کد تأیید فقط تا پایان اعتبارش (OTP["TTL_SECONDS"]) ارسال می‌شود؛ بعد از آن expired می‌شود."""
+    from accounts.otp import otp_settings
+
+    ttl = timedelta(seconds=otp_settings()["TTL_SECONDS"])
+    return enqueue(phone, [str(code)], kind=SMSOutbox.KIND_OTP, expires_at=timezone.now() + ttl)
+
+
+def _expired(now) -> Q:
+    return Q(expires_at__isnull=False, expires_at__lte=now)
+
+
+# وضعیت‌های پایانی: کد داخل params دیگر لازم نیست و پاک می‌شود
+DONE_STATUSES = (SMSOutbox.STATUS_SENT, SMSOutbox.STATUS_EXPIRED, SMSOutbox.STATUS_FAILED)
+
+
+def expire_stale() -> int:
+    """پیام‌های در صف که زمان اعتبارشان گذشته را بدون ارسال expired می‌کند."""
+    return SMSOutbox.objects.filter(
+        _expired(timezone.now()), status=SMSOutbox.STATUS_PENDING,
+    ).update(status=SMSOutbox.STATUS_EXPIRED, params=[])
+
+
+def purge_done(older_than_days: int = None) -> int:
+    """ردیف‌های پایان‌یافته (ارسال‌شده/منقضی/ناموفق) قدیمی‌تر از RETENTION_DAYS را حذف می‌کند."""
+    days = sms_settings()["RETENTION_DAYS"] if older_than_days is None else older_than_days
+    cutoff = timezone.now() - timedelta(days=days)
+    deleted, _ = SMSOutbox.objects.filter(status__in=DONE_STATUSES, created_at__lt=cutoff).delete()
+    return deleted
+
+
+def _backoff(attempts: int, cfg: dict) -> timedelta:
+    seconds = min(cfg["BACKOFF_SECONDS"] * (2 ** max(attempts - 1, 0)), cfg["BACKOFF_MAX_SECONDS"])
+    return timedelta(seconds=seconds)
+
+
+def _claim(limit: int, ids=None):
+    """ردیف‌های آماده را برمی‌دارد و sending می‌کند تا worker دیگری همان‌ها را نگیرد."""
+    now = timezone.now()
+    with transaction.atomic():
+        qs = (SMSOutbox.objects.filter(status=SMSOutbox.STATUS_PENDING, next_attempt_at__lte=now)
+              .exclude(_expired(now)))
+        if ids:
+            qs = qs.filter(pk__in=ids)
+        batch = list(qs.select_for_update(skip_locked=True).order_by("next_attempt_at", "id")[:limit])
+        if batch:
+            # next_attempt_at = زمان برداشتن؛ برای requeue_stuck
+            SMSOutbox.objects.filter(pk__in=[m.pk for m in batch]).update(
+                status=SMSOutbox.STATUS_SENDING, next_attempt_at=now,
+            )
+    return batch
+
+
+def process_batch(limit=None, ids=None, provider=None) -> dict:
+    """یک دسته از صف را با provider کش‌شده ارسال می‌کند؛ خطاها با backoff نمایی دوباره صف می‌شوند."""
+    cfg = sms_settings()
+    provider = provider or get_provider()
+    stats = {"sent": 0, "retry": 0, "failed": 0, "expired": expire_stale()}
+
+    for msg in _claim(limit or cfg["BATCH_SIZE"], ids=ids):
+        msg.attempts += 1
+        msg.provider = provider.name
+        try:
+            msg.provider_ref = str(provider.send_template(msg.phone, msg.params) or "")[:64]
+            msg.status = SMSOutbox.STATUS_SENT
+            msg.sent_at = timezone.now()
+            msg.last_error = ""
+            stats["sent"] += 1
+        except Exception as e:  # SmsProviderError یا خطای پیش‌بینی‌نشدهٔ provider
+            msg.last_error = str(e)[:1000]
+            if msg.attempts >= cfg["MAX_ATTEMPTS"]:
+                msg.status = SMSOutbox.STATUS_FAILED
+                stats["failed"] += 1
+                logger.error("SMS to %s failed permanently: %s", msg.phone, e)
+            else:
+                msg.next_attempt_at = timezone.now() + _backoff(msg.attempts, cfg)
+                if msg.expires_at and msg.next_attempt_at >= msg.expires_at:
+                    # تلاش بعدی بعد از انقضای کد می‌افتد → کد کهنه فرستاده نشود
+                    msg.status = SMSOutbox.STATUS_EXPIRED
+                    stats["expired"] += 1
+                    logger.warning("SMS to %s expired before retry (attempt %s): %s", msg.phone, msg.attempts, e)
+                else:
+                    msg.status = SMSOutbox.STATUS_PENDING
+                    stats["retry"] += 1
+                    logger.warning("SMS to %s failed (attempt %s): %s", msg.phone, msg.attempts, e)
+        if msg.status in DONE_STATUSES:
+            msg.params = []
+        msg.save(update_fields=[
+            "attempts", "provider", "provider_ref", "status", "sent_at", "last_error", "next_attempt_at", "params",
+        ])
+    return stats
+
+
+def requeue_stuck(older_than_seconds: int = 300) -> int:
+    """پیام‌هایی که worker وسط ارسال‌شان از کار افتاده را به صف برمی‌گرداند (منقضی‌ها expired می‌شوند)."""
+    now = timezone.now()
+    stuck = SMSOutbox.objects.filter(
+        status=SMSOutbox.STATUS_SENDING, next_attempt_at__lt=now - timedelta(seconds=older_than_seconds),
+    )
+    stuck.filter(_expired(now)).update(status=SMSOutbox.STATUS_EXPIRED, params=[])
+    return stuck.exclude(_expired(now)).update(status=SMSOutbox.STATUS_PENDING)
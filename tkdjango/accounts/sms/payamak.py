@@ -0,0 +1,63 @@
+# accounts/sms/payamak.py
+import logging
+import threading
+
+from .base import SmsProviderBase, SmsProviderError
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WSDL = "http://api.payamak-panel.com/post/send.asmx?wsdl"
+
+
+class PayamakProvider(SmsProviderBase):
+    """
+    Melipayamak / Payamak Panel (SendByBaseNumber).
+    کلاینت zeep فقط یک بار ساخته می‌شود (WSDL یک بار دریافت/پارس می‌شود) و برای کل پروسه می‌ماند.
+    """
+    name = "payamak"
+
+    def __init__(self, config=None):
+        super().__init__(config)
+        self._client = None
+        self._lock = threading.Lock()
+
+    def _get_client(self):
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    from zeep import Client
+                    from zeep.transports import Transport
+                    transport = Transport(
+                        timeout=self.config.get("TIMEOUT", 10),
+                        operation_timeout=self.config.get("TIMEOUT", 10),
+                    )
+                    self._client = Client(self.config.get("WSDL") or DEFAULT_WSDL, transport=transport)
+        return self._client
+
+    def send_template(self, phone, params):
+        username = self.config.get("USERNAME")
+        password = self.config.get("PASSWORD")
+        body_id = self.config.get("BODY_ID")
+        if not (username and password and body_id):
+            raise SmsProviderError("SMS credentials are missing. Set MELIPAYAMAK_* env vars.")
+
+        try:
+            # این وب‌سرویس متن را از قالبِ BodyId می‌گیرد؛ text فقط آرایهٔ جایگزین‌هاست.
+            result = self._get_client().service.SendByBaseNumber(
+                username=username,
+                password=password,
+                text=[str(p) for p in params],
+                to=phone,
+                bodyId=int(body_id),
+            )
+        except Exception as e:
+            # اتصال خراب ممکن است کلاینت را نامعتبر کند؛ دفعهٔ بعد از نو بساز
+            self._client = None
+            raise SmsProviderError(str(e)) from e
+
+        # در این سرویس recId موفق یک عدد بزرگ است و کدهای خطا اعداد کوچک (مثل 0، -1، 11)
+        ref = str(result if result is not None else "")
+        if not ref or (ref.lstrip("-").isdigit() and abs(int(ref)) < 100):
+            raise SmsProviderError(f"provider returned {ref!r}")
+        logger.info("SMS sent via provider. result=%s", ref)
+        return ref
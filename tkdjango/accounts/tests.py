@@ -1,3 +1,74 @@
-from django.test import TestCase
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+
+from accounts import otp
+from accounts.models import SMSVerification
+from accounts.otp.base import INVALID, OK
+from accounts.otp.cache import CacheOtpStore
+from accounts.otp.db import DbOtpStore
+
+OTP_CFG = {"TTL_SECONDS": 180, "COOLDOWN_SECONDS": 180, "MAX_VERIFY_ATTEMPTS": 3}
+
+
+class DbOtpAttemptCapTests(TestCase):
+    phone = "09120000001"
+
+    def setUp(self):
+        self.store = DbOtpStore(OTP_CFG)
+        self.store.issue(self.phone, "1234")
+
+    def test_wrong_guesses_past_cap_delete_code(self):
+        for guess in ("0000", "1111", "2222", "3333", "4444"):
+            self.assertEqual(self.store.verify(self.phone, guess), INVALID)
+        self.assertFalse(SMSVerification.objects.filter(phone=self.phone).exists())
+        self.assertEqual(self.store.verify(self.phone, "1234"), INVALID)
+
+    def test_parallel_guesses_with_stale_read_cannot_pass_cap(self):
+        # همهٔ درخواست‌های موازی ردیف را با attempts=0 خوانده‌اند
+        stale = SMSVerification.objects.get(phone=self.phone)
+        with mock.patch.object(DbOtpStore, "_latest", return_value=stale):
+            results = [self.store.verify(self.phone, g) for g in ("0000", "1111", "2222", "1234")]
+        self.assertEqual(results, [INVALID] * 4)
+        self.assertFalse(SMSVerification.objects.filter(phone=self.phone).exists())
+
+    def test_correct_code_within_cap(self):
+        self.assertEqual(self.store.verify(self.phone, "0000"), INVALID)
+        self.assertEqual(self.store.verify(self.phone, "1234"), OK)
+
+
+@override_settings(CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+                                       "LOCATION": "otp-tests"}})
+class CacheOtpAttemptCapTests(TestCase):
+    phone = "09120000002"
+
+    def setUp(self):
+        caches["default"].clear()
+        self.store = CacheOtpStore(OTP_CFG)
+        self.store.issue(self.phone, "1234")
+
+    def test_wrong_guesses_past_cap_delete_code(self):
+        for guess in ("0000", "1111", "2222", "3333"):
+            self.assertEqual(self.store.verify(self.phone, guess), INVALID)
+        self.assertEqual(self.store.verify(self.phone, "1234"), INVALID)
+
+
+@override_settings(
+    CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "otp-ip"}},
+    OTP={"STORE": "db", "MAX_FAILS_PER_IP": 2, "MAX_VERIFY_ATTEMPTS": 10},
+)
+class FailIpLimitTests(TestCase):
+    def setUp(self):
+        caches["default"].clear()
+        otp.reset_stores()
+        self.addCleanup(otp.reset_stores)
+
+    def test_ip_is_throttled_before_code_is_compared(self):
+        otp.get_store().issue("09120000003", "1234")
+        for guess in ("0000", "1111"):
+            self.assertEqual(otp.check_code("09120000003", guess, ip="5.6.7.8"), INVALID)
+        with mock.patch.object(DbOtpStore, "verify") as verify:
+            with self.assertRaises(otp.OtpThrottled):
+                otp.check_code("09120000003", "1234", ip="5.6.7.8")
+        verify.assert_not_called()
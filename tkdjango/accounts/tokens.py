@@ -0,0 +1,110 @@
+# accounts/tokens.py
+# -*- coding: utf-8 -*-
+"""
+توکن‌های JWT با claimهای نقش/دامنه (role, profile_id, club_id, board_id, coach_id)
+و نسخهٔ توکن (ver) برای ابطال.
+"""
+from __future__ import annotations
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from main.caching import is_shared
+
+from .actor import Actor, actor_for_user
+from .models import TokenVersion
+
+VERSION_CLAIM = "ver"
+VERSION_CACHE_PREFIX = "tokver:v1:"
+VERSION_CACHE_TTL = 60 * 60
+
+
+def _version_key(user_id) -> str:
+    return f"{VERSION_CACHE_PREFIX}{user_id}"
+
+
+def _db_version(user_id) -> int:
+    return (TokenVersion.objects.filter(user_id=user_id)
+            .values_list("version", flat=True).first()) or 0
+
+
+def current_version(user_id) -> int:
+    """
+    نسخهٔ فعلی توکن‌های کاربر. فقط با کش مشترک (file/redis) کش می‌شود؛ با locmem ابطال روی worker های
+    دیگر دیده نمی‌شد، پس هر بار از DB (یک کوئری روی کلید یکتا) خوانده می‌شود.
+    """
+    if not is_shared():
+        return int(_db_version(user_id))
+    key = _version_key(user_id)
+    v = cache.get(key)
+    if v is None:
+        v = _db_version(user_id)
+        cache.set(key, v, VERSION_CACHE_TTL)
+    return int(v)
+
+
+def revoke_tokens(user) -> int:
+    """
+    همهٔ توکن‌های صادرشدهٔ کاربر را باطل می‌کند؛ نسخهٔ جدید را برمی‌گرداند.
+    کلید کش بعد از commit پاک می‌شود تا rollback کش و DB را ناهمگام نگذارد.
+    """
+    user_id = getattr(user, "pk", user)
+    if not user_id:
+        return 0
+    if not TokenVersion.objects.filter(user_id=user_id).update(version=F("version") + 1):
+        TokenVersion.objects.get_or_create(user_id=user_id, defaults={"version": 1})
+    transaction.on_commit(lambda: cache.delete(_version_key(user_id)))
+    return _db_version(user_id)
+
+
+def scope_claims(actor: Actor) -> dict:
+    return {
+        "role": actor.role or "",
+        "profile_id": actor.profile_id,
+        "club_id": actor.club_id,
+        "board_id": actor.board_id,
+        "coach_id": actor.coach_id,
+        "is_coach": bool(actor.is_coach),
+        "is_referee": bool(actor.is_referee),
+        "member_club_id": actor.member_club_id,
+        "member_board_id": actor.member_board_id,
+    }
+
+
+def actor_from_claims(token) -> Actor | None:
+    """Actor فقط از روی claimها (بدون کوئری)؛ توکن‌های قدیمی بدون claim → None."""
+    if "role" not in token:
+        return None
+    role = token.get("role") or ""
+    profile_id = token.get("profile_id")
+    return Actor(
+        user_id=token.get("user_id"),
+        role=role,
+        profile_role=role if profile_id and role not in ("club", "heyat") else "",
+        profile_id=profile_id,
+        is_coach=bool(token.get("is_coach")),
+        # توکن‌های قبل از claim is_referee: فقط از روی نقش
+        is_referee=bool(token.get("is_referee", role == "referee")),
+        coach_id=token.get("coach_id"),
+        club_id=token.get("club_id"),
+        board_id=token.get("board_id"),
+        member_club_id=token.get("member_club_id"),
+        member_board_id=token.get("member_board_id"),
+    )
+
+
+class TkdRefreshToken(RefreshToken):
+    """RefreshToken با claimهای نقش؛ access ساخته‌شده از آن همین claimها را کپی می‌کند."""
+
+    @classmethod
+    def for_user(cls, user, actor: Actor | None = None, role: str | None = None):
+        token = super().for_user(user)
+        actor = actor or actor_for_user(user, use_cache=False)
+        for k, v in scope_claims(actor).items():
+            token[k] = v
+        if role:
+            token["role"] = role
+        token[VERSION_CLAIM] = current_version(user.pk)
+        return token
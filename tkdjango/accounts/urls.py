@@ -9,7 +9,8 @@ from .views import (
     approve_edited_profile,CoachStudentsAPIView,CoachClubsAPIView,UpdateCoachClubsAPIView,
     AllClubsAPIView,ClubStudentsView,ClubCoachesView,ClubAllCoachesView,UpdateClubCoachesView
 ,PendingCoachRequestsView,RespondToCoachRequestView,HeyatLoginAPIView,HeyatStudentsAPIView, heyat_form_data,
-HeyatCoachesAPIView,HeyatRefereesAPIView,heyat_clubs_list,KyorugiCompetitionListView,UniversalLoginAPIView
+HeyatCoachesAPIView,HeyatRefereesAPIView,heyat_clubs_list,KyorugiCompetitionListView,UniversalLoginAPIView,
+search_view
 )
 
 urlpatterns = [
@@ -44,6 +45,7 @@ urlpatterns = [
     path('heyat/coaches/', HeyatCoachesAPIView.as_view(), name="heyat-coaches"),
     path("heyat/referees/", HeyatRefereesAPIView.as_view(), name="heyat-referees"),
     path("heyat/clubs/", heyat_clubs_list, name="heyat-clubs"),
+    path("search/", search_view, name="search"),
     path("dashboard/kyorugi/", KyorugiCompetitionListView.as_view(), name="kyorugi-list"),
     path("dashboard/<role>/", DashboardCombinedView.as_view(), name="dashboard-combined"),
     # ✅ ورود عمومی با نام کاربری و رمز عبور
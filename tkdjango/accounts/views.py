@@ -1,7 +1,6 @@
 # accounts/views.py
-from datetime import timedelta
+import hashlib
 import json
-import random
 import logging
 logger = logging.getLogger(__name__)
 
@@ -10,10 +9,10 @@ from django.contrib import messages
 from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth import authenticate, get_user_model
 from django.db import transaction
-from django.db.models import (CharField, Count, F, IntegerField, OuterRef, Q,
+from django.db.models import (Count, F, IntegerField, OuterRef, Q,
                               Subquery, Sum, Value)
-from django.db.models.functions import Coalesce, Concat
-from django.http import JsonResponse
+from django.db.models.functions import Coalesce
+from django.http import HttpResponseNotModified, JsonResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404, redirect
 from django.urls import reverse
 from django.utils import timezone
@@ -25,11 +24,14 @@ from rest_framework.parsers import FormParser, MultiPartParser
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from rest_framework_simplejwt.tokens import RefreshToken
 
 from competitions.models import CoachApproval, Enrollment, KyorugiCompetition
+from main import normalize
+from main.caching import blob_response, etag_matches, get_or_build, get_or_build_json
+from main.images import variant_url
+from main.normalize import search_terms
 from .models import (CoachClubRequest, PendingClub, PendingCoach,
-                     PendingEditProfile, PendingUserProfile, SMSVerification,
+                     PendingEditProfile, PendingUserProfile,
                      TkdBoard, TkdClub, UserProfile)
 from .serializers import (ClubCoachInfoSerializer, ClubSerializer,
                           ClubStudentSerializer, DashboardKyorugiCompetitionSerializer,
@@ -38,7 +40,11 @@ from .serializers import (ClubCoachInfoSerializer, ClubSerializer,
                           PhoneSerializer, UserProfileSerializer,
                           VerifyCodeSerializer, VerifyLoginCodeSerializer,
                           PlayerDashboardSerializer)  # PlayerDashboardSerializer used below
-from .utils import send_verification_code
+from . import listings, otp
+from .approvals import approve_clubs, approve_edits, approve_users
+from .search import filter_queryset as search_filter, search as run_search, search_settings
+from .actor import actor_for_user, get_actor
+from .tokens import TkdRefreshToken, revoke_tokens
 
 User = get_user_model()
 
@@ -50,18 +56,16 @@ ELIGIBLE_ENROLL_STATUSES = ('paid', 'confirmed', 'accepted', 'completed')
 def _normalize_digits(s: str) -> str:
     if s is None:
         return ""
-    return str(s).strip().translate(
-        str.maketrans("۰۱۲۳۴۵۶۷۸۹٠١٢٣٤٥٦٧٨٩", "01234567890123456789")
-    )
+    return normalize.digits(str(s).strip())
 
 
 def _detect_role(user):
-    prof = getattr(user, "profile", None)
-    if prof:
-        return (prof.role or "player").lower()
-    if TkdClub.objects.filter(user=user).exists():
+    actor = actor_for_user(user, use_cache=False)
+    if actor.profile_id:
+        return actor.profile_role or "player"
+    if actor.club_id:
         return "club"
-    if TkdBoard.objects.filter(user=user).exists():
+    if actor.board_id:
         return "heyat"
     return "player"
 
@@ -116,17 +120,11 @@ class SendCodeAPIView(APIView):
         else:
             return Response({"error": "نقش نامعتبر است."}, status=status.HTTP_400_BAD_REQUEST)
 
-        # Rate limit 3 دقیقه
-        recent = SMSVerification.objects.filter(
-            phone=phone, created_at__gte=timezone.now() - timedelta(minutes=3)
-        ).first()
-        if recent:
-            remaining = 180 - int((timezone.now() - recent.created_at).total_seconds())
-            return Response({"error": "کد قبلی هنوز معتبر است.", "retry_after": remaining}, status=429)
-
-        code = str(random.randint(1000, 9999))
-        SMSVerification.objects.create(phone=phone, code=code)
-        send_verification_code(phone, code)
+        # cooldown هر شماره + سقف ارسال برای شماره/IP
+        try:
+            otp.send_code(phone, otp.client_ip(request))
+        except otp.OtpThrottled as e:
+            return Response({"error": e.message, "retry_after": e.retry_after}, status=429)
 
         return Response({"message": "کد تأیید ارسال شد."}, status=200)
 
@@ -144,82 +142,75 @@ class VerifyCodeAPIView(APIView):
         phone = serializer.validated_data["phone"]
         code = serializer.validated_data["code"]
 
-        expire_time = timezone.now() - timedelta(minutes=3)
-
         try:
-            record = SMSVerification.objects.get(phone=phone, code=code)
-        except SMSVerification.DoesNotExist:
-            SMSVerification.objects.filter(phone=phone).delete()
+            result = otp.check_code(phone, code, otp.client_ip(request))
+        except otp.OtpThrottled as e:
+            return Response({"error": e.message, "retry_after": e.retry_after}, status=429)
+        if result == otp.INVALID:
             return Response({"error": "کد وارد شده نادرست است."}, status=400)
-
-        if record.created_at < expire_time:
-            record.delete()
+        if result == otp.EXPIRED:
             return Response({"error": "کد منقضی شده است. لطفاً مجدداً دریافت کنید."}, status=400)
 
-        record.delete()
         return Response({"message": "کد تأیید شد. ادامه دهید."}, status=200)
 
 
 # ---------- Form Data helpers ----------
+# payload ها JSON فشرده در کش form_data (main.caching) هستند و با ETag سرو می‌شوند؛
+# تغییر هیئت/باشگاه/مربی (و coaching_clubs) نسخهٔ namespace را بالا می‌برد.
 
-@api_view(['GET'])
-def form_data_player_view(request):
-    gender = request.GET.get('gender')
+BELT_CHOICES = [
+    ('سفید', 'سفید'),
+    ('زرد', 'زرد'), ('سبز', 'سبز'), ('آبی', 'آبی'), ('قرمز', 'قرمز'),
+    *[(f'مشکی دان {i}', f'مشکی دان {i}') for i in range(1, 11)]
+]
+
+
+def _coach_rows(qs, name_key="full_name"):
+    return [{"id": pk, name_key: f"{fn} {ln}"}
+            for pk, fn, ln in qs.values_list("id", "first_name", "last_name")]
 
+
+def _form_data(gender):
     heyats = list(TkdBoard.objects.values('id', 'name'))
     clubs = list(TkdClub.objects.values('id', 'club_name'))
 
     coaches_qs = UserProfile.objects.filter(is_coach=True)
     if gender:
         coaches_qs = coaches_qs.filter(gender=gender)
+    return {"heyats": heyats, "clubs": clubs, "coaches": _coach_rows(coaches_qs)}
 
-    coaches = [{"id": c.id, "full_name": f"{c.first_name} {c.last_name}"} for c in coaches_qs]
-
-    BELT_CHOICES = [
-        ('سفید', 'سفید'),
-        ('زرد', 'زرد'), ('سبز', 'سبز'), ('آبی', 'آبی'), ('قرمز', 'قرمز'),
-        *[(f'مشکی دان {i}', f'مشکی دان {i}') for i in range(1, 11)]
-    ]
 
-    return Response({
-        "heyats": heyats,
-        "clubs": clubs,
-        "coaches": coaches,
-        "belt_choices": BELT_CHOICES,
-    })
+@api_view(['GET'])
+def form_data_player_view(request):
+    gender = request.GET.get('gender') or ""
+    blob = get_or_build_json("form_data", ("player", gender),
+                             lambda: {**_form_data(gender), "belt_choices": BELT_CHOICES})
+    return blob_response(request, blob)
 
 
 @api_view(['GET'])
 def coaches_by_club_gender(request):
-    club_id = request.GET.get('club')
-    gender = request.GET.get('gender')
+    club_id = request.GET.get('club') or ""
+    gender = request.GET.get('gender') or ""
+    if club_id and not str(club_id).isdigit():
+        return Response({"coaches": []})
 
-    coaches_qs = UserProfile.objects.filter(is_coach=True)
-
-    if club_id:
-        coaches_qs = coaches_qs.filter(coaching_clubs__id=club_id)
-    if gender:
-        coaches_qs = coaches_qs.filter(gender=gender)
+    def build():
+        coaches_qs = UserProfile.objects.filter(is_coach=True)
+        if club_id:
+            coaches_qs = coaches_qs.filter(coaching_clubs__id=club_id)
+        if gender:
+            coaches_qs = coaches_qs.filter(gender=gender)
+        return {"coaches": _coach_rows(coaches_qs)}
 
-    coaches = [{"id": c.id, "full_name": f"{c.first_name} {c.last_name}"} for c in coaches_qs]
-    return Response({"coaches": coaches})
+    return blob_response(request, get_or_build_json("form_data", ("coaches", club_id, gender), build))
 
 
 @csrf_exempt
 @api_view(['GET'])
 def form_data_view(request):
-    gender = request.GET.get('gender')
-
-    heyats = list(TkdBoard.objects.values('id', 'name'))
-    clubs = list(TkdClub.objects.values('id', 'club_name'))
-
-    coaches_qs = UserProfile.objects.filter(is_coach=True)
-    if gender:
-        coaches_qs = coaches_qs.filter(gender=gender)
-
-    coaches = [{"id": c.id, "full_name": f"{c.first_name} {c.last_name}"} for c in coaches_qs]
-
-    return Response({"heyats": heyats, "clubs": clubs, "coaches": coaches})
+    gender = request.GET.get('gender') or ""
+    return blob_response(request, get_or_build_json("form_data", ("common", gender), lambda: _form_data(gender)))
 
 
 def check_national_code(request):
@@ -309,49 +300,11 @@ class RegisterCoachAPIView(APIView):
 @staff_member_required
 def approve_pending_user(request, pk):
     pending = get_object_or_404(PendingUserProfile, pk=pk)
-
-    if pending.national_code and UserProfile.objects.filter(national_code=pending.national_code).exists():
-        messages.warning(request, "این کاربر قبلاً تأیید شده است.")
+    result = approve_users(PendingUserProfile.objects.filter(pk=pending.pk))
+    if not result["approved"]:
+        messages.warning(request, result["skipped"][0][1])
         return redirect(reverse("admin:accounts_userprofile_changelist"))
 
-    username = (pending.phone or "").strip()
-    raw_pass = _normalize_digits(pending.national_code)
-
-    coach_instance = UserProfile.objects.filter(id=pending.coach_id).first() if pending.coach_id else None
-    is_coach = pending.role in ['coach', 'both']
-    is_referee = pending.role in ['referee', 'both']
-
-    with transaction.atomic():
-        user_obj = User.objects.filter(username=username).first() or User(username=username)
-        if raw_pass:
-            user_obj.set_password(raw_pass)
-        else:
-            user_obj.set_unusable_password()
-        user_obj.save()
-
-        user = UserProfile.objects.create(
-            first_name=pending.first_name, last_name=pending.last_name, father_name=pending.father_name,
-            national_code=pending.national_code, birth_date=pending.birth_date, phone=pending.phone,
-            gender=pending.gender, role=pending.role, province=pending.province, county=pending.county,
-            city=pending.city, tkd_board=pending.tkd_board,
-            tkd_board_name=pending.tkd_board.name if pending.tkd_board else '',
-            address=pending.address, profile_image=pending.profile_image,
-            belt_grade=pending.belt_grade, belt_certificate_number=pending.belt_certificate_number,
-            belt_certificate_date=pending.belt_certificate_date,
-            is_coach=is_coach, coach_level=pending.coach_level, coach_level_International=pending.coach_level_International,
-            is_referee=is_referee, kyorogi=pending.kyorogi, kyorogi_level=pending.kyorogi_level,
-            kyorogi_level_International=pending.kyorogi_level_International,
-            poomseh=pending.poomseh, poomseh_level=pending.poomseh_level, poomseh_level_International=pending.poomseh_level_International,
-            hanmadang=pending.hanmadang, hanmadang_level=pending.hanmadang_level, hanmadang_level_International=pending.hanmadang_level_International,
-            confirm_info=pending.confirm_info, club_names=pending.club_names, coach_name=pending.coach_name,
-            club=pending.club, coach=coach_instance, user=user_obj
-        )
-
-        if pending.coaching_clubs.exists():
-            user.coaching_clubs.set(pending.coaching_clubs.all())
-
-        pending.delete()
-
     messages.success(request, "کاربر تأیید شد. نام‌کاربری = موبایل، رمز = کد ملی.")
     return redirect(reverse("admin:accounts_userprofile_changelist"))
 
@@ -423,39 +376,11 @@ class RegisterPendingClubAPIView(APIView):
 @staff_member_required
 def approve_pending_club(request, pk):
     pending = get_object_or_404(PendingClub, pk=pk)
-
-    if TkdClub.objects.filter(license_number=pending.license_number).exists():
-        messages.warning(request, "این باشگاه قبلاً ثبت و تایید شده است.")
+    result = approve_clubs(PendingClub.objects.filter(pk=pending.pk))
+    if not result["approved"]:
+        messages.warning(request, result["skipped"][0][1])
         return redirect(reverse("admin:accounts_pendingclub_changelist"))
 
-    user_obj = User.objects.create_user(username=pending.founder_phone)
-    if pending.founder_national_code and pending.founder_national_code.isdigit():
-        user_obj.set_password(pending.founder_national_code)
-    else:
-        user_obj.set_unusable_password()
-    user_obj.save()
-
-    TkdClub.objects.create(
-        club_name=pending.club_name,
-        founder_name=pending.founder_name,
-        founder_national_code=pending.founder_national_code,
-        founder_phone=pending.founder_phone,
-        club_type=pending.club_type,
-        activity_description=pending.activity_description,
-        province=pending.province,
-        county=pending.county,
-        city=pending.city,
-        tkd_board=pending.tkd_board,
-        phone=pending.phone,
-        address=pending.address,
-        license_number=pending.license_number,
-        federation_id=pending.federation_id,
-        license_image=pending.license_image,
-        confirm_info=pending.confirm_info,
-        user=user_obj
-    )
-
-    pending.delete()
     messages.success(request, "باشگاه با موفقیت تایید و به لیست اصلی اضافه شد.")
     return redirect(reverse("admin:accounts_tkdclub_changelist"))
 
@@ -476,9 +401,8 @@ class ClubStudentsView(APIView):
 
         coach = request.GET.get("coach")
         if coach and coach != "مربی":
-            students = students.annotate(
-                full_name=Concat('coach__first_name', Value(' '), 'coach__last_name', output_field=CharField())
-            ).filter(full_name__icontains=coach)
+            coaches = search_filter(UserProfile.objects.filter(is_coach=True), coach)
+            students = students.filter(coach__in=coaches.values("pk"))
 
         belt = request.GET.get("belt")
         if belt and belt != "درجه کمربند":
@@ -494,11 +418,7 @@ class ClubStudentsView(APIView):
 
         search = request.GET.get("search")
         if search:
-            students = students.filter(
-                Q(first_name__icontains=search) |
-                Q(last_name__icontains=search) |
-                Q(national_code__icontains=search)
-            )
+            students = search_filter(students, search)
 
         students = annotate_student_stats(students)
         serialized = ClubStudentSerializer(students, many=True)
@@ -549,6 +469,18 @@ def with_competitions_count(qs):
     return qs.annotate(competitions_count=Subquery(subq, output_field=IntegerField()))
 
 
+DASHBOARD_MEDAL_FIELDS = (
+    "gold_medals", "silver_medals", "bronze_medals",
+    "gold_medals_country", "silver_medals_country", "bronze_medals_country",
+    "gold_medals_int", "silver_medals_int", "bronze_medals_int",
+)
+
+
+def _member_sums(fields, member_q=None):
+    """Sum شرطی روی اعضا؛ همه در همان یک aggregate."""
+    return {f: Sum(f, filter=member_q, default=0) for f in fields}
+
+
 class DashboardCombinedView(APIView):
     permission_classes = [IsAuthenticated]
 
@@ -556,94 +488,48 @@ class DashboardCombinedView(APIView):
         user = request.user
 
         if role == 'club':
-            try:
-                club = TkdClub.objects.get(user=user)
-                members = UserProfile.objects.filter(club=club)
-
-                student_count = members.filter(role='player').count()
-                coach_count = UserProfile.objects.filter(coaching_clubs=club, is_coach=True).count()
-
-                medals = members.aggregate(
-                    gold_medals=Sum('gold_medals', default=0),
-                    silver_medals=Sum('silver_medals', default=0),
-                    bronze_medals=Sum('bronze_medals', default=0),
-                    gold_medals_country=Sum('gold_medals_country', default=0),
-                    silver_medals_country=Sum('silver_medals_country', default=0),
-                    bronze_medals_country=Sum('bronze_medals_country', default=0),
-                    gold_medals_int=Sum('gold_medals_int', default=0),
-                    silver_medals_int=Sum('silver_medals_int', default=0),
-                    bronze_medals_int=Sum('bronze_medals_int', default=0),
-                )
-
-                rankings = members.aggregate(
-                    ranking_competition=Sum('ranking_competition', default=0),
-                    ranking_total=Sum('ranking_total', default=0),
-                )
-
-                return Response({
-                    "role": "club",
-                    "club_name": club.club_name,
-                    "founder_name": club.founder_name,
-                    "student_count": student_count,
-                    "coach_count": coach_count,
-                    "matches_participated": club.matches_participated,
-                    "gold_medals": medals["gold_medals"] or 0,
-                    "silver_medals": medals["silver_medals"] or 0,
-                    "bronze_medals": medals["bronze_medals"] or 0,
-                    "gold_medals_country": medals["gold_medals_country"] or 0,
-                    "silver_medals_country": medals["silver_medals_country"] or 0,
-                    "bronze_medals_country": medals["bronze_medals_country"] or 0,
-                    "gold_medals_int": medals["gold_medals_int"] or 0,
-                    "silver_medals_int": medals["silver_medals_int"] or 0,
-                    "bronze_medals_int": medals["bronze_medals_int"] or 0,
-                    "ranking_competition": rankings["ranking_competition"] or 0,
-                    "ranking_total": rankings["ranking_total"] or 0,
-                })
-            except TkdClub.DoesNotExist:
+            club = TkdClub.objects.filter(user=user).first()
+            if club is None:
                 return Response({"detail": "پروفایل باشگاه یافت نشد."}, status=404)
 
+            # اعضا: فیلتر مستقیم روی club_id (ایندکس FK)؛ مربیان: شمارش جدا روی جدول واسط coaching_clubs
+            stats = UserProfile.objects.filter(club_id=club.id).aggregate(
+                student_count=Count("id", filter=Q(role='player')),
+                ranking_competition=Sum("ranking_competition", default=0),
+                ranking_total=Sum("ranking_total", default=0),
+                **_member_sums(DASHBOARD_MEDAL_FIELDS),
+            )
+            stats["coach_count"] = UserProfile.coaching_clubs.through.objects.filter(
+                tkdclub_id=club.id, userprofile__is_coach=True,
+            ).count()
+
+            return Response({
+                "role": "club",
+                "club_name": club.club_name,
+                "founder_name": club.founder_name,
+                "matches_participated": club.matches_participated,
+                **{k: v or 0 for k, v in stats.items()},
+            })
+
         elif role == 'heyat':
-            try:
-                board = TkdBoard.objects.get(user=user)
-                members = UserProfile.objects.filter(tkd_board=board)
-
-                student_count = members.filter(role='player').count()
-                coach_count = members.filter(is_coach=True).count()
-                referee_count = members.filter(is_referee=True).count()
-                club_count = TkdClub.objects.filter(tkd_board=board).count()
-
-                medals = members.aggregate(
-                    gold_medals=Sum('gold_medals', default=0),
-                    silver_medals=Sum('silver_medals', default=0),
-                    bronze_medals=Sum('bronze_medals', default=0),
-                    gold_medals_country=Sum('gold_medals_country', default=0),
-                    silver_medals_country=Sum('silver_medals_country', default=0),
-                    bronze_medals_country=Sum('bronze_medals_country', default=0),
-                    gold_medals_int=Sum('gold_medals_int', default=0),
-                    silver_medals_int=Sum('silver_medals_int', default=0),
-                    bronze_medals_int=Sum('bronze_medals_int', default=0),
-                )
-
-                return Response({
-                    "role": "heyat",
-                    "board_name": board.name,
-                    "student_count": student_count,
-                    "coach_count": coach_count,
-                    "referee_count": referee_count,
-                    "club_count": club_count,
-                    "gold_medals": medals["gold_medals"] or 0,
-                    "silver_medals": medals["silver_medals"] or 0,
-                    "bronze_medals": medals["bronze_medals"] or 0,
-                    "gold_medals_country": medals["gold_medals_country"] or 0,
-                    "silver_medals_country": medals["silver_medals_country"] or 0,
-                    "bronze_medals_country": medals["bronze_medals_country"] or 0,
-                    "gold_medals_int": medals["gold_medals_int"] or 0,
-                    "silver_medals_int": medals["silver_medals_int"] or 0,
-                    "bronze_medals_int": medals["bronze_medals_int"] or 0,
-                })
-            except TkdBoard.DoesNotExist:
+            board = TkdBoard.objects.filter(user=user).annotate(club_count=Count("clubs")).first()
+            if board is None:
                 return Response({"detail": "هیئت مربوط به کاربر یافت نشد."}, status=404)
 
+            stats = UserProfile.objects.filter(tkd_board=board).aggregate(
+                student_count=Count("id", filter=Q(role='player')),
+                coach_count=Count("id", filter=Q(is_coach=True)),
+                referee_count=Count("id", filter=Q(is_referee=True)),
+                **_member_sums(DASHBOARD_MEDAL_FIELDS),
+            )
+
+            return Response({
+                "role": "heyat",
+                "board_name": board.name,
+                "club_count": board.club_count,
+                **{k: v or 0 for k, v in stats.items()},
+            })
+
         # player/coach/referee/both
         try:
             profile = UserProfile.objects.get(user=user)
@@ -666,30 +552,31 @@ def user_profile_with_form_data_view(request):
     except UserProfile.DoesNotExist:
         return Response({"detail": "پروفایل یافت نشد."}, status=404)
 
-    profile_serializer = UserProfileSerializer(profile, context={'request': request})
-    heyats = list(TkdBoard.objects.values('id', 'name'))
-    clubs = list(TkdClub.objects.values('id', 'club_name'))
-
-    gender = profile.gender
-    coaches_qs = UserProfile.objects.filter(is_coach=True, gender=gender)
-    coaches = [{"id": coach.id, "full_name": f"{coach.first_name} {coach.last_name}"} for coach in coaches_qs]
-
-    BELT_CHOICES = [
-        ('زرد', 'زرد'), ('سبز', 'سبز'), ('آبی', 'آبی'), ('قرمز', 'قرمز'),
-        *[(f'مشکی دان {i}', f'مشکی دان {i}') for i in range(1, 11)]
-    ]
-    DEGREE_CHOICES = [('درجه یک', 'درجه یک'), ('درجه دو', 'درجه دو'), ('درجه سه', 'درجه سه'), ('ممتاز', 'ممتاز')]
-
-    return Response({
-        "profile": profile_serializer.data,
-        "form_options": {
-            "heyats": heyats,
-            "clubs": clubs,
-            "coaches": coaches,
-            "belt_choices": BELT_CHOICES,
-            "degree_choices": DEGREE_CHOICES,
+    profile_data = UserProfileSerializer(profile, context={'request': request}).data
+    gender = profile.gender or ""
+
+    def build():
+        data = _form_data(gender)
+        return {
+            "heyats": data["heyats"],
+            "clubs": data["clubs"],
+            "coaches": data["coaches"],
+            "belt_choices": BELT_CHOICES[1:],   # بدون «سفید»
+            "degree_choices": UserProfile.DEGREE_CHOICES,
         }
-    })
+
+    # گزینه‌ها از کش؛ ETag = گزینه‌ها + داده‌های پروفایل همین کاربر
+    options = get_or_build("form_data", ("profile_options", gender), build)
+    etag = '"%s"' % hashlib.md5(
+        json.dumps([profile_data, options], ensure_ascii=False, sort_keys=True, default=str).encode()
+    ).hexdigest()
+    if etag_matches(request, etag):
+        resp = HttpResponseNotModified()
+    else:
+        resp = Response({"profile": profile_data, "form_options": options})
+    resp["ETag"] = etag
+    resp["Cache-Control"] = "private, no-cache"
+    return resp
 
 
 class UpdateProfilePendingAPIView(APIView):
@@ -792,43 +679,11 @@ class UpdateProfilePendingAPIView(APIView):
 @staff_member_required
 def approve_edited_profile(request, pk):
     pending = get_object_or_404(PendingEditProfile, pk=pk)
-    user = pending.original_user
-
-    if not user:
-        messages.error(request, "پروفایل اصلی یافت نشد.")
+    result = approve_edits(PendingEditProfile.objects.filter(pk=pending.pk))
+    if not result["approved"]:
+        messages.error(request, result["skipped"][0][1])
         return redirect(reverse("admin:accounts_pendingeditprofile_changelist"))
 
-    simple_fields = [
-        'first_name', 'last_name', 'father_name', 'birth_date', 'gender',
-        'address', 'province', 'county', 'city',
-        'belt_grade', 'belt_certificate_number', 'belt_certificate_date',
-        'coach_level', 'coach_level_International',
-        'kyorogi', 'kyorogi_level', 'kyorogi_level_International',
-        'poomseh', 'poomseh_level', 'poomseh_level_International',
-        'hanmadang', 'hanmadang_level', 'hanmadang_level_International',
-        'is_coach', 'is_referee', 'tkd_board_name', 'club_names', 'confirm_info', 'role'
-    ]
-
-    for field in simple_fields:
-        setattr(user, field, getattr(pending, field))
-
-    if pending.tkd_board_id:
-        user.tkd_board = pending.tkd_board
-    if pending.coach_id:
-        user.coach = pending.coach
-        user.coach_name = pending.coach_name
-    if pending.club_id:
-        user.club = pending.club
-
-    if pending.profile_image:
-        user.profile_image = pending.profile_image
-
-    if pending.coaching_clubs.exists():
-        user.coaching_clubs.set(pending.coaching_clubs.all())
-
-    user.save()
-    pending.delete()
-
     messages.success(request, "ویرایش کاربر با موفقیت تایید شد.")
     return redirect(reverse("admin:accounts_userprofile_changelist"))
 
@@ -866,11 +721,7 @@ class CoachStudentsAPIView(APIView):
 
         search = request.GET.get("search")
         if search:
-            students = students.filter(
-                Q(first_name__icontains=search) |
-                Q(last_name__icontains=search) |
-                Q(national_code__icontains=search)
-            )
+            students = search_filter(students, search)
 
         students = annotate_student_stats(students)
         serialized = ClubStudentSerializer(students, many=True)
@@ -1013,7 +864,7 @@ class HeyatLoginAPIView(APIView):
         except TkdBoard.DoesNotExist:
             return Response({"error": "هیأت مرتبط یافت نشد."}, status=403)
 
-        refresh = RefreshToken.for_user(user)
+        refresh = TkdRefreshToken.for_user(user, role="heyat")
         return Response({
             "access": str(refresh.access_token),
             "role": "heyat",
@@ -1035,9 +886,8 @@ class HeyatStudentsAPIView(APIView):
 
         coach = request.GET.get("coach")
         if coach and coach != "مربی":
-            students = students.annotate(
-                full_name=Concat('coach__first_name', Value(' '), 'coach__last_name', output_field=CharField())
-            ).filter(full_name__icontains=coach)
+            coaches = search_filter(UserProfile.objects.filter(is_coach=True), coach)
+            students = students.filter(coach__in=coaches.values("pk"))
 
         club = request.GET.get("club")
         if club and club != "باشگاه":
@@ -1057,11 +907,7 @@ class HeyatStudentsAPIView(APIView):
 
         search = request.GET.get("search")
         if search:
-            students = students.filter(
-                Q(first_name__icontains=search) |
-                Q(last_name__icontains=search) |
-                Q(national_code__icontains=search)
-            )
+            students = search_filter(students, search)
 
         students = annotate_student_stats(students)
         serialized = ClubStudentSerializer(students, many=True)
@@ -1076,17 +922,23 @@ def heyat_form_data(request):
     except TkdBoard.DoesNotExist:
         return Response({"detail": "هیئت یافت نشد"}, status=404)
 
-    coaches = UserProfile.objects.filter(tkd_board=board, is_coach=True)
-    clubs = TkdClub.objects.filter(tkd_board=board)
-
-    coach_names = [{"id": c.id, "name": f"{c.first_name} {c.last_name}"} for c in coaches]
-    club_names = [{"id": c.id, "club_name": c.club_name} for c in clubs]
+    def build():
+        return {
+            "coaches": _coach_rows(UserProfile.objects.filter(tkd_board=board, is_coach=True), name_key="name"),
+            "clubs": list(TkdClub.objects.filter(tkd_board=board).values("id", "club_name")),
+        }
 
-    return Response({"coaches": coach_names, "clubs": club_names})
+    return blob_response(request, get_or_build_json("form_data", ("heyat", board.id), build), private=True)
 
 
-class HeyatCoachesAPIView(APIView):
+class HeyatListingView(APIView):
+    """
+    فهرست مربیان/داوران هیئت (accounts.listings).
+    ?limit=&cursor= → صفحه‌بندی {"results", "next"}؛ بدون آن‌ها کل فهرست (قالب قبلی)
+    ?export=csv → فایل CSV جریانی با همان فیلترها
+    """
     permission_classes = [IsAuthenticated]
+    kind = None
 
     def get(self, request):
         try:
@@ -1094,142 +946,26 @@ class HeyatCoachesAPIView(APIView):
         except TkdBoard.DoesNotExist:
             return Response({"detail": "هیئت یافت نشد"}, status=404)
 
-        coaches = UserProfile.objects.filter(
-            tkd_board=board, is_coach=True,
-        ).prefetch_related("coaching_clubs")
-
-        club = request.GET.get("club")
-        if club and club != "همه":
-            coaches = coaches.filter(coaching_clubs__club_name=club)
-
-        belt = request.GET.get("belt")
-        if belt and belt != "همه":
-            coaches = coaches.filter(belt_grade=belt)
-
-        birth_from = request.GET.get("birth_from")
-        if birth_from:
-            coaches = coaches.filter(birth_date__gte=birth_from)
-
-        birth_to = request.GET.get("birth_to")
-        if birth_to:
-            coaches = coaches.filter(birth_date__lte=birth_to)
-
-        national_level = request.GET.get("national_level")
-        if national_level and national_level != "همه":
-            coaches = coaches.filter(coach_level=national_level)
+        params = request.GET
+        if params.get("export") == "csv":
+            response = StreamingHttpResponse(listings.export_rows(self.kind, board, params),
+                                             content_type="text/csv; charset=utf-8")
+            response["Content-Disposition"] = f'attachment; filename="heyat_{self.kind}.csv"'
+            return response
 
-        international_level = request.GET.get("international_level")
-        if international_level and international_level != "همه":
-            coaches = coaches.filter(coach_level_International=international_level)
-
-        search = request.GET.get("search")
-        if search:
-            coaches = coaches.filter(
-                Q(first_name__icontains=search) |
-                Q(last_name__icontains=search) |
-                Q(national_code__icontains=search)
-            )
-
-        result = []
-        for coach in coaches.distinct():
-            result.append({
-                "full_name": f"{coach.first_name} {coach.last_name}",
-                "national_code": coach.national_code,
-                "birth_date": coach.birth_date,
-                "belt_grade": coach.belt_grade,
-                "national_certificate_date": coach.coach_level or "—",
-                "international_certificate_date": coach.coach_level_International or "درجه بین‌الملل ندارد",
-                "clubs": [club.club_name for club in coach.coaching_clubs.all()]
-            })
-        return Response(result)
-
-
-class HeyatRefereesAPIView(APIView):
-    permission_classes = [IsAuthenticated]
-
-    def get(self, request):
         try:
-            board = TkdBoard.objects.get(user=request.user)
-        except TkdBoard.DoesNotExist:
-            return Response({"detail": "هیئت یافت نشد"}, status=404)
+            limit = int(params["limit"]) if params.get("limit") else None
+            return Response(listings.listing(self.kind, board, params, cursor=params.get("cursor"), limit=limit))
+        except (listings.ListingError, ValueError) as e:
+            return Response({"detail": str(e)}, status=400)
 
-        referees = UserProfile.objects.filter(tkd_board=board, is_referee=True)
 
-        club = request.GET.get("club")
-        if club and club != "همه":
-            referees = referees.filter(coaching_clubs__club_name=club)
+class HeyatCoachesAPIView(HeyatListingView):
+    kind = "coaches"
 
-        belt = request.GET.get("belt")
-        if belt and belt != "همه":
-            referees = referees.filter(belt_grade=belt)
 
-        birth_from = request.GET.get("birth_from")
-        if birth_from:
-            referees = referees.filter(birth_date__gte=birth_from)
-
-        birth_to = request.GET.get("birth_to")
-        if birth_to:
-            referees = referees.filter(birth_date__lte=birth_to)
-
-        search = request.GET.get("search")
-        if search:
-            referees = referees.filter(
-                Q(first_name__icontains=search) |
-                Q(last_name__icontains=search) |
-                Q(national_code__icontains=search)
-            )
-
-        referee_field = request.GET.get("referee_field")
-        if referee_field and referee_field != "همه":
-            field_map = {"کیوروگی": "kyorogi", "پومسه": "poomseh", "هانمادانگ": "hanmadang"}
-            field_key = field_map.get(referee_field)
-            if field_key:
-                referees = referees.filter(**{f"{field_key}": True})
-
-        national_level = request.GET.get("national_level")
-        international_level = request.GET.get("international_level")
-
-        if national_level and national_level != "همه":
-            referees = referees.filter(
-                Q(kyorogi_level=national_level) |
-                Q(poomseh_level=national_level) |
-                Q(hanmadang_level=national_level)
-            )
-
-        if international_level and international_level != "همه":
-            referees = referees.filter(
-                Q(kyorogi_level_International=international_level) |
-                Q(poomseh_level_International=international_level) |
-                Q(hanmadang_level_International=international_level)
-            )
-
-        result = []
-        for r in referees:
-            result.append({
-                "full_name": f"{r.first_name} {r.last_name}",
-                "national_code": r.national_code,
-                "birth_date": r.birth_date,
-                "belt_grade": r.belt_grade,
-                "clubs": [c.club_name for c in r.coaching_clubs.all()],
-                "referee_fields": {
-                    "کیوروگی": {
-                        "active": r.kyorogi,
-                        "national": r.kyorogi_level or "درجه ملی ندارد",
-                        "international": r.kyorogi_level_International or "درجه بین‌الملل ندارد"
-                    },
-                    "پومسه": {
-                        "active": r.poomseh,
-                        "national": r.poomseh_level or "درجه ملی ندارد",
-                        "international": r.poomseh_level_International or "درجه بین‌الملل ندارد"
-                    },
-                    "هانمادانگ": {
-                        "active": r.hanmadang,
-                        "national": r.hanmadang_level or "درجه ملی ندارد",
-                        "international": r.hanmadang_level_International or "درجه بین‌الملل ندارد"
-                    },
-                }
-            })
-        return Response(result)
+class HeyatRefereesAPIView(HeyatListingView):
+    kind = "referees"
 
 
 @api_view(["GET"])
@@ -1244,11 +980,7 @@ def heyat_clubs_list(request):
 
     search = request.GET.get("search")
     if search:
-        clubs = clubs.filter(
-            Q(club_name__icontains=search) |
-            Q(founder_name__icontains=search) |
-            Q(founder_phone__icontains=search)
-        )
+        clubs = search_filter(clubs, search)
 
     data = []
     for club in clubs:
@@ -1268,20 +1000,85 @@ def heyat_clubs_list(request):
     return Response(data, status=200)
 
 
+SEARCH_ROLES = {
+    "player": Q(role='player'),
+    "coach": Q(is_coach=True),
+    "referee": Q(is_referee=True),
+}
+
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def search_view(request):
+    """
+    جستجوی رتبه‌دار بازیکن/مربی/داور یا باشگاه (accounts.search).
+    ?q=...&type=profiles|clubs&role=player|coach|referee&limit=20
+    هیئت فقط در حوزهٔ خودش، باشگاه فقط اعضای خودش، کارمند ادمین همه را می‌بیند.
+    """
+    cfg = search_settings()
+    q = (request.GET.get("q") or "").strip()
+    # طول بعد از توکن‌سازی: «--» یا فقط علائم عبارت معتبری نیست
+    if len(" ".join(search_terms(q))) < cfg["MIN_LENGTH"]:
+        return Response({"detail": f"عبارت جستجو باید حداقل {cfg['MIN_LENGTH']} نویسه باشد."}, status=400)
+    try:
+        limit = min(max(int(request.GET.get("limit") or cfg["LIMIT"]), 1), cfg["MAX_LIMIT"])
+    except ValueError:
+        limit = cfg["LIMIT"]
+    kind = request.GET.get("type") or "profiles"
+
+    actor = get_actor(request)
+    if request.user.is_staff:
+        profiles, clubs = UserProfile.objects.all(), TkdClub.objects.all()
+    elif actor.board_id:
+        profiles = UserProfile.objects.filter(tkd_board_id=actor.board_id)
+        clubs = TkdClub.objects.filter(tkd_board_id=actor.board_id)
+    elif actor.club_id:
+        profiles = UserProfile.objects.filter(Q(club_id=actor.club_id) | Q(coaching_clubs=actor.club_id)).distinct()
+        clubs = TkdClub.objects.filter(pk=actor.club_id)
+    else:
+        return Response({"detail": "دسترسی به جستجو ندارید."}, status=403)
+
+    if kind == "clubs":
+        rows = run_search(clubs, q, limit).values(
+            "id", "club_name", "founder_name", "city", "tkd_board__name", "search_rank",
+        )
+        return Response({"results": [
+            {"id": r["id"], "club_name": r["club_name"], "manager_name": r["founder_name"],
+             "city": r["city"], "board": r["tkd_board__name"], "rank": r["search_rank"]}
+            for r in rows
+        ]})
+    if kind != "profiles":
+        return Response({"detail": "نوع جستجو نامعتبر است."}, status=400)
+
+    role = request.GET.get("role")
+    if role in SEARCH_ROLES:
+        profiles = profiles.filter(SEARCH_ROLES[role])
+    rows = run_search(profiles, q, limit).values(
+        "id", "first_name", "last_name", "national_code", "role", "belt_grade",
+        "club__club_name", "tkd_board__name", "search_rank",
+    )
+    return Response({"results": [
+        {"id": r["id"], "full_name": f"{r['first_name']} {r['last_name']}", "national_code": r["national_code"],
+         "role": r["role"], "belt_grade": r["belt_grade"], "club": r["club__club_name"],
+         "board": r["tkd_board__name"], "rank": r["search_rank"]}
+        for r in rows
+    ]})
+
 class KyorugiCompetitionListView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        profile = UserProfile.objects.select_related('coach').filter(user=request.user).first()
+        actor = get_actor(request)
+        profile = actor.profile
 
         role = None
         is_coach = False
         if profile:
             role = profile.role
-            is_coach = bool(profile.is_coach or role in ['coach', 'both'])
-        elif TkdClub.objects.filter(user=request.user).exists():
+            is_coach = bool(actor.is_coach or role in ['coach', 'both'])
+        elif actor.club_id:
             role = 'club'
-        elif TkdBoard.objects.filter(user=request.user).exists():
+        elif actor.board_id:
             role = 'heyat'
         else:
             return Response([])
@@ -1293,7 +1090,7 @@ class KyorugiCompetitionListView(APIView):
         elif role == 'player':
             if profile and profile.coach_id:
                 qs = qs.filter(
-                    coach_approvals__coach=profile.coach,
+                    coach_approvals__coach_id=profile.coach_id,
                     coach_approvals__is_active=True,
                     coach_approvals__terms_accepted=True,
                 ).distinct()
@@ -1319,7 +1116,7 @@ class KyorugiCompetitionListView(APIView):
 @permission_classes([IsAuthenticated])
 def mini_profile(request):
     u = request.user
-    prof = getattr(u, "profile", None) or UserProfile.objects.filter(user=u).first()
+    prof = get_actor(request).profile
 
     if not prof:
         full_name = f"{(u.first_name or '').strip()} {(u.last_name or '').strip()}".strip()
@@ -1333,14 +1130,6 @@ def mini_profile(request):
             "profile_image_url": None,
         })
 
-    def abs_url(filefield):
-        try:
-            if filefield and getattr(filefield, "url", None):
-                return request.build_absolute_uri(filefield.url)
-        except Exception:
-            pass
-        return None
-
     data = {
         "full_name": f"{(prof.first_name or '').strip()} {(prof.last_name or '').strip()}".strip(),
         "first_name": (prof.first_name or "").strip(),
@@ -1348,7 +1137,7 @@ def mini_profile(request):
         "national_code": (prof.national_code or "").strip(),
         "belt_grade": (prof.belt_grade or "").strip(),
         "role": (prof.role or "").strip(),
-        "profile_image_url": abs_url(getattr(prof, "profile_image", None)),
+        "profile_image_url": variant_url(getattr(prof, "profile_image", None), "thumb", request),
     }
     return Response(data)
 
@@ -1368,27 +1157,21 @@ class UniversalLoginAPIView(APIView):
         "heyat": {"heyat", "board"},  # ← این خط
     }
 
-    def _detect_user_role(self, user):
+    def _detect_user_role(self, user, actor=None):
         """
         فقط زمانی نقش را از پروفایل برگردان که مقدار داشته باشد؛
         در غیر این صورت سراغ TkdBoard/TkdClub برو.
         """
-        from .models import UserProfile, TkdClub, TkdBoard
-
-        prof = getattr(user, "profile", None)
+        actor = actor or actor_for_user(user, use_cache=False)
 
-        # اگر پروفایل نقش مشخص دارد، همان را (با نرمال‌سازی) برگردان
-        if prof and (prof.role or "").strip():
-            role = prof.role.strip().lower()
-            # اگر در دیتابیس به جای "heyat" چیزی مثل "board" ذخیره می‌کنید:
-            if role in {"board", "hey'at"}:
-                return "heyat"
-            return role
+        # اگر پروفایل نقش مشخص دارد، همان را (با نرمال‌سازی board → heyat) برگردان
+        if actor.profile_role:
+            return actor.profile_role
 
-        # اگر نقش در پروفایل خالی بود، حالا چک‌های مدل‌های مرتبط را انجام بده
-        if TkdBoard.objects.filter(user=user).exists():
+        # اگر نقش در پروفایل خالی بود، حالا باشگاه/هیئتِ مالک را چک کن
+        if actor.board_id:
             return "heyat"
-        if TkdClub.objects.filter(user=user).exists():
+        if actor.club_id:
             return "club"
 
         # TODO: اگر منبع دیگری برای coach/referee/both داری، اینجا اضافه کن
@@ -1473,7 +1256,8 @@ class UniversalLoginAPIView(APIView):
         if not user:
             return Response({"error": "نام کاربری یا رمز عبور اشتباه است."}, status=401)
 
-        actual_role = self._detect_user_role(user)
+        actor = actor_for_user(user, use_cache=False)
+        actual_role = self._detect_user_role(user, actor)
         allowed = self.ROLE_GROUPS[req_group]
         print(f"[UNILOGIN] auth ok -> actual_role={actual_role} allowed={allowed}", flush=True)
 
@@ -1481,7 +1265,8 @@ class UniversalLoginAPIView(APIView):
             return Response({"error": "این فرم برای نقش دیگری است. لطفاً از فرم صحیح ورود استفاده کنید."}, status=403)
 
         # 7) صدور توکن
-        refresh = RefreshToken.for_user(user)
+        # نقش/دامنه داخل توکن می‌ماند تا درخواست‌های بعدی دوباره از DB خوانده نشوند
+        refresh = TkdRefreshToken.for_user(user, actor=actor, role=actual_role)
         return Response(
             {"access": str(refresh.access_token), "refresh": str(refresh), "role": actual_role},
             status=200
@@ -1513,16 +1298,11 @@ class ForgotPasswordSendCodeAPIView(APIView):
         if not user:
             return Response({"error": "کاربری با این شماره یافت نشد."}, status=404)
 
-        recent = SMSVerification.objects.filter(
-            phone=phone, created_at__gte=timezone.now() - timedelta(minutes=3)
-        ).first()
-        if recent:
-            remaining = 180 - int((timezone.now() - recent.created_at).total_seconds())
-            return Response({"error": "کد قبلی هنوز معتبر است.", "retry_after": remaining}, status=429)
-
-        code = str(random.randint(1000, 9999))
-        SMSVerification.objects.create(phone=phone, code=code)
-        send_verification_code(phone, code)
+        # cooldown هر شماره + سقف ارسال برای شماره/IP
+        try:
+            otp.send_code(phone, otp.client_ip(request))
+        except otp.OtpThrottled as e:
+            return Response({"error": e.message, "retry_after": e.retry_after}, status=429)
 
         return Response({"message": "کد تأیید ارسال شد."}, status=200)
 
@@ -1545,19 +1325,15 @@ class ForgotPasswordVerifyAPIView(APIView):
         if not code.isdigit() or len(code) != 4:
             return Response({"error": "کد باید ۴ رقمی باشد."}, status=400)
 
-        expire_time = timezone.now() - timedelta(minutes=3)
         try:
-            rec = SMSVerification.objects.get(phone=phone, code=code)
-        except SMSVerification.DoesNotExist:
-            SMSVerification.objects.filter(phone=phone).delete()
+            result = otp.check_code(phone, code, otp.client_ip(request))
+        except otp.OtpThrottled as e:
+            return Response({"error": e.message, "retry_after": e.retry_after}, status=429)
+        if result == otp.INVALID:
             return Response({"error": "کد وارد شده نادرست است."}, status=400)
-
-        if rec.created_at < expire_time:
-            rec.delete()
+        if result == otp.EXPIRED:
             return Response({"error": "کد منقضی شده است. لطفاً مجدداً دریافت کنید."}, status=400)
 
-        rec.delete()
-
         user = User.objects.filter(username=phone).first()
         prof = None
         club = None
@@ -1588,6 +1364,7 @@ class ForgotPasswordVerifyAPIView(APIView):
 
         user.set_password(new_pass)
         user.save()
+        revoke_tokens(user)
 
         role = _detect_role(user)
 
@@ -27,6 +27,7 @@ import jdatetime
 import django_jalali.forms as jforms
 import django_jalali.admin as jadmin
 from django_jalali.admin.filters import JDateFieldListFilter
+from main import jalali
 
 # ============================ مدل‌ها ============================
 from .models import (
@@ -40,7 +41,8 @@ from .models import (
 
 # سرویس‌ها
 from .services.draw_service import create_draw_for_group
-from .services.results_service import apply_results_and_points
+from .services.results_service import apply_results_and_points, apply_competition_results
+from .services.bracket_results_service import derive_results_for_competition
 from competitions.services.numbering_service import (
     number_matches_for_competition,
     clear_match_numbers_for_competition,
@@ -110,8 +112,7 @@ def _to_jalali_str(value):
             g_date = None
         if not g_date:
             return "-"
-        j = jdatetime.date.fromgregorian(date=g_date)
-        return j.strftime("%Y/%m/%d")
+        return jalali.format_date(g_date) or "-"
     except Exception:
         return "-"
 
@@ -225,7 +226,7 @@ class CoachApprovalInline(admin.TabularInline):
 @admin.display(description="تاریخ برگزاری (شمسی)")
 def _comp_date_jalali(obj):
     if obj.competition_date:
-        return jdatetime.date.fromgregorian(date=obj.competition_date).strftime("%Y/%m/%d")
+        return jalali.format_date(obj.competition_date)
     return "-"
 
 @admin.display(boolean=True, description="جدول منتشر؟")
@@ -240,6 +241,27 @@ def _style_col(obj):
 def _registration_open_col(obj):
     return bool(getattr(obj, "registration_open_effective", False))
 
+@admin.action(description="اعمال نتایج و امتیازهای همه اوزان")
+def apply_results_action(modeladmin, request, queryset):
+    for comp in queryset:
+        stats = apply_competition_results(comp)
+        messages.success(
+            request,
+            f"{comp.title}: {stats['results']} وزن — {stats['added']} تراکنش جدید، {stats['removed']} حذف‌شده.",
+        )
+
+@admin.action(description="استخراج نتایج از جدول‌ها و اعمال امتیازها")
+def derive_results_action(modeladmin, request, queryset):
+    for comp in queryset:
+        report = derive_results_for_competition(comp)
+        messages.success(
+            request,
+            f"{comp.title}: {report['created']} نتیجه جدید، {report['updated']} به‌روزشده، "
+            f"{report['unchanged']} بدون تغییر.",
+        )
+        for p in report["problems"]:
+            messages.warning(request, f"{comp.title} — {p}")
+
 @admin.register(KyorugiCompetition)
 class KyorugiCompetitionAdmin(admin.ModelAdmin):
     form = KyorugiCompetitionAdminForm
@@ -258,7 +280,7 @@ class KyorugiCompetitionAdmin(admin.ModelAdmin):
         ("registration_start", JDateFieldListFilter),
         ("registration_end", JDateFieldListFilter),
     )
-    actions = []
+    actions = [derive_results_action, apply_results_action]
     inlines = [MatAssignmentInline, CompetitionImageInline, CompetitionFileInline, CoachApprovalInline]
     readonly_fields = ("public_id",)
     ordering = ("-competition_date", "-id")
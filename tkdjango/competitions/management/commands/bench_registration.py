@@ -0,0 +1,155 @@
+# competitions/management/commands/bench_registration.py
+import secrets
+import statistics
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections, transaction
+from django.test import override_settings
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from accounts.models import UserProfile
+from competitions.models import Enrollment, KyorugiCompetition
+from competitions.views import CoachRegisterStudentsView
+
+
+class Command(BaseCommand):
+    help = (
+        "بنچمارک ثبت‌نام هم‌زمان مربیان (CoachRegisterStudentsView) روی دیتابیس تنظیم‌شده؛ "
+        "برای مقایسه با DB_ENGINE / SQLITE_WAL / DB_POOL متفاوت اجرا کنید. داده‌های ساختگی در پایان حذف می‌شوند."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--coaches", type=int, default=8, help="تعداد مربی هم‌زمان (thread)")
+        parser.add_argument("--students", type=int, default=40, help="شاگرد هر مربی")
+        parser.add_argument("--batch", type=int, default=5, help="تعداد شاگرد در هر درخواست")
+        parser.add_argument("--force", action="store_true", help="اجرا حتی وقتی DEBUG خاموش است")
+
+    def handle(self, *args, **opts):
+        if not settings.DEBUG and not opts["force"]:
+            raise CommandError("این بنچمارک روی دیتابیس واقعی می‌نویسد؛ با DEBUG=True یا --force اجرا کنید.")
+        coaches_n, students_n, batch = opts["coaches"], opts["students"], max(1, opts["batch"])
+
+        db = connection.settings_dict
+        mode = db["ENGINE"].rsplit(".", 1)[-1]
+        if mode == "sqlite3":
+            with connection.cursor() as c:
+                c.execute("PRAGMA journal_mode")
+                mode += f" journal={c.fetchone()[0]} timeout={db.get('OPTIONS', {}).get('timeout')}"
+        elif db.get("OPTIONS", {}).get("pool"):
+            mode += " pool"
+        else:
+            mode += f" conn_max_age={db.get('CONN_MAX_AGE')}"
+
+        run = secrets.randbelow(900) + 100
+        # فقط همین ردیف‌ها در پایان حذف می‌شوند (نه با پیشوند موبایل/کد ملی که ممکن است مال اعضای واقعی باشد)
+        created = {"comp": None, "users": [], "profiles": []}
+        try:
+            comp, coaches = self._fixture(run, coaches_n, students_n, created)
+            stats = self._run(comp, coaches, batch)
+        finally:
+            self._cleanup(created)
+
+        lat = sorted(stats["latency"]) or [0.0]
+        p95 = lat[min(len(lat) - 1, int(len(lat) * 0.95))]
+        self.stdout.write(self.style.SUCCESS(
+            f"{mode}: {stats['requests']} requests, {stats['created']} enrollments in {stats['elapsed']:.2f}s "
+            f"→ {stats['requests'] / stats['elapsed']:.1f} req/s, {stats['created'] / stats['elapsed']:.1f} enr/s; "
+            f"latency median={statistics.median(lat) * 1000:.0f}ms p95={p95 * 1000:.0f}ms; errors={stats['errors']}"
+        ))
+        for msg, n in sorted(stats["error_kinds"].items(), key=lambda x: -x[1])[:5]:
+            self.stdout.write(self.style.WARNING(f"  {n} × {msg}"))
+
+    # ---------- داده‌های ساختگی ----------
+    def _profile(self, run, i, **kw):
+        return UserProfile(
+            first_name="bench", last_name=str(i), father_name="bench",
+            national_code=f"8{run:03d}{i:06d}", phone=f"09{run:03d}{i:06d}",
+            birth_date="1380/01/01", gender="male", address="-", province="-", county="-", city="-",
+            belt_grade="مشکی دان 1", belt_certificate_number="-", belt_certificate_date="1390/01/01", **kw,
+        )
+
+    def _fixture(self, run, coaches_n, students_n, created):
+        today = timezone.localdate()
+        comp = created["comp"] = KyorugiCompetition.objects.create(
+            title=f"bench-{run}", belt_level="all", gender="male", city="-", address="-",
+            registration_manual=True, entry_fee=1000,
+            registration_start=today, registration_end=today + timedelta(days=10),
+            weigh_date=today + timedelta(days=20), draw_date=today + timedelta(days=20),
+            competition_date=today + timedelta(days=30),
+        )
+        coaches, n = [], 0
+        for c in range(coaches_n):
+            # هر مربی و شاگردانش در یک تراکنش: خطای یکتایی در وسط کار ردیف ثبت‌نشده‌ای جا نمی‌گذارد
+            with transaction.atomic():
+                user = User.objects.create(username=f"bench{run}_{c}")
+                coach = self._profile(run, n, user=user, role="coach", is_coach=True)
+                coach.save()
+                players = [self._profile(run, n + 1 + j, role="player", coach=coach) for j in range(students_n)]
+                UserProfile.objects.bulk_create(players)
+                # coach تازه ساخته شده، پس شاگردانش دقیقاً همین ردیف‌های bulk_create هستند
+                ids = list(UserProfile.objects.filter(coach=coach).values_list("id", flat=True))
+            created["users"].append(user.pk)
+            created["profiles"] += [coach.pk, *ids]
+            n += 1 + students_n
+            coaches.append((user, ids))
+        return comp, coaches
+
+    def _cleanup(self, created):
+        if created["comp"] is not None:
+            Enrollment.objects.filter(competition=created["comp"]).delete()
+            created["comp"].delete()
+        if created["profiles"]:
+            UserProfile.objects.filter(pk__in=created["profiles"]).delete()
+        if created["users"]:
+            User.objects.filter(pk__in=created["users"]).delete()
+
+    # ---------- اجرا ----------
+    def _run(self, comp, coaches, batch):
+        factory = APIRequestFactory()
+        view = CoachRegisterStudentsView.as_view()
+        ins_date = (comp.competition_date - timedelta(days=10)).isoformat()
+        lock = threading.Lock()
+        stats = {"requests": 0, "created": 0, "errors": 0, "latency": [], "error_kinds": {}}
+        start = threading.Barrier(len(coaches))
+
+        def worker(user, ids):
+            start.wait()
+            try:
+                for i in range(0, len(ids), batch):
+                    students = [{"player_id": pid, "declared_weight": 60, "insurance_number": "1",
+                                 "insurance_issue_date": ins_date} for pid in ids[i:i + batch]]
+                    req = factory.post("/bench/", {"students": students}, format="json")
+                    force_authenticate(req, user=user)
+                    t0 = time.perf_counter()
+                    try:
+                        resp = view(req, key=str(comp.pk))
+                        ok, created = resp.status_code < 300, len(resp.data.get("enrollment_ids") or [])
+                        err = None if ok else f"HTTP {resp.status_code}"
+                    except Exception as e:
+                        ok, created, err = False, 0, f"{type(e).__name__}: {e}"
+                    dt = time.perf_counter() - t0
+                    with lock:
+                        stats["requests"] += 1
+                        stats["latency"].append(dt)
+                        stats["created"] += created
+                        if not ok:
+                            stats["errors"] += 1
+                            stats["error_kinds"][err] = stats["error_kinds"].get(err, 0) + 1
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=worker, args=c) for c in coaches]
+        t0 = time.perf_counter()
+        with override_settings(PAYMENTS_ENABLED=True):   # بدون پرداخت آزمایشی/امتیاز؛ فقط مسیر ثبت‌نام
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+        stats["elapsed"] = max(time.perf_counter() - t0, 1e-6)
+        return stats
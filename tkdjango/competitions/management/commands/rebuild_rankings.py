@@ -0,0 +1,53 @@
+# competitions/management/commands/rebuild_rankings.py
+from django.core.management.base import BaseCommand
+
+from competitions.services.ranking_service import (
+    rebuild_standings,
+    verify_counters,
+    verify_standings,
+    bootstrap_opening_balances,
+)
+
+
+class Command(BaseCommand):
+    help = "بازسازی جدول رده‌بندی فصل از روی دفتر امتیاز و صحت‌سنجی شمارنده‌های ranking_*"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--season", type=int, default=None, help="سال شمسی (پیش‌فرض: همه فصل‌ها)")
+        parser.add_argument("--verify", action="store_true", help="فقط صحت‌سنجی، بدون بازسازی")
+        parser.add_argument(
+            "--bootstrap", action="store_true",
+            help="اختلاف شمارنده‌های قدیمی با دفتر را به‌صورت ردیف opening ثبت کن",
+        )
+        parser.add_argument("--limit", type=int, default=20, help="حداکثر تعداد اختلاف چاپ‌شده")
+
+    def handle(self, *args, **opts):
+        season = opts["season"]
+        limit = opts["limit"]
+
+        if opts["bootstrap"]:
+            n = bootstrap_opening_balances(season)
+            self.stdout.write(self.style.SUCCESS(f"Opening balances recorded: {n} rows."))
+
+        if not opts["verify"]:
+            n = rebuild_standings(season)
+            self.stdout.write(self.style.SUCCESS(f"Standings rebuilt: {n} rows."))
+
+        counter_problems = verify_counters()
+        standing_problems = verify_standings()
+
+        for p in counter_problems[:limit]:
+            self.stdout.write(self.style.WARNING(
+                f"{p['model']}#{p['id']}: competition {p['diff_competition']:+g}, total {p['diff_total']:+g}"
+            ))
+        for p in standing_problems[:limit]:
+            self.stdout.write(self.style.WARNING(
+                f"standing {p['key']}: table={p['standing']} ledger={p['ledger']}"
+            ))
+
+        if counter_problems or standing_problems:
+            self.stdout.write(self.style.ERROR(
+                f"Mismatches — counters: {len(counter_problems)}, standings: {len(standing_problems)}"
+            ))
+        else:
+            self.stdout.write(self.style.SUCCESS("Counters and standings match the ledger."))
@@ -0,0 +1,83 @@
+# Generated by Django 5.2.1 on 2026-10-19 13:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('competitions', '0045_kyorugicompetition_bracket_published_at_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RankingLedgerEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('season', models.PositiveSmallIntegerField(db_index=True, verbose_name='فصل (سال شمسی)')),
+                ('subject_type', models.CharField(choices=[('player', 'بازیکن'), ('coach', 'مربی'), ('club', 'باشگاه'), ('board', 'هیئت')], max_length=16)),
+                ('subject_id', models.IntegerField()),
+                ('delta_competition', models.FloatField(default=0.0)),
+                ('delta_total', models.FloatField(default=0.0)),
+                ('source', models.CharField(choices=[('payment', 'پرداخت ثبت\u200cنام'), ('award', 'امتیاز شرکت در مسابقه'), ('result', 'نتیجه/مدال'), ('opening', 'مانده افتتاحیه')], max_length=16)),
+                ('ref', models.CharField(blank=True, default='', max_length=64)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'ردیف دفتر امتیاز',
+                'verbose_name_plural': 'دفتر امتیاز',
+            },
+        ),
+        migrations.CreateModel(
+            name='RankingStanding',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('season', models.PositiveSmallIntegerField(verbose_name='فصل (سال شمسی)')),
+                ('subject_type', models.CharField(choices=[('player', 'بازیکن'), ('coach', 'مربی'), ('club', 'باشگاه'), ('board', 'هیئت')], max_length=16)),
+                ('subject_id', models.IntegerField()),
+                ('points_competition', models.FloatField(default=0.0)),
+                ('points_total', models.FloatField(default=0.0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'رده\u200cبندی فصل',
+                'verbose_name_plural': 'رده\u200cبندی فصل',
+            },
+        ),
+        migrations.DeleteModel(
+            name='MatchNumberingEntry',
+        ),
+        migrations.CreateModel(
+            name='NumberingEntry',
+            fields=[
+            ],
+            options={
+                'verbose_name': 'شماره\u200cگذاری بازی\u200cها',
+                'verbose_name_plural': 'شماره\u200cگذاری بازی\u200cها',
+                'proxy': True,
+                'indexes': [],
+                'constraints': [],
+            },
+            bases=('competitions.kyorugicompetition',),
+        ),
+        migrations.AddIndex(
+            model_name='rankingledgerentry',
+            index=models.Index(fields=['subject_type', 'subject_id', 'season'], name='competition_subject_845f5e_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='rankingledgerentry',
+            index=models.Index(fields=['source', 'ref'], name='competition_source_2272dc_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='rankingstanding',
+            index=models.Index(fields=['season', 'subject_type', '-points_total', 'subject_id'], name='standing_total_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='rankingstanding',
+            index=models.Index(fields=['season', 'subject_type', '-points_competition', 'subject_id'], name='standing_comp_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='rankingstanding',
+            constraint=models.UniqueConstraint(fields=('season', 'subject_type', 'subject_id'), name='uniq_standing_subject'),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.1 on 2026-10-19 14:48
+
+from django.db import migrations, models
+
+ROLE_BITS = {"player": 1, "coach": 2, "referee": 4}
+
+
+def fill_role_mask(apps, schema_editor):
+    Seminar = apps.get_model("competitions", "Seminar")
+    using = schema_editor.connection.alias
+    objs = list(Seminar.objects.using(using).only("pk", "allowed_roles"))
+    for s in objs:
+        s.role_mask = 0
+        for r in s.allowed_roles or []:
+            s.role_mask |= ROLE_BITS.get(r, 0)
+    Seminar.objects.using(using).bulk_update(objs, ["role_mask"], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('competitions', '0046_ranking_ledger_and_standings'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='seminar',
+            name='role_mask',
+            field=models.PositiveSmallIntegerField(default=0, editable=False, verbose_name='ماسک نقش\u200cها'),
+        ),
+        migrations.AddIndex(
+            model_name='seminar',
+            index=models.Index(fields=['role_mask', 'event_date'], name='seminar_role_event_idx'),
+        ),
+        migrations.RunPython(fill_role_mask, migrations.RunPython.noop),
+    ]
@@ -17,10 +17,13 @@ from typing import List, Optional
 from django.utils.translation import gettext_lazy as _
 
 from accounts.models import UserProfile, TkdClub, TkdBoard
+from main import jalali
 from django.conf import settings
+import logging
 
 
 User = get_user_model()
+logger = logging.getLogger(__name__)
 
 
 
@@ -431,6 +434,25 @@ class CoachApproval(models.Model):
         )
         self.refresh_from_db(fields=("terms_accepted", "is_active", "approved_at"))
 
+def _record_payment_points(enr, ref: str = ""):
+    """
+    امتیاز پرداخت ثبت‌نام (کیوروگی/پومسه) از طریق دفتر امتیاز:
+    بازیکن +1 (مسابقه و کل)، مربی +0.75، باشگاه/هیئت +0.5 به کل.
+    در savepoint جدا: خطای امتیازدهی فقط لاگ می‌شود و تراکنش پرداخت را باطل نمی‌کند.
+    """
+    from competitions.services.ranking_service import record_deltas
+    try:
+        with transaction.atomic():
+            record_deltas([
+                ("player", enr.player_id, 1.0, 1.0),
+                ("coach", enr.coach_id, 0.0, 0.75),
+                ("club", enr.club_id, 0.0, 0.5),
+                ("board", enr.board_id, 0.0, 0.5),
+            ], source="payment", ref=ref)
+    except Exception:
+        logger.exception("ranking points for paid %s not recorded", ref or f"enrollment:{enr.pk}")
+
+
 # =========================
 # ثبت‌نام بازیکن (Enrollment)
 # =========================
@@ -527,30 +549,7 @@ class Enrollment(models.Model):
 
         # ✅ فقط دفعه‌ی اول که از unpaid → paid می‌رویم، امتیاز بده
         if not was_paid:
-            # بازیکن: +1 مسابقه
-            try:
-                UserProfile.objects.filter(id=self.player_id).update(
-                    ranking_competition=F("ranking_competition") + 1.0,
-                    ranking_total=F("ranking_total") + 1.0
-                )
-            except Exception:
-                pass
-
-            # مربی: +0.75 به total
-            if self.coach_id:
-                UserProfile.objects.filter(id=self.coach_id).update(
-                    ranking_total=F("ranking_total") + 0.75
-                )
-
-            # باشگاه/هیئت: +0.5 به total
-            if self.club_id:
-                TkdClub.objects.filter(id=self.club_id).update(
-                    ranking_total=F("ranking_total") + 0.5
-                )
-            if self.board_id:
-                TkdBoard.objects.filter(id=self.board_id).update(
-                    ranking_total=F("ranking_total") + 0.5
-                )
+            _record_payment_points(self, ref=f"enrollment:{self.pk}")
 
 class Draw(models.Model):
     """قرعهٔ یک گروه مشخص در یک مسابقه (جنسیت/رده سنی/گروه کمربندی/رده وزنی)."""
@@ -720,22 +719,14 @@ def _award_points_after_payment(enrollment):
         points_board=0.5 if board else 0.0,
     )
 
-    # اعمال امتیازها (اتمیک با F)
-    UserProfile.objects.filter(pk=player.pk).update(
-        ranking_competition=F('ranking_competition') + award.points_player
-    )
-    if coach:
-        UserProfile.objects.filter(pk=coach.pk).update(
-            ranking_total=F('ranking_total') + award.points_coach
-        )
-    if club:
-        TkdClub.objects.filter(pk=club.pk).update(
-            ranking_total=F('ranking_total') + award.points_club
-        )
-    if board:
-        TkdBoard.objects.filter(pk=board.pk).update(
-            ranking_total=F('ranking_total') + award.points_board
-        )
+    # اعمال امتیازها از طریق دفتر امتیاز (اتمیک با F)
+    from competitions.services.ranking_service import record_deltas
+    record_deltas([
+        ("player", player.pk, award.points_player, 0.0),
+        ("coach", getattr(coach, "pk", None), 0.0, award.points_coach),
+        ("club", getattr(club, "pk", None), 0.0, award.points_club),
+        ("board", getattr(board, "pk", None), 0.0, award.points_board),
+    ], source="award", ref=f"enrollment:{enrollment.pk}")
 
 class KyorugiResult(models.Model):
     competition     = models.ForeignKey("KyorugiCompetition", on_delete=models.CASCADE, related_name="results")
@@ -786,6 +777,71 @@ class RankingTransaction(models.Model):
             models.Index(fields=["result"]),
         ]
 
+
+# ------------------------- دفتر امتیاز (Ledger) + جدول رده‌بندی -------------------------
+class RankingLedgerEntry(models.Model):
+    """
+    دفتر فقط‌افزودنی همهٔ تغییرات امتیاز (پرداخت، award، نتایج).
+    اصلاح/برگشت = ردیف جدید با مقدار منفی؛ ردیف‌ها ویرایش/حذف نمی‌شوند.
+    """
+    SOURCE_PAYMENT = "payment"
+    SOURCE_AWARD   = "award"
+    SOURCE_RESULT  = "result"
+    SOURCE_OPENING = "opening"
+    SOURCE_CHOICES = [
+        (SOURCE_PAYMENT, "پرداخت ثبت‌نام"),
+        (SOURCE_AWARD,   "امتیاز شرکت در مسابقه"),
+        (SOURCE_RESULT,  "نتیجه/مدال"),
+        (SOURCE_OPENING, "مانده افتتاحیه"),
+    ]
+
+    season       = models.PositiveSmallIntegerField("فصل (سال شمسی)", db_index=True)
+    subject_type = models.CharField(max_length=16, choices=RankingTransaction.SUBJECT_CHOICES)
+    subject_id   = models.IntegerField()
+    delta_competition = models.FloatField(default=0.0)
+    delta_total       = models.FloatField(default=0.0)
+    source     = models.CharField(max_length=16, choices=SOURCE_CHOICES)
+    ref        = models.CharField(max_length=64, blank=True, default="")  # مثل "enrollment:12" یا "result:5"
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "ردیف دفتر امتیاز"
+        verbose_name_plural = "دفتر امتیاز"
+        indexes = [
+            models.Index(fields=["subject_type", "subject_id", "season"]),
+            models.Index(fields=["source", "ref"]),
+        ]
+
+    def __str__(self):
+        return f"{self.subject_type}#{self.subject_id} {self.delta_competition:+g}/{self.delta_total:+g} ({self.source})"
+
+
+class RankingStanding(models.Model):
+    """
+    جمع تجمیعی دفتر برای هر (فصل، نوع، شناسه) که به‌صورت افزایشی به‌روز می‌شود.
+    ایندکس‌های (season, subject_type, points) جایگاه را با یک range-scan روی B-tree می‌دهند.
+    """
+    season       = models.PositiveSmallIntegerField("فصل (سال شمسی)")
+    subject_type = models.CharField(max_length=16, choices=RankingTransaction.SUBJECT_CHOICES)
+    subject_id   = models.IntegerField()
+    points_competition = models.FloatField(default=0.0)
+    points_total       = models.FloatField(default=0.0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "رده‌بندی فصل"
+        verbose_name_plural = "رده‌بندی فصل"
+        constraints = [
+            models.UniqueConstraint(fields=["season", "subject_type", "subject_id"], name="uniq_standing_subject"),
+        ]
+        indexes = [
+            models.Index(fields=["season", "subject_type", "-points_total", "subject_id"], name="standing_total_idx"),
+            models.Index(fields=["season", "subject_type", "-points_competition", "subject_id"], name="standing_comp_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.season} {self.subject_type}#{self.subject_id}: {self.points_total:g}"
+
 #-------------------------------------------------------------سمینار----------------------------------------------------------------------------
 # -----------------------
 # Helpers: public_id
@@ -818,6 +874,8 @@ class Seminar(models.Model):
         (ROLE_REFEREE, "داور"),
     ]
     ROLE_VALUES = [r[0] for r in ROLE_CHOICES]
+    # بیت هر نقش در role_mask (0 = همه نقش‌ها)
+    ROLE_BITS = {ROLE_PLAYER: 1, ROLE_COACH: 2, ROLE_REFEREE: 4}
 
     title       = models.CharField("عنوان", max_length=255)
     poster      = models.ImageField("پوستر", upload_to="seminars/posters/", blank=True, null=True)
@@ -832,6 +890,8 @@ class Seminar(models.Model):
 
     allowed_roles = models.JSONField("نقش‌های مجاز", default=list, blank=True,
                                      help_text="مثلاً ['player','coach'] — خالی = همه نقش‌ها")
+    # نسخهٔ قابل‌ایندکس allowed_roles برای فیلتر نقش در SQL (با save() پر می‌شود)
+    role_mask = models.PositiveSmallIntegerField("ماسک نقش‌ها", default=0, editable=False)
 
     created_at = models.DateTimeField("ایجاد شده در", auto_now_add=True)
 
@@ -850,6 +910,7 @@ class Seminar(models.Model):
         indexes = [
             Index(fields=["public_id"]),
             Index(fields=["event_date"]),
+            Index(fields=["role_mask", "event_date"], name="seminar_role_event_idx"),
         ]
         ordering = ["-event_date", "-created_at"]
         constraints = [
@@ -884,6 +945,10 @@ class Seminar(models.Model):
     def save(self, *args, **kwargs):
         if not self.public_id:
             self.public_id = _unique_public_id_for_model(type(self))
+        self.role_mask = self.mask_for(self.allowed_roles)
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and "allowed_roles" in update_fields:
+            kwargs["update_fields"] = {*update_fields, "role_mask"}
         for i in range(3):
             try:
                 return super().save(*args, **kwargs)
@@ -894,6 +959,24 @@ class Seminar(models.Model):
                 raise
 
     # -------- Helpers --------
+    @classmethod
+    def mask_for(cls, roles) -> int:
+        mask = 0
+        for r in roles or []:
+            mask |= cls.ROLE_BITS.get(r, 0)
+        return mask
+
+    @classmethod
+    def role_filter(cls, role: str) -> Q:
+        """
+        سمینارهایی که نقش role (یا 'both' = مربی یا داور) مجاز است در آن‌ها ثبت‌نام کند.
+        فقط ۸ ماسک ممکن است، پس شرط یک IN روی ایندکس role_mask است (نه AND بیتی روی هر ردیف).
+        """
+        roles = [cls.ROLE_COACH, cls.ROLE_REFEREE] if role == "both" else [role]
+        bits = cls.mask_for(roles)
+        masks = [m for m in range(1 << len(cls.ROLE_BITS)) if m == 0 or m & bits]
+        return Q(role_mask__in=masks)
+
     def can_register_role(self, role: Optional[str]) -> bool:
         allowed: List[str] = self.allowed_roles or []
         return True if not allowed else (bool(role) and role in allowed)
@@ -907,11 +990,7 @@ class Seminar(models.Model):
     def _date_to_jalali_str(d) -> str:
         if not d:
             return ""
-        try:
-            j = jdatetime.date.fromgregorian(date=d)
-            return f"{j.year:04d}/{j.month:02d}/{j.day:02d}"
-        except Exception:
-            return ""
+        return jalali.format_date(d) or ""
 
     @property
     def registration_start_jalali(self) -> str: return self._date_to_jalali_str(self.registration_start)
@@ -1379,25 +1458,7 @@ class PoomsaeEnrollment(models.Model):
         super().save(update_fields=["is_paid", "paid_amount", "bank_ref_code", "paid_at", "status"])
 
         if not was_paid:
-            try:
-                UserProfile.objects.filter(id=self.player_id).update(
-                    ranking_competition=F("ranking_competition") + 1.0,
-                    ranking_total=F("ranking_total") + 1.0
-                )
-            except Exception:
-                pass
-            if self.coach_id:
-                UserProfile.objects.filter(id=self.coach_id).update(
-                    ranking_total=F("ranking_total") + 0.75
-                )
-            if self.club_id:
-                TkdClub.objects.filter(id=self.club_id).update(
-                    ranking_total=F("ranking_total") + 0.5
-                )
-            if self.board_id:
-                TkdBoard.objects.filter(id=self.board_id).update(
-                    ranking_total=F("ranking_total") + 0.5
-                )
+            _record_payment_points(self, ref=f"poomsae_enrollment:{self.pk}")
 
 class PoomsaeImage(models.Model):
     competition = models.ForeignKey(
@@ -1,10 +1,10 @@
 from rest_framework.permissions import BasePermission
-from accounts.models import UserProfile
+from accounts.actor import get_actor
 
 class IsCoach(BasePermission):
     def has_permission(self, request, view):
-        return request.user.is_authenticated and UserProfile.objects.filter(user=request.user, is_coach=True).exists()
+        return request.user.is_authenticated and get_actor(request).is_coach
 
 class IsPlayer(BasePermission):
     def has_permission(self, request, view):
-        return request.user.is_authenticated and UserProfile.objects.filter(user=request.user, role='player').exists()
+        return request.user.is_authenticated and get_actor(request).profile_role == 'player'
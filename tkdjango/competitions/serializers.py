@@ -16,6 +16,8 @@ from django.shortcuts import get_object_or_404
 
 
 from accounts.models import UserProfile, TkdClub, TkdBoard
+from main import jalali, normalize
+from main.images import variant_url
 from math import inf
 
 from .models import (
@@ -110,7 +112,7 @@ def _g2j(d):
         return None
     if isinstance(d, _datetime):
         d = d.date()
-    return jdatetime.date.fromgregorian(date=d)
+    return jalali.to_jalali(d)
 
 def _j2str(jd):
     return f"{jd.year:04d}/{jd.month:02d}/{jd.day:02d}" if jd else None
@@ -122,15 +124,7 @@ def _to_jalali_date_str(d):
     """Gregorian date/datetime -> 'YYYY/MM/DD' jalali (safe)."""
     if not d:
         return None
-    # اگر datetime است، قبل از تبدیل صرفاً تاریخ را بگیر
-    if isinstance(d, _datetime):
-        # اگر آگاه به تایم‌زون است، به لوکال تبدیل کن بعد date() بگیر
-        d = timezone.localtime(d).date() if timezone.is_aware(d) else d.date()
-    try:
-        jd = jdatetime.date.fromgregorian(date=d)
-        return f"{jd.year:04d}/{jd.month:02d}/{jd.day:02d}"
-    except Exception:
-        return None
+    return jalali.format_date(d)
 
 def _to_jalali_date_str_safe(d):
     # الان با _to_jalali_date_str یکی شد؛ نگهش داریم برای سازگاری
@@ -141,23 +135,7 @@ def _to_greg_from_str_jalali(s: str):
     ورودی: 'YYYY/MM/DD' یا 'YYYY-MM-DD' (جلالی یا میلادی).
     خروجی: datetime.date گریگوریان. سال >=1700 میلادی فرض می‌شود.
     """
-    if not s:
-        return None
-    # حذف ZWNJ/RTL/… و یکدست‌سازی ارقام و جداکننده
-    t = str(s)
-    t = re.sub(r"[\u200e\u200f\u200c\u202a-\u202e]", "", t)
-    t = _to_en_digits(t).strip().replace("-", "/")
-    try:
-        y, m, d = [int(x) for x in t.split("/")[:3]]
-    except Exception:
-        return None
-    try:
-        if y >= 1700:
-            return _date(y, m, d)
-        # جلالی → گریگوریان (date، نه datetime)
-        return jdatetime.date(y, m, d).togregorian()
-    except Exception:
-        return None
+    return normalize.parse_date(s)
 
 
 def _parse_jalali_str(s):
@@ -165,7 +143,7 @@ def _parse_jalali_str(s):
         return None
     if isinstance(s, (_date, _datetime)):
         g = s.date() if isinstance(s, _datetime) else s
-        return jdatetime.date.fromgregorian(date=g)
+        return jalali.to_jalali(g)
     t = _to_en_digits(str(s)).strip().strip('"').strip("'").replace("-", "/")
     parts = t.split("/")[:3]
     try:
@@ -175,7 +153,7 @@ def _parse_jalali_str(s):
     try:
         if y >= 1700:  # Gregorian
             g = _date(y, m, d)
-            return jdatetime.date.fromgregorian(date=g)
+            return jalali.to_jalali(g)
         return jdatetime.date(y, m, d)
     except Exception:
         return None
@@ -211,11 +189,8 @@ def _norm_gender(v):
     t = str(v).strip().lower().replace("ي", "ی").replace("ك", "ک").replace("‌", "").replace("-", "")
     return _GENDER_MAP.get(t, t)
 
-_DIGIT_MAP = {ord(p): str(i) for i, p in enumerate("۰۱۲۳۴۵۶۷۸۹")}
-_DIGIT_MAP.update({ord(a): str(i) for i, a in enumerate("٠١٢٣٤٥٦٧٨٩")})
-
 def _to_en_digits(s):
-    return str(s).translate(_DIGIT_MAP) if s is not None else s
+    return normalize.digits(s) if s is not None else s
 
 BELT_BASE = {
     "white": "white", "سفید": "white",
@@ -991,6 +966,9 @@ class DashboardKyorugiCompetitionSerializer(serializers.ModelSerializer):
     belt_level_display = serializers.CharField(source="get_belt_level_display", read_only=True)
     style_display      = serializers.CharField(read_only=True)
 
+    # پوستر کارت: نسخهٔ کوچک به جای فایل اصلی
+    poster = serializers.SerializerMethodField()
+
     # تاریخ‌های شمسی
     registration_start_jalali = serializers.SerializerMethodField()
     registration_end_jalali   = serializers.SerializerMethodField()
@@ -1035,6 +1013,9 @@ class DashboardKyorugiCompetitionSerializer(serializers.ModelSerializer):
             "can_register", "status",
         ]
 
+    def get_poster(self, obj):
+        return variant_url(obj.poster, "list", self.context.get("request"))
+
     # --- جلالی‌ها ---
     def get_registration_start_jalali(self, obj):
         return _to_jalali_date_str(obj.registration_start)
@@ -1161,6 +1142,8 @@ class EnrollmentCardSerializer(serializers.ModelSerializer):
                 if v and (not hasattr(v, "name") or getattr(v, "name", "")):
                     cand = v
                     break
+        if hasattr(cand, "storage"):
+            return variant_url(cand, "card", request)
         return _abs_media(request, cand)
 
     def _pick_wc(self, obj):
@@ -1169,7 +1152,9 @@ class EnrollmentCardSerializer(serializers.ModelSerializer):
         declared = getattr(obj, "declared_weight", None)
         if not declared:
             return None
-        for wc in _collect_comp_weights(obj.competition):
+        lookups = self.context.get("card_lookups")  # card_service: یک بار برای هر مسابقه
+        weights = lookups.comp_weights(obj.competition) if lookups else _collect_comp_weights(obj.competition)
+        for wc in weights:
             if _gender_ok_for_wc(obj.competition, getattr(wc, "gender", None)) and _wc_includes(wc, declared):
                 return wc
         return None
@@ -1187,6 +1172,9 @@ class EnrollmentCardSerializer(serializers.ModelSerializer):
         if getattr(obj, "belt_group", None):
             return getattr(obj.belt_group, "label", None)
         code = _norm_belt(getattr(obj.player, "belt_grade", None))
+        lookups = self.context.get("card_lookups")
+        if lookups:
+            return lookups.belt_group_label(obj.competition, code)
         return _find_belt_group_label(obj.competition, code)
 
     def get_insurance_issue_date_jalali(self, obj):
@@ -1295,11 +1283,7 @@ def _to_jalali_str(d):
         return None
     if isinstance(d, _datetime):
         d = d.date()
-    try:
-        jd = jdatetime.date.fromgregorian(date=d)
-        return jd.strftime("%Y/%m/%d")
-    except Exception:
-        return None
+    return jalali.format_date(d)
 
 def _abs_url(request, url_or_field):
     if not url_or_field:
@@ -1460,11 +1444,11 @@ class SeminarCardSerializer(serializers.ModelSerializer):
     def get_poster_url(self, obj: Seminar):
         if not obj.poster:
             return None
-        try:
-            url = obj.poster.url
-        except Exception:
-            url = default_storage.url(obj.poster.name)
         request = self.context.get("request")
+        url = variant_url(obj.poster, "list", request)
+        if url:
+            return url
+        url = default_storage.url(obj.poster.name)
         return request.build_absolute_uri(url) if request else url
 
     def get_registration_open(self, obj: Seminar):
@@ -1551,7 +1535,10 @@ class DashboardAnyCompetitionSerializer(serializers.Serializer):
             return None
 
     def get_poster(self, obj):
-        return self._abs_url(getattr(obj, "poster", None))
+        poster = getattr(obj, "poster", None)
+        if hasattr(poster, "storage"):
+            return variant_url(poster, "list", self.context.get("request"))
+        return self._abs_url(poster)
 
     def get_registration_start_jalali(self, obj):
         return _to_jalali_date_str_safe(getattr(obj, "registration_start", None))
@@ -2228,6 +2215,9 @@ class PoomsaeEnrollmentCardSerializer(serializers.ModelSerializer):
         return "poomsae"
 
     def get_poomsae_types(self, obj):
+        lookups = self.context.get("card_lookups")
+        if lookups:
+            return list(lookups.poomsae_types(obj))
         return list(
             PoomsaeEnrollment.objects
             .filter(competition=obj.competition, player=obj.player)
@@ -2237,10 +2227,14 @@ class PoomsaeEnrollmentCardSerializer(serializers.ModelSerializer):
         )
 
     def get_poomsae_type_display(self, obj):
-        qs = (PoomsaeEnrollment.objects
-              .filter(competition=obj.competition, player=obj.player)
-              .exclude(status="canceled"))
-        types = list(qs.values_list("poomsae_type", flat=True).distinct())
+        lookups = self.context.get("card_lookups")
+        if lookups:
+            types = list(lookups.poomsae_types(obj))
+        else:
+            qs = (PoomsaeEnrollment.objects
+                  .filter(competition=obj.competition, player=obj.player)
+                  .exclude(status="canceled"))
+            types = list(qs.values_list("poomsae_type", flat=True).distinct())
         order = {"standard": 0, "creative": 1}
         types.sort(key=lambda x: order.get(x, 99))
         mapping = dict(PoomsaeEnrollment.POOMSAE_TYPE_CHOICES)
@@ -2278,6 +2272,8 @@ class PoomsaeEnrollmentCardSerializer(serializers.ModelSerializer):
                 if v and (not hasattr(v, "name") or getattr(v, "name", "")):
                     cand = v
                     break
+        if hasattr(cand, "storage"):
+            return variant_url(cand, "card", request)
         return _abs_media(request, cand)
 
     def get_insurance_issue_date_jalali(self, obj):
@@ -2320,6 +2316,9 @@ class PoomsaeEnrollmentCardSerializer(serializers.ModelSerializer):
             return None
 
         comp = obj.competition
+        lookups = self.context.get("card_lookups")
+        if lookups:
+            return lookups.age_category_name(comp, g)
         try:
             if getattr(comp, "age_categories", None) and comp.age_categories.exists():
                 m = AgeCategory.objects.filter(
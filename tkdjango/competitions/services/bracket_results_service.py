@@ -0,0 +1,204 @@
+# competitions/services/bracket_results_service.py
+# -*- coding: utf-8 -*-
+"""
+استخراج خودکار KyorugiResult از جدول‌های تمام‌شده:
+  طلا = برندهٔ فینال، نقره = بازندهٔ فینال، دو برنز = بازنده‌های نیمه‌نهایی.
+همهٔ اوزان یک مسابقه با چند کوئری ثابت خوانده می‌شوند و نتیجه + امتیازها در یک تراکنش اعمال می‌شود.
+"""
+from __future__ import annotations
+
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+from django.db import transaction
+from django.utils import timezone
+
+from competitions.models import Draw, Enrollment, KyorugiCompetition, KyorugiResult, Match
+from competitions.services.results_service import apply_competition_results
+
+ELIGIBLE_STATUSES = ("paid", "confirmed", "accepted", "completed")
+PODIUM_FIELDS = ("gold_enrollment_id", "silver_enrollment_id", "bronze1_enrollment_id", "bronze2_enrollment_id")
+
+
+def _rounds_total(draw: Draw, by_round: Dict[int, List[Match]]) -> int:
+    size = int(getattr(draw, "size", 0) or 0)
+    if size <= 0:
+        size = max(2, len(by_round.get(1, [])) * 2)
+    n, s = 0, 1
+    while s < size:
+        n += 1
+        s <<= 1
+    return max(n, max(by_round) if by_round else 0)
+
+
+class _Bracket:
+    """شرکت‌کننده‌ها و برندهٔ مؤثر هر مسابقه (با در نظر گرفتن BYE و راندهای بدون بازیکن ثبت‌شده)."""
+
+    def __init__(self, draw: Draw, matches: List[Match]):
+        self.draw = draw
+        self.by_round: Dict[int, List[Match]] = defaultdict(list)
+        for m in matches:
+            self.by_round[m.round_no].append(m)
+        for r in self.by_round.values():
+            r.sort(key=lambda m: (m.slot_a, m.id))
+        self.total = _rounds_total(draw, self.by_round)
+        self._memo: Dict[Tuple[int, int], Tuple[Optional[int], Optional[int]]] = {}
+
+    def match(self, r: int, i: int) -> Optional[Match]:
+        ms = self.by_round.get(r, [])
+        return ms[i] if i < len(ms) else None
+
+    def participants(self, r: int, i: int) -> Tuple[Optional[int], Optional[int]]:
+        key = (r, i)
+        if key in self._memo:
+            return self._memo[key]
+        m = self.match(r, i)
+        a = getattr(m, "player_a_id", None)
+        b = getattr(m, "player_b_id", None)
+        if r > 1 and not (a and b):
+            a = a or self.winner(r - 1, 2 * i)
+            b = b or self.winner(r - 1, 2 * i + 1)
+        self._memo[key] = (a, b)
+        return a, b
+
+    def winner(self, r: int, i: int) -> Optional[int]:
+        m = self.match(r, i)
+        a, b = self.participants(r, i)
+        if m is not None and m.winner_id:
+            return m.winner_id
+        # BYE: تنها بازیکن واقعی خودبه‌خود بالا می‌رود
+        if bool(a) != bool(b):
+            return a or b
+        return None
+
+    @staticmethod
+    def loser(pair: Tuple[Optional[int], Optional[int]], winner: Optional[int]) -> Optional[int]:
+        a, b = pair
+        if not winner:
+            return None
+        if winner == a:
+            return b
+        if winner == b:
+            return a
+        return None
+
+
+def _podium_for_draw(br: _Bracket, problems: List[str], label: str) -> Optional[List[Optional[int]]]:
+    """خروجی: [gold, silver, bronze1, bronze2] به صورت player_id (یا None)."""
+    R = br.total
+    if R <= 0 or not br.by_round:
+        problems.append(f"{label}: جدول بدون مسابقه است.")
+        return None
+
+    final_pair = br.participants(R, 0)
+    gold = br.winner(R, 0)
+    if not gold:
+        problems.append(f"{label}: برندهٔ فینال ثبت نشده است.")
+        return None
+    if gold not in final_pair:
+        problems.append(f"{label}: برندهٔ فینال جزو بازیکنان فینال نیست.")
+        return None
+    silver = br.loser(final_pair, gold)
+
+    bronzes: List[Optional[int]] = []
+    if R >= 2:
+        for i in (0, 1):
+            pair = br.participants(R - 1, i)
+            w = br.winner(R - 1, i)
+            if pair[0] and pair[1] and not w:
+                problems.append(f"{label}: برندهٔ نیمه‌نهایی {i + 1} ثبت نشده است.")
+            elif w and w not in final_pair:
+                problems.append(f"{label}: برندهٔ نیمه‌نهایی {i + 1} در فینال حضور ندارد.")
+            bronzes.append(br.loser(pair, w))
+    while len(bronzes) < 2:
+        bronzes.append(None)
+    return [gold, silver, bronzes[0], bronzes[1]]
+
+
+@transaction.atomic
+def derive_results_for_competition(competition: KyorugiCompetition, *, apply_points: bool = True,
+                                   dry_run: bool = False) -> dict:
+    """
+    برای همهٔ Drawهای مسابقه نتیجه می‌سازد/به‌روز می‌کند و (اختیاری) امتیازها را اعمال می‌کند.
+    خروجی: {"created", "updated", "unchanged", "problems": [...], "points": {...}}
+    """
+    problems: List[str] = []
+
+    draws = list(
+        Draw.objects.filter(competition=competition)
+        .select_related("weight_category", "belt_group")
+        .order_by("weight_category__gender", "weight_category__min_weight", "id")
+    )
+    matches_by_draw: Dict[int, List[Match]] = defaultdict(list)
+    for m in Match.objects.filter(draw__competition=competition).only(
+        "id", "draw_id", "round_no", "slot_a", "slot_b", "player_a_id", "player_b_id", "winner_id", "is_bye"
+    ):
+        matches_by_draw[m.draw_id].append(m)
+
+    # KyorugiResult یکتا روی (مسابقه، وزن) است؛ چند قرعه برای یک وزن قابل ادغام نیست
+    draws_by_weight: Dict[int, List[Draw]] = defaultdict(list)
+    for d in draws:
+        draws_by_weight[d.weight_category_id].append(d)
+
+    enrollment_of: Dict[Tuple[int, int], int] = {}
+    for e in (Enrollment.objects
+              .filter(competition=competition, status__in=ELIGIBLE_STATUSES)
+              .values("id", "player_id", "weight_category_id")
+              .order_by("id")):
+        enrollment_of.setdefault((e["player_id"], e["weight_category_id"]), e["id"])
+
+    podiums: Dict[int, List[Optional[int]]] = {}
+    for weight_id, ds in draws_by_weight.items():
+        label = str(ds[0].weight_category)
+        if len(ds) > 1:
+            problems.append(f"{label}: {len(ds)} قرعه برای یک وزن وجود دارد؛ نتیجه دستی ثبت شود.")
+            continue
+        players = _podium_for_draw(_Bracket(ds[0], matches_by_draw.get(ds[0].id, [])), problems, label)
+        if players is None:
+            continue
+        podium = []
+        for pid in players:
+            if not pid:
+                podium.append(None)
+                continue
+            eid = enrollment_of.get((pid, weight_id))
+            if eid is None:
+                problems.append(f"{label}: برای بازیکن #{pid} ثبت‌نام معتبر در این وزن پیدا نشد.")
+            podium.append(eid)
+        podiums[weight_id] = podium
+
+    existing = {r.weight_category_id: r for r in KyorugiResult.objects.filter(competition=competition)}
+    to_create, to_update, unchanged = [], [], 0
+    for weight_id, podium in podiums.items():
+        r = existing.get(weight_id)
+        if r is None:
+            to_create.append(KyorugiResult(
+                competition=competition, weight_category_id=weight_id,
+                **dict(zip(PODIUM_FIELDS, podium)),
+            ))
+            continue
+        if [getattr(r, f) for f in PODIUM_FIELDS] == podium:
+            unchanged += 1
+            continue
+        for f, v in zip(PODIUM_FIELDS, podium):
+            setattr(r, f, v)
+        to_update.append(r)
+
+    report = {
+        "created": len(to_create),
+        "updated": len(to_update),
+        "unchanged": unchanged,
+        "problems": problems,
+        "points": None,
+    }
+    if dry_run:
+        return report
+
+    KyorugiResult.objects.bulk_create(to_create)
+    now = timezone.now()
+    for r in to_update:
+        r.updated_at = now
+    KyorugiResult.objects.bulk_update(to_update, list(PODIUM_FIELDS) + ["updated_at"])
+    if apply_points:
+        report["points"] = apply_competition_results(competition)
+    return report
@@ -0,0 +1,437 @@
+# competitions/services/card_service.py
+# -*- coding: utf-8 -*-
+"""
+ساخت گروهی کارت‌های شناسایی (کیوروگی + پومسه):
+  - همهٔ ثبت‌نام‌ها با select_related/prefetch در چند کوئری ثابت خوانده می‌شوند
+  - اوزان/گروه‌های کمربندی/رده‌های سنی هر مسابقه فقط یک بار محاسبه می‌شوند (CardLookups)
+  - خروجی JSON همان سریالایزرهای کارت است؛ در صورت نیاز PDF چاپی (چند کارت در هر صفحهٔ A4)
+  - payload هر کارت با کلید card:v1:<نسخه>:<k|p>:<id> کش می‌شود و با سیگنال‌ها (competitions/signals.py) پاک می‌شود؛
+    تغییر داده‌های پایهٔ مشترک (رده وزنی/سنی، گروه کمربندی) با bump_version همهٔ کارت‌ها را یک‌جا باطل می‌کند
+"""
+from __future__ import annotations
+
+import logging
+import os
+import re
+import time
+from collections import defaultdict
+from io import BytesIO
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+
+from accounts.models import UserProfile
+from main.caching import is_shared
+from competitions.models import AgeCategory, Enrollment, PoomsaeEnrollment
+from competitions.serializers import (EnrollmentCardSerializer, PoomsaeEnrollmentCardSerializer,
+                                      _can_show_card, _norm_belt)
+
+logger = logging.getLogger(__name__)
+
+
+class CardLookups:
+    """کش داده‌های هر مسابقه در طول یک درخواست؛ سریالایزرهای کارت از context['card_lookups'] می‌خوانند."""
+
+    def __init__(self):
+        self._weights: Dict[int, list] = {}
+        self._belt_labels: Dict[Tuple[str, int], Dict[str, Optional[str]]] = {}
+        self._ages: Dict[int, list] = {}
+        self._all_ages: Optional[list] = None
+        self._poomsae_types: Dict[Tuple[int, int], List[str]] = {}
+
+    # ---------- کیوروگی ----------
+    def comp_weights(self, comp) -> list:
+        if comp.pk not in self._weights:
+            ws = {}
+            for ma in comp.mat_assignments.all():   # از prefetch
+                for w in ma.weights.all():
+                    ws[w.pk] = w
+            self._weights[comp.pk] = list(ws.values())
+        return self._weights[comp.pk]
+
+    def belt_group_label(self, comp, code) -> Optional[str]:
+        key = (comp._meta.label, comp.pk)
+        if key not in self._belt_labels:
+            labels: Dict[str, Optional[str]] = {}
+            for g in comp.belt_groups.all():        # از prefetch
+                label = getattr(g, "label", None) or getattr(g, "name", None)
+                for b in g.belts.all():
+                    c = _norm_belt(getattr(b, "name", "") or getattr(b, "label", ""))
+                    if c:
+                        labels.setdefault(c, label)  # اولین گروه برنده است (مثل _find_belt_group_label)
+            self._belt_labels[key] = labels
+        return self._belt_labels[key].get(code)
+
+    # ---------- پومسه ----------
+    def prime_poomsae_types(self, enrollments: Iterable[PoomsaeEnrollment]):
+        comp_ids = {e.competition_id for e in enrollments}
+        player_ids = {e.player_id for e in enrollments}
+        if not comp_ids:
+            return
+        rows = (PoomsaeEnrollment.objects
+                .filter(competition_id__in=comp_ids, player_id__in=player_ids)
+                .exclude(status="canceled")
+                .values_list("competition_id", "player_id", "poomsae_type")
+                .distinct())
+        found = defaultdict(list)
+        for cid, pid, t in rows:
+            if t not in found[(cid, pid)]:
+                found[(cid, pid)].append(t)
+        for e in enrollments:
+            self._poomsae_types[(e.competition_id, e.player_id)] = found.get((e.competition_id, e.player_id), [])
+
+    def poomsae_types(self, enr) -> List[str]:
+        key = (enr.competition_id, enr.player_id)
+        if key not in self._poomsae_types:
+            self.prime_poomsae_types([enr])
+        return self._poomsae_types[key]
+
+    def age_category_name(self, comp, g) -> Optional[str]:
+        if comp.pk not in self._ages:
+            self._ages[comp.pk] = list(comp.age_categories.all()) if hasattr(comp, "age_categories") else []
+        for m in self._ages[comp.pk]:
+            if m.from_date and m.to_date and m.from_date <= g <= m.to_date:
+                return m.name
+        if self._all_ages is None:
+            self._all_ages = list(AgeCategory.objects.all())
+        for m in self._all_ages:
+            if m.from_date and m.to_date and m.from_date <= g <= m.to_date:
+                return m.name
+        return None
+
+
+# -------------------------------------------------------------------
+# شناسهٔ کارت: k-<id> برای کیوروگی، p-<id> برای پومسه (عدد خالی = رفتار قدیمی، هر دو جدول)
+# -------------------------------------------------------------------
+KIND_PREFIX = {"kyorugi": "k", "poomsae": "p"}
+PREFIX_KIND = {v: k for k, v in KIND_PREFIX.items()}
+MODELS = {"kyorugi": Enrollment, "poomsae": PoomsaeEnrollment}
+CACHE_PREFIX = "card:v1:"
+VERSION_KEY = f"{CACHE_PREFIX}version"
+MISSING_TTL = 5 * 60
+LOCAL_CARD_TTL = 5 * 60   # کش غیرمشترک: باطل‌سازی به worker های دیگر نمی‌رسد، پس کارت کهنه کوتاه بماند
+
+
+def _ttl() -> int:
+    ttl = int(getattr(settings, "CARD_CACHE_TTL", 6 * 60 * 60))
+    return ttl if is_shared() else min(ttl, LOCAL_CARD_TTL)
+
+
+def card_id(kind: str, pk: int) -> str:
+    return f"{KIND_PREFIX[kind]}-{int(pk)}"
+
+
+def parse_card_id(raw) -> Tuple[Optional[str], int]:
+    """'k-12' → ('kyorugi', 12)؛ '12' → (None, 12)؛ نامعتبر → ValueError."""
+    t = str(raw or "").strip().lower()
+    if t.isdigit():
+        return None, int(t)
+    prefix, _, num = t.partition("-")
+    if prefix in PREFIX_KIND and num.isdigit():
+        return PREFIX_KIND[prefix], int(num)
+    raise ValueError(f"invalid card id: {raw}")
+
+
+def current_version() -> int:
+    # اگر کلید نسخه از کش بیرون رفته باشد، مقدار تازه بر اساس زمان از همهٔ نسخه‌های قبلی بزرگ‌تر است
+    cache.add(VERSION_KEY, int(time.time() * 1000), None)
+    return cache.get(VERSION_KEY) or 0
+
+
+def bump_version():
+    """همهٔ کارت‌های کش‌شده را باطل می‌کند (کلیدهای نسخهٔ قبل با TTL خودشان حذف می‌شوند)."""
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        current_version()
+
+
+def cache_key(kind: str, pk: int, version: Optional[int] = None) -> str:
+    version = current_version() if version is None else version
+    return f"{CACHE_PREFIX}{version}:{KIND_PREFIX[kind]}:{int(pk)}"
+
+
+def invalidate(kind: str, pks: Iterable[int]):
+    version = current_version()
+    keys = [cache_key(kind, pk, version) for pk in pks]
+    if keys:
+        cache.delete_many(keys)
+
+
+def load_enrollments(kyo_ids: Iterable[int], poo_ids: Iterable[int]):
+    """(kyorugi{id: e}, poomsae{id: e}) با همهٔ روابط لازم برای کارت."""
+    kyo_ids, poo_ids = list(kyo_ids), list(poo_ids)
+    kyo = {e.id: e for e in (
+        Enrollment.objects.filter(id__in=kyo_ids)
+        .select_related("player", "competition", "weight_category", "belt_group")
+        .prefetch_related(
+            "competition__mat_assignments__weights",
+            "competition__belt_groups__belts",
+        )
+    )} if kyo_ids else {}
+    poo = {e.id: e for e in (
+        PoomsaeEnrollment.objects.filter(id__in=poo_ids)
+        .select_related("player", "competition", "belt_group", "age_category")
+        .prefetch_related("competition__age_categories")
+    )} if poo_ids else {}
+    return kyo, poo
+
+
+def _record(kind: str, e, lookups: CardLookups) -> dict:
+    """payload قابل کش: دادهٔ کارت (آدرس‌های نسبی) + فیلدهای لازم برای مجوز."""
+    ser = EnrollmentCardSerializer if kind == "kyorugi" else PoomsaeEnrollmentCardSerializer
+    data = dict(ser(e, context={"card_lookups": lookups}).data)
+    data["kind"] = kind
+    data["enrollment_id"] = e.id
+    data["card_id"] = card_id(kind, e.id)
+    photo = getattr(e.player, "profile_image", None)
+    return {
+        "data": data,
+        "player_user_id": getattr(e.player, "user_id", None),
+        "coach_id": e.coach_id,
+        "club_id": e.club_id,
+        "board_id": e.board_id,
+        "ready": _can_show_card(getattr(e, "status", ""), getattr(e, "is_paid", False)),
+        "photo_name": getattr(photo, "name", "") or "",
+    }
+
+
+def get_records(pairs: Iterable[Tuple[str, int]]) -> Dict[Tuple[str, int], Optional[dict]]:
+    """
+    {(kind, pk): record یا None}؛ ابتدا از کش، بقیه با یک کوئری برای هر جدول (و ذخیره در کش).
+    """
+    wanted = {(k, int(pk)) for k, pk in pairs}
+    version = current_version()
+    keys = {cache_key(k, pk, version): (k, pk) for k, pk in wanted}
+    found = cache.get_many(list(keys))
+    out = {keys[key]: (None if rec.get("missing") else rec) for key, rec in found.items()}
+
+    missing = wanted - set(out)
+    if missing:
+        kyo, poo = load_enrollments(
+            [pk for k, pk in missing if k == "kyorugi"],
+            [pk for k, pk in missing if k == "poomsae"],
+        )
+        lookups = CardLookups()
+        lookups.prime_poomsae_types(poo.values())
+        to_cache, to_cache_missing = {}, {}
+        for k, pk in missing:
+            e = (kyo if k == "kyorugi" else poo).get(pk)
+            if e is None:
+                out[(k, pk)] = None
+                to_cache_missing[cache_key(k, pk, version)] = {"missing": True}
+                continue
+            rec = _record(k, e, lookups)
+            out[(k, pk)] = rec
+            to_cache[cache_key(k, pk, version)] = rec
+        if to_cache:
+            cache.set_many(to_cache, _ttl())
+        if to_cache_missing:
+            cache.set_many(to_cache_missing, MISSING_TTL)
+    return out
+
+
+def public_data(rec: dict, request=None) -> dict:
+    data = dict(rec["data"])
+    photo = data.get("photo")
+    if request is not None and photo and not str(photo).startswith("http"):
+        data["photo"] = request.build_absolute_uri(photo)
+    return data
+
+
+def _allowed(rec, actor, user_id) -> bool:
+    prof = actor.profile if actor.profile_id else None
+    is_coach = bool(prof and (str(getattr(prof, "role", "")).lower() in {"coach", "both"}
+                              or getattr(prof, "is_coach", False)))
+    return (
+        rec["player_user_id"] == user_id
+        or (is_coach and rec["coach_id"] == actor.profile_id)
+        or bool(actor.club_id and rec["club_id"] == actor.club_id)
+        or bool(actor.board_id and rec["board_id"] == actor.board_id)
+    )
+
+
+def _candidates(kind: Optional[str], pk: int) -> List[Tuple[str, int]]:
+    return [(kind, pk)] if kind else [("kyorugi", pk), ("poomsae", pk)]
+
+
+def resolve_own_card(raw_id, user_id):
+    """
+    کارت تکی (فقط خودِ بازیکن). خروجی: (record, error) با error در {None, "not_found", "forbidden"}.
+    """
+    kind, pk = parse_card_id(raw_id)
+    cands = _candidates(kind, pk)
+    recs = get_records(cands)
+    existing = [recs[c] for c in cands if recs.get(c)]
+    if not existing:
+        return None, "not_found"
+    for rec in existing:
+        if rec["player_user_id"] == user_id:
+            return rec, None
+    return None, "forbidden"
+
+
+def _resolve_bulk(ids, actor, user_id) -> List[Tuple[object, Optional[dict], Optional[str]]]:
+    parsed = []
+    for raw in ids:
+        try:
+            parsed.append((raw, parse_card_id(raw)))
+        except ValueError:
+            continue
+    recs = get_records(c for _raw, (k, pk) in parsed for c in _candidates(k, pk))
+
+    out = []
+    for raw, (kind, pk) in parsed:
+        if kind:
+            rec = recs.get((kind, pk))
+        else:  # رفتار قدیمی: اگر هر دو بود، پومسه
+            rec = recs.get(("poomsae", pk)) or recs.get(("kyorugi", pk))
+        if rec is None:
+            continue
+        if not _allowed(rec, actor, user_id):
+            out.append((raw, rec, "forbidden"))
+        elif not rec["ready"]:
+            out.append((raw, rec, "not_ready"))
+        else:
+            out.append((raw, rec, None))
+    return out
+
+
+def build_cards(ids: List, *, actor, user_id, request=None) -> List[dict]:
+    """
+    کارت‌ها به ترتیب ids (عدد یا k-/p-)؛ برای موارد غیرمجاز/ناآماده {"enrollment_id", "error"}.
+    """
+    out = []
+    for _raw, rec, err in _resolve_bulk(ids, actor, user_id):
+        if err:
+            out.append({"enrollment_id": rec["data"]["enrollment_id"], "card_id": rec["data"]["card_id"], "error": err})
+        else:
+            out.append(public_data(rec, request))
+    return out
+
+
+def build_cards_pdf(ids: List, *, actor, user_id, request=None) -> Tuple[bytes, int]:
+    """(PDF، تعداد کارت چاپ‌شده)؛ موارد غیرمجاز/ناآماده چاپ نمی‌شوند."""
+    cards, photos = [], {}
+    for _raw, rec, err in _resolve_bulk(ids, actor, user_id):
+        if err:
+            continue
+        cards.append(rec["data"])
+        photos[rec["data"]["card_id"]] = rec["photo_name"]
+    return render_cards_pdf(cards, photos), len(cards)
+
+
+# -------------------------------------------------------------------
+# PDF چاپی: A4 عمودی، ۲×۴ کارت در هر صفحه (Pillow؛ بدون وابستگی جدید)
+# -------------------------------------------------------------------
+DPI = 150
+PAGE = (1240, 1754)          # A4 در 150dpi
+COLS, ROWS = 2, 4
+MARGIN = 50
+GAP = 24
+FONT_FILES = ("IRANSansWeb_Medium.ttf", "IRANSansWeb.ttf")
+_DIGITS_RUN = re.compile(r"[0-9۰-۹/.\-]+")
+
+
+def _font(size):
+    from PIL import ImageFont, features
+    engine = ImageFont.Layout.RAQM if features.check("raqm") else ImageFont.Layout.BASIC
+    for d in list(getattr(settings, "STATICFILES_DIRS", [])) + [os.path.join(settings.BASE_DIR, "static")]:
+        for name in FONT_FILES:
+            path = os.path.join(str(d), "fonts", name)
+            if os.path.exists(path):
+                return ImageFont.truetype(path, size, layout_engine=engine), engine == ImageFont.Layout.RAQM
+    return ImageFont.load_default(), False
+
+
+def _visual(text: str, shaped: bool) -> str:
+    """بدون raqm: ترتیب نمایشی راست‌به‌چپ تقریبی (اعداد برعکس نمی‌شوند)."""
+    text = str(text or "")
+    if shaped:
+        return text
+    rev = text[::-1]
+    return _DIGITS_RUN.sub(lambda m: m.group(0)[::-1], rev)
+
+
+def _photo(name, size):
+    from PIL import Image, ImageOps
+    if not name:
+        return None
+    storage = UserProfile._meta.get_field("profile_image").storage
+    try:
+        with storage.open(name, "rb") as fh:
+            img = ImageOps.exif_transpose(Image.open(fh)).convert("RGB")
+            return ImageOps.fit(img, size)
+    except Exception as e:
+        logger.warning("card photo %s: %s", name, e)
+        return None
+
+
+def _card_lines(c) -> List[Tuple[str, str]]:
+    rows = [
+        ("نام", f"{c.get('first_name') or ''} {c.get('last_name') or ''}".strip()),
+        ("تاریخ تولد", c.get("birth_date")),
+        ("کمربند", c.get("belt")),
+        ("گروه کمربندی", c.get("belt_group")),
+    ]
+    if c.get("kind") == "poomsae":
+        rows += [("پومسه", c.get("poomsae_type_display")), ("رده سنی", c.get("age_category_name"))]
+    else:
+        rows += [("وزن", c.get("weight_name"))]
+    rows += [
+        ("باشگاه", c.get("club_name")),
+        ("مربی", c.get("coach_name")),
+        ("بیمه", c.get("insurance_number")),
+    ]
+    return [(k, str(v)) for k, v in rows if v]
+
+
+def render_cards_pdf(cards: List[dict], photos: Optional[dict] = None) -> bytes:
+    """photos: {card_id: نام فایل عکس پروفایل}؛ عکس اصلی برای کیفیت چاپ."""
+    from PIL import Image, ImageDraw
+
+    photos = photos or {}
+    cw = (PAGE[0] - 2 * MARGIN - (COLS - 1) * GAP) // COLS
+    ch = (PAGE[1] - 2 * MARGIN - (ROWS - 1) * GAP) // ROWS
+    title_font, shaped = _font(30)
+    body_font, _ = _font(24)
+    photo_size = (int(ch * 0.6 * 3 / 4), int(ch * 0.6))
+    per_page = COLS * ROWS
+    direction = {"direction": "rtl"} if shaped else {}
+
+    pages = []
+    for start in range(0, max(len(cards), 1), per_page):
+        page = Image.new("RGB", PAGE, "white")
+        draw = ImageDraw.Draw(page)
+        for i, c in enumerate(cards[start:start + per_page]):
+            col = COLS - 1 - (i % COLS)               # راست‌به‌چپ
+            row = i // COLS
+            x0 = MARGIN + col * (cw + GAP)
+            y0 = MARGIN + row * (ch + GAP)
+            draw.rectangle([x0, y0, x0 + cw, y0 + ch], outline="black", width=2)
+
+            title = c.get("competition_title") or ""
+            draw.text((x0 + cw - 16, y0 + 14), _visual(title, shaped), fill="black",
+                      font=title_font, anchor="ra", **direction)
+            y_body = y0 + 64
+            draw.line([x0 + 10, y_body - 8, x0 + cw - 10, y_body - 8], fill="black", width=1)
+
+            ph = _photo(photos.get(c.get("card_id")), photo_size)
+            if ph is not None:
+                page.paste(ph, (x0 + 16, y_body))
+            else:
+                draw.rectangle([x0 + 16, y_body, x0 + 16 + photo_size[0], y_body + photo_size[1]], outline="gray")
+
+            line_h = 34
+            for j, (k, v) in enumerate(_card_lines(c)):
+                y = y_body + j * line_h
+                if y + line_h > y0 + ch - 8:
+                    break
+                draw.text((x0 + cw - 16, y), _visual(f"{k}: {v}", shaped), fill="black",
+                          font=body_font, anchor="ra", **direction)
+        pages.append(page)
+
+    out = BytesIO()
+    pages[0].save(out, "PDF", resolution=DPI, save_all=True, append_images=pages[1:])
+    return out.getvalue()
@@ -0,0 +1,115 @@
+# competitions/services/competition_key_service.py
+# -*- coding: utf-8 -*-
+"""
+تبدیل کلید مسابقه در URL (id / public_id / slug) به (kind, pk):
+  - کیوروگی و پومسه با یک کوئری UNION روی ایندکس‌های یکتا (تطبیق دقیق، نه iexact)
+  - نتیجه در یک LRU داخل پروسه نگه داشته می‌شود؛ با ذخیره/حذف مسابقه پاک می‌شود (competitions/signals.py)
+اولویت مثل قبل: id کیوروگی، public_id کیوروگی، id پومسه، public_id پومسه و در آخر slug (فقط مدل‌هایی که دارند).
+"""
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from typing import Iterable, Optional, Tuple
+
+from django.conf import settings
+from django.db.models import Case, CharField, IntegerField, Q, Value, When
+
+from competitions.models import KyorugiCompetition, PoomsaeCompetition
+
+MODELS = {"kyorugi": KyorugiCompetition, "poomsae": PoomsaeCompetition}
+ALL_KINDS = ("kyorugi", "poomsae")
+
+# kind → (رتبهٔ id، رتبهٔ public_id، رتبهٔ slug)
+RANKS = {"kyorugi": (0, 1, 5), "poomsae": (2, 3, 4)}
+
+
+def _has_slug(Model) -> bool:
+    return any(f.name == "slug" for f in Model._meta.get_fields())
+
+_lru: "OrderedDict[Tuple[Tuple[str, ...], str], Tuple[str, int]]" = OrderedDict()
+_lock = threading.Lock()
+
+
+def _max_size() -> int:
+    return int(getattr(settings, "COMPETITION_KEY_CACHE_SIZE", 2048))
+
+
+def _norm(key) -> str:
+    return str(key if key is not None else "").strip()
+
+
+def _ranked(kind: str, s: str):
+    Model = MODELS[kind]
+    r_id, r_pub, r_slug = RANKS[kind]
+    variants = list({s, s.lower()})
+    cond = Q(public_id__in=variants)
+    if _has_slug(Model):
+        cond |= Q(slug__in=variants)
+    whens = []
+    if s.isdigit():
+        cond |= Q(pk=int(s))
+        whens.append(When(pk=int(s), then=Value(r_id)))
+    whens.append(When(public_id__in=variants, then=Value(r_pub)))
+    return (Model.objects.filter(cond).order_by()
+            .annotate(kind=Value(kind, output_field=CharField()),
+                      rank=Case(*whens, default=Value(r_slug), output_field=IntegerField()))
+            .values_list("kind", "pk", "rank"))
+
+
+def _lookup(s: str, kinds: Tuple[str, ...]) -> Optional[Tuple[str, int]]:
+    qs = [_ranked(k, s) for k in kinds]
+    q = qs[0].union(*qs[1:], all=True) if len(qs) > 1 else qs[0]
+    row = next(iter(q.order_by("rank")[:1]), None)
+    return (row[0], row[1]) if row else None
+
+
+def resolve(key, kinds: Iterable[str] = ALL_KINDS) -> Optional[Tuple[str, int]]:
+    """(kind, pk) یا None؛ نتیجهٔ منفی کش نمی‌شود تا مسابقهٔ تازه فوراً پیدا شود."""
+    s = _norm(key)
+    if not s:
+        return None
+    kinds = tuple(k for k in ALL_KINDS if k in set(kinds))
+    ck = (kinds, s)
+    with _lock:
+        hit = _lru.get(ck)
+        if hit is not None:
+            _lru.move_to_end(ck)
+            return hit
+    found = _lookup(s, kinds)
+    if found is not None:
+        with _lock:
+            _lru[ck] = found
+            _lru.move_to_end(ck)
+            while len(_lru) > _max_size():
+                _lru.popitem(last=False)
+    return found
+
+
+def get_competition(key, kinds: Iterable[str] = ALL_KINDS, queryset=None):
+    """
+    نمونهٔ مسابقه یا None. queryset (اختیاری) برای select_related/prefetch؛ فقط وقتی یک kind خواسته شده.
+    """
+    kinds = tuple(kinds)
+    for attempt in range(2):
+        found = resolve(key, kinds)
+        if found is None:
+            return None
+        kind, pk = found
+        qs = queryset if queryset is not None else MODELS[kind].objects.all()
+        obj = qs.filter(pk=pk).first()
+        if obj is not None:
+            return obj
+        invalidate(kind, pk)   # در پروسهٔ دیگری حذف/عوض شده؛ یک بار دیگر از DB
+    return None
+
+
+def invalidate(kind: str, pk: int):
+    with _lock:
+        for ck in [ck for ck, v in _lru.items() if v == (kind, pk)]:
+            del _lru[ck]
+
+
+def clear():
+    with _lock:
+        _lru.clear()
@@ -0,0 +1,102 @@
+# competitions/services/feed_service.py
+# -*- coding: utf-8 -*-
+"""
+فید یکپارچهٔ مسابقات (کیوروگی + پومسه) برای داشبورد:
+  - یک UNION ALL از ستون‌های (created_at, kind, id) هر دو جدول، مرتب و صفحه‌بندی‌شده در SQL (keyset)
+  - فقط ردیف‌های همان صفحه با select_related/prefetch (age_categories) بارگذاری و سریالایز می‌شوند
+ترتیب: (-created_at, -kind, -id)؛ cursor = مقادیر همین سه ستون برای آخرین ردیف صفحه.
+all_items: همان ترتیب بدون صفحه‌بندی (قالب قبلی API برای کلاینت‌هایی که cursor/limit نمی‌فرستند)
+"""
+from __future__ import annotations
+
+import base64
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from django.db.models import CharField, F, Q, Value
+
+from competitions.models import KyorugiCompetition, PoomsaeCompetition
+
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+
+
+class FeedError(ValueError):
+    pass
+
+
+def encode_cursor(created_at: datetime, kind: str, pk: int) -> str:
+    raw = f"{created_at.isoformat()}|{kind}|{int(pk)}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, str, int]:
+    try:
+        pad = "=" * (-len(cursor) % 4)
+        ts, kind, pk = base64.urlsafe_b64decode(cursor + pad).decode().split("|")
+        return datetime.fromisoformat(ts), kind, int(pk)
+    except Exception:
+        raise FeedError("cursor نامعتبر است.")
+
+
+def _after(kind: str, cursor: Tuple[datetime, str, int]) -> Q:
+    ts, c_kind, c_pk = cursor
+    q = Q(created_at__lt=ts)
+    if kind < c_kind:
+        q |= Q(created_at=ts)
+    elif kind == c_kind:
+        q |= Q(created_at=ts, pk__lt=c_pk)
+    return q
+
+
+def _project(qs, kind: str, cursor):
+    if cursor is not None:
+        qs = qs.filter(_after(kind, cursor))
+    return (qs.order_by()
+            .annotate(feed_ts=F("created_at"), feed_kind=Value(kind, output_field=CharField()))
+            .values_list("feed_ts", "feed_kind", "pk"))
+
+
+def _load(rows) -> List[object]:
+    ky_ids = [pk for _ts, kind, pk in rows if kind == "kyorugi"]
+    po_ids = [pk for _ts, kind, pk in rows if kind == "poomsae"]
+    objs = {}
+    if ky_ids:
+        for o in KyorugiCompetition.objects.filter(pk__in=ky_ids).select_related("age_category"):
+            objs[("kyorugi", o.pk)] = o
+    if po_ids:
+        for o in (PoomsaeCompetition.objects.filter(pk__in=po_ids)
+                  .select_related("age_category").prefetch_related("age_categories")):
+            objs[("poomsae", o.pk)] = o
+    return [objs[(kind, pk)] for _ts, kind, pk in rows if (kind, pk) in objs]
+
+
+def _ordered(ky_qs, po_qs, after=None):
+    parts = [_project(ky_qs, "kyorugi", after)]
+    if po_qs is not None:
+        parts.append(_project(po_qs, "poomsae", after))
+    q = parts[0].union(*parts[1:], all=True) if len(parts) > 1 else parts[0]
+    return q.order_by("-feed_ts", "-feed_kind", "-pk")
+
+
+def all_items(ky_qs, po_qs=None) -> List[object]:
+    """همهٔ مسابقات به ترتیب فید (بدون صفحه‌بندی)."""
+    return _load(list(_ordered(ky_qs, po_qs)))
+
+
+def page(ky_qs, po_qs=None, cursor: Optional[str] = None, limit=DEFAULT_LIMIT) -> dict:
+    """
+    ky_qs / po_qs: queryset های فیلترشدهٔ هر نوع (po_qs=None یعنی فقط کیوروگی).
+    خروجی: {"items": [مدل‌ها به ترتیب فید], "next": cursor صفحهٔ بعد یا None}
+    """
+    try:
+        limit = max(1, min(int(limit or DEFAULT_LIMIT), MAX_LIMIT))
+    except (TypeError, ValueError):
+        raise FeedError("limit نامعتبر است.")
+    after = decode_cursor(cursor) if cursor else None
+
+    rows = list(_ordered(ky_qs, po_qs, after)[: limit + 1])
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    next_cursor = encode_cursor(*rows[-1]) if has_more and rows else None
+    return {"items": _load(rows), "next": next_cursor}
@@ -0,0 +1,190 @@
+# competitions/services/leaderboard_service.py
+# -*- coding: utf-8 -*-
+"""
+جدول رده‌بندی ملی / هیئتی با صفحه‌بندی keyset (بدون OFFSET).
+  - بدون season: امتیاز کل دوران (ranking_* روی UserProfile / TkdClub / TkdBoard)، ترتیب (-امتیاز, id)
+  - با season: RankingStanding همان فصل، ترتیب (-امتیاز, subject_id) روی ایندکس‌های standing_*_idx؛
+    مشخصات نمایشی هر صفحه با یک کوئری id__in از مدل اصلی اضافه می‌شود
+cursor = امتیاز/شناسه/رتبه/ردیف آخرین سطر صفحه → رتبهٔ صفحهٔ بعد بدون COUNT به دست می‌آید.
+"""
+from __future__ import annotations
+
+import base64
+from typing import List, Optional, Tuple
+
+from django.db.models import Q
+
+from accounts.models import UserProfile, TkdClub, TkdBoard
+from competitions.models import RankingStanding
+
+MAX_LIMIT = 100
+MAX_WINDOW = 25
+
+
+class LeaderboardError(ValueError):
+    pass
+
+
+# kind → (model, score field, base filter, fields for values(), board field)
+KINDS = {
+    "players": (UserProfile, "ranking_competition", Q(role="player"),
+                ("id", "first_name", "last_name", "profile_image", "club__club_name", "tkd_board__name",
+                 "ranking_competition", "ranking_total"), "tkd_board_id"),
+    "coaches": (UserProfile, "ranking_total", Q(is_coach=True),
+                ("id", "first_name", "last_name", "profile_image", "club__club_name", "tkd_board__name",
+                 "ranking_total"), "tkd_board_id"),
+    "clubs":   (TkdClub, "ranking_total", Q(),
+                ("id", "club_name", "tkd_board__name", "ranking_competition", "ranking_total"),
+                "tkd_board_id"),
+    "boards":  (TkdBoard, "ranking_total", Q(),
+                ("id", "name", "province", "ranking_total"), "id"),
+}
+
+# kind → (subject_type در RankingStanding، ستون امتیاز فصل متناظر با score field بالا)
+SEASON_KINDS = {
+    "players": ("player", "points_competition"),
+    "coaches": ("coach", "points_total"),
+    "clubs":   ("club", "points_total"),
+    "boards":  ("board", "points_total"),
+}
+
+
+def _kind(kind: str):
+    spec = KINDS.get((kind or "").lower())
+    if spec is None:
+        raise LeaderboardError(f"نوع جدول نامعتبر است: {kind}")
+    return spec
+
+
+def _existing_fields(model, fields) -> Tuple[str, ...]:
+    out = []
+    for f in fields:
+        root = f.split("__", 1)[0]
+        try:
+            model._meta.get_field(root)
+            out.append(f)
+        except Exception:
+            continue
+    return tuple(out)
+
+
+def encode_cursor(score: float, pk: int, rank: int, pos: int) -> str:
+    raw = f"{float(score)!r}|{int(pk)}|{int(rank)}|{int(pos)}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[float, int, int, int]:
+    try:
+        pad = "=" * (-len(cursor) % 4)
+        score, pk, rank, pos = base64.urlsafe_b64decode(cursor + pad).decode().split("|")
+        return float(score), int(pk), int(rank), int(pos)
+    except Exception:
+        raise LeaderboardError("cursor نامعتبر است.")
+
+
+def base_queryset(kind: str, board_id: Optional[int] = None, season: Optional[int] = None):
+    """(queryset, score field, key field, values fields) برای جدول کل دوران یا فصل season."""
+    Model, score, flt, fields, board_field = _kind(kind)
+    if not season:
+        qs = Model.objects.filter(flt)
+        if board_id:
+            qs = qs.filter(**{board_field: board_id})
+        return qs, score, "id", _existing_fields(Model, fields)
+
+    subject_type, column = SEASON_KINDS[kind.lower()]
+    qs = RankingStanding.objects.filter(season=int(season), subject_type=subject_type)
+    if board_id:
+        qs = qs.filter(subject_id__in=Model.objects.filter(flt, **{board_field: board_id}).values("id"))
+    return qs, column, "subject_id", ("subject_id", column)
+
+
+def _attach(kind: str, rows: List[dict], season: Optional[int]) -> List[dict]:
+    """ردیف‌های RankingStanding را با مشخصات نمایشی subject کامل می‌کند (یک کوئری برای کل صفحه)."""
+    if not season or not rows:
+        return rows
+    Model, _score, _flt, fields, _board = _kind(kind)
+    ids = [r["subject_id"] for r in rows]
+    info = {d["id"]: d for d in Model.objects.filter(id__in=ids).values(*_existing_fields(Model, fields))}
+    for r in rows:
+        r.update(info.get(r["subject_id"], {}))
+        r["id"] = r.pop("subject_id")
+        r["season"] = int(season)
+    return rows
+
+
+def _after(score_field: str, score: float, pk: int, key: str = "id") -> Q:
+    return Q(**{f"{score_field}__lt": score}) | Q(**{score_field: score, f"{key}__gt": pk})
+
+
+def _before(score_field: str, score: float, pk: int, key: str = "id") -> Q:
+    return Q(**{f"{score_field}__gt": score}) | Q(**{score_field: score, f"{key}__lt": pk})
+
+
+def _rank_rows(rows: List[dict], score_field: str, rank: int, pos: int, last_score=None) -> List[dict]:
+    """رتبهٔ رقابتی (۱، ۲، ۲، ۴) با ادامه از آخرین رتبه/ردیف."""
+    for r in rows:
+        pos += 1
+        s = r[score_field]
+        if last_score is None or s != last_score:
+            rank = pos
+        last_score = s
+        r["rank"] = rank
+        r["score"] = s
+    return rows
+
+
+def page(kind: str, board_id: Optional[int] = None, cursor: Optional[str] = None, limit: int = 20,
+         season: Optional[int] = None) -> dict:
+    qs, score, key, fields = base_queryset(kind, board_id, season)
+    limit = max(1, min(int(limit or 20), MAX_LIMIT))
+
+    rank, pos, last_score = 0, 0, None
+    if cursor:
+        last_score, last_pk, rank, pos = decode_cursor(cursor)
+        qs = qs.filter(_after(score, last_score, last_pk, key))
+
+    rows = list(qs.order_by(f"-{score}", key).values(*fields)[: limit + 1])
+    has_more = len(rows) > limit
+    rows = _attach(kind, _rank_rows(rows[:limit], score, rank, pos, last_score), season)
+
+    next_cursor = None
+    if has_more and rows:
+        last = rows[-1]
+        next_cursor = encode_cursor(last[score], last["id"], last["rank"], pos + len(rows))
+    return {"results": rows, "next": next_cursor}
+
+
+def around(kind: str, subject_id: int, board_id: Optional[int] = None, window: int = 5,
+           season: Optional[int] = None) -> dict:
+    """
+    چند ردیف قبل و بعد از یک subject به همراه رتبهٔ خودش.
+    رتبهٔ اولین ردیف پنجره با دو COUNT روی range ایندکس به دست می‌آید، پس هزینه O(رتبه) است
+    (تعداد ردیف‌های جلوتر)، نه کل جدول؛ مثل ranking_service.rank_of رتبه ذخیره نمی‌شود چون هر تغییر امتیاز
+    رتبهٔ همهٔ ردیف‌های بین دو مقدار را جابه‌جا می‌کند. صفحه‌های بعدی با cursor بدون COUNT ادامه می‌یابند.
+    """
+    qs, score, key, fields = base_queryset(kind, board_id, season)
+    window = max(1, min(int(window or 5), MAX_WINDOW))
+
+    me = qs.filter(**{key: subject_id}).values(*fields).first()
+    if me is None:
+        return {"results": [], "me": None, "next": None}
+    s = me[score]
+
+    before = list(qs.filter(_before(score, s, subject_id, key)).order_by(score, f"-{key}").values(*fields)[:window])
+    before.reverse()
+    after = list(qs.filter(_after(score, s, subject_id, key)).order_by(f"-{score}", key)
+                 .values(*fields)[: window + 1])
+    has_more = len(after) > window
+    after = after[:window]
+
+    rows = before + [me] + after
+    first = rows[0]
+    ahead = qs.filter(**{f"{score}__gt": first[score]}).count()
+    pos_before_first = ahead + qs.filter(**{score: first[score], f"{key}__lt": first[key]}).count()
+    rows = _attach(kind, _rank_rows(rows, score, ahead + 1, pos_before_first, last_score=first[score]), season)
+
+    next_cursor = None
+    if has_more:
+        last = rows[-1]
+        next_cursor = encode_cursor(last[score], last["id"], last["rank"], pos_before_first + len(rows))
+    return {"results": rows, "me": next(r for r in rows if r["id"] == subject_id), "next": next_cursor}
@@ -0,0 +1,329 @@
+# competitions/services/ranking_service.py
+# -*- coding: utf-8 -*-
+"""
+همهٔ تغییرات امتیاز از این ماژول عبور می‌کند:
+  1) یک ردیف در RankingLedgerEntry (فقط‌افزودنی)
+  2) به‌روزرسانی شمارنده‌های ranking_* روی UserProfile / TkdClub / TkdBoard
+  3) به‌روزرسانی افزایشی RankingStanding برای فصل جاری
+"""
+from __future__ import annotations
+
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import jdatetime
+from django.db import transaction
+from django.db.models import Case, F, FloatField, Q, Sum, Value, When
+from django.utils import timezone
+
+from accounts.models import UserProfile, TkdClub, TkdBoard
+from competitions.models import RankingLedgerEntry, RankingStanding
+
+SUBJECT_MODELS = {
+    "player": UserProfile,
+    "coach": UserProfile,
+    "club": TkdClub,
+    "board": TkdBoard,
+}
+
+FIELD_COLUMNS = {
+    "competition": "points_competition",
+    "total": "points_total",
+}
+
+EPS = 1e-6
+BATCH_SIZE = 300
+
+# (subject_type, subject_id, delta_competition, delta_total)
+Delta = Tuple[str, int, float, float]
+
+
+def season_for(d=None) -> int:
+    """فصل = سال شمسی تاریخ داده‌شده (پیش‌فرض: امروز)."""
+    d = d or timezone.localdate()
+    if hasattr(d, "date") and callable(d.date):
+        d = d.date()
+    return jdatetime.date.fromgregorian(date=d).year
+
+
+def _merge(deltas: Iterable[Delta]) -> "OrderedDict[Tuple[str, int], List[float]]":
+    merged: "OrderedDict[Tuple[str, int], List[float]]" = OrderedDict()
+    for subject_type, subject_id, d_comp, d_total in deltas:
+        if not subject_id or subject_type not in SUBJECT_MODELS:
+            continue
+        acc = merged.setdefault((subject_type, int(subject_id)), [0.0, 0.0])
+        acc[0] += float(d_comp or 0.0)
+        acc[1] += float(d_total or 0.0)
+    return OrderedDict(
+        (k, v) for k, v in merged.items() if abs(v[0]) > EPS or abs(v[1]) > EPS
+    )
+
+
+def _has_field(model, name: str) -> bool:
+    try:
+        model._meta.get_field(name)
+        return True
+    except Exception:
+        return False
+
+
+def _chunks(items: list, size: int = BATCH_SIZE):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def case_add(field: str, pairs, key: str = "pk", output_field=None):
+    """
+    F(field) + delta برای هر pk در یک عبارت CASE؛ بقیه ردیف‌ها دست‌نخورده.
+    pairs: [(pk, delta), ...]
+    """
+    return Case(
+        *[When(**{key: pk}, then=F(field) + Value(float(d))) for pk, d in pairs],
+        default=F(field),
+        output_field=output_field or FloatField(),
+    )
+
+
+def _apply_counters(merged) -> None:
+    """یک UPDATE مبتنی بر CASE برای هر جدول (UserProfile / TkdClub / TkdBoard)."""
+    by_model: Dict[type, Dict[int, List[float]]] = {}
+    for (subject_type, subject_id), (d_comp, d_total) in merged.items():
+        acc = by_model.setdefault(SUBJECT_MODELS[subject_type], {}).setdefault(subject_id, [0.0, 0.0])
+        acc[0] += d_comp
+        acc[1] += d_total
+
+    for Model, per_pk in by_model.items():
+        items = list(per_pk.items())
+        for chunk in _chunks(items):
+            comp_pairs = [(pk, d[0]) for pk, d in chunk if abs(d[0]) > EPS]
+            total_pairs = [(pk, d[1]) for pk, d in chunk if abs(d[1]) > EPS]
+            upd = {}
+            if comp_pairs and _has_field(Model, "ranking_competition"):
+                upd["ranking_competition"] = case_add("ranking_competition", comp_pairs)
+            if total_pairs:
+                upd["ranking_total"] = case_add("ranking_total", total_pairs)
+            if upd:
+                Model.objects.filter(pk__in=[pk for pk, _ in chunk]).update(**upd)
+
+
+def _apply_standings(season: int, merged) -> None:
+    RankingStanding.objects.bulk_create(
+        [
+            RankingStanding(season=season, subject_type=st, subject_id=sid)
+            for (st, sid) in merged.keys()
+        ],
+        ignore_conflicts=True,
+    )
+    # شناسهٔ ردیف‌ها را یک‌جا بخوان تا CASE روی pk بنویسیم
+    items = list(merged.items())
+    for chunk in _chunks(items):
+        cond = Q()
+        for (st, sid), _ in chunk:
+            cond |= Q(subject_type=st, subject_id=sid)
+        pk_of = {
+            (r["subject_type"], r["subject_id"]): r["pk"]
+            for r in RankingStanding.objects.filter(cond, season=season).values("pk", "subject_type", "subject_id")
+        }
+        comp_pairs = [(pk_of[k], d[0]) for k, d in chunk if k in pk_of and abs(d[0]) > EPS]
+        total_pairs = [(pk_of[k], d[1]) for k, d in chunk if k in pk_of and abs(d[1]) > EPS]
+        upd = {"updated_at": timezone.now()}
+        if comp_pairs:
+            upd["points_competition"] = case_add("points_competition", comp_pairs)
+        if total_pairs:
+            upd["points_total"] = case_add("points_total", total_pairs)
+        RankingStanding.objects.filter(pk__in=list(pk_of.values())).update(**upd)
+
+
+@transaction.atomic
+def record_deltas(
+    deltas: Iterable[Delta],
+    *,
+    source: str,
+    ref: str = "",
+    season: Optional[int] = None,
+    apply_counters: bool = True,
+) -> List[RankingLedgerEntry]:
+    """
+    ثبت یک دسته تغییر امتیاز در دفتر + اعمال روی شمارنده‌ها و جدول فصل.
+    ردیف‌های تکراری یک subject با هم جمع می‌شوند؛ تغییر صفر ثبت نمی‌شود.
+    """
+    merged = _merge(deltas)
+    if not merged:
+        return []
+    season = season or season_for()
+
+    rows = RankingLedgerEntry.objects.bulk_create([
+        RankingLedgerEntry(
+            season=season,
+            subject_type=st,
+            subject_id=sid,
+            delta_competition=d_comp,
+            delta_total=d_total,
+            source=source,
+            ref=ref,
+        )
+        for (st, sid), (d_comp, d_total) in merged.items()
+    ])
+    if apply_counters:
+        _apply_counters(merged)
+    _apply_standings(season, merged)
+    return rows
+
+
+# ------------------------- خواندن رده‌بندی -------------------------
+def _column(field: str) -> str:
+    return FIELD_COLUMNS.get(field, "points_total")
+
+
+def rank_of(subject_type: str, subject_id: int, season: Optional[int] = None, field: str = "total") -> Optional[int]:
+    """
+    جایگاه رقابتی (1 + تعداد امتیازهای بیشتر) — COUNT فقط روی ایندکس (season, subject_type, -points, subject_id).
+    هزینه متناسب با خود رتبه است (تعداد ردیف‌های جلوتر در همان فصل/نوع)، نه کل جدول؛
+    رتبهٔ ذخیره‌شده عمداً نگه داشته نمی‌شود، چون هر تغییر امتیاز رتبهٔ همهٔ ردیف‌های بین دو مقدار را جابه‌جا می‌کند
+    و آن نوشتن‌ها به مسیر پرداخت (record_deltas) اضافه می‌شد.
+    """
+    season = season or season_for()
+    col = _column(field)
+    mine = (
+        RankingStanding.objects
+        .filter(season=season, subject_type=subject_type, subject_id=subject_id)
+        .values_list(col, flat=True)
+        .first()
+    )
+    if mine is None:
+        return None
+    ahead = RankingStanding.objects.filter(
+        season=season, subject_type=subject_type, **{f"{col}__gt": mine}
+    ).count()
+    return ahead + 1
+
+
+def top(subject_type: str, season: Optional[int] = None, field: str = "total", limit: int = 50):
+    season = season or season_for()
+    col = _column(field)
+    return (
+        RankingStanding.objects
+        .filter(season=season, subject_type=subject_type)
+        .order_by(f"-{col}", "subject_id")[:limit]
+    )
+
+
+# ------------------------- بازسازی / صحت‌سنجی -------------------------
+@transaction.atomic
+def rebuild_standings(season: Optional[int] = None) -> int:
+    """جدول فصل را کاملاً از روی دفتر می‌سازد (همه فصل‌ها اگر season=None)."""
+    ledger = RankingLedgerEntry.objects.all()
+    standings = RankingStanding.objects.all()
+    if season:
+        ledger = ledger.filter(season=season)
+        standings = standings.filter(season=season)
+    standings.delete()
+
+    rows = [
+        RankingStanding(
+            season=r["season"],
+            subject_type=r["subject_type"],
+            subject_id=r["subject_id"],
+            points_competition=r["c"] or 0.0,
+            points_total=r["t"] or 0.0,
+        )
+        for r in ledger.values("season", "subject_type", "subject_id")
+                       .annotate(c=Sum("delta_competition"), t=Sum("delta_total"))
+                       .order_by()
+    ]
+    RankingStanding.objects.bulk_create(rows, batch_size=1000)
+    return len(rows)
+
+
+def _ledger_sums_by_model() -> Dict[type, Dict[int, List[float]]]:
+    out: Dict[type, Dict[int, List[float]]] = {}
+    qs = (
+        RankingLedgerEntry.objects
+        .values("subject_type", "subject_id")
+        .annotate(c=Sum("delta_competition"), t=Sum("delta_total"))
+        .order_by()
+    )
+    for r in qs:
+        Model = SUBJECT_MODELS.get(r["subject_type"])
+        if Model is None:
+            continue
+        acc = out.setdefault(Model, {}).setdefault(r["subject_id"], [0.0, 0.0])
+        acc[0] += float(r["c"] or 0.0)
+        acc[1] += float(r["t"] or 0.0)
+    return out
+
+
+def verify_counters() -> List[dict]:
+    """
+    مقایسهٔ ranking_* روی مدل‌ها با جمع دفتر (همهٔ فصل‌ها).
+    خروجی: لیست اختلاف‌ها با diff = شمارنده - دفتر.
+    """
+    sums = _ledger_sums_by_model()
+    problems: List[dict] = []
+    for Model in (UserProfile, TkdClub, TkdBoard):
+        has_comp = _has_field(Model, "ranking_competition")
+        fields = ["id", "ranking_total"] + (["ranking_competition"] if has_comp else [])
+        by_id = sums.get(Model, {})
+        qs = Model.objects.all()
+        if Model is UserProfile:
+            qs = qs.filter(
+                Q(id__in=list(by_id.keys())) | ~Q(ranking_total=0) | ~Q(ranking_competition=0)
+            )
+        for row in qs.values(*fields).iterator():
+            led_c, led_t = by_id.get(row["id"], (0.0, 0.0))
+            diff_t = float(row["ranking_total"] or 0.0) - led_t
+            diff_c = (float(row["ranking_competition"] or 0.0) - led_c) if has_comp else 0.0
+            if abs(diff_t) > EPS or abs(diff_c) > EPS:
+                problems.append({
+                    "model": Model.__name__,
+                    "id": row["id"],
+                    "diff_competition": round(diff_c, 4),
+                    "diff_total": round(diff_t, 4),
+                })
+    return problems
+
+
+def verify_standings() -> List[dict]:
+    """مقایسهٔ RankingStanding با جمع دفتر به تفکیک فصل."""
+    expected = {
+        (r["season"], r["subject_type"], r["subject_id"]): (float(r["c"] or 0.0), float(r["t"] or 0.0))
+        for r in RankingLedgerEntry.objects
+                 .values("season", "subject_type", "subject_id")
+                 .annotate(c=Sum("delta_competition"), t=Sum("delta_total"))
+                 .order_by()
+    }
+    problems: List[dict] = []
+    seen = set()
+    for s in RankingStanding.objects.values(
+        "season", "subject_type", "subject_id", "points_competition", "points_total"
+    ).iterator():
+        key = (s["season"], s["subject_type"], s["subject_id"])
+        seen.add(key)
+        c, t = expected.get(key, (0.0, 0.0))
+        if abs(s["points_competition"] - c) > EPS or abs(s["points_total"] - t) > EPS:
+            problems.append({"key": key, "standing": (s["points_competition"], s["points_total"]), "ledger": (c, t)})
+    for key, (c, t) in expected.items():
+        if key not in seen and (abs(c) > EPS or abs(t) > EPS):
+            problems.append({"key": key, "standing": None, "ledger": (c, t)})
+    return problems
+
+
+def bootstrap_opening_balances(season: Optional[int] = None) -> int:
+    """
+    برای داده‌های قدیمی (قبل از دفتر): اختلاف شمارنده و دفتر را به‌صورت ردیف «opening» ثبت می‌کند
+    بدون اینکه شمارنده‌ها دوباره تغییر کنند.
+    """
+    season = season or season_for()
+    coach_ids = set(UserProfile.objects.filter(is_coach=True).values_list("id", flat=True))
+    deltas: List[Delta] = []
+    for p in verify_counters():
+        if p["model"] == "UserProfile":
+            # امتیاز مسابقه مال بازیکن است؛ total برای مربی‌ها به حساب مربی
+            deltas.append(("player", p["id"], p["diff_competition"], 0.0))
+            deltas.append(("coach" if p["id"] in coach_ids else "player", p["id"], 0.0, p["diff_total"]))
+        elif p["model"] == "TkdClub":
+            deltas.append(("club", p["id"], p["diff_competition"], p["diff_total"]))
+        elif p["model"] == "TkdBoard":
+            deltas.append(("board", p["id"], 0.0, p["diff_total"]))
+    rows = record_deltas(deltas, source=RankingLedgerEntry.SOURCE_OPENING, season=season, apply_counters=False)
+    return len(rows)
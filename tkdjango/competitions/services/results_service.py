@@ -1,149 +1,178 @@
 # competitions/services/results_service.py
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, List, Tuple
+
 from django.db import transaction
-from django.db.models import Sum, F, Count, Case, When, Value
+from django.db.models import Case, F, Value, When, IntegerField
+from django.db.models.functions import Greatest
 
-from competitions.models import KyorugiResult, RankingTransaction, Enrollment
-from accounts.models import UserProfile, TkdClub, TkdBoard
+from competitions.models import KyorugiCompetition, KyorugiResult, RankingTransaction, Enrollment
+from accounts.models import UserProfile, TkdClub
+from competitions.services.ranking_service import record_deltas, season_for, BATCH_SIZE
+from competitions.services import card_service
 
 PLAYER_POINTS = {1: 7.0, 2: 3.0, 3: 1.0}
 COACH_POINTS  = {"gold": 1.0,  "silver": 0.75, "bronze": 0.5}
 ORG_POINTS    = {"gold": 0.75, "silver": 0.5,  "bronze": 0.25}
 
+MEDALS = ("gold", "silver", "bronze")
+MEDAL_MODELS = {"player": UserProfile, "club": TkdClub}
+
+# (result_id, subject_type, subject_id, medal, points)
+TxKey = Tuple[int, str, int, str, float]
+
 def _medal_of_place(place: int) -> str:
     return "gold" if place == 1 else ("silver" if place == 2 else "bronze")
 
-def _apply_points(subject_type: str, subject_id: int, delta: float):
+def _points_delta(subject_type: str, subject_id: int, delta: float):
     """
+    تغییر امتیاز برای دفتر امتیاز (ranking_service.record_deltas):
     ✅ بازیکن: به ranking_competition اضافه/کم کن
     ✅ مربی/باشگاه/هیئت: به ranking_total اضافه/کم کن
     """
-    if not subject_id or not delta:
-        return
-    delta = float(delta)
-
+    delta = float(delta or 0.0)
     if subject_type == "player":
-        UserProfile.objects.filter(pk=subject_id).update(
-            ranking_competition=F("ranking_competition") + delta
-        )
-    elif subject_type == "coach":
-        UserProfile.objects.filter(pk=subject_id).update(
-            ranking_total=F("ranking_total") + delta
-        )
-    elif subject_type == "club":
-        TkdClub.objects.filter(pk=subject_id).update(
-            ranking_total=F("ranking_total") + delta
-        )
-    elif subject_type == "board":
-        TkdBoard.objects.filter(pk=subject_id).update(
-            ranking_total=F("ranking_total") + delta
-        )
-
-def _medal_counter_update(subject_type: str, subject_id: int, medal: str, delta: int):
-    if not subject_id or medal not in ("gold", "silver", "bronze") or not delta:
-        return
-
-    field = f"{medal}_medals"
+        return (subject_type, subject_id, delta, 0.0)
+    return (subject_type, subject_id, 0.0, delta)
 
-    if subject_type == "player":
-        Model = UserProfile
-    elif subject_type == "club":
-        Model = TkdClub
-    else:
-        return
-
-    qs = Model.objects.filter(pk=subject_id)
-
-    if delta < 0:
-        qs.update(**{
-            field: Case(
-                When(**{f"{field}__lte": abs(delta)}, then=Value(0)),
-                default=F(field) + delta,
-            )
-        })
-    else:
-        qs.update(**{field: F(field) + delta})
-
-def _award_transactions_for_enrollment(e: Enrollment, place: int, result: KyorugiResult):
+def _transactions_for_enrollment(e: Enrollment, place: int, result_id: int) -> List[TxKey]:
     medal = _medal_of_place(place)
-
-    # بازیکن
-    RankingTransaction.objects.create(
-        competition=result.competition,
-        result=result,
-        subject_type="player",
-        subject_id=e.player_id,
-        points=PLAYER_POINTS[place],
-        medal=medal,
-    )
-
-    # مربی
+    rows = [(result_id, "player", e.player_id, medal, PLAYER_POINTS[place])]   # بازیکن
     if e.coach_id:
-        RankingTransaction.objects.create(
-            competition=result.competition,
-            result=result,
-            subject_type="coach",
-            subject_id=e.coach_id,
-            points=COACH_POINTS[medal],
-            medal=medal,
-        )
-
-    # باشگاه
+        rows.append((result_id, "coach", e.coach_id, medal, COACH_POINTS[medal]))  # مربی
     if e.club_id:
-        RankingTransaction.objects.create(
-            competition=result.competition,
-            result=result,
-            subject_type="club",
-            subject_id=e.club_id,
-            points=ORG_POINTS[medal],
-            medal=medal,
-        )
-
-    # هیئت
+        rows.append((result_id, "club", e.club_id, medal, ORG_POINTS[medal]))      # باشگاه
     if e.board_id:
-        RankingTransaction.objects.create(
-            competition=result.competition,
-            result=result,
-            subject_type="board",
-            subject_id=e.board_id,
-            points=ORG_POINTS[medal],
-            medal=medal,
-        )
-
-    if getattr(e, "medal", None) != medal:
-        e.medal = medal
-        e.save(update_fields=["medal"])
+        rows.append((result_id, "board", e.board_id, medal, ORG_POINTS[medal]))    # هیئت
+    return rows
 
-@transaction.atomic
-def apply_results_and_points(result: KyorugiResult):
-    # 1) اثر تراکنش‌های قبلی را برعکس کن
-    prev_qs = RankingTransaction.objects.filter(result=result)
+def _result_podium(result: KyorugiResult):
+    return [
+        (result.gold_enrollment,    1),
+        (result.silver_enrollment,  2),
+        (result.bronze1_enrollment, 3),
+        (result.bronze2_enrollment, 3),
+    ]
+
+def _medal_counters_bulk(deltas: Dict[Tuple[str, int, str], int]):
+    """
+    یک UPDATE مبتنی بر CASE برای هر جدول؛ کاهش‌ها در صفر clamp می‌شوند.
+    deltas: {(subject_type, subject_id, medal): delta}
+    """
+    by_model = defaultdict(lambda: defaultdict(dict))  # Model -> medal -> {pk: delta}
+    for (subject_type, subject_id, medal), d in deltas.items():
+        Model = MEDAL_MODELS.get(subject_type)
+        if Model is None or not subject_id or medal not in MEDALS or not d:
+            continue
+        by_model[Model][medal][subject_id] = by_model[Model][medal].get(subject_id, 0) + d
+
+    for Model, per_medal in by_model.items():
+        pks = sorted({pk for m in per_medal.values() for pk in m})
+        for i in range(0, len(pks), BATCH_SIZE):
+            chunk = set(pks[i:i + BATCH_SIZE])
+            upd = {}
+            for medal, per_pk in per_medal.items():
+                field = f"{medal}_medals"
+                whens = [
+                    When(pk=pk, then=Greatest(F(field) + Value(d), Value(0)))
+                    for pk, d in per_pk.items() if pk in chunk and d
+                ]
+                if whens:
+                    upd[field] = Case(*whens, default=F(field), output_field=IntegerField())
+            if upd:
+                Model.objects.filter(pk__in=chunk).update(**upd)
+
+def _sync_results(competition: KyorugiCompetition, results: Iterable[KyorugiResult]) -> dict:
+    """
+    تراکنش‌های قبلی این نتایج را با تراکنش‌های جدید در حافظه diff می‌کند:
+      - فقط ردیف‌های حذف‌شده delete و ردیف‌های جدید bulk_create می‌شوند
+      - امتیاز خالص هر subject یک‌جا در دفتر امتیاز ثبت می‌شود
+      - شمارندهٔ مدال‌ها با یک UPDATE برای هر جدول
+    """
+    results = list(results)
+    result_ids = [r.pk for r in results]
 
-    for row in prev_qs.values("subject_type", "subject_id").annotate(total=Sum("points")):
-        _apply_points(row["subject_type"], row["subject_id"], -float(row["total"] or 0.0))
+    old_rows = list(
+        RankingTransaction.objects
+        .filter(result_id__in=result_ids)
+        .values_list("id", "result_id", "subject_type", "subject_id", "medal", "points")
+    )
 
-    for row in prev_qs.values("subject_type", "subject_id", "medal").annotate(cnt=Count("id")):
-        if row["medal"] in ("gold", "silver", "bronze"):
-            _medal_counter_update(row["subject_type"], row["subject_id"], row["medal"], -int(row["cnt"] or 0))
+    new_keys: List[TxKey] = []
+    medal_changed: List[Enrollment] = []
+    for r in results:
+        for e, place in _result_podium(r):
+            if isinstance(e, Enrollment):
+                new_keys.extend(_transactions_for_enrollment(e, place, r.pk))
+                medal = _medal_of_place(place)
+                if getattr(e, "medal", None) != medal:
+                    e.medal = medal
+                    medal_changed.append(e)
+
+    # diff چندمجموعه‌ای: ردیف‌های مشترک دست نمی‌خورند
+    remaining = Counter(new_keys)
+    to_delete, removed = [], []
+    for row_id, *key in old_rows:
+        key = tuple(key)
+        if remaining[key] > 0:
+            remaining[key] -= 1
+        else:
+            to_delete.append(row_id)
+            removed.append(key)
+    added = [k for k, n in remaining.items() for _ in range(n)]
+
+    # امتیاز خالص و مدال خالص هر subject
+    net_points = defaultdict(float)
+    net_medals = defaultdict(int)
+    for _rid, st, sid, medal, pts in removed:
+        net_points[(st, sid)] -= float(pts or 0.0)
+        net_medals[(st, sid, medal)] -= 1
+    for _rid, st, sid, medal, pts in added:
+        net_points[(st, sid)] += float(pts or 0.0)
+        net_medals[(st, sid, medal)] += 1
+
+    if to_delete:
+        RankingTransaction.objects.filter(id__in=to_delete).delete()
+    RankingTransaction.objects.bulk_create(
+        [
+            RankingTransaction(
+                competition=competition, result_id=rid,
+                subject_type=st, subject_id=sid, medal=medal, points=pts,
+            )
+            for rid, st, sid, medal, pts in added
+        ],
+        batch_size=BATCH_SIZE,
+    )
 
-    prev_qs.delete()
+    record_deltas(
+        [_points_delta(st, sid, d) for (st, sid), d in net_points.items()],
+        source="result",
+        ref=f"competition:{competition.pk}" if len(results) != 1 else f"result:{results[0].pk}",
+        season=season_for(competition.competition_date),
+    )
+    _medal_counters_bulk(net_medals)
 
-    # 3) تراکنش‌های جدید
-    mapping = [
-        (result.gold_enrollment,   1),
-        (result.silver_enrollment, 2),
-        (result.bronze1_enrollment, 3),
-        (result.bronze2_enrollment, 3),
-    ]
-    for e, place in mapping:
-        if isinstance(e, Enrollment):
-            _award_transactions_for_enrollment(e, place, result)
+    # مدال روی Enrollment (bulk_update سیگنال نمی‌فرستد → کش کارت‌ها همین‌جا پاک شود)
+    Enrollment.objects.bulk_update(medal_changed, ["medal"], batch_size=BATCH_SIZE)
+    if medal_changed:
+        ids = [e.pk for e in medal_changed]
+        transaction.on_commit(lambda: card_service.invalidate("kyorugi", ids))
+
+    return {"results": len(results), "added": len(added), "removed": len(to_delete)}
 
-    # 4) اعمال امتیازهای جدید
-    new_qs = RankingTransaction.objects.filter(result=result)
+def _results_qs():
+    return KyorugiResult.objects.select_related(
+        "competition",
+        "gold_enrollment", "silver_enrollment", "bronze1_enrollment", "bronze2_enrollment",
+    )
 
-    for row in new_qs.values("subject_type", "subject_id").annotate(total=Sum("points")):
-        _apply_points(row["subject_type"], row["subject_id"], float(row["total"] or 0.0))
+@transaction.atomic
+def apply_results_and_points(result: KyorugiResult):
+    return _sync_results(result.competition, [result])
 
-    for row in new_qs.values("subject_type", "subject_id", "medal").annotate(cnt=Count("id")):
-        if row["medal"] in ("gold", "silver", "bronze"):
-            _medal_counter_update(row["subject_type"], row["subject_id"], row["medal"], int(row["cnt"] or 0))
+@transaction.atomic
+def apply_competition_results(competition: KyorugiCompetition) -> dict:
+    """
+    ثبت نهایی همهٔ اوزان یک مسابقه در یک تراکنش کوتاه.
+    """
+    return _sync_results(competition, _results_qs().filter(competition=competition))
@@ -1,11 +1,115 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import m2m_changed, post_save, post_delete
 from django.dispatch import receiver
 from django.db import transaction
-from .models import Enrollment
+from accounts.models import UserProfile
+from .models import Enrollment, PoomsaeEnrollment, KyorugiCompetition, PoomsaeCompetition
+from .models import AgeCategory, Belt, BeltGroup, MatAssignment, WeightCategory
 from .models import _award_points_after_payment  # همان هِلپر تعریف‌شده
+from .services import card_service, competition_key_service
 
 @receiver(post_save, sender=Enrollment)
 def award_on_manual_paid(sender, instance: Enrollment, created, **kwargs):
     # اگر پرداخت شده و هنوز award ندارد، بعد از commit امتیاز بده
     if instance.is_paid and not hasattr(instance, 'ranking_award'):
         transaction.on_commit(lambda: _award_points_after_payment(instance))
+
+
+# ---------- پاک‌سازی کش کارت‌ها (card_service) ----------
+def _drop_cards(kind, pks):
+    pks = list(pks)
+    if pks:
+        transaction.on_commit(lambda: card_service.invalidate(kind, pks))
+
+
+@receiver(post_save, sender=Enrollment)
+@receiver(post_delete, sender=Enrollment)
+def drop_kyorugi_card(sender, instance, **kwargs):
+    _drop_cards("kyorugi", [instance.pk])
+
+
+@receiver(post_save, sender=PoomsaeEnrollment)
+@receiver(post_delete, sender=PoomsaeEnrollment)
+def drop_poomsae_card(sender, instance, **kwargs):
+    _drop_cards("poomsae", [instance.pk])
+
+
+@receiver(post_save, sender=UserProfile)
+def drop_player_cards(sender, instance, created, **kwargs):
+    if created:
+        return
+    _drop_cards("kyorugi", Enrollment.objects.filter(player_id=instance.pk).values_list("id", flat=True))
+    _drop_cards("poomsae", PoomsaeEnrollment.objects.filter(player_id=instance.pk).values_list("id", flat=True))
+
+
+@receiver(post_save, sender=KyorugiCompetition)
+def drop_kyorugi_competition_cards(sender, instance, created, **kwargs):
+    if not created:
+        _drop_cards("kyorugi", instance.enrollments.values_list("id", flat=True))
+
+
+@receiver(post_save, sender=PoomsaeCompetition)
+def drop_poomsae_competition_cards(sender, instance, created, **kwargs):
+    if not created:
+        _drop_cards("poomsae", instance.enrollments.values_list("id", flat=True))
+
+
+@receiver(post_save, sender=MatAssignment)
+@receiver(post_delete, sender=MatAssignment)
+def drop_mat_assignment_cards(sender, instance, **kwargs):
+    # رده وزنی کارت از اوزان تخصیص‌یافتهٔ زمین‌های همان مسابقه خوانده می‌شود
+    _drop_cards("kyorugi", Enrollment.objects.filter(competition_id=instance.competition_id)
+                .values_list("id", flat=True))
+
+
+_COMPETITION_M2M = {
+    MatAssignment.weights.through: ("kyorugi", lambda ma: ma.competition_id),
+    KyorugiCompetition.belt_groups.through: ("kyorugi", lambda comp: comp.pk),
+    PoomsaeCompetition.belt_groups.through: ("poomsae", lambda comp: comp.pk),
+    PoomsaeCompetition.age_categories.through: ("poomsae", lambda comp: comp.pk),
+}
+
+
+def drop_competition_m2m_cards(sender, instance, action, reverse, **kwargs):
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+    if reverse:
+        # از سمت رده/گروه (مثلاً weight.matassignment_set.add) → چند مسابقه؛ همه باطل شوند
+        transaction.on_commit(card_service.bump_version)
+        return
+    kind, comp_id_of = _COMPETITION_M2M[sender]
+    model = Enrollment if kind == "kyorugi" else PoomsaeEnrollment
+    _drop_cards(kind, model.objects.filter(competition_id=comp_id_of(instance)).values_list("id", flat=True))
+
+
+for _through in _COMPETITION_M2M:
+    m2m_changed.connect(drop_competition_m2m_cards, sender=_through,
+                        dispatch_uid=f"card_m2m_{_through._meta.label_lower}")
+
+
+# داده‌های پایهٔ مشترک بین مسابقات (نام رده وزنی/سنی، گروه کمربندی): یک bump نسخه به‌جای پیمایش ثبت‌نام‌ها
+@receiver(post_save, sender=WeightCategory)
+@receiver(post_delete, sender=WeightCategory)
+@receiver(post_save, sender=AgeCategory)
+@receiver(post_delete, sender=AgeCategory)
+@receiver(post_save, sender=BeltGroup)
+@receiver(post_delete, sender=BeltGroup)
+@receiver(post_save, sender=Belt)
+@receiver(post_delete, sender=Belt)
+@receiver(m2m_changed, sender=BeltGroup.belts.through)
+def bump_card_version(sender, **kwargs):
+    action = kwargs.get("action")
+    if action is None or action in ("post_add", "post_remove", "post_clear"):
+        transaction.on_commit(card_service.bump_version)
+
+
+# ---------- پاک‌سازی LRU کلید مسابقه (competition_key_service) ----------
+@receiver(post_save, sender=KyorugiCompetition)
+@receiver(post_delete, sender=KyorugiCompetition)
+def drop_kyorugi_key(sender, instance, **kwargs):
+    competition_key_service.invalidate("kyorugi", instance.pk)
+
+
+@receiver(post_save, sender=PoomsaeCompetition)
+@receiver(post_delete, sender=PoomsaeCompetition)
+def drop_poomsae_key(sender, instance, **kwargs):
+    competition_key_service.invalidate("poomsae", instance.pk)
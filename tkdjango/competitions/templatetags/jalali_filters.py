@@ -1,9 +1,10 @@
 # -*- coding: utf-8 -*-
 import re
-import jdatetime
 from datetime import date, datetime
 from django import template
 
+from main import jalali
+
 register = template.Library()
 
 _EN_TO_FA = str.maketrans("0123456789", "۰۱۲۳۴۵۶۷۸۹")
@@ -37,19 +38,14 @@ def to_jalali(value):
             # میلادی رشته‌ای → تبدیل
             try:
                 g = date(int(m.group(1)), int(m.group(2)), int(m.group(3)))
-                jd = jdatetime.date.fromgregorian(date=g)
-                return jd.strftime("%Y/%m/%d")
             except Exception:
                 return s
+            return jalali.format_date(g) or s
         return value  # رشته‌های دیگر را دست نمی‌زنیم
 
     # اگر datetime/date باشد
-    try:
-        if isinstance(value, datetime):
-            value = value.date()
-        if isinstance(value, date):
-            jd = jdatetime.date.fromgregorian(date=value)
-            return jd.strftime("%Y/%m/%d")
-    except Exception:
-        pass
+    if isinstance(value, datetime):
+        value = value.date()
+    if isinstance(value, date):
+        return jalali.format_date(value) or value
     return value
@@ -13,6 +13,7 @@ from .views import (
     MyEnrollmentView, EnrollmentCardView, EnrollmentCardsBulkView,
     DashboardKyorugiListView, PlayerCompetitionsList, RefereeCompetitionsList,
     CoachStudentsEligibleListView, CoachRegisterStudentsView,
+    LeaderboardView,
 
     # --------- Dashboard (ALL) ----------
     DashboardAllCompetitionsView,public_bracket_view  ,
@@ -65,7 +66,7 @@ urlpatterns = [
     path("auth/kyorugi/<ckey:key>/coach-approval/approve/", ApproveCompetitionView.as_view(),
          name="coach-approval-approve"),
     path("auth/kyorugi/<ckey:key>/my-enrollment/", MyEnrollmentView.as_view(), name="my-enrollment"),
-    path("auth/enrollments/<int:enrollment_id>/card/", EnrollmentCardView.as_view(), name="enrollment-card"),
+    path("auth/enrollments/<str:card_id>/card/", EnrollmentCardView.as_view(), name="enrollment-card"),
     path("auth/enrollments/cards/bulk/", EnrollmentCardsBulkView.as_view(), name="enrollment-cards-bulk"),
     path("auth/kyorugi/<ckey:key>/coach/students/eligible/", CoachStudentsEligibleListView.as_view(),
          name="coach-eligible-students"),
@@ -74,6 +75,10 @@ urlpatterns = [
     path("auth/kyorugi/<ckey:key>/register/students/", CoachRegisterStudentsView.as_view(),
          name="register-students-bulk-alias"),
 
+    # ========================= رده‌بندی =========================
+    path("rankings/<str:kind>/", LeaderboardView.as_view(), name="leaderboard"),
+    path("rankings/<str:kind>/board/<int:board_id>/", LeaderboardView.as_view(), name="leaderboard-board"),
+
     # ========================= Dashboard =========================
     path("dashboard/all/", DashboardAllCompetitionsView.as_view(), name="dashboard-all"),
     path("dashboard/kyorugi/", DashboardKyorugiListView.as_view(), name="dashboard-kyorugi"),
@@ -88,9 +93,9 @@ urlpatterns = [
 
     # ========================= سمینار =========================
     path("seminars/", SeminarListView.as_view(), name="seminar-list"),
+    path("seminars/sidebar/", sidebar_seminars, name="seminars-sidebar"),  # قبل از <ckey:key>
     path("seminars/<ckey:key>/", SeminarDetailView.as_view(), name="seminar-detail"),
     path("auth/seminars/<ckey:key>/register/", SeminarRegisterView.as_view(), name="seminar-register"),
-    path("seminars/sidebar/", sidebar_seminars, name="seminars-sidebar"),
 
     # ========================= ترم‌ها (عمومی) =========================
     path("<ckey:key>/terms/", CompetitionTermsView.as_view(), name="terms-generic"),
@@ -7,7 +7,7 @@ from typing import Optional  # ✅ سازگاری پایتون < 3.10
 import base64  # optional اگر لازم شد
 
 # زمان/تاریخ
-from datetime import date as _date, datetime as _datetime, time as _time, timedelta
+from datetime import date as _date, datetime as _datetime, timedelta
 
 # بالای فایل (اگر قبلاً ندارید)
 import json
@@ -17,7 +17,6 @@ logger = logging.getLogger(__name__)
 # بالای فایل کنار ایمپورت‌ها
 from rest_framework.exceptions import ValidationError as DRFValidationError
 
-import jdatetime
 
 from django.db.models import Exists, OuterRef, Q
 
@@ -26,7 +25,7 @@ from django.conf import settings
 from django.core.exceptions import FieldError, ValidationError
 from django.db import transaction, IntegrityError
 from django.db import models as djm
-from django.http import Http404
+from django.http import Http404, HttpResponse
 from django.shortcuts import get_object_or_404
 from django.utils import timezone
 
@@ -36,10 +35,13 @@ from rest_framework.pagination import PageNumberPagination
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from rest_framework_simplejwt.authentication import JWTAuthentication
+from accounts.authentication import ClaimsJWTAuthentication, VersionedJWTAuthentication
 
 # --- Project models
 from accounts.models import UserProfile, TkdClub, TkdBoard
+from accounts.actor import get_actor
+from main import jalali, normalize
+from main.caching import get_or_build, request_host
 from .models import (
     KyorugiCompetition, CoachApproval, Enrollment, Draw, Match,
     WeightCategory, BeltGroup, Belt, KyorugiResult, Seminar, SeminarRegistration,
@@ -49,6 +51,7 @@ from .models import (
 
 # --- Project permissions
 from .permissions import IsCoach, IsPlayer
+from .services import card_service, competition_key_service, feed_service, leaderboard_service, ranking_service
 
 # --- Project serializers / helpers
 from .serializers import (
@@ -76,10 +79,7 @@ def _birth_jalali_from_profile(p: UserProfile) -> str:
     g = _player_birthdate_to_gregorian(p)
     if not g:
         return ""
-    try:
-        return jdatetime.date.fromgregorian(date=g).strftime("%Y/%m/%d")
-    except Exception:
-        return ""
+    return jalali.format_date(g) or ""
 
 def _poomsae_user_eligible(user, comp):
     """صلاحیت بازیکن برای پومسه: جنسیت + بازه‌های سنی (M2M و FK) + کمربند."""
@@ -137,17 +137,17 @@ def _uniq_preserve(seq):
         out.append(s)
     return out
 
-def _detect_role_and_profile(request):
-    prof = UserProfile.objects.filter(user=request.user).first()
-    if prof and prof.role:
-        return (prof.role or "").lower(), prof
-    if TkdClub.objects.filter(user=request.user).exists():
+def _detect_role_and_coach(request):
+    """(نقش، coach_id بازیکن) فقط از روی Actor؛ پروفایل کامل خوانده نمی‌شود."""
+    actor = get_actor(request)
+    if actor.profile_role:
+        return actor.profile_role, actor.coach_id
+    if actor.club_id:
         return "club", None
-    if request.user.groups.filter(name__iexact="heyat").exists():
-        return "heyat", None
-    if request.user.groups.filter(name__iexact="board").exists():
-        return "board", None
-    return "", prof
+    for g in ("heyat", "board"):
+        if g in actor.groups or actor.role == g:
+            return g, None
+    return "", actor.coach_id
 
 def registration_open_effective(obj):
     """
@@ -216,29 +216,29 @@ def _opened(qs, only_open: bool):
         )
     return qs.filter(open_q)
 
-def _dashboard_base_qs(role, profile, only_open):
+def _dashboard_base_qs(role, coach_id, only_open):
     ky_qs = KyorugiCompetition.objects.all()
     po_qs = PoomsaeCompetition.objects.all()
 
     if role == "player":
-        if not (profile and profile.coach):
+        if not coach_id:
             return KyorugiCompetition.objects.none(), PoomsaeCompetition.objects.none()
 
         ky_qs = ky_qs.filter(
-            coach_approvals__coach=profile.coach,
+            coach_approvals__coach_id=coach_id,
             coach_approvals__is_active=True,
             coach_approvals__terms_accepted=True,
         ).distinct()
         # پومسه: approved (نه terms_accepted)
         try:
             po_qs = po_qs.filter(
-                coach_approvals__coach=profile.coach,
+                coach_approvals__coach_id=coach_id,
                 coach_approvals__is_active=True,
                 coach_approvals__approved=True,
             ).distinct()
         except FieldError:
             po_qs = po_qs.filter(
-                coach_approvals__coach=profile.coach,
+                coach_approvals__coach_id=coach_id,
                 coach_approvals__is_active=True,
             ).distinct()
 
@@ -249,56 +249,52 @@ def _dashboard_base_qs(role, profile, only_open):
 
     return _opened(ky_qs, only_open), _opened(po_qs, only_open)
 
-def _to_aware_dt(v):
-    if v is None:
-        return timezone.now()
-    if isinstance(v, _date) and not isinstance(v, _datetime):
-        v = _datetime.combine(v, _time.min)
-    if timezone.is_naive(v):
-        v = timezone.make_aware(v, timezone.get_current_timezone())
-    return v
-
-def _order_items(items):
-    def _key(x):
-        v = (getattr(x, "created_at", None)
-             or getattr(x, "competition_date", None)
-             or getattr(x, "event_date", None))
-        v = _to_aware_dt(v)
-        return v.timestamp()
-    return sorted(items, key=_key, reverse=True)
+def _dashboard_cache_parts(role, coach_id, only_open):
+    """کلید کش هم‌ارز با _dashboard_base_qs: فقط بازیکن به مربی وابسته است، داور همیشه only_open."""
+    if role == "player":
+        return ("player", coach_id or 0, only_open)
+    if role == "referee":
+        return ("referee", True)
+    return ("all", only_open)
+
+def _dashboard_feed(request, role, coach_id, only_open, kyorugi_only=False):
+    """
+    فید داشبورد (جدیدترین اول):
+      بدون cursor/limit → کل فهرست (قالب قبلی API، یک لیست)
+      ?cursor=&limit= → {"results": [...], "next": cursor|None}
+    """
+    cursor = request.query_params.get("cursor") or None
+    limit = request.query_params.get("limit") or None
+
+    def build():
+        ky_qs, po_qs = _dashboard_base_qs(role, coach_id, only_open)
+        po_qs = None if kyorugi_only else po_qs
+        if limit is None and cursor is None:
+            items = feed_service.all_items(ky_qs, po_qs)
+            return DashboardAnyCompetitionSerializer(items, many=True, context={"request": request}).data
+        res = feed_service.page(ky_qs, po_qs, cursor=cursor, limit=limit)
+        ser = DashboardAnyCompetitionSerializer(res["items"], many=True, context={"request": request})
+        return {"results": ser.data, "next": res["next"]}
+
+    parts = ("dashboard_kyorugi" if kyorugi_only else "dashboard_all",
+             *_dashboard_cache_parts(role, coach_id, only_open), cursor, limit, request_host(request))
+    try:
+        data = get_or_build("competitions", parts, build)
+    except feed_service.FeedError as e:
+        return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    return Response(data, status=status.HTTP_200_OK)
 
 def _get_comp_by_key(key):
-    s = str(key).strip()
-    qs = KyorugiCompetition.objects.all()
-    if s.isdigit():
-        obj = qs.filter(id=int(s)).first()
-        if obj:
-            return obj
-    obj = qs.filter(public_id__iexact=s).first()
-    if obj:
-        return obj
-    raise Http404("KyorugiCompetition not found")
+    obj = competition_key_service.get_competition(key, kinds=("kyorugi",))
+    if obj is None:
+        raise Http404("KyorugiCompetition not found")
+    return obj
 
 def _get_comp_by_key_any(key):
-    s = str(key).strip()
-    try:
-        return _get_comp_by_key(key)
-    except Http404:
-        pass
-    if s.isdigit():
-        obj = PoomsaeCompetition.objects.filter(id=int(s)).first()
-        if obj:
-            return obj
-    obj = PoomsaeCompetition.objects.filter(public_id__iexact=s).first()
-    if obj:
-        return obj
-    try:
-        obj = PoomsaeCompetition.objects.filter(slug__iexact=s).first()
-        if obj:
-            return obj
-    except Exception:
-        pass
-    raise Http404("Competition not found")
+    obj = competition_key_service.get_competition(key)
+    if obj is None:
+        raise Http404("Competition not found")
+    return obj
 
 def _required_gender_for_comp(comp):
     g = getattr(comp, "gender", None)
@@ -321,19 +317,7 @@ def _gender_norm(val):
     return m.get(str(val).strip().lower(), None)
 
 def _parse_jalali_ymd(s: str) -> Optional[_date]:  # ✅ Optional
-    if not s:
-        return None
-    t = re.sub(r"[\u200e\u200f\u200c\u202a-\u202e]", "", str(s))
-    t = t.replace("-", "/")
-    t = t.translate(str.maketrans("۰۱۲۳۴۵۶۷۸۹٠١٢٣٤٥٦٧٨٩","01234567890123456789"))
-    m = re.fullmatch(r"(\d{4})/(\d{1,2})/(\d{1,2})", t)
-    if not m: return None
-    jy, jm, jd = map(int, m.groups())
-    try:
-        g = jdatetime.date(jy, jm, jd).togregorian()
-        return _date(g.year, g.month, g.day)
-    except Exception:
-        return None
+    return normalize.parse_date(s)
 
 def _player_birthdate_to_gregorian(p: UserProfile):
     return _parse_jalali_ymd(p.birth_date)
@@ -382,7 +366,7 @@ def _find_weight_category_for(comp: KyorugiCompetition, gender: str, declared_we
     return None
 
 def _coach_from_request(request):
-    return UserProfile.objects.filter(user=request.user, role__in=["coach", "both"]).first()
+    return get_actor(request).coach_profile
 
 def _allowed_belt_names(comp: KyorugiCompetition) -> set[str]:
     if comp.belt_groups.exists():
@@ -434,7 +418,7 @@ def _enr_label(e):
 # Views
 # ------------------------------------------------------------------------------------
 class CompetitionDetailAnyView(views.APIView):
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [VersionedJWTAuthentication]
     permission_classes = [permissions.AllowAny]
 
     def get(self, request, key):
@@ -447,7 +431,7 @@ class CompetitionDetailAnyView(views.APIView):
             data["kind"] = "kyorugi"
 
             if request.user and request.user.is_authenticated:
-                player = UserProfile.objects.filter(user=request.user, role__in=["player", "both"]).first()
+                player = get_actor(request).player_profile
                 if player:
                     enr = (Enrollment.objects
                            .only("id","status","player_id","competition_id")
@@ -492,7 +476,7 @@ class CompetitionDetailAnyView(views.APIView):
         data["teamRegistrationNote"] = _note
 
         if request.user and request.user.is_authenticated:
-            coach = UserProfile.objects.filter(user=request.user, role__in=["coach", "both"]).first()
+            coach = get_actor(request).coach_profile
             if coach:
                 appr = PoomsaeCoachApproval.objects.filter(
                     competition=comp, coach=coach, is_active=True
@@ -503,8 +487,7 @@ class CompetitionDetailAnyView(views.APIView):
                 }
 
             # ✅ my_profile پومسه: national_code + DOB جلالی
-            player = UserProfile.objects.filter(user=request.user, role__in=["player", "both"]) \
-                .only("gender", "belt_grade", "national_code", "birth_date").first()
+            player = get_actor(request).player_profile
             if player:
                 birth_text = _birth_jalali_from_profile(player)
                 belt_val = getattr(player, "belt_grade", "") or getattr(player, "belt_name", "") or ""
@@ -525,7 +508,7 @@ class CompetitionDetailAnyView(views.APIView):
 
 # ---------- جزئیات مسابقه (کیوروگی) ----------
 class KyorugiCompetitionDetailView(views.APIView):
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [VersionedJWTAuthentication]
     permission_classes = [permissions.AllowAny]
 
     def get(self, request, key):
@@ -534,7 +517,7 @@ class KyorugiCompetitionDetailView(views.APIView):
         data = dict(ser.data)
 
         if request.user and request.user.is_authenticated:
-            player = UserProfile.objects.filter(user=request.user, role__in=["player", "both"]).first()
+            player = get_actor(request).player_profile
             if player:
                 enr = (Enrollment.objects
                        .only("id","status","player_id","competition_id")
@@ -563,7 +546,7 @@ class KyorugiCompetitionDetailView(views.APIView):
 
 # ---------- ثبت‌نام خودِ بازیکن ----------
 class RegisterSelfView(views.APIView):
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [VersionedJWTAuthentication]
     permission_classes = [permissions.IsAuthenticated, IsPlayer]
 
     @transaction.atomic
@@ -576,7 +559,7 @@ class RegisterSelfView(views.APIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        player = UserProfile.objects.filter(user=request.user, role__in=["player", "both"]).first()
+        player = get_actor(request).player_profile
         if not player:
             return Response({"detail": "پروفایل بازیکن یافت نشد."}, status=status.HTTP_404_NOT_FOUND)
 
@@ -624,12 +607,12 @@ class RegisterSelfView(views.APIView):
 
 # ---------- وضعیت/تأیید مربی ----------
 class CoachApprovalStatusView(views.APIView):
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [VersionedJWTAuthentication]
     permission_classes = [permissions.IsAuthenticated, IsCoach]
 
     def get(self, request, key):
         comp = _get_comp_by_key_any(key)
-        coach = UserProfile.objects.filter(user=request.user, role__in=["coach", "both"]).first()
+        coach = get_actor(request).coach_profile
         if not coach:
             return Response({"detail": "پروفایل مربی یافت نشد."}, status=404)
 
@@ -664,7 +647,7 @@ class CoachApprovalStatusView(views.APIView):
         }, status=200)
 
 class ApproveCompetitionView(APIView):
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [VersionedJWTAuthentication]
     permission_classes = [IsAuthenticated, IsCoach]
 
     @transaction.atomic
@@ -673,7 +656,7 @@ class ApproveCompetitionView(APIView):
         if isinstance(comp, PoomsaeCompetition):
             return Response({"detail": "تأیید مربی برای پومسه هنوز به مدل جدا/جنریک وصل نشده است."}, status=400)
 
-        coach = UserProfile.objects.filter(user=request.user, role__in=["coach", "both"]).first()
+        coach = get_actor(request).coach_profile
         if not coach:
             return Response({"detail": "پروفایل مربی یافت نشد."}, status=404)
 
@@ -695,7 +678,7 @@ class ApproveCompetitionView(APIView):
 
 class CompetitionTermsView(views.APIView):
     permission_classes = [permissions.AllowAny]
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [VersionedJWTAuthentication]
 
     def get(self, request, key):
         comp = _get_comp_by_key_any(key)
@@ -704,11 +687,11 @@ class CompetitionTermsView(views.APIView):
         return Response({"title": title, "content": content}, status=status.HTTP_200_OK)
 
 class PlayerCompetitionsList(views.APIView):
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [VersionedJWTAuthentication]
     permission_classes = [permissions.IsAuthenticated, IsPlayer]
 
     def get(self, request):
-        player = UserProfile.objects.filter(user=request.user, role__in=["player", "both"]).first()
+        player = get_actor(request).player_profile
         if not player or not player.coach:
             return Response([], status=200)
 
@@ -723,11 +706,11 @@ class PlayerCompetitionsList(views.APIView):
         return Response(out, status=200)
 
 class RefereeCompetitionsList(views.APIView):
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [VersionedJWTAuthentication]
     permission_classes = [permissions.IsAuthenticated]
 
     def get(self, request):
-        referee = UserProfile.objects.filter(user=request.user, role='referee').first()
+        referee = get_actor(request).referee_profile
         if not referee:
             return Response([], status=200)
 
@@ -735,39 +718,32 @@ class RefereeCompetitionsList(views.APIView):
         return Response([{"public_id": c.public_id, "title": c.title} for c in qs], status=200)
 
 class DashboardAllCompetitionsView(views.APIView):
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [ClaimsJWTAuthentication]
     permission_classes = [permissions.IsAuthenticated]
 
     def get(self, request):
-        role, profile = _detect_role_and_profile(request)
+        role, coach_id = _detect_role_and_coach(request)
         only_open = str(request.query_params.get("only_open", "")).lower() in {"1", "true", "yes"}
 
-        ky_qs, po_qs = _dashboard_base_qs(role, profile, only_open)
-        items = _order_items([*ky_qs, *po_qs])
-        ser = DashboardAnyCompetitionSerializer(items, many=True, context={"request": request})
-        return Response(ser.data, status=status.HTTP_200_OK)
+        return _dashboard_feed(request, role, coach_id, only_open, kyorugi_only=False)
 
 class DashboardKyorugiListView(views.APIView):
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [ClaimsJWTAuthentication]
     permission_classes = [permissions.IsAuthenticated]
 
     def get(self, request):
-        role, profile = _detect_role_and_profile(request)
+        role, coach_id = _detect_role_and_coach(request)
         only_open = str(request.query_params.get("only_open", "")).lower() in {"1","true","yes"}
 
-        ky_qs, _ = _dashboard_base_qs(role, profile, only_open)
-        items = _order_items(list(ky_qs))
-
-        ser = DashboardAnyCompetitionSerializer(items, many=True, context={"request": request})
-        return Response(ser.data, status=status.HTTP_200_OK)
+        return _dashboard_feed(request, role, coach_id, only_open, kyorugi_only=True)
 
 class RegisterSelfPrefillView(views.APIView):
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [VersionedJWTAuthentication]
     permission_classes = [permissions.IsAuthenticated]
 
     def get(self, request, key):
         comp = _get_comp_by_key(key)
-        prof = UserProfile.objects.filter(user=request.user).first()
+        prof = get_actor(request).profile
         if not prof:
             return Response(
                 {"can_register": False, "detail": "پروفایل کاربر یافت نشد."},
@@ -778,9 +754,7 @@ class RegisterSelfPrefillView(views.APIView):
             if not s:
                 return ""
             t = str(s)
-            t = re.sub(r"[\u200e\u200f\u202a-\u202e\u2066-\u2069\u200c]", "", t)
-            trans = str.maketrans("۰۱۲۳۴۵۶۷۸۹٠١٢٣٤٥٦٧٨٩", "01234567890123456789")
-            t_norm = t.translate(trans)
+            t_norm = normalize.clean(t)
             t_norm = re.sub(r"[\s\-–—:|،]*[+(\[]?\d[\d\s\-\(\)]{6,}$", "", t_norm).strip()
             return t_norm if len(t_norm) < len(t) else t.strip()
 
@@ -809,24 +783,7 @@ class RegisterSelfPrefillView(views.APIView):
             return ""
 
         def _parse_birthdate_to_date(val):
-            if not val:
-                return None
-            t = str(val).strip()
-            if "T" in t:
-                t = t[:10]
-            t = t.replace("-", "/")
-            t = t.translate(str.maketrans("۰۱۲۳۴۵۶۷۸۹٠١٢٣٤٥٦٧٨٩", "01234567890123456789"))
-            m = re.search(r"(\d{4})/(\d{1,2})/(\d{1,2})", t)
-            if not m:
-                return None
-            y, m_, d = map(int, m.groups())
-            try:
-                if y < 1700:
-                    g = jdatetime.date(y, m_, d).togregorian()
-                    return _date(g.year, g.month, g.day)
-                return _date(y, m_, d)
-            except Exception:
-                return None
+            return normalize.parse_date(val, loose=True)
 
         def _birth_display(p: UserProfile) -> str:
             raw = getattr(p, "birth_date", None) or getattr(p, "birthDate", None)
@@ -834,7 +791,7 @@ class RegisterSelfPrefillView(views.APIView):
                 return ""
             g = _parse_birthdate_to_date(raw)
             if g:
-                return jdatetime.date.fromgregorian(date=g).strftime("%Y/%m/%d")
+                return jalali.format_date(g) or ""
             return ""
 
         can_register = comp.registration_open_effective
@@ -896,15 +853,8 @@ class RegisterSelfPrefillView(views.APIView):
 def _to_jalali_str(d):
     if not d:
         return ""
-    try:
-        # اگر datetime است، به timezone محلی برگردان و فقط تاریخ را بردار
-        if isinstance(d, _datetime):
-            if timezone.is_naive(d):
-                d = timezone.make_aware(d, timezone.get_current_timezone())
-            d = timezone.localtime(d).date()
-        return jdatetime.date.fromgregorian(date=d).strftime("%Y/%m/%d")
-    except Exception:
-        return ""
+    # datetime آگاه به وقت محلی برده می‌شود (main.jalali)
+    return jalali.format_date(d) or ""
 
 def _profile_belt_display(p):
     # اولویت با grade / سپس نام کمربند
@@ -942,104 +892,39 @@ def _belt_group_for_player_in_comp(player, comp):
     return None
 
 class EnrollmentCardView(views.APIView):
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [VersionedJWTAuthentication]
     permission_classes = [permissions.IsAuthenticated]
 
-    def _photo_url(self, request, prof):
-        img = getattr(prof, "profile_image", None)
-        if not img:
-            return None
-        url = getattr(img, "url", None) or (str(img) if img else None)
-        if not url:
-            return None
-        if not re.match(r"^https?://", str(url)):
-            try:
-                url = request.build_absolute_uri(url)
-            except Exception:
-                pass
-        return url
-
-    def _to_jalali_str(self, d):
-        if not d:
-            return ""
-        try:
-            return jdatetime.date.fromgregorian(date=d).strftime("%Y/%m/%d")
-        except Exception:
-            return ""
-
-    def _profile_belt_display(self, p):
-        for name in ("belt_grade", "belt_name", "belt_label", "belt_title"):
-            v = getattr(p, name, None)
-            if v:
-                return str(v)
-        b = getattr(p, "belt", None)
-        if not b:
-            return ""
-        for attr in ("name", "label", "title"):
-            v = getattr(b, attr, None)
-            if v:
-                return str(v)
-        return b if isinstance(b, str) else ""
-
-    def get(self, request, enrollment_id: int):
-        eid = int(enrollment_id)
-
-        # 1) هر دو مدل را با این id امتحان کن
-        candidates = []
-        try:
-            sr = ["player","club","board","competition","weight_category","belt_group"]
-            k = Enrollment.objects.select_related(*sr).get(id=eid)
-            candidates.append(("kyorugi", k))
-        except Enrollment.DoesNotExist:
-            pass
+    def get(self, request, card_id: str):
+        # card_id: "k-12" / "p-12" (یک lookup در کش/جدول) یا عدد خالی برای سازگاری (هر دو جدول)
         try:
-            sr = ["player","club","board","competition","age_category","belt_group"]
-            p = PoomsaeEnrollment.objects.select_related(*sr).get(id=eid)
-            candidates.append(("poomsae", p))
-        except PoomsaeEnrollment.DoesNotExist:
-            pass
-
-        if not candidates:
+            rec, err = card_service.resolve_own_card(card_id, request.user.id)
+        except ValueError:
             return Response({"detail": "No Enrollment matches the given query."},
                             status=status.HTTP_404_NOT_FOUND)
 
-        # 2) فقط اگر خودِ بازیکن است اجازه بده
-        chosen = None
-        for kind, e in candidates:
-            if getattr(e.player, "user_id", None) == request.user.id:
-                chosen = (kind, e)
-                break
-        if not chosen:
+        if err == "not_found":
+            return Response({"detail": "No Enrollment matches the given query."},
+                            status=status.HTTP_404_NOT_FOUND)
+        if err == "forbidden":
             return Response({"detail": "اجازه دسترسی ندارید."}, status=status.HTTP_403_FORBIDDEN)
 
-        kind, e = chosen
-
-        # 3) کارت فقط برای وضعیت‌های آماده
-        if not _can_show_card(e.status, getattr(e, "is_paid", False)):
+        # کارت فقط برای وضعیت‌های آماده
+        if not rec["ready"]:
             return Response({"detail": "هنوز پرداخت/تأیید نهایی نشده است."},
                             status=status.HTTP_403_FORBIDDEN)
 
-        # 4) استفاده از سریالایزر مناسب
-        if kind == "kyorugi":
-            data = EnrollmentCardSerializer(e, context={"request": request}).data
-            data["kind"] = "kyorugi"          # برای یکدست‌سازی با پومسه
-            data["enrollment_id"] = e.id
-            return Response(data, status=status.HTTP_200_OK)
-        else:
-            data = PoomsaeEnrollmentCardSerializer(e, context={"request": request}).data
-            # این سریالایزر خودش فیلد kind را "poomsae" برمی‌گرداند
-            data["enrollment_id"] = e.id
-            return Response(data, status=status.HTTP_200_OK)
+        return Response(card_service.public_data(rec, request), status=status.HTTP_200_OK)
 
 
 class MyEnrollmentView(views.APIView):
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [VersionedJWTAuthentication]
     permission_classes = [permissions.IsAuthenticated]
 
     def get(self, request, key):
         comp = _get_comp_by_key(key)
 
-        player = UserProfile.objects.filter(user=request.user, role__in=["player", "both"]).first()
+        player = get_actor(request).player_profile
         if not player:
             return Response({"enrollment_id": None}, status=status.HTTP_200_OK)
 
@@ -1064,7 +949,8 @@ class MyEnrollmentView(views.APIView):
 
         can_show_card = _can_show_card(e.status, getattr(e, "is_paid", False))
         return Response(
-            {"enrollment_id": e.id, "status": e.status, "can_show_card": can_show_card},
+            {"enrollment_id": e.id, "card_id": card_service.card_id("kyorugi", e.id),
+             "status": e.status, "can_show_card": can_show_card},
             status=status.HTTP_200_OK
         )
 
@@ -1088,7 +974,6 @@ class KyorugiBracketView(APIView):
             is_bye=False,
             match_number__isnull=True,
         )
-        has_any_draw = comp.draws.exists()
         draws_qs = (
             Draw.objects.filter(competition=comp)
             .annotate(_has_unumbered=Exists(unsafe))
@@ -1096,23 +981,28 @@ class KyorugiBracketView(APIView):
             .order_by("weight_category__min_weight", "id")
         )
 
-        if (not has_any_draw) or (not draws_qs.exists()):
-            return Response({"detail": "bracket_not_ready"}, status=status.HTTP_404_NOT_FOUND)
+        def build():
+            if not comp.draws.exists() or not draws_qs.exists():
+                return None
+            # اگر از سریالایزر کلی استفاده می‌کنی:
+            ser = DrawWithMatchesSerializer(draws_qs, many=True, context={"request": request})
+            return {
+                "competition": {
+                    "title": comp.title,
+                    "public_id": comp.public_id,
+                },
+                "draws": ser.data
+            }
 
-        # اگر از سریالایزر کلی استفاده می‌کنی:
-        ser = DrawWithMatchesSerializer(draws_qs, many=True, context={"request": request})
-        return Response({
-            "competition": {
-                "title": comp.title,
-                "public_id": comp.public_id,
-            },
-            "draws": ser.data
-        }, status=200)
+        data = get_or_build("brackets", ("kyorugi", comp.pk, request_host(request)), build)
+        if data is None:
+            return Response({"detail": "bracket_not_ready"}, status=status.HTTP_404_NOT_FOUND)
+        return Response(data, status=200)
 
 
 # ───────── GET: لیست شاگردها با پیش‌تیک ثبت‌نام‌شده‌ها ─────────
 class CoachStudentsEligibleListView(APIView):
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [VersionedJWTAuthentication]
     permission_classes = [permissions.IsAuthenticated, IsCoach]
 
     def get(self, request, key):
@@ -1183,7 +1073,7 @@ class CoachStudentsEligibleListView(APIView):
 # ───────── POST: ثبت‌نام گروهی ─────────
 # --- CoachRegisterStudentsView (fixed) ---
 class CoachRegisterStudentsView(APIView):
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [VersionedJWTAuthentication]
     permission_classes = [permissions.IsAuthenticated, IsCoach]
 
     @transaction.atomic
@@ -1209,31 +1099,8 @@ class CoachRegisterStudentsView(APIView):
 
         created_ids, skipped_already, errors = [], [], {}
 
-        # هِلپر محلی: پارس تاریخ بیمه بدون جابه‌جایی روز
-        import re as _re
-        def _parse_insurance_date(v) -> Optional[_date]:
-            if v is None:
-                return None
-            t = str(v).strip()
-            # اگر ISO datetime آمده باشد، فقط بخش تاریخ را بردار
-            if "T" in t:
-                t = t.split("T", 1)[0]
-            # حذف علامت‌های کنترلی RTL و تبدیل ارقام فارسی/عربی
-            t = _re.sub(r"[\u200e\u200f\u200c\u202a-\u202e]", "", t)
-            t = t.translate(str.maketrans("۰۱۲۳۴۵۶۷۸۹٠١٢٣٤٥٦٧٨٩", "01234567890123456789"))
-            # یکدست: اسلش
-            t = t.replace("-", "/")
-            m = _re.fullmatch(r"(\d{4})/(\d{1,2})/(\d{1,2})", t)
-            if not m:
-                return None
-            y, m_, d = map(int, m.groups())
-            try:
-                if y < 1700:
-                    g = jdatetime.date(y, m_, d).togregorian()
-                    return _date(g.year, g.month, g.day)
-                return _date(y, m_, d)
-            except Exception:
-                return None
+        # هِلپر محلی: پارس تاریخ بیمه بدون جابه‌جایی روز (ISO datetime → فقط بخش تاریخ)
+        _parse_insurance_date = normalize.parse_date
 
         for it in items:
             pid = it.get("player_id")
@@ -1334,54 +1201,28 @@ class CoachRegisterStudentsView(APIView):
 
 
 class EnrollmentCardsBulkView(views.APIView):
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [VersionedJWTAuthentication]
     permission_classes = [permissions.IsAuthenticated]
 
     def post(self, request):
         ids = request.data.get("ids") or request.data.get("enrollment_ids") or []
         if not isinstance(ids, (list, tuple)):
             return Response({"detail": "ids باید آرایه باشد."}, status=400)
-        ids = [int(i) for i in ids if str(i).isdigit()]
-
-        # هر دو مدل
-        kyo = {e.id: e for e in Enrollment.objects.filter(id__in=ids)}
-        poo = {e.id: e for e in PoomsaeEnrollment.objects.filter(id__in=ids)}
-        all_map = {**kyo, **poo}
-
-        prof  = UserProfile.objects.filter(user=request.user).first()
-        club  = TkdClub.objects.filter(user=request.user).first()
-        board = TkdBoard.objects.filter(user=request.user).first()
-
-        out_by_id = {}
-        for eid, e in all_map.items():
-            # مجوز
-            allowed = (
-                getattr(e.player, "user_id", None) == request.user.id
-                or (prof and (str(getattr(prof, "role", "")).lower() in {"coach","both"} or getattr(prof,"is_coach",False)) and getattr(e,"coach_id",None) == getattr(prof,"id",None))
-                or (club and getattr(e,"club_id",None) == club.id)
-                or (board and getattr(e,"board_id",None) == board.id)
-            )
-            if not allowed:
-                out_by_id[eid] = {"enrollment_id": eid, "error": "forbidden"}
-                continue
-
-            # آماده نمایش؟
-            if not _can_show_card(getattr(e, "status", ""), getattr(e, "is_paid", False)):
-                out_by_id[eid] = {"enrollment_id": eid, "error": "not_ready"}
-                continue
-
-            # سریالایزر مناسب
-            if isinstance(e, Enrollment):
-                data = EnrollmentCardSerializer(e, context={"request": request}).data
-            else:
-                data = PoomsaeEnrollmentCardSerializer(e, context={"request": request}).data
-
-            data["enrollment_id"] = eid
-            out_by_id[eid] = data
-
-        # حفظ ترتیب
-        out_sorted = [out_by_id[i] for i in ids if i in out_by_id]
-        return Response(out_sorted, status=200)
+        # عدد (سازگاری قدیمی) یا شناسهٔ کارت "k-12" / "p-12"
+        ids = [str(i).strip() for i in ids if str(i).strip()]
+
+        actor = get_actor(request)
+        # خروجی چاپی: {"output": "pdf"} در بدنه یا ?output=pdf
+        if str(request.data.get("output") or request.query_params.get("output") or "").lower() == "pdf":
+            pdf, n = card_service.build_cards_pdf(ids, actor=actor, user_id=request.user.id, request=request)
+            if not n:
+                return Response({"detail": "کارت قابل چاپی یافت نشد."}, status=404)
+            resp = HttpResponse(pdf, content_type="application/pdf")
+            resp["Content-Disposition"] = 'attachment; filename="cards.pdf"'
+            return resp
+
+        cards = card_service.build_cards(ids, actor=actor, user_id=request.user.id, request=request)
+        return Response(cards, status=200)
 
 # ------------------------------ نتایج کیوروگی ------------------------------
 class KyorugiResultsView(views.APIView):
@@ -1414,6 +1255,73 @@ class KyorugiResultsView(views.APIView):
         return Response({"results": out, "count": len(out)}, status=status.HTTP_200_OK)
 
 
+# ------------------------------------------------------------- جدول رده‌بندی -------------------------------------------------------------
+class LeaderboardView(views.APIView):
+    """
+    GET /rankings/<kind>/                  ملی
+    GET /rankings/<kind>/board/<board_id>/ هیئتی
+    kind: players | coaches | clubs | boards
+    پارامترها: cursor, limit, around=me|<id>, window
+    """
+    authentication_classes = [ClaimsJWTAuthentication]
+    permission_classes = [permissions.AllowAny]
+
+    def _my_subject_id(self, request, kind):
+        user = request.user
+        if not getattr(user, "is_authenticated", False):
+            return None
+        actor = get_actor(request)
+        if kind in ("players", "coaches"):
+            return actor.profile_id
+        if kind == "clubs":
+            return actor.club_id or actor.member_club_id
+        if kind == "boards":
+            return actor.board_id or actor.member_board_id
+        return None
+
+    def _media(self, request, rows):
+        for r in rows:
+            img = r.get("profile_image")
+            if img:
+                url = settings.MEDIA_URL + str(img)
+                try:
+                    url = request.build_absolute_uri(url)
+                except Exception:
+                    pass
+                r["profile_image"] = url
+        return rows
+
+    def get(self, request, kind, board_id=None):
+        board_id = board_id or request.query_params.get("board") or None
+        around = (request.query_params.get("around") or "").strip().lower()
+        season = (request.query_params.get("season") or "").strip().lower()
+        try:
+            board_id = int(board_id) if board_id else None
+            # ?season=1404 یا current → RankingStanding همان فصل؛ بدون آن امتیاز کل دوران
+            season = ranking_service.season_for() if season == "current" else (int(season) if season else None)
+            if around:
+                subject_id = self._my_subject_id(request, kind) if around == "me" else int(around)
+                if not subject_id:
+                    return Response({"detail": "موقعیت شما در این جدول مشخص نیست."},
+                                    status=status.HTTP_404_NOT_FOUND)
+                data = leaderboard_service.around(
+                    kind, subject_id, board_id=board_id,
+                    window=request.query_params.get("window") or 5, season=season,
+                )
+            else:
+                data = leaderboard_service.page(
+                    kind, board_id=board_id,
+                    cursor=request.query_params.get("cursor") or None,
+                    limit=request.query_params.get("limit") or 20, season=season,
+                )
+        except (leaderboard_service.LeaderboardError, ValueError) as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        self._media(request, data["results"])
+        data.update({"kind": kind, "board_id": board_id, "season": season})
+        return Response(data, status=status.HTTP_200_OK)
+
+
 
 def public_bracket_view(request, public_id):
     comp = KyorugiCompetition.objects.filter(public_id=public_id).first()
@@ -1437,11 +1345,12 @@ def public_bracket_view(request, public_id):
         .order_by("weight_category__min_weight", "id")
     )
 
-    data = {
-        "board_logo_url": _logo_url(),
-        "draws": DrawWithMatchesSerializer(draws_qs, many=True).data,  # از سریالایزر فعلی‌ات استفاده کن
-    }
-    return Response(data, status=200)
+    def build():
+        return {
+            "board_logo_url": _logo_url(),
+            "draws": DrawWithMatchesSerializer(draws_qs, many=True).data,  # از سریالایزر فعلی‌ات استفاده کن
+        }
+    return Response(get_or_build("brackets", ("public", comp.pk), build), status=200)
 
 
 
@@ -1470,18 +1379,7 @@ class SeminarListView(generics.ListAPIView):
 
         role = (self.request.query_params.get("role") or "").strip().lower()
         if role and role not in ("club", "heyat"):
-            if role == "both":
-                wanted = {"coach", "referee"}
-                ids = [
-                    s.id for s in qs.only("id", "allowed_roles")
-                    if not (s.allowed_roles or []) or (wanted & set(s.allowed_roles or []))
-                ]
-            else:
-                ids = [
-                    s.id for s in qs.only("id", "allowed_roles")
-                    if not (s.allowed_roles or []) or (role in (s.allowed_roles or []))
-                ]
-            qs = qs.filter(id__in=ids)
+            qs = qs.filter(Seminar.role_filter(role))
 
         date_from = (self.request.query_params.get("date_from") or "").strip()
         date_to   = (self.request.query_params.get("date_to") or "").strip()
@@ -1604,20 +1502,7 @@ def sidebar_seminars(request):
         qs = qs.order_by("event_date", "-created_at")
 
     if role not in ("club", "heyat"):
-        superset = list(qs[:200])
-
-        def role_ok(s):
-            allowed = (s.allowed_roles or [])
-            if not allowed:
-                return True
-            if role == "both":
-                return ("coach" in allowed) or ("referee" in allowed)
-            return role in allowed
-
-        filtered = [s for s in superset if role_ok(s)]
-        qs = filtered[:limit]
-        data = SeminarCardSerializer(qs, many=True, context={"request": request}).data
-        return Response(data)
+        qs = qs.filter(Seminar.role_filter(role))
 
     qs = qs[:limit]
     data = SeminarCardSerializer(qs, many=True, context={"request": request}).data
@@ -1632,14 +1517,14 @@ class PoomsaeKwargMixin:
         return kwargs.get("public_id") or kwargs.get("key")
 
 class PoomsaeCoachApprovalStatusView(PoomsaeKwargMixin, APIView):
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [VersionedJWTAuthentication]
     permission_classes = [IsAuthenticated]
 
     def get(self, request, *args, **kwargs):
         public_id = self.get_public_id_from_kwargs(**kwargs)
         comp = get_object_or_404(PoomsaeCompetition, public_id=public_id)
 
-        coach = UserProfile.objects.filter(user=request.user, role__in=["coach", "both"]).first()
+        coach = get_actor(request).coach_profile
         if not coach:
             return Response({"detail": "پروفایل مربی یافت نشد."}, status=404)
 
@@ -1665,7 +1550,7 @@ class PoomsaeCoachApprovalStatusView(PoomsaeKwargMixin, APIView):
         }, status=200)
 
 class PoomsaeCoachApprovalApproveView(PoomsaeKwargMixin, APIView):
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [VersionedJWTAuthentication]
     permission_classes = [IsAuthenticated, IsCoach]
 
     @transaction.atomic
@@ -1673,7 +1558,7 @@ class PoomsaeCoachApprovalApproveView(PoomsaeKwargMixin, APIView):
         public_id = self.get_public_id_from_kwargs(**kwargs)
         comp = get_object_or_404(PoomsaeCompetition, public_id=public_id)
 
-        coach = UserProfile.objects.filter(user=request.user, role__in=["coach", "both"]).first()
+        coach = get_actor(request).coach_profile
         if not coach:
             return Response({"detail": "پروفایل مربی یافت نشد."}, status=404)
 
@@ -1699,7 +1584,7 @@ class PoomsaeCoachApprovalApproveView(PoomsaeKwargMixin, APIView):
         return Response({"ok": True, "code": appr.code}, status=200)
 
 class PoomsaeCompetitionDetailView(views.APIView):
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [VersionedJWTAuthentication]
     permission_classes = [permissions.AllowAny]
 
     def get(self, request, key):
@@ -1709,13 +1594,9 @@ class PoomsaeCompetitionDetailView(views.APIView):
             .prefetch_related("images", "files")
         )
 
-        s = str(key).strip()
-        if s.isdigit():
-            comp = get_object_or_404(base_qs, id=int(s))
-        else:
-            comp = base_qs.filter(public_id__iexact=s).first() or base_qs.filter(slug__iexact=s).first()
-            if not comp:
-                raise Http404("PoomsaeCompetition not found")
+        comp = competition_key_service.get_competition(key, kinds=("poomsae",), queryset=base_qs)
+        if not comp:
+            raise Http404("PoomsaeCompetition not found")
 
         reg_open_effective = comp.registration_open_effective
 
@@ -1739,7 +1620,7 @@ class PoomsaeCompetitionDetailView(views.APIView):
         })
 
         if request.user and request.user.is_authenticated:
-            coach = UserProfile.objects.filter(user=request.user, role__in=["coach", "both"]).first()
+            coach = get_actor(request).coach_profile
             if coach:
                 appr = PoomsaeCoachApproval.objects.filter(
                     competition=comp, coach=coach, is_active=True
@@ -1749,8 +1630,7 @@ class PoomsaeCompetitionDetailView(views.APIView):
                     "code": appr.code if appr and appr.is_active else None,
                 }
 
-            player = UserProfile.objects.filter(user=request.user, role__in=["player", "both"])\
-                                        .only("gender","belt_grade","national_code","birth_date").first()
+            player = get_actor(request).player_profile
             if player:
                 birth_text = _birth_jalali_from_profile(player)
                 belt_val = getattr(player, "belt_grade", "") or getattr(player, "belt_name", "") or ""
@@ -1771,7 +1651,7 @@ class PoomsaeCompetitionDetailView(views.APIView):
 
 # --- PoomsaeRegisterSelfView (fixed) ---
 class PoomsaeRegisterSelfView(APIView):
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [VersionedJWTAuthentication]
     permission_classes = [IsAuthenticated]
 
     def _get_first(self, data, *keys, default=""):
@@ -1798,32 +1678,8 @@ class PoomsaeRegisterSelfView(APIView):
           - ISO datetime مثل 'YYYY-MM-DDTHH:mm:ssZ'
         خروجی: 'YYYY-MM-DD' گریگوریان (بدون جابه‌جایی روز).
         """
-        if not s:
-            return ""
-        import re as _re
-        t = str(s).strip()
-        # اگر ISO datetime است، فقط تاریخ را بردار
-        if "T" in t:
-            t = t.split("T", 1)[0]
-        # پاک‌سازی و یکسان‌سازی
-        t = _re.sub(r"[\u200e\u200f\u200c\u202a-\u202e]", "", t)
-        t = t.translate(str.maketrans("۰۱۲۳۴۵۶۷۸۹٠١٢٣٤٥٦٧٨٩", "01234567890123456789")).replace("-", "/")
-
-        m = _re.fullmatch(r"(\d{4})/(\d{1,2})/(\d{1,2})", t)
-        if not m:
-            return ""
-
-        y, m_, d = map(int, m.groups())
-        try:
-            if y < 1700:
-                # جلالی→گریگوریان: با ساعت 12 ظهر تا هیچ DST/Timezone شِفتی اتفاق نیفتد
-                jdt = jdatetime.datetime(y, m_, d, 12, 0, 0)
-                g = jdt.togregorian().date()
-            else:
-                g = _date(y, m_, d)
-            return f"{g.year:04d}-{g.month:02d}-{g.day:02d}"
-        except Exception:
-            return ""
+        d = normalize.parse_date(s)
+        return d.isoformat() if d else ""
 
     def _as_plain_dict(self, data):
         out = {}
@@ -1839,30 +1695,13 @@ class PoomsaeRegisterSelfView(APIView):
         return out
 
     def _get_comp_by_key(self, key):
-        s = str(key).strip()
-        base = PoomsaeCompetition.objects.all()
-        if s.isdigit():
-            obj = base.filter(id=int(s)).first()
-            if obj: return obj
-        obj = base.filter(public_id__iexact=s).first() or base.filter(slug__iexact=s).first()
-        if obj: return obj
-        raise Http404("PoomsaeCompetition not found")
+        obj = competition_key_service.get_competition(key, kinds=("poomsae",))
+        if obj is None:
+            raise Http404("PoomsaeCompetition not found")
+        return obj
 
     def _to_greg_date(self, val):
-        if not val:
-            return None
-        if isinstance(val, _date):
-            return val
-        t = str(val).strip().replace("-", "/")
-        t = t.translate(str.maketrans("۰۱۲۳۴۵۶۷۸۹٠١٢٣٤٥٦٧٨٩","01234567890123456789"))
-        try:
-            y, m, d = map(int, t.split("/")[:3])
-            if y < 1700:
-                g = jdatetime.date(y, m, d).togregorian()
-                return _date(g.year, g.month, g.day)
-            return _date(y, m, d)
-        except Exception:
-            return None
+        return normalize.parse_date(val, loose=True)
 
     @transaction.atomic
     def post(self, request, *args, **kwargs):
@@ -1872,8 +1711,7 @@ class PoomsaeRegisterSelfView(APIView):
         if not comp.registration_open_effective:
             return Response({"detail": "ثبت‌نام این مسابقه فعال نیست."}, status=status.HTTP_400_BAD_REQUEST)
 
-        player = UserProfile.objects.filter(user=request.user, role__in=["player", "both"])\
-                                    .select_related("club","tkd_board").first()
+        player = get_actor(request).player_profile
         if not player:
             return Response({"detail": "پروفایل بازیکن یافت نشد."}, status=status.HTTP_404_NOT_FOUND)
 
@@ -2009,21 +1847,16 @@ class CompetitionLookupMixin:
 
 
 class MyPoomsaeEnrollmentsView(views.APIView):
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [VersionedJWTAuthentication]
     permission_classes = [permissions.IsAuthenticated]
 
     def get(self, request, key):
-        # پیداکردن مسابقه پومسه با public_id/slug/id
-        s = str(key).strip()
-        base_qs = PoomsaeCompetition.objects.all()
-        if s.isdigit():
-            comp = get_object_or_404(base_qs, id=int(s))
-        else:
-            comp = base_qs.filter(public_id__iexact=s).first() or base_qs.filter(slug__iexact=s).first()
-            if not comp:
-                raise Http404("PoomsaeCompetition not found")
+        # پیداکردن مسابقه پومسه با public_id/id
+        comp = competition_key_service.get_competition(key, kinds=("poomsae",))
+        if not comp:
+            raise Http404("PoomsaeCompetition not found")
 
-        player = UserProfile.objects.filter(user=request.user, role__in=["player", "both"]).first()
+        player = get_actor(request).player_profile
         if not player:
             return Response({"standard": None, "creative": None}, status=200)
 
@@ -2037,6 +1870,7 @@ class MyPoomsaeEnrollmentsView(views.APIView):
             if not e: return None
             return {
                 "enrollment_id": e.id,
+                "card_id": card_service.card_id("poomsae", e.id),
                 "status": e.status,
                 "can_show_card": _can_show_card(e.status, getattr(e, "is_paid", False))
             }
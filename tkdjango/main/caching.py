@@ -0,0 +1,216 @@
+# main/caching.py
+# -*- coding: utf-8 -*-
+"""
+لایهٔ کش مشترک پروژه (cache-aside):
+    data = get_or_build("news", ("list", host), build)
+  - کلید = <namespace>:v<نسخهٔ namespace>:<hash اجزا>؛ invalidate(namespace) فقط نسخه را یک واحد بالا می‌برد
+  - single-flight: روی miss فقط یک سازنده (در پروسه با قفل، بین پروسه‌ها با cache.add) و بقیه منتظر نتیجه
+  - ذخیره/حذف مدل‌های NAMESPACES بعد از commit نسخهٔ namespace مربوط را بالا می‌برد (connect در MainConfig.ready)
+backend در settings.CACHES (CACHE_BACKEND=file|redis|locmem) انتخاب می‌شود؛ invalidate بین worker ها فقط با file/redis کار می‌کند
+و check_shared_cache برای locmem با DEBUG=False هشدار می‌دهد.
+
+payload های JSON پرتکرار (فرم‌های ثبت‌نام) با get_or_build_json یک بار سریالایز و gzip می‌شوند و
+blob_response همان بایت‌ها را با ETag (و 304 برای If-None-Match) برمی‌گرداند.
+"""
+import gzip
+import hashlib
+import json
+import logging
+import threading
+import time
+
+from django.apps import apps
+from django.conf import settings
+from django.core import checks
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.cache import patch_vary_headers
+from django.utils.http import parse_etags
+
+logger = logging.getLogger(__name__)
+
+# namespace → مدل‌هایی که تغییرشان کش آن namespace را باطل می‌کند
+NAMESPACES = {
+    "competitions": (
+        "competitions.KyorugiCompetition", "competitions.PoomsaeCompetition",
+        "competitions.CoachApproval", "competitions.PoomsaeCoachApproval",
+        "competitions.AgeCategory",
+    ),
+    "brackets": (
+        "competitions.KyorugiCompetition", "competitions.Draw", "competitions.Match",
+        "competitions.WeightCategory",
+    ),
+    "news": ("main.News", "main.NewsImage", "main.Circular", "main.CircularImage", "main.CircularAttachment",
+             "main.SliderImage", "main.HeaderBackground"),
+    # تغییر UserProfile فقط وقتی مربی است (accounts.signals)، نه با هر ذخیرهٔ پروفایل
+    "form_data": ("accounts.TkdBoard", "accounts.TkdClub"),
+}
+
+_MISS = object()
+_STRIPES = [threading.Lock() for _ in range(64)]
+
+
+def cache_settings() -> dict:
+    cfg = dict(getattr(settings, "CACHE_LAYER", {}) or {})
+    cfg.setdefault("ENABLED", True)
+    cfg.setdefault("DEFAULT_TTL", 300)
+    cfg.setdefault("TTL", {})
+    cfg.setdefault("LOCK_SECONDS", 10)    # حداکثر عمر قفل سازنده
+    cfg.setdefault("WAIT_SECONDS", 3.0)   # حداکثر انتظار بقیه برای نتیجهٔ سازنده
+    return cfg
+
+
+# backend هایی که هر پروسه کپی خودش را دارد (باطل‌سازی به worker های دیگر نمی‌رسد)
+LOCAL_BACKENDS = (
+    "django.core.cache.backends.locmem.LocMemCache",
+    "django.core.cache.backends.dummy.DummyCache",
+)
+
+
+def is_shared(alias: str = "default") -> bool:
+    """آیا کش alias بین worker ها مشترک است (file/redis/memcached)؟"""
+    backend = (getattr(settings, "CACHES", {}).get(alias) or {}).get("BACKEND", "")
+    return backend not in LOCAL_BACKENDS
+
+
+@checks.register(checks.Tags.caches)
+def check_shared_cache(app_configs=None, **kwargs):
+    if settings.DEBUG or is_shared():
+        return []
+    return [checks.Warning(
+        "کش default بین worker ها مشترک نیست؛ باطل‌سازی کش، نسخهٔ توکن‌ها و شمارنده‌های OTP به worker های دیگر نمی‌رسد.",
+        hint="در production از CACHE_BACKEND=file یا redis استفاده کنید.",
+        id="main.W001",
+    )]
+
+
+def _ns_key(namespace: str) -> str:
+    return f"ns:{namespace}"
+
+
+def ns_version(namespace: str) -> int:
+    v = cache.get(_ns_key(namespace))
+    if v is None:
+        cache.add(_ns_key(namespace), 1, None)
+        v = cache.get(_ns_key(namespace)) or 1
+    return int(v)
+
+
+def invalidate(namespace: str):
+    try:
+        cache.incr(_ns_key(namespace))
+    except ValueError:   # کلید نبود (یا evict شده بود)
+        cache.set(_ns_key(namespace), int(time.time()), None)
+
+
+def make_key(namespace: str, parts=()) -> str:
+    raw = "|".join(str(p) for p in parts)
+    digest = hashlib.md5(raw.encode("utf-8")).hexdigest()
+    return f"{namespace}:v{ns_version(namespace)}:{digest}"
+
+
+def get_or_build(namespace: str, parts, builder, ttl=None):
+    """مقدار کش‌شده یا builder() (فقط یک سازنده هم‌زمان برای هر کلید)."""
+    cfg = cache_settings()
+    if not cfg["ENABLED"]:
+        return builder()
+    if ttl is None:
+        ttl = cfg["TTL"].get(namespace, cfg["DEFAULT_TTL"])
+
+    key = make_key(namespace, parts)
+    val = cache.get(key, _MISS)
+    if val is not _MISS:
+        return val
+
+    with _STRIPES[hash(key) % len(_STRIPES)]:
+        val = cache.get(key, _MISS)
+        if val is not _MISS:
+            return val
+
+        lock_key = f"{key}:lock"
+        if cache.add(lock_key, 1, cfg["LOCK_SECONDS"]):
+            try:
+                val = builder()
+                cache.set(key, val, ttl)
+                return val
+            finally:
+                cache.delete(lock_key)
+
+        # پروسهٔ دیگری در حال ساخت است
+        deadline = time.monotonic() + float(cfg["WAIT_SECONDS"])
+        while time.monotonic() < deadline:
+            time.sleep(0.05)
+            val = cache.get(key, _MISS)
+            if val is not _MISS:
+                return val
+        logger.warning("cache single-flight wait timed out for %s", key)
+        return builder()
+
+
+def get_or_build_json(namespace: str, parts, builder, ttl=None) -> dict:
+    """مثل get_or_build، ولی چیزی که در کش می‌ماند JSON فشرده است: {"etag", "gz", "size"}."""
+    def build():
+        raw = json.dumps(builder(), ensure_ascii=False, separators=(",", ":"), cls=DjangoJSONEncoder).encode()
+        return {"etag": f'"{hashlib.md5(raw).hexdigest()}"', "gz": gzip.compress(raw, 6), "size": len(raw)}
+    return get_or_build(namespace, parts, build, ttl)
+
+
+def etag_matches(request, etag: str) -> bool:
+    inm = request.META.get("HTTP_IF_NONE_MATCH")
+    if not inm:
+        return False
+    tags = parse_etags(inm)
+    return "*" in tags or etag in tags or f"W/{etag}" in tags
+
+
+def blob_response(request, blob: dict, private: bool = False):
+    """
+    پاسخ blob ساخته‌شده با get_or_build_json: 304 اگر ETag یکی بود، وگرنه همان gzip (یا JSON باز برای
+    کلاینت‌های بدون gzip). no-cache یعنی مرورگر ذخیره می‌کند ولی هر بار با If-None-Match می‌پرسد.
+    """
+    if etag_matches(request, blob["etag"]):
+        resp = HttpResponseNotModified()
+    elif "gzip" in request.META.get("HTTP_ACCEPT_ENCODING", ""):
+        resp = HttpResponse(blob["gz"], content_type="application/json")
+        resp["Content-Encoding"] = "gzip"
+    else:
+        resp = HttpResponse(gzip.decompress(blob["gz"]), content_type="application/json")
+    resp["ETag"] = blob["etag"]
+    resp["Cache-Control"] = f"{'private' if private else 'public'}, no-cache"
+    patch_vary_headers(resp, ("Accept-Encoding",))
+    return resp
+
+
+def request_host(request) -> str:
+    """بخشی از کلید برای داده‌هایی که آدرس مطلق (build_absolute_uri) دارند."""
+    try:
+        return f"{request.scheme}://{request.get_host()}"
+    except Exception:
+        return ""
+
+
+def _on_change(namespaces):
+    def handler(sender, instance=None, **kwargs):
+        if kwargs.get("raw"):
+            return
+        for ns in namespaces:
+            transaction.on_commit(lambda ns=ns: invalidate(ns))
+    return handler
+
+
+def connect():
+    by_model = {}
+    for ns, labels in NAMESPACES.items():
+        for label in labels:
+            by_model.setdefault(label, []).append(ns)
+    for label, namespaces in by_model.items():
+        try:
+            model = apps.get_model(label)
+        except LookupError:
+            continue
+        handler = _on_change(tuple(namespaces))
+        post_save.connect(handler, sender=model, weak=False, dispatch_uid=f"cache_ns_save:{label}")
+        post_delete.connect(handler, sender=model, weak=False, dispatch_uid=f"cache_ns_delete:{label}")
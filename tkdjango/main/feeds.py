@@ -0,0 +1,68 @@
+# main/feeds.py
+# -*- coding: utf-8 -*-
+"""
+صفحه‌بندی keyset اخبار و بخش‌نامه‌ها (بدون OFFSET):
+  - ترتیب (-created_at, -id)؛ cursor = created_at و id آخرین ردیف صفحه
+  - فقط ردیف‌های همان صفحه با prefetch (images / attachments) خوانده می‌شوند
+"""
+from __future__ import annotations
+
+import base64
+from datetime import datetime
+from typing import Optional, Tuple
+
+from django.db.models import Q
+
+from .models import Circular, News
+
+DEFAULT_LIMIT = 12
+MAX_LIMIT = 50
+
+
+class FeedError(ValueError):
+    pass
+
+
+def encode_cursor(created_at: datetime, pk: int) -> str:
+    raw = f"{created_at.isoformat()}|{int(pk)}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        pad = "=" * (-len(cursor) % 4)
+        ts, pk = base64.urlsafe_b64decode(cursor + pad).decode().split("|")
+        return datetime.fromisoformat(ts), int(pk)
+    except Exception:
+        raise FeedError("cursor نامعتبر است.")
+
+
+def published_news():
+    return News.objects.filter(published=True).prefetch_related("images")
+
+
+def published_circulars():
+    return (Circular.objects.filter(published=True)
+            .select_related("author").prefetch_related("images", "attachments"))
+
+
+def clean_limit(limit) -> int:
+    """limit درخواست را به بازهٔ ۱ تا MAX_LIMIT می‌برد."""
+    try:
+        return max(1, min(int(limit or DEFAULT_LIMIT), MAX_LIMIT))
+    except (TypeError, ValueError):
+        raise FeedError("limit نامعتبر است.")
+
+
+def page(qs, cursor: Optional[str] = None, limit=DEFAULT_LIMIT) -> dict:
+    """خروجی: {"items": [مدل‌ها], "next": cursor صفحهٔ بعد یا None}"""
+    limit = clean_limit(limit)
+    if cursor:
+        ts, pk = decode_cursor(cursor)
+        qs = qs.filter(Q(created_at__lt=ts) | Q(created_at=ts, pk__lt=pk))
+
+    items = list(qs.order_by("-created_at", "-pk")[: limit + 1])
+    has_more = len(items) > limit
+    items = items[:limit]
+    last = items[-1] if has_more and items else None
+    return {"items": items, "next": encode_cursor(last.created_at, last.pk) if last else None}
@@ -0,0 +1,206 @@
+# main/images.py
+# -*- coding: utf-8 -*-
+"""
+نسخه‌های کوچک‌شدهٔ تصاویر (عکس پروفایل، پوستر، اسلایدر، خبر) کنار فایل اصلی:
+    player_photos/abc.jpg  →  player_photos/abc.thumb.webp
+نسخه‌ها هنگام آپلود (post_save) ساخته می‌شوند و سریالایزرها به جای فایل اصلی آدرس نسخهٔ مناسب را برمی‌گردانند.
+نسخهٔ ناموجود (lazy) هرگز داخل درخواست ساخته نمی‌شود: آدرس فایل اصلی برمی‌گردد و ساخت نسخه
+بعد از commit در thread پس‌زمینه صف می‌شود (یا با دستور build_image_variants).
+"""
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
+
+# name → (width, height, mode) ؛ cover = برش به اندازهٔ دقیق، fit = جا شدن در کادر بدون برش
+VARIANTS = {
+    "thumb": (160, 160, "cover"),   # آواتار / لیست‌ها
+    "card":  (360, 480, "cover"),   # کارت شناسایی و داشبورد (۳×۴)
+    "list":  (640, 640, "fit"),     # پوستر در کارت‌های لیست
+    "large": (1280, 1280, "fit"),   # اسلایدر / صفحهٔ خبر
+}
+
+# "app_label.Model" → {field: (variants…)}
+IMAGE_FIELDS = {
+    "accounts.UserProfile":            {"profile_image": ("thumb", "card")},
+    "competitions.KyorugiCompetition": {"poster": ("thumb", "list")},
+    "competitions.PoomsaeCompetition": {"poster": ("thumb", "list")},
+    "competitions.Seminar":            {"poster": ("thumb", "list")},
+    "main.SliderImage":                {"image": ("large",)},
+    "main.News":                       {"image": ("list", "large")},
+    "main.Circular":                   {"thumbnail": ("list",)},
+}
+
+_known = set()
+_known_lock = threading.Lock()
+_KNOWN_MAX = 20000
+
+_pending = set()        # (storage, نام نسخه) های در صف ساخت
+_executor = None
+
+
+def image_settings() -> dict:
+    cfg = dict(getattr(settings, "IMAGE_VARIANTS", {}) or {})
+    cfg.setdefault("FORMAT", "webp")
+    cfg.setdefault("QUALITY", 80)
+    cfg.setdefault("LAZY", True)
+    cfg.setdefault("LAZY_WORKERS", 1)   # thread های ساخت نسخه‌های ناموجود در پس‌زمینه
+    cfg.setdefault("ON_UPLOAD", True)
+    return cfg
+
+
+def _format():
+    fmt = str(image_settings()["FORMAT"]).lower()
+    if fmt == "webp":
+        try:
+            from PIL import features
+            if not features.check("webp"):
+                fmt = "jpeg"
+        except Exception:
+            fmt = "jpeg"
+    return "jpeg" if fmt in ("jpg", "jpeg") else fmt
+
+
+def variant_name(name: str, variant: str) -> str:
+    root, _ext = os.path.splitext(name)
+    ext = "jpg" if _format() == "jpeg" else _format()
+    return f"{root}.{variant}.{ext}"
+
+
+def _remember(key):
+    with _known_lock:
+        if len(_known) >= _KNOWN_MAX:
+            _known.clear()
+        _known.add(key)
+
+
+def _render(fieldfile, variant: str) -> bytes:
+    from PIL import Image, ImageOps
+
+    w, h, mode = VARIANTS[variant]
+    fmt = _format()
+    with fieldfile.storage.open(fieldfile.name, "rb") as fh:
+        img = Image.open(fh)
+        img = ImageOps.exif_transpose(img)
+        if fmt == "jpeg" or img.mode not in ("RGB", "RGBA"):
+            img = img.convert("RGBA" if (fmt != "jpeg" and "A" in img.getbands()) else "RGB")
+        if mode == "cover":
+            img = ImageOps.fit(img, (w, h), Image.LANCZOS)
+        else:
+            img.thumbnail((w, h), Image.LANCZOS)
+        out = BytesIO()
+        opts = {"quality": int(image_settings()["QUALITY"])}
+        if fmt == "jpeg":
+            opts.update(optimize=True, progressive=True)
+        else:
+            opts["method"] = 4
+        img.save(out, fmt.upper(), **opts)
+        return out.getvalue()
+
+
+def ensure_variant(fieldfile, variant: str, create: bool = True):
+    """نام فایل نسخه (در صورت نبود و create=True می‌سازد)؛ در خطا None."""
+    name = getattr(fieldfile, "name", "") or ""
+    if not name or variant not in VARIANTS:
+        return None
+    storage = fieldfile.storage
+    vname = variant_name(name, variant)
+    key = (id(storage), vname)
+    if key in _known:
+        return vname
+    try:
+        if storage.exists(vname):
+            _remember(key)
+            return vname
+        if not create or not storage.exists(name):
+            return None
+        saved = storage.save(vname, ContentFile(_render(fieldfile, variant)))
+        if saved != vname:  # هم‌زمان ساخته شده بود
+            storage.delete(saved)
+        _remember(key)
+        return vname
+    except Exception as e:
+        logger.warning("image variant %s for %s failed: %s", variant, name, e)
+        return None
+
+
+def delete_variants(storage, name: str, variants=None) -> int:
+    """نسخه‌های ساخته‌شده از name را حذف می‌کند (وقتی فایل اصلی جایگزین یا جابه‌جا شده است)."""
+    if not name:
+        return 0
+    removed = 0
+    for variant in variants or VARIANTS:
+        vname = variant_name(name, variant)
+        with _known_lock:
+            _known.discard((id(storage), vname))
+        try:
+            if storage.exists(vname):
+                storage.delete(vname)
+                removed += 1
+        except Exception as e:
+            logger.warning("could not delete image variant %s: %s", vname, e)
+    return removed
+
+
+def generate_variants(fieldfile, variants) -> int:
+    return sum(1 for v in variants if ensure_variant(fieldfile, v))
+
+
+def _build_in_background(fieldfile, variant: str, key):
+    try:
+        ensure_variant(fieldfile, variant)
+    finally:
+        with _known_lock:
+            _pending.discard(key)
+
+
+def _submit(fieldfile, variant: str, key):
+    global _executor
+    with _known_lock:
+        if key in _pending or key in _known:
+            return
+        _pending.add(key)
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=max(1, int(image_settings()["LAZY_WORKERS"])),
+                                           thread_name_prefix="image-variants")
+    _executor.submit(_build_in_background, fieldfile, variant, key)
+
+
+def schedule_variant(fieldfile, variant: str):
+    """ساخت نسخه را (یک بار برای هر فایل) بعد از commit به thread پس‌زمینه می‌سپارد."""
+    name = getattr(fieldfile, "name", "") or ""
+    key = (id(fieldfile.storage), variant_name(name, variant))
+    if key in _pending:
+        return
+    transaction.on_commit(lambda: _submit(fieldfile, variant, key))
+
+
+def variant_url(fieldfile, variant: str, request=None):
+    """
+    آدرس نسخهٔ variant (مطلق اگر request داده شود)؛ اگر نسخه هنوز ساخته نشده، آدرس فایل اصلی
+    (و در حالت LAZY ساخت آن در پس‌زمینه صف می‌شود).
+    """
+    if not fieldfile or not (getattr(fieldfile, "name", "") or ""):
+        return None
+    vname = ensure_variant(fieldfile, variant, create=False)
+    if vname is None and variant in VARIANTS and image_settings()["LAZY"]:
+        schedule_variant(fieldfile, variant)
+    try:
+        url = fieldfile.storage.url(vname) if vname else fieldfile.url
+    except Exception:
+        return None
+    if request is not None and not str(url).startswith("http"):
+        return request.build_absolute_uri(url)
+    return url
+
+
+def variants_for(model, field_name):
+    label = f"{model._meta.app_label}.{model.__name__}"
+    return IMAGE_FIELDS.get(label, {}).get(field_name, ())
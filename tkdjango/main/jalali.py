@@ -0,0 +1,137 @@
+# main/jalali.py
+# -*- coding: utf-8 -*-
+"""
+تبدیل/قالب‌بندی تاریخ میلادی ↔ شمسی با کش:
+  - format_date / to_jalali: یک LRU محدود با کلید تاریخ (سریالایزرهای لیستی هر تاریخ را چند بار می‌پرسند)
+  - format_many: قالب‌بندی دسته‌ای (برای لیست‌های بزرگ از جدول روزها)
+  - DayTable: جدول ازپیش‌محاسبه‌شدهٔ روز میلادی ↔ شمسی برای گزارش‌ها و خروجی‌ها (ساخت lazy، یک بار در هر پروسه)
+datetime آگاه به منطقهٔ زمانی قبل از تبدیل به وقت محلی برده می‌شود.
+"""
+import threading
+from datetime import date as _date, datetime as _datetime
+from functools import lru_cache
+from typing import Iterable, List, Optional, Tuple
+
+import jdatetime
+from django.utils import timezone
+
+LRU_SIZE = 4096
+TABLE_YEARS = (1920, 2060)      # بازهٔ میلادی جدول روزها
+BULK_MIN = 64                   # از این تعداد به بالا format_many از جدول استفاده می‌کند
+
+_MONTH_DAYS = (31, 31, 31, 31, 31, 31, 30, 30, 30, 30, 30, 29)
+
+
+def as_date(value) -> Optional[_date]:
+    """date/datetime → date (datetime آگاه به وقت محلی)؛ بقیه None."""
+    if isinstance(value, _datetime):
+        if timezone.is_aware(value):
+            value = timezone.localtime(value)
+        return value.date()
+    if isinstance(value, _date):
+        return value
+    return None
+
+
+@lru_cache(maxsize=LRU_SIZE)
+def _g2j(d: _date) -> jdatetime.date:
+    return jdatetime.date.fromgregorian(date=d)
+
+
+@lru_cache(maxsize=LRU_SIZE)
+def _fmt(d: _date, sep: str) -> str:
+    j = _g2j(d)
+    return f"{j.year:04d}{sep}{j.month:02d}{sep}{j.day:02d}"
+
+
+def to_jalali(value) -> Optional[jdatetime.date]:
+    d = as_date(value)
+    if d is None:
+        return None
+    try:
+        return _g2j(d)
+    except Exception:
+        return None
+
+
+def format_date(value, sep: str = "/") -> Optional[str]:
+    """تاریخ/دیتایم میلادی → 'YYYY/MM/DD' شمسی؛ ورودی نامعتبر → None."""
+    d = as_date(value)
+    if d is None:
+        return None
+    try:
+        return _fmt(d, sep)
+    except Exception:
+        return None
+
+
+class DayTable:
+    """ordinal میلادی ↔ (سال، ماه، روز) شمسی برای یک بازهٔ ثابت."""
+
+    def __init__(self, start: _date, end: _date):
+        self.base = start.toordinal()
+        self.last = end.toordinal()
+        j = jdatetime.date.fromgregorian(date=start)
+        y, m, d = j.year, j.month, j.day
+        leap = jdatetime.date(y, 1, 1).isleap()
+        self._days: List[Tuple[int, int, int]] = []
+        self._rev = {}
+        for i in range(self.last - self.base + 1):
+            self._days.append((y, m, d))
+            self._rev[(y, m, d)] = self.base + i
+            d += 1
+            if d > (30 if (m == 12 and leap) else _MONTH_DAYS[m - 1]):
+                d, m = 1, m + 1
+                if m > 12:
+                    m, y = 1, y + 1
+                    leap = jdatetime.date(y, 1, 1).isleap()
+
+    def g2j(self, d: _date) -> Optional[Tuple[int, int, int]]:
+        o = d.toordinal()
+        return self._days[o - self.base] if self.base <= o <= self.last else None
+
+    def j2g(self, y: int, m: int, d: int) -> Optional[_date]:
+        o = self._rev.get((y, m, d))
+        return _date.fromordinal(o) if o is not None else None
+
+
+_table: Optional[DayTable] = None
+_table_lock = threading.Lock()
+
+
+def table() -> DayTable:
+    global _table
+    if _table is None:
+        with _table_lock:
+            if _table is None:
+                _table = DayTable(_date(TABLE_YEARS[0], 1, 1), _date(TABLE_YEARS[1], 12, 31))
+    return _table
+
+
+def format_many(values: Iterable, sep: str = "/") -> List[Optional[str]]:
+    """قالب‌بندی دسته‌ای، هم‌ترتیب با ورودی."""
+    values = list(values)
+    if len(values) < BULK_MIN:
+        return [format_date(v, sep) for v in values]
+    t = table()
+    out = []
+    for v in values:
+        d = as_date(v)
+        ymd = t.g2j(d) if d is not None else None
+        if ymd is None:
+            out.append(format_date(d, sep) if d is not None else None)
+        else:
+            out.append(f"{ymd[0]:04d}{sep}{ymd[1]:02d}{sep}{ymd[2]:02d}")
+    return out
+
+
+def to_gregorian(y: int, m: int, d: int) -> Optional[_date]:
+    """شمسی → میلادی؛ داخل بازهٔ جدول (اگر ساخته شده) بدون jdatetime، در غیر این صورت jdatetime."""
+    if _table is not None:
+        g = _table.j2g(y, m, d)
+        if g is not None:
+            return g
+    try:
+        return jdatetime.date(y, m, d).togregorian()
+    except Exception:
+        return None
@@ -0,0 +1,79 @@
+# main/management/commands/bench_normalize.py
+import random
+import re
+import time
+from datetime import date as _date
+
+import jdatetime
+from django.core.management.base import BaseCommand
+
+from main import normalize
+
+
+def _legacy_parse(v):
+    """پیاده‌سازی قبلی (کپی هِلپرهای views): maketrans و regex در هر فراخوانی."""
+    if not v:
+        return None
+    t = str(v).strip()
+    if "T" in t:
+        t = t.split("T", 1)[0]
+    t = re.sub(r"[\u200e\u200f\u200c\u202a-\u202e]", "", t)
+    t = t.translate(str.maketrans("۰۱۲۳۴۵۶۷۸۹٠١٢٣٤٥٦٧٨٩", "01234567890123456789"))
+    t = t.replace("-", "/")
+    m = re.fullmatch(r"(\d{4})/(\d{1,2})/(\d{1,2})", t)
+    if not m:
+        return None
+    y, m_, d = map(int, m.groups())
+    try:
+        if y < 1700:
+            g = jdatetime.date(y, m_, d).togregorian()
+            return _date(g.year, g.month, g.day)
+        return _date(y, m_, d)
+    except Exception:
+        return None
+
+
+class Command(BaseCommand):
+    help = "بنچمارک یکدست‌سازی ارقام و تبدیل تاریخ شمسی (پیاده‌سازی قبلی در برابر main.normalize)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=20000, help="تعداد مقدار (مثل ردیف‌های یک فایل import)")
+        parser.add_argument("--distinct", type=int, default=3000, help="تعداد تاریخ متمایز بین ردیف‌ها")
+
+    def handle(self, *args, **opts):
+        rows, distinct = max(1, opts["rows"]), max(1, opts["distinct"])
+        rnd = random.Random(1402)
+        fa = str.maketrans("0123456789", "۰۱۲۳۴۵۶۷۸۹")
+        pool = []
+        for i in range(distinct):
+            s = f"{rnd.randint(1360, 1403)}/{rnd.randint(1, 12)}/{rnd.randint(1, 29)}"
+            if i % 3 == 0:
+                s = s.translate(fa)
+            elif i % 3 == 1:
+                s = "\u200f" + s.replace("/", "-")
+            pool.append(s)
+        values = [pool[rnd.randrange(distinct)] for _ in range(rows)]
+
+        def timed(label, fn):
+            t0 = time.perf_counter()
+            out = fn()
+            dt = time.perf_counter() - t0
+            self.stdout.write(f"{label:<28} {dt * 1000:8.1f}ms  {rows / dt:12.0f} rows/s")
+            return out
+
+        legacy = timed("legacy (per call)", lambda: [_legacy_parse(v) for v in values])
+        normalize._parse_str.cache_clear()
+        single = timed("normalize.parse_date", lambda: [normalize.parse_date(v) for v in values])
+        normalize._parse_str.cache_clear()
+        batch = timed("normalize.parse_dates", lambda: normalize.parse_dates(values))
+
+        timed("legacy digits", lambda: [
+            str(v).translate(str.maketrans("۰۱۲۳۴۵۶۷۸۹٠١٢٣٤٥٦٧٨٩", "01234567890123456789")) for v in values
+        ])
+        timed("normalize.digits_many", lambda: normalize.digits_many(values))
+
+        if legacy == single == batch:
+            self.stdout.write(self.style.SUCCESS("نتایج هر سه روش یکسان است."))
+        else:
+            diff = sum(1 for a, b in zip(legacy, batch) if a != b)
+            self.stdout.write(self.style.ERROR(f"{diff} نتیجهٔ متفاوت!"))
@@ -0,0 +1,38 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand
+
+from main.images import IMAGE_FIELDS, VARIANTS, generate_variants
+
+
+class Command(BaseCommand):
+    help = "ساخت نسخه‌های کوچک (thumb/card/list/large) برای تصاویر موجود"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--model", action="append", default=[],
+                            help="فقط این مدل‌ها (مثلاً accounts.UserProfile)؛ قابل تکرار")
+        parser.add_argument("--variant", action="append", default=[], choices=sorted(VARIANTS),
+                            help="فقط این نسخه‌ها؛ قابل تکرار")
+        parser.add_argument("--chunk", type=int, default=500)
+
+    def handle(self, *args, **opts):
+        labels = opts["model"] or list(IMAGE_FIELDS)
+        total_files = total_variants = 0
+        for label in labels:
+            fields = IMAGE_FIELDS.get(label)
+            if not fields:
+                self.stderr.write(self.style.WARNING(f"مدل ثبت نشده: {label}"))
+                continue
+            Model = apps.get_model(label)
+            for field, variants in fields.items():
+                variants = [v for v in variants if not opts["variant"] or v in opts["variant"]]
+                if not variants:
+                    continue
+                qs = Model.objects.exclude(**{field: ""}).exclude(**{f"{field}__isnull": True}).only("pk", field)
+                n_files = n_vars = 0
+                for obj in qs.iterator(chunk_size=opts["chunk"]):
+                    n_files += 1
+                    n_vars += generate_variants(getattr(obj, field), variants)
+                total_files += n_files
+                total_variants += n_vars
+                self.stdout.write(f"{label}.{field}: {n_files} فایل، {n_vars} نسخه")
+        self.stdout.write(self.style.SUCCESS(f"پایان: {total_files} فایل، {total_variants} نسخه آماده است."))
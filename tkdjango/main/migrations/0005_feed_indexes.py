@@ -0,0 +1,21 @@
+# Generated by Django 5.2.1 on 2026-10-19 14:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0004_alter_headerbackground_options'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='circular',
+            index=models.Index(fields=['published', '-created_at', '-id'], name='circular_pub_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='news',
+            index=models.Index(fields=['published', '-created_at', '-id'], name='news_pub_created_idx'),
+        ),
+    ]
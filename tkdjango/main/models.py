@@ -52,6 +52,10 @@ class News(models.Model):
         ordering = ['-created_at']
         verbose_name = "خبر"
         verbose_name_plural = "اخبار"
+        indexes = [
+            # فهرست اخبار منتشرشده (keyset: -created_at, -id در main.feeds)
+            models.Index(fields=["published", "-created_at", "-id"], name="news_pub_created_idx"),
+        ]
 
     def __str__(self):
         return self.title
@@ -73,6 +77,9 @@ class Circular(models.Model):
         ordering = ['-created_at']
         verbose_name = "بخش‌نامه"
         verbose_name_plural = "بخش‌نامه‌ها"
+        indexes = [
+            models.Index(fields=["published", "-created_at", "-id"], name="circular_pub_created_idx"),
+        ]
 
     def __str__(self):
         return self.title
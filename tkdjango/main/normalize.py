@@ -0,0 +1,116 @@
+# main/normalize.py
+# -*- coding: utf-8 -*-
+"""
+یکدست‌سازی ورودی کاربر/فایل‌های import (جدول‌ها و regex ها یک بار در import ماژول ساخته می‌شوند):
+  - digits: ارقام فارسی/عربی → لاتین
+  - clean: ارقام + حذف نویسه‌های کنترلی جهت‌نما (LRM/RLM/ZWNJ/embedding/isolate) در یک translate
+  - parse_date: تاریخ شمسی یا میلادی ('۱۴۰۲/۴/۵'، '1402-04-05'، ISO datetime، date) → date میلادی
+  - parse_dates / digits_many: نسخهٔ دسته‌ای برای هزاران مقدار (با جدول روزهای main.jalali)
+  - search_text / search_terms: متن قابل جستجو (ی/ک یکدست، بدون ZWNJ و اعراب، ارقام لاتین، حروف کوچک)
+سال کمتر از 1700 شمسی فرض می‌شود.
+"""
+import re
+from datetime import date as _date, datetime as _datetime
+from functools import lru_cache
+from typing import Iterable, List, Optional
+
+FA_DIGITS = "۰۱۲۳۴۵۶۷۸۹"
+AR_DIGITS = "٠١٢٣٤٥٦٧٨٩"
+CONTROL_CHARS = "\u200e\u200f\u200c\u202a\u202b\u202c\u202d\u202e\u2066\u2067\u2068\u2069"
+
+DIGITS = str.maketrans(FA_DIGITS + AR_DIGITS, "0123456789" * 2)
+CLEAN = {**DIGITS, **{ord(c): None for c in CONTROL_CHARS}}
+# برای تاریخ: علاوه بر CLEAN همهٔ جداکننده‌ها → '/'
+DATE = {**CLEAN, **{ord(c): "/" for c in "-.–—−\\"}}
+
+# جستجو: CLEAN + ي/ى→ی، ك→ک، ة→ه، أ/إ/ٱ→ا، ؤ→و، حذف اعراب و کشیده؛ هر نشانه‌گذاری → فاصله
+SEARCH = {
+    **CLEAN,
+    **{ord(a): b for a, b in zip("يىكةأإٱؤ", "ییکهاااو")},
+    **{c: None for c in range(0x064B, 0x0660)},   # اعراب (فتحه، کسره، تشدید، ...)
+    ord("\u0640"): None,                           # کشیده
+    ord("\u200d"): None,
+}
+SEARCH_SPLIT_RE = re.compile(r"[^\w]+")
+
+CONTROL_RE = re.compile(f"[{CONTROL_CHARS}]")
+DATE_RE = re.compile(r"(\d{4})/(\d{1,2})/(\d{1,2})")
+
+PARSE_CACHE_SIZE = 8192
+
+
+def digits(s) -> str:
+    return "" if s is None else str(s).translate(DIGITS)
+
+
+def clean(s) -> str:
+    """ارقام لاتین + بدون نویسه‌های کنترلی جهت‌نما (trim نمی‌کند)."""
+    return "" if s is None else str(s).translate(CLEAN)
+
+
+def digits_many(values: Iterable) -> List[str]:
+    t = DIGITS
+    return ["" if v is None else str(v).translate(t) for v in values]
+
+
+def _split_date(s: str, loose: bool):
+    t = s.strip()
+    if "T" in t:
+        t = t.split("T", 1)[0]
+    t = t.translate(DATE).strip()
+    m = DATE_RE.search(t) if loose else DATE_RE.fullmatch(t)
+    if not m:
+        return None
+    return int(m.group(1)), int(m.group(2)), int(m.group(3))
+
+
+@lru_cache(maxsize=PARSE_CACHE_SIZE)
+def _parse_str(s: str, loose: bool) -> Optional[_date]:
+    from main import jalali
+
+    ymd = _split_date(s, loose)
+    if ymd is None:
+        return None
+    y, m, d = ymd
+    if y < 1700:
+        return jalali.to_gregorian(y, m, d)
+    try:
+        return _date(y, m, d)
+    except ValueError:
+        return None
+
+
+def parse_date(value, loose: bool = False) -> Optional[_date]:
+    """
+    date/datetime/رشته → date میلادی یا None.
+    loose=True: تاریخ می‌تواند وسط متن باشد (مثل '1380/01/01 ساعت ...').
+    """
+    if value is None or value == "":
+        return None
+    if isinstance(value, _datetime):
+        return value.date()
+    if isinstance(value, _date):
+        return value
+    return _parse_str(str(value), loose)
+
+
+def parse_dates(values: Iterable, loose: bool = False) -> List[Optional[_date]]:
+    """نسخهٔ دسته‌ای parse_date؛ جدول روزها یک بار ساخته می‌شود و تبدیل شمسی بدون jdatetime است."""
+    from main import jalali
+
+    values = list(values)
+    if len(values) >= jalali.BULK_MIN:
+        jalali.table()
+    return [parse_date(v, loose) for v in values]
+
+
+def search_terms(value) -> List[str]:
+    """متن/عبارت جستجو → فهرست توکن‌های یکدست (بدون توکن خالی)."""
+    if value is None:
+        return []
+    return [t for t in SEARCH_SPLIT_RE.split(str(value).translate(SEARCH).lower()) if t]
+
+
+def search_text(*parts) -> str:
+    """اجزای یک رکورد (نام، نام خانوادگی، کد ملی، ...) → ستون search_text."""
+    return " ".join(t for p in parts for t in search_terms(p))
@@ -1,4 +1,5 @@
 from rest_framework import serializers
+from .images import variant_url
 from .models import HeaderBackground , SliderImage,News ,Circular, CircularImage,CircularAttachment,News,NewsImage
 
 class HeaderBackgroundSerializer(serializers.ModelSerializer):
@@ -8,10 +9,15 @@ class HeaderBackgroundSerializer(serializers.ModelSerializer):
 
 
 class SliderImageSerializer(serializers.ModelSerializer):
+    image = serializers.SerializerMethodField()
+
     class Meta:
         model = SliderImage
         fields = ['image', 'title']
 
+    def get_image(self, obj):
+        return variant_url(obj.image, "large", self.context.get('request'))
+
 class NewsImageSerializer(serializers.ModelSerializer):
     class Meta:
         model = NewsImage
@@ -19,10 +25,14 @@ class NewsImageSerializer(serializers.ModelSerializer):
 
 class NewsSerializer(serializers.ModelSerializer):
     images = NewsImageSerializer(many=True, read_only=True)  # 👈 اضافه شود
+    image_thumb = serializers.SerializerMethodField()
 
     class Meta:
         model = News
-        fields = ['id', 'title', 'content', 'image', 'author', 'created_at', 'images']
+        fields = ['id', 'title', 'content', 'image', 'image_thumb', 'author', 'created_at', 'images']
+
+    def get_image_thumb(self, obj):
+        return variant_url(obj.image, "list", self.context.get('request'))
 
 
 class CircularAttachmentSerializer(serializers.ModelSerializer):
@@ -58,7 +68,7 @@ class CircularSerializer(serializers.ModelSerializer):
     def get_thumbnail_url(self, obj):
         request = self.context.get('request')
         if obj.thumbnail and hasattr(obj.thumbnail, 'url'):
-            return request.build_absolute_uri(obj.thumbnail.url)
+            return variant_url(obj.thumbnail, "list", request)
         return ""
 
     def get_has_attachments(self, obj):
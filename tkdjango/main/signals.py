@@ -0,0 +1,50 @@
+# main/signals.py
+from django.apps import apps
+from django.db import transaction
+from django.db.models.signals import post_save, pre_save
+
+from .images import IMAGE_FIELDS, delete_variants, image_settings, schedule_variant
+
+
+def _image_fields(sender, update_fields):
+    fields = IMAGE_FIELDS.get(sender._meta.label, {})
+    if update_fields is not None:
+        fields = {f: v for f, v in fields.items() if f in update_fields}
+    return fields
+
+
+def _remember_images(sender, instance, **kwargs):
+    fields = _image_fields(sender, kwargs.get("update_fields"))
+    old = None
+    if instance.pk and fields and not kwargs.get("raw"):
+        old = sender.objects.filter(pk=instance.pk).values(*fields).first()
+    instance._images_before = old or {}
+
+
+def _build_variants(sender, instance, **kwargs):
+    if kwargs.get("raw"):
+        return
+    before = getattr(instance, "_images_before", {})
+    for field, variants in _image_fields(sender, kwargs.get("update_fields")).items():
+        ff = getattr(instance, field, None)
+        name = getattr(ff, "name", "") or ""
+        old = before.get(field) or ""
+        if old and old != name:
+            # فایل اصلی عوض یا جابه‌جا شد → نسخه‌های نام قبلی بعد از commit حذف شوند
+            storage = instance._meta.get_field(field).storage
+            transaction.on_commit(lambda storage=storage, old=old, variants=variants:
+                                  delete_variants(storage, old, variants))
+        if name and name != old and image_settings()["ON_UPLOAD"]:
+            # مثل نسخه‌های lazy: بعد از commit در thread پس‌زمینه، نه در thread درخواست
+            for variant in variants:
+                schedule_variant(ff, variant)
+
+
+def connect():
+    for label in IMAGE_FIELDS:
+        try:
+            model = apps.get_model(label)
+        except LookupError:
+            continue
+        pre_save.connect(_remember_images, sender=model, dispatch_uid=f"image_variants_before:{label}")
+        post_save.connect(_build_variants, sender=model, dispatch_uid=f"image_variants:{label}")
@@ -9,12 +9,14 @@ from .views import (
     CircularsListAPIView,
     CircularDetailAPIView,
     BoardNewsSubmitAPIView,
-    BoardMyNewsListAPIView
+    BoardMyNewsListAPIView,
+    HomeBundleAPIView,
 )
 
 urlpatterns = [
     path('header-background/', HeaderBackgroundAPIView.as_view(), name='header-background'),
     path('slider-images/', SliderImagesAPIView.as_view(), name='slider-images'),
+    path('home/', HomeBundleAPIView.as_view(), name='home-bundle'),  # هر چهار بخش صفحهٔ اصلی در یک درخواست
     path('news/slider/', NewsSliderAPIView.as_view(), name='news-slider'),  # فقط ۴ خبر
     path('news/', NewsListAPIView.as_view(), name='news-list'),  # همه اخبار
     path('news/<int:pk>/', NewsDetailView.as_view(), name='news-detail'),
@@ -5,41 +5,96 @@ from rest_framework.parsers import MultiPartParser
 from rest_framework.permissions import IsAuthenticated
 from .models import HeaderBackground , SliderImage , News,Circular,NewsImage
 from .serializers import HeaderBackgroundSerializer , SliderImageSerializer ,NewsSerializer ,CircularSerializer,BoardNewsSubmitSerializer
+from . import feeds
+from .caching import blob_response, get_or_build, get_or_build_json, request_host
+
+
+def header_background_data():
+    # آخرین بک‌گراند
+    background = HeaderBackground.objects.order_by('-created_at').first()
+    if background is None:
+        return {"background_image": ""}
+    return HeaderBackgroundSerializer(background).data
+
+
+def slider_images_data():
+    return SliderImageSerializer(SliderImage.objects.all(), many=True).data
+
+
+def news_slider_data():
+    return NewsSerializer(feeds.published_news().order_by('-created_at')[:4], many=True).data
+
+
+def circulars_latest_data(request):
+    circulars = feeds.published_circulars().order_by('-created_at')[:4]
+    return CircularSerializer(circulars, many=True, context={'request': request}).data
+
 
 class HeaderBackgroundAPIView(APIView):
     def get(self, request):
-        try:
-            # آخرین بک‌گراند را برمی‌گردانیم
-            background = HeaderBackground.objects.latest('created_at')
-            serializer = HeaderBackgroundSerializer(background)
-            return Response(serializer.data)
-        except HeaderBackground.DoesNotExist:
-            return Response({"background_image": ""}, status=200)
+        return Response(get_or_build("news", ("header",), header_background_data))
 
 
 
 class SliderImagesAPIView(APIView):
     def get(self, request):
-        images = SliderImage.objects.all()
-        serializer = SliderImageSerializer(images, many=True)
-        return Response(serializer.data)
+        return Response(get_or_build("news", ("slider",), slider_images_data))
 
 # views.py
 
 class NewsSliderAPIView(APIView):
     """چهار خبر آخر برای اسلایدر صفحه اصلی"""
     def get(self, request):
-        news_items = News.objects.filter(published=True).order_by('-created_at')[:4]
-        serializer = NewsSerializer(news_items, many=True)
-        return Response(serializer.data)
+        return Response(get_or_build("news", ("news_slider",), news_slider_data))
+
+
+class HomeBundleAPIView(APIView):
+    """
+    هر چهار بخش صفحهٔ اصلی (بک‌گراند هدر، اسلایدر، اسلایدر اخبار، آخرین بخش‌نامه‌ها) در یک پاسخ؛
+    یک blob فشرده در namespace «news» که با ذخیرهٔ هر خبر/بخش‌نامه/تصویر در ادمین باطل می‌شود.
+    """
+    def get(self, request):
+        def build():
+            return {
+                "header_background": header_background_data(),
+                "slider_images": slider_images_data(),
+                "news_slider": news_slider_data(),
+                "circulars": circulars_latest_data(request),
+            }
+        return blob_response(request, get_or_build_json("news", ("home", request_host(request)), build))
+
+
+def _feed_response(request, namespace_part, queryset, serialize):
+    """
+    ?limit=&cursor= → {"results": [...], "next": cursor}؛ بدون آن‌ها کل فهرست (قالب قبلی).
+    فقط صفحهٔ اول (با limit محدودشده) کش می‌شود تا cursorهای دلخواه کلید تازه در کش نسازند؛
+    صفحه‌های بعدی یک کوئری keyset ارزان هستند.
+    """
+    cursor, limit = request.GET.get("cursor"), request.GET.get("limit")
+    host = request_host(request)
+    if not cursor and not limit:
+        return Response(get_or_build("news", (namespace_part, host), lambda: serialize(queryset.order_by('-created_at'))))
+
+    try:
+        limit = feeds.clean_limit(limit)
+        if cursor:
+            feeds.decode_cursor(cursor)
+    except feeds.FeedError as e:
+        return Response({"detail": str(e)}, status=400)
+
+    def build():
+        data = feeds.page(queryset, cursor=cursor, limit=limit)
+        return {"results": serialize(data["items"]), "next": data["next"]}
+    if cursor:
+        return Response(build())
+    return Response(get_or_build("news", (f"{namespace_part}_page", host, limit), build))
 
 
 class NewsListAPIView(APIView):
-    """لیست کامل اخبار منتشر شده برای داشبورد"""
+    """لیست اخبار منتشر شده برای داشبورد (با cursor صفحه‌بندی می‌شود)"""
     def get(self, request):
-        news_items = News.objects.filter(published=True).order_by('-created_at')
-        serializer = NewsSerializer(news_items, many=True)
-        return Response(serializer.data)
+        return _feed_response(request, "news_list", feeds.published_news(),
+                              lambda items: NewsSerializer(items, many=True).data)
 
 
 class NewsDetailView(APIView):
@@ -53,15 +108,13 @@ class NewsDetailView(APIView):
 
 class CircularListAPIView(APIView):
     def get(self, request):
-        circulars = Circular.objects.filter(published=True).order_by('-created_at')[:4]
-        serializer = CircularSerializer(circulars, many=True, context={'request': request})
-        return Response(serializer.data)
+        return Response(get_or_build("news", ("circulars_latest", request_host(request)),
+                                     lambda: circulars_latest_data(request)))
 
 class CircularsListAPIView(APIView):
     def get(self, request):
-        circulars = Circular.objects.filter(published=True).order_by('-created_at')
-        serializer = CircularSerializer(circulars, many=True, context={'request': request})
-        return Response(serializer.data)
+        return _feed_response(request, "circulars", feeds.published_circulars(),
+                              lambda items: CircularSerializer(items, many=True, context={'request': request}).data)
 
 
 
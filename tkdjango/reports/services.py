@@ -4,12 +4,16 @@ import datetime as _dt
 from django.db.models import Count, Sum, Q, F, DateTimeField
 from django.db.models import DateField as _DateField
 
+from main import normalize
+
 # jdatetime برای تبدیل جلالی←→میلادی (اختیاری)
 try:
     import jdatetime
+    from main import jalali
     _HAS_JDATETIME = True
 except Exception:
     jdatetime = None
+    jalali = None
     _HAS_JDATETIME = False
 
 
@@ -30,9 +34,6 @@ MEDAL_STRINGS = {
 }
 
 # ---------- هِلپرهای عمومی متن/تاریخ ----------
-_FA_DIGITS = "۰۱۲۳۴۵۶۷۸۹"
-_EN_DIGITS = "0123456789"
-_AR_DIGITS = "٠١٢٣٤٥٦٧٨٩"  # Arabic-Indic U+0660..U+0669
 
 
 def get_belt_choices():
@@ -47,17 +48,7 @@ def get_belt_choices():
 
 
 def _fa_to_en(s: str) -> str:
-    if not s:
-        return ""
-    out = []
-    for ch in str(s):
-        if ch in _FA_DIGITS:
-            out.append(_EN_DIGITS[_FA_DIGITS.index(ch)])
-        elif ch in _AR_DIGITS:
-            out.append(_EN_DIGITS[_AR_DIGITS.index(ch)])
-        else:
-            out.append(ch)
-    return "".join(out)
+    return normalize.digits(s) if s else ""
 
 def _norm_date_str(s: str) -> str:
     """
@@ -119,10 +110,7 @@ def _to_gdate_from_any(v):
 
     # جلالی → میلادی
     if _HAS_JDATETIME:
-        try:
-            return jdatetime.date(y, m, d).togregorian()
-        except Exception:
-            return None
+        return jalali.to_gregorian(y, m, d)
     return None
 
 
@@ -284,6 +272,15 @@ def _role_counts(qs, model):
     return out
 
 
+def _fill_jalali(rows, dates, key, sep="/"):
+    """ستون شمسی ردیف‌ها یک‌جا با jalali.format_many (لیست‌های بزرگ از جدول روزها)؛ ورودی غیرتاریخ → بدون تغییر."""
+    if not _HAS_JDATETIME:
+        return
+    for row, text in zip(rows, jalali.format_many(dates, sep=sep)):
+        if text:
+            row[key] = text
+
+
 # ---------- سرویس گزارش کاربران (کارت‌ها + جدول) ----------
 def users_summary(start, end):
     from accounts.models import UserProfile
@@ -444,7 +441,7 @@ def coach_students(coach_id, belt_id=None, club_id=None, national_code=None):
         return EnrollmentModel.objects.filter(**{f"{pf}_id": pid}).count()
 
     # ساخت ردیف‌ها
-    rows = []
+    rows, birth_dates = [], []
     for p in players_iter:
         fname = getattr(p, "first_name", "") or ""
         lname = getattr(p, "last_name", "") or ""
@@ -465,6 +462,7 @@ def coach_students(coach_id, belt_id=None, club_id=None, national_code=None):
         # نمایش تاریخ تولد فقط برای جدول/جستجوی متنی؛ نه فیلتر
         birth_str = ""
         birth_jalali = ""
+        birth_raw = None
         for dob_field in (
             "birth_date", "date_of_birth", "dob", "birthdate", "birthday",
             "dateBirth", "datebirth", "birth"
@@ -473,13 +471,8 @@ def coach_students(coach_id, belt_id=None, club_id=None, national_code=None):
                 _dv = getattr(p, dob_field)
                 if hasattr(_dv, "strftime"):
                     birth_str = _dv.strftime("%Y-%m-%d")
-                    try:
-                        if jdatetime and isinstance(_dv, (_dt.date, _dt.datetime)):
-                            if isinstance(_dv, _dt.datetime): _dv = _dv.date()
-                            j = jdatetime.date.fromgregorian(date=_dv)
-                            birth_jalali = f"{j.year:04d}-{j.month:02d}-{j.day:02d}"
-                    except Exception:
-                        pass
+                    if isinstance(_dv, (_dt.date, _dt.datetime)):
+                        birth_raw = _dv
                 elif _dv:
                     birth_str = str(_dv)
                 break
@@ -499,7 +492,9 @@ def coach_students(coach_id, belt_id=None, club_id=None, national_code=None):
             "medal_gold": g, "medal_silver": s, "medal_bronze": b,
             "rank_comp": r_comp, "rank_total": r_total,
         })
+        birth_dates.append(birth_raw)
 
+    _fill_jalali(rows, birth_dates, "birth_date_jalali", sep="-")
     return {
         "rows": rows,
         "filters_applied": {
@@ -790,7 +785,7 @@ def club_students(club_id, belt_id=None, coach_id=None, national_code=None):
             return 0
         return EnrollmentModel.objects.filter(**{f"{pf}_id": pid}).count()
 
-    rows = []
+    rows, birth_dates = [], []
     for p in players:
         fname = getattr(p, "first_name", "") or ""
         lname = getattr(p, "last_name", "") or ""
@@ -818,18 +813,14 @@ def club_students(club_id, belt_id=None, coach_id=None, national_code=None):
         # تاریخ تولد فقط برای نمایش
         birth_str = ""
         birth_jalali = ""
+        birth_raw = None
         for dob_field in ("birth_date","date_of_birth","dob","birthdate","birthday","dateBirth","datebirth","birth"):
             if hasattr(p, dob_field):
                 _dv = getattr(p, dob_field)
                 if hasattr(_dv, "strftime"):
                     birth_str = _dv.strftime("%Y-%m-%d")
-                    try:
-                        if jdatetime and isinstance(_dv, (_dt.date, _dt.datetime)):
-                            if isinstance(_dv, _dt.datetime): _dv = _dv.date()
-                            j = jdatetime.date.fromgregorian(date=_dv)
-                            birth_jalali = f"{j.year:04d}-{j.month:02d}-{j.day:02d}"
-                    except Exception:
-                        pass
+                    if isinstance(_dv, (_dt.date, _dt.datetime)):
+                        birth_raw = _dv
                 elif _dv:
                     birth_str = str(_dv)
                 break
@@ -849,7 +840,9 @@ def club_students(club_id, belt_id=None, coach_id=None, national_code=None):
             "medal_gold": g, "medal_silver": s, "medal_bronze": b,
             "rank_comp": r_comp, "rank_total": r_total,
         })
+        birth_dates.append(birth_raw)
 
+    _fill_jalali(rows, birth_dates, "birth_date_jalali", sep="-")
     return {
         "rows": rows,
         "filters_applied": {
@@ -1218,7 +1211,7 @@ def board_coaches_referees(board_id=None, role=None, club_id=None, national_code
     created_field = _created_or_approved_field(UserProfile)
     base_qs = base_qs.select_related("club").order_by("last_name", "first_name", "id")
 
-    rows = []
+    rows, joined_dates = [], []
     for p in base_qs:
         fname = getattr(p, "first_name", "") or ""
         lname = getattr(p, "last_name", "") or ""
@@ -1233,14 +1226,7 @@ def board_coaches_referees(board_id=None, role=None, club_id=None, national_code
         club_names = _clubs_list_for_profile(p)  # 👈 همه باشگاه‌ها
 
         joined = getattr(p, created_field, None) if created_field else None
-        joined_jalali = ""
-        if joined and _HAS_JDATETIME:
-            try:
-                d = joined.date() if isinstance(joined, _dt.datetime) else joined
-                j = jdatetime.date.fromgregorian(date=d)
-                joined_jalali = f"{j.year:04d}/{j.month:02d}/{j.day:02d}"
-            except Exception:
-                pass
+        joined_dates.append(joined)
 
         # تعداد بازیکنان شخص (اگر مربی نباشد احتمالاً 0 می‌ماند)
         players_count = _players_count_for_person(p.id)
@@ -1259,11 +1245,12 @@ def board_coaches_referees(board_id=None, role=None, club_id=None, national_code
             "phone": phone or "",
             "club_name": club_names,  # 👈 لیستی
             "players_count": players_count,  # 👈 جایگزین ستون هیئت
-            "joined_jalali": joined_jalali or "",
+            "joined_jalali": "",
             "medal_gold": g, "medal_silver": s, "medal_bronze": b,
             "rank_total": r_total or 0,
         })
 
+    _fill_jalali(rows, joined_dates, "joined_jalali")
     return {
         "rows": rows,
         "filters_applied": {
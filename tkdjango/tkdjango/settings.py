@@ -80,12 +80,49 @@ WSGI_APPLICATION = "tkdjango.wsgi.application"
 # ─────────────────────────────────────────────
 # Database
 # ─────────────────────────────────────────────
-DATABASES = {
-    "default": {
-        "ENGINE": "django.db.backends.sqlite3",
-        "NAME": BASE_DIR / "db.sqlite3",
+# DB_ENGINE=sqlite (پیش‌فرض، استقرارهای کوچک) یا postgres (روز ثبت‌نام / چند worker)
+# بنچمارک: python manage.py bench_registration
+DB_ENGINE = config("DB_ENGINE", default="sqlite").strip().lower()
+
+if DB_ENGINE in ("postgres", "postgresql"):
+    # درایور: psycopg[binary,pool] (requirements.txt)؛ DB_POOL=pool داخلی جنگو، بدون pool اتصال پایدار با CONN_MAX_AGE
+    _DB_POOL = config("DB_POOL", default=False, cast=bool)
+    DATABASES = {
+        "default": {
+            "ENGINE": "django.db.backends.postgresql",
+            "NAME": config("DB_NAME", default="tkd"),
+            "USER": config("DB_USER", default="tkd"),
+            "PASSWORD": config("DB_PASSWORD", default=""),
+            "HOST": config("DB_HOST", default="127.0.0.1"),
+            "PORT": config("DB_PORT", default="5432"),
+            "CONN_MAX_AGE": 0 if _DB_POOL else config("DB_CONN_MAX_AGE", default=60, cast=int),
+            "CONN_HEALTH_CHECKS": True,
+            "OPTIONS": {
+                "pool": {
+                    "min_size": config("DB_POOL_MIN", default=2, cast=int),
+                    "max_size": config("DB_POOL_MAX", default=20, cast=int),
+                    "timeout": config("DB_POOL_TIMEOUT", default=10, cast=int),
+                },
+            } if _DB_POOL else {},
+        }
+    }
+else:
+    # WAL: خواننده‌ها پشت نویسنده نمی‌مانند؛ IMMEDIATE: قفل نوشتن از ابتدای تراکنش گرفته می‌شود
+    # تا ارتقای قفل وسط تراکنش (database is locked بدون انتظار) رخ ندهد؛ timeout = busy timeout
+    _SQLITE_PRAGMAS = []
+    if config("SQLITE_WAL", default=True, cast=bool):
+        _SQLITE_PRAGMAS = ["PRAGMA journal_mode=WAL", "PRAGMA synchronous=NORMAL"]
+    DATABASES = {
+        "default": {
+            "ENGINE": "django.db.backends.sqlite3",
+            "NAME": config("DB_NAME", default=str(BASE_DIR / "db.sqlite3")),
+            "OPTIONS": {
+                "timeout": config("SQLITE_TIMEOUT", default=20, cast=int),
+                "transaction_mode": "IMMEDIATE",
+                "init_command": ";".join(_SQLITE_PRAGMAS),
+            },
+        }
     }
-}
 
 # ─────────────────────────────────────────────
 # Auth / REST / JWT
@@ -99,7 +136,7 @@ AUTH_PASSWORD_VALIDATORS = [
 
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "accounts.authentication.VersionedJWTAuthentication",
     ),
 }
 
@@ -176,3 +213,113 @@ PAYMENTS_DUMMY = True
 # ─────────────────────────────────────────────
 POOMSAE_ALLOW_TEST_REG = True
 SMS_DRY_RUN = True
+
+# ─────────────────────────────────────────────
+# پیامک (صف SMSOutbox + دستور send_sms_outbox)
+# ─────────────────────────────────────────────
+SMS = {
+    "DEFAULT_PROVIDER": "fake" if (SMS_DRY_RUN or DEBUG) else "payamak",
+    "EAGER": SMS_DRY_RUN or DEBUG,  # لوکال: بعد از commit همان لحظه با provider فیک
+    "MAX_ATTEMPTS": 5,
+    "BACKOFF_SECONDS": 15,         # 15، 30، 60، ... تا سقف
+    "BACKOFF_MAX_SECONDS": 600,
+    "BATCH_SIZE": 50,
+    "RETENTION_DAYS": 30,          # ردیف‌های ارسال‌شده/منقضی/ناموفق بعد از این مدت حذف می‌شوند
+    "PROVIDERS": {
+        "payamak": {
+            "USERNAME": config("MELIPAYAMAK_USERNAME", default=""),
+            "PASSWORD": config("MELIPAYAMAK_PASSWORD", default=""),
+            "BODY_ID": config("MELIPAYAMAK_BODY_ID", default=""),
+            "TIMEOUT": 10,
+        },
+    },
+}
+
+# ─────────────────────────────────────────────
+# ورود گروهی اعضا/باشگاه‌ها (دستور import_members)
+# ─────────────────────────────────────────────
+IMPORTS = {
+    "CHUNK_SIZE": config("IMPORT_CHUNK_SIZE", default=1000, cast=int),
+    # گزارش خطا (کد ملی/موبایل) → پوشهٔ خصوصی، بیرون از MEDIA_ROOT
+    "REPORT_DIR": config("IMPORT_REPORT_DIR", default=str(BASE_DIR / "private" / "imports")),
+    "STRICT_NATIONAL_CODE": False,
+}
+
+# تأیید گروهی ثبت‌نام‌ها (accounts.approvals): هش رمزها در ThreadPool
+APPROVALS = {
+    "HASH_WORKERS": config("APPROVAL_HASH_WORKERS", default=min(8, os.cpu_count() or 1), cast=int),
+    "BATCH_SIZE": 500,
+}
+
+# جستجوی فارسی پروفایل‌ها/باشگاه‌ها (accounts.search): FTS5 روی SQLite، pg_trgm روی PostgreSQL
+SEARCH = {
+    "MIN_LENGTH": 2,
+    "LIMIT": 20,
+    "MAX_LIMIT": 100,
+}
+
+# ─────────────────────────────────────────────
+# Cache
+# ─────────────────────────────────────────────
+# CACHE_BACKEND: file (پیش‌فرض؛ مشترک بین worker ها روی یک سرور)، redis (نیازمند پکیج redis)،
+# locmem (هر پروسه جدا — فقط برای توسعه؛ با DEBUG=False هشدار main.W001 می‌دهد)
+CACHE_BACKEND = config("CACHE_BACKEND", default="file").strip().lower()
+_CACHE_BACKENDS = {
+    "locmem": ("django.core.cache.backends.locmem.LocMemCache", "tkd"),
+    "file": ("django.core.cache.backends.filebased.FileBasedCache", str(BASE_DIR / ".cache")),
+    "redis": ("django.core.cache.backends.redis.RedisCache", "redis://127.0.0.1:6379/1"),
+}
+CACHES = {
+    "default": {
+        "BACKEND": _CACHE_BACKENDS[CACHE_BACKEND][0],
+        "LOCATION": config("CACHE_LOCATION", default=_CACHE_BACKENDS[CACHE_BACKEND][1]),
+        "KEY_PREFIX": config("CACHE_KEY_PREFIX", default="tkd"),
+        "TIMEOUT": 300,
+        "OPTIONS": {"MAX_ENTRIES": 20000} if CACHE_BACKEND != "redis" else {},
+    }
+}
+
+# main.caching — TTL هر namespace (ثانیه)؛ باطل‌سازی با سیگنال مدل‌ها انجام می‌شود
+CACHE_LAYER = {
+    "ENABLED": config("CACHE_LAYER_ENABLED", default=True, cast=bool),
+    "DEFAULT_TTL": 300,
+    "TTL": {
+        "competitions": 60,   # باز/بسته بودن ثبت‌نام به زمان وابسته است
+        "brackets": 300,
+        "news": 300,
+        "form_data": 600,
+    },
+}
+
+# کش کوتاه‌مدت نقش/پروفایل کاربر (accounts.actor) — ثانیه؛ 0 یعنی بدون کش
+ACTOR_CACHE_TTL = config("ACTOR_CACHE_TTL", default=60, cast=int)
+
+# کش payload کارت شناسایی (competitions.services.card_service) — ثانیه؛ با سیگنال‌ها پاک می‌شود
+# (روی کش غیرمشترک مثل locmem حداکثر card_service.LOCAL_CARD_TTL)
+CARD_CACHE_TTL = config("CARD_CACHE_TTL", default=6 * 60 * 60, cast=int)
+
+# LRU داخل پروسه برای کلید مسابقه در URL → (نوع، id) (competitions.services.competition_key_service)
+COMPETITION_KEY_CACHE_SIZE = config("COMPETITION_KEY_CACHE_SIZE", default=2048, cast=int)
+
+# کد تأیید پیامکی (accounts.otp) — store: db یا cache؛ cache فقط با کش مشترک بین پروسه‌ها
+OTP = {
+    "STORE": config("OTP_STORE", default="db"),
+    "TTL_SECONDS": 180,
+    "COOLDOWN_SECONDS": 180,
+    "MAX_VERIFY_ATTEMPTS": 3,
+    "WINDOW_SECONDS": 3600,
+    "MAX_SENDS_PER_PHONE": 5,
+    "MAX_SENDS_PER_IP": 20,
+    "MAX_FAILS_PER_IP": 15,
+    # پشت nginx/لودبالانسر: IP/CIDR آن‌ها (جدا با کاما)؛ خالی = X-Forwarded-For نادیده گرفته می‌شود
+    "TRUSTED_PROXIES": config("OTP_TRUSTED_PROXIES", default="", cast=lambda v: [p for p in v.split(",") if p.strip()]),
+}
+
+# نسخه‌های کوچک تصاویر (main.images) — webp در صورت پشتیبانی Pillow، وگرنه jpeg
+IMAGE_VARIANTS = {
+    "FORMAT": "webp",
+    "QUALITY": 80,
+    "LAZY": True,       # نسخهٔ ناموجود: آدرس اصلی + ساخت در پس‌زمینه بعد از commit
+    "LAZY_WORKERS": 1,
+    "ON_UPLOAD": True,  # ساخت بعد از ذخیرهٔ مدل
+}